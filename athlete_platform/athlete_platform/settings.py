@@ -204,6 +204,15 @@ AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', 'us-east-1')
 AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
 AWS_DEFAULT_ACL = 'public-read'
 AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
+# Shared boto3 client tuning (see core/utils/aws_clients.py)
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '32'))
+AWS_CONNECT_TIMEOUT = int(os.getenv('AWS_CONNECT_TIMEOUT', '5'))
+AWS_READ_TIMEOUT = int(os.getenv('AWS_READ_TIMEOUT', '30'))
+AWS_MAX_RETRY_ATTEMPTS = int(os.getenv('AWS_MAX_RETRY_ATTEMPTS', '5'))
+# Upper bound on concurrent GETs issued by S3Utils.fetch_many
+S3_FETCH_MAX_WORKERS = int(os.getenv('S3_FETCH_MAX_WORKERS', '8'))
+# Raw payload codec for S3Utils.store_json_data: identity (indented JSON), gzip or zstd
+S3_JSON_CODEC = os.getenv('S3_JSON_CODEC', 'identity')
 
 # Static files configuration
 STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/static/'
@@ -222,6 +231,11 @@ GARMIN_PASSWORD_ALT_1 = os.getenv('GARMIN_PASSWORD_ALT_1', 'test_password')
 GARMIN_USERNAME_ALT_2 = os.getenv('GARMIN_USERNAME_ALT_2', 'hash_user')
 GARMIN_PASSWORD_ALT_2 = os.getenv('GARMIN_PASSWORD_ALT_2', 'hash_password')
 
+# Garmin collection: concurrent workers, request budget and 429 retries per collect_data call
+GARMIN_COLLECTION_WORKERS = int(os.getenv('GARMIN_COLLECTION_WORKERS', '4'))
+GARMIN_REQUESTS_PER_SECOND = float(os.getenv('GARMIN_REQUESTS_PER_SECOND', '4'))
+GARMIN_MAX_RETRIES = int(os.getenv('GARMIN_MAX_RETRIES', '4'))
+
 # Encrypt credentials when defining profiles
 GARMIN_PROFILES = {
     'default': {
@@ -342,6 +356,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'httpx': {  # One INFO line per API request otherwise
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
@@ -411,6 +430,15 @@ CORS_ALLOW_HEADERS = [
     'XSRF-TOKEN',
 ]
 
+# Freshness of stale-while-revalidate biometric reads
+CORS_EXPOSE_HEADERS = [
+    'X-Data-Last-Synced',
+    'X-Data-Stale',
+    'X-Data-Refresh-Pending',
+    'X-Sync-Job-Id',
+    'X-Sync-Status-Url',
+]
+
 
 # CSRF_COOKIE_SECURE = not DEBUG  # False in development, True in production
 #TODO
@@ -423,22 +451,73 @@ WHOOP_CLIENT_ID = os.getenv('WHOOP_CLIENT_ID')
 WHOOP_CLIENT_SECRET = os.getenv('WHOOP_CLIENT_SECRET')
 WHOOP_REDIRECT_URI = os.getenv('WHOOP_REDIRECT_URI') 
 WHOOP_TOKEN_URL = os.getenv('WHOOP_TOKEN_URL', 'https://api.prod.whoop.com/oauth/oauth2/token')
-
-# Add cache configuration for sync locks
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-#         'LOCATION': 'redis://127.0.0.1:6379/1',
-#     }
-# }
-
-#without redis
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+WHOOP_MAX_CONCURRENT_REQUESTS = int(os.getenv('WHOOP_MAX_CONCURRENT_REQUESTS', '8'))
+WHOOP_RANGE_FETCH = os.getenv('WHOOP_RANGE_FETCH', 'True') == 'True'
+# App-wide WHOOP budget shared by all collectors through the cache (WHOOP allows 100/min per app)
+WHOOP_RATE_LIMIT_PER_MINUTE = int(os.getenv('WHOOP_RATE_LIMIT_PER_MINUTE', '90'))
+WHOOP_RATE_LIMIT_BURST = int(os.getenv('WHOOP_RATE_LIMIT_BURST', '20'))
+WHOOP_RATE_LIMIT_MAX_WAIT = int(os.getenv('WHOOP_RATE_LIMIT_MAX_WAIT', '120'))
+# Webhooks (signed with WHOOP_CLIENT_SECRET) older than this many seconds are refused. While an
+# athlete's webhooks arrived in the last WHOOP_WEBHOOK_ACTIVE_HOURS, default syncs skip the settling lookback
+WHOOP_WEBHOOK_MAX_AGE = int(os.getenv('WHOOP_WEBHOOK_MAX_AGE', '300'))
+WHOOP_WEBHOOK_ACTIVE_HOURS = int(os.getenv('WHOOP_WEBHOOK_ACTIVE_HOURS', '24'))
+
+# Team-wide sync: athletes synced concurrently, each with its own time budget
+COACH_SYNC_WORKERS = int(os.getenv('COACH_SYNC_WORKERS', '4'))
+COACH_SYNC_ATHLETE_TIMEOUT = int(os.getenv('COACH_SYNC_ATHLETE_TIMEOUT', '120'))
+COACH_SYNC_TOTAL_TIMEOUT = int(os.getenv('COACH_SYNC_TOTAL_TIMEOUT', '0')) or None
+# Team and position summaries read TeamDailyRollup (run `python manage.py rebuild_team_rollups` before enabling)
+COACH_ROLLUP_SUMMARIES = os.getenv('COACH_ROLLUP_SUMMARIES', 'False') == 'True'
+# Day window of the precomputed team snapshot served by team_cached_biometrics
+TEAM_SNAPSHOT_DAYS = int(os.getenv('TEAM_SNAPSHOT_DAYS', '7'))
+
+# Background sync jobs: 'thread' runs them on a pool in the web process, 'worker'
+# leaves them for `python manage.py run_sync_jobs`, 'celery' sends them to the broker
+SYNC_JOB_BACKEND = os.getenv('SYNC_JOB_BACKEND', 'thread')
+SYNC_JOB_WORKERS = int(os.getenv('SYNC_JOB_WORKERS', '2'))
+SYNC_JOB_STALE_SECONDS = int(os.getenv('SYNC_JOB_STALE_SECONDS', '1800'))
+SYNC_JOB_MAX_ATTEMPTS = int(os.getenv('SYNC_JOB_MAX_ATTEMPTS', '3'))
+# Seconds a source sync waits on a running sync of the same athlete and source before running itself
+SYNC_SINGLE_FLIGHT_WAIT = int(os.getenv('SYNC_SINGLE_FLIGHT_WAIT', '120'))
+# Default syncs resume after each athlete and source's settled watermark (SyncState) instead
+# of rescanning 30 days; the last SYNC_SETTLING_DAYS stay open for late-arriving scores
+SYNC_INCREMENTAL = os.getenv('SYNC_INCREMENTAL', 'True') == 'True'
+SYNC_SETTLING_DAYS = int(os.getenv('SYNC_SETTLING_DAYS', '3'))
+# Seconds a day a source answered with no data is skipped by syncs (0 disables the negative cache)
+EMPTY_DAY_CACHE_TTL = int(os.getenv('EMPTY_DAY_CACHE_TTL', '21600'))
+# Syncs fetch each contiguous run of missing days as its own range, joining runs across gaps the
+# source's cost model says are cheaper to refetch than another API range (False never joins them)
+SYNC_PLAN_MERGE_GAPS = os.getenv('SYNC_PLAN_MERGE_GAPS', 'True') == 'True'
+# Biometric reads answer from the database and queue a sync when the window is stale,
+# at most once per BIOMETRIC_REFRESH_INTERVAL seconds per athlete
+BIOMETRIC_STALE_WHILE_REVALIDATE = os.getenv('BIOMETRIC_STALE_WHILE_REVALIDATE', 'True') == 'True'
+BIOMETRIC_REFRESH_INTERVAL = int(os.getenv('BIOMETRIC_REFRESH_INTERVAL', '900'))
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://127.0.0.1:6379/0')
+CELERY_TASK_ACKS_LATE = True
+
+# Shared async HTTP client used by API collectors
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '20'))
+ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv('ASYNC_HTTP_MAX_KEEPALIVE', '10'))
+ASYNC_HTTP_TIMEOUT = float(os.getenv('ASYNC_HTTP_TIMEOUT', '30'))
+
+# Cache used by sync locks and rate limits. Set CACHE_REDIS_URL (e.g. redis://127.0.0.1:6379/1)
+# so they span gunicorn workers, the local memory cache only covers one process.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    #without redis
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
 
 # Add this near your other environment variables
 DEVELOPMENT_PASSWORD = os.getenv('DEVELOPMENT_PASSWORD')
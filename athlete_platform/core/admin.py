@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Team, Athlete, WorkoutData, CoreBiometricData, CoachCode, Coach, CoreBiometricTimeSeries
+from .models import User, Team, Athlete, WorkoutData, CoreBiometricData, CoachCode, Coach, CoreBiometricTimeSeries, GarminSessionToken, SyncJob, TeamDailyRollup, TeamSnapshot, SyncState
 from django.utils import timezone
 import uuid
 import random
@@ -100,6 +100,36 @@ class CoachAdmin(admin.ModelAdmin):
         }),
     )
 
+class GarminSessionTokenAdmin(admin.ModelAdmin):
+    list_display = ('profile_type', 'resume_count', 'login_count', 'resume_failure_count', 'last_resumed_at', 'last_login_at')
+    readonly_fields = ('profile_type', 'resume_count', 'login_count', 'resume_failure_count', 'last_resumed_at', 'last_login_at', 'created_at', 'updated_at')
+    # Never render the session tokens, even encrypted
+    exclude = ('encrypted_tokens',)
+
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'status', 'athlete', 'team', 'reason', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('job_type', 'status', 'reason')
+    search_fields = ('athlete__user__username', 'team__name')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'updated_at')
+
+class TeamDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('team', 'position', 'date', 'metric', 'value_count', 'value_sum', 'value_min', 'value_max', 'updated_at')
+    list_filter = ('position', 'metric')
+    search_fields = ('team__name',)
+    readonly_fields = ('updated_at',)
+
+class TeamSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('team', 'days', 'version', 'stale', 'generated_at', 'updated_at')
+    list_filter = ('stale', 'days')
+    search_fields = ('team__name',)
+    readonly_fields = ('generated_at', 'updated_at')
+
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ('athlete', 'source', 'settled_through', 'last_success_at', 'updated_at')
+    list_filter = ('source',)
+    search_fields = ('athlete__user__username',)
+    readonly_fields = ('updated_at',)
+
 # Register all models with their custom admin classes
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Team, TeamAdmin)
@@ -109,3 +139,8 @@ admin.site.register(CoreBiometricData, CoreBiometricDataAdmin)
 admin.site.register(CoreBiometricTimeSeries, CoreBiometricTimeSeriesAdmin)
 admin.site.register(CoachCode, CoachCodeAdmin)
 admin.site.register(Coach, CoachAdmin)
+admin.site.register(GarminSessionToken, GarminSessionTokenAdmin)
+admin.site.register(SyncJob, SyncJobAdmin)
+admin.site.register(TeamDailyRollup, TeamDailyRollupAdmin)
+admin.site.register(TeamSnapshot, TeamSnapshotAdmin)
+admin.site.register(SyncState, SyncStateAdmin)
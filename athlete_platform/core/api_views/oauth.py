@@ -17,6 +17,8 @@ from requests_oauthlib import OAuth2Session
 from oauthlib.oauth2 import BackendApplicationClient
 from ..db_models.oauth_tokens import OAuthTokens
 from ..models import WhoopCredentials
+from ..services.data_collectors.whoop_collector import WhoopCollector
+from ..services.whoop_webhook_service import WhoopWebhookService, verify_signature
 from django.utils import timezone
 import logging
 from django.core.signing import Signer
@@ -130,6 +132,14 @@ class WhoopCallbackView(WhoopOAuthBaseView):
             action = "Created" if created else "Updated"
             logger.info(f"{action} WHOOP credentials for user {request.user.username}")
 
+            # Webhooks name the WHOOP user, not the athlete
+            try:
+                profile = oauth.get(f"{WhoopCollector.BASE_URL}/user/profile/basic", timeout=10).json()
+                whoop_creds.whoop_user_id = str(profile['user_id'])
+                whoop_creds.save(update_fields=['whoop_user_id'])
+            except Exception as e:
+                logger.warning(f"Could not read the WHOOP user id for user {request.user.username}: {e}")
+
             # Update user's active data sources
             if 'whoop' not in request.user.active_data_sources:
                 request.user.active_data_sources.append('whoop')
@@ -190,9 +200,24 @@ def refresh_whoop_token(oauth_token):
 @method_decorator(csrf_exempt, name='dispatch')
 class WhoopWebhookView(View):
     def post(self, request):
-        """Handle WHOOP webhooks"""
+        """Verify a WHOOP webhook and queue a fetch of the changed record. WHOOP retries anything but a 2xx."""
+        if not verify_signature(
+            request.body,
+            request.headers.get('X-WHOOP-Signature-Timestamp'),
+            request.headers.get('X-WHOOP-Signature'),
+        ):
+            logger.warning("Rejected WHOOP webhook with an invalid or expired signature")
+            return JsonResponse({'error': 'Invalid signature'}, status=401)
+
         try:
-            return HttpResponse(status=200)
-        except Exception as e:
-            logger.error(f"Webhook processing failed: {str(e)}")
+            job = WhoopWebhookService().handle(json.loads(request.body))
+        except ValueError as e:
+            logger.error(f"Invalid WHOOP webhook: {str(e)}")
             return JsonResponse({'error': str(e)}, status=400)
+        except Exception as e:
+            logger.error(f"Webhook processing failed: {str(e)}", exc_info=True)
+            return JsonResponse({'error': 'Webhook processing failed'}, status=500)
+
+        if job is None:
+            return JsonResponse({'status': 'ignored'})
+        return JsonResponse({'status': 'queued', 'job_id': str(job.id)})
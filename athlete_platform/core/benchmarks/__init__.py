@@ -0,0 +1,18 @@
+"""
+Micro-benchmarks for the data pipeline, run with `python manage.py benchmark <name>`.
+
+Each benchmark module exposes run(**options) returning a dict of timings.
+"""
+from . import s3_client, json_codec, whoop_collector, team_window, coach_dashboard, sync_watermark, sync_plan
+
+BENCHMARKS = {
+    's3-client': s3_client,
+    'json-codec': json_codec,
+    'whoop-collector': whoop_collector,
+    'team-window': team_window,
+    'coach-dashboard': coach_dashboard,
+    'sync-watermark': sync_watermark,
+    'sync-plan': sync_plan,
+}
+
+__all__ = ['BENCHMARKS']
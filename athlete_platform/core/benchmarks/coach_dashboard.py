@@ -0,0 +1,97 @@
+"""Coach dashboard: the four section endpoints called separately vs one composite load"""
+import random
+import time
+from datetime import timedelta
+from typing import Any, Dict
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Athlete, CoreBiometricData, Team, User
+from core.services.coach_data_sync_service import CoachDataSyncService
+
+DESCRIPTION = 'Coach dashboard for 40 athletes x 7 days: four separate section calls vs one composite load (rolled back fixture)'
+
+ATHLETES = 40
+DAYS = 7
+POSITIONS = ['FORWARD', 'MIDFIELDER', 'DEFENDER', 'GOALKEEPER']
+
+
+def _create_team(seed: int = 5) -> Team:
+    """Fixture team written with bulk_create, so no user or ingest signals fire"""
+    rng = random.Random(seed)
+    coach, = User.objects.bulk_create([User(username=f'benchmark-coach-{seed}', role='COACH')])
+    team = Team.objects.create(name='Benchmark Team', coach=coach)
+    users = User.objects.bulk_create([
+        User(username=f'benchmark-athlete-{seed}-{number}', role='ATHLETE') for number in range(ATHLETES)
+    ])
+    athletes = Athlete.objects.bulk_create([
+        Athlete(user=user, team=team, position=POSITIONS[number % len(POSITIONS)], jersey_number=number)
+        for number, user in enumerate(users)
+    ])
+    team.athletes_array = [str(user.id) for user in users]
+    team.save(update_fields=['athletes_array'])
+
+    today = timezone.now().date()
+    CoreBiometricData.objects.bulk_create([
+        CoreBiometricData(
+            athlete=athlete,
+            date=today - timedelta(days=offset),
+            resting_heart_rate=rng.randint(42, 65),
+            max_heart_rate=rng.randint(150, 195),
+            hrv_ms=round(rng.uniform(30, 120), 1),
+            recovery_score=round(rng.uniform(20, 99), 1),
+            total_sleep_seconds=rng.randint(18000, 34000),
+            total_steps=rng.randint(2000, 22000),
+        )
+        for athlete in athletes
+        for offset in range(DAYS)
+    ])
+    return team
+
+
+def _separate_calls(team: Team) -> Dict[str, Any]:
+    """What the dashboard did before: one request, and so one service, per section"""
+    return {
+        'team_summary': CoachDataSyncService(team=team).get_team_biometric_summary(days=DAYS),
+        'position_summaries': CoachDataSyncService(team=team).get_position_biometric_summary(days=DAYS),
+        'comparison': CoachDataSyncService(team=team).get_biometric_comparison_by_position(days=DAYS),
+        'optimization': CoachDataSyncService(team=team).get_training_optimization_data(days=DAYS),
+    }
+
+
+def _composite_call(team: Team) -> Dict[str, Any]:
+    return CoachDataSyncService(team=team).get_dashboard_data(days=DAYS)
+
+
+def _measure(path, team: Team, iterations: int):
+    with CaptureQueriesContext(connection) as queries:
+        output = path(team)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        path(team)
+    return output, len(queries), (time.perf_counter() - started) * 1000 / iterations
+
+
+def run(iterations: int = 20, **options) -> Dict[str, Any]:
+    # The fixture never outlives the benchmark
+    with transaction.atomic():
+        team = _create_team()
+        separate, separate_queries, separate_ms = _measure(_separate_calls, team, iterations)
+        composite, composite_queries, composite_ms = _measure(_composite_call, team, iterations)
+        transaction.set_rollback(True)
+
+    for output in (separate, composite):
+        output['team_summary'].pop('timestamp', None)
+    if separate != composite:
+        raise AssertionError('The composite dashboard differs from the separate section calls')
+
+    return {
+        'athletes': ATHLETES,
+        'days': DAYS,
+        'iterations': iterations,
+        'separate': {'ms': round(separate_ms, 2), 'queries': separate_queries},
+        'composite': {'ms': round(composite_ms, 2), 'queries': composite_queries},
+        'speedup': round(separate_ms / composite_ms, 2),
+    }
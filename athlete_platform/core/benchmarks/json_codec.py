@@ -0,0 +1,75 @@
+"""Bytes stored and decode time per athlete-month for each raw payload codec"""
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from core.utils.json_codec import encode_json, decode_json, available_codecs
+
+DESCRIPTION = 'S3 raw payload size and decode time per athlete-month (legacy indented JSON vs compact gzip/zstd)'
+
+DAYS_PER_MONTH = 30
+# Roughly one sample every two minutes over an eight hour night, as Garmin returns them
+SLEEP_SAMPLES = 240
+
+
+def _garmin_day(current_date: date, rng: random.Random) -> Dict[str, Any]:
+    start = int(time.mktime(current_date.timetuple())) * 1000
+
+    def series(low: int, high: int) -> List[Dict[str, int]]:
+        return [{'value': rng.randint(low, high), 'startGMT': start + i * 120000} for i in range(SLEEP_SAMPLES)]
+
+    return {
+        'date': current_date.isoformat(),
+        'sleep': {
+            'dailySleepDTO': {
+                'sleepTimeSeconds': rng.randint(21000, 30000),
+                'deepSleepSeconds': rng.randint(3000, 8000),
+                'lightSleepSeconds': rng.randint(10000, 16000),
+                'remSleepSeconds': rng.randint(3000, 7000),
+                'awakeSleepSeconds': rng.randint(300, 2000),
+                'averageRespirationValue': round(rng.uniform(12, 17), 1),
+            },
+            'sleepHeartRate': series(42, 70),
+            'sleepStress': series(0, 40),
+            'sleepBodyBattery': series(20, 100),
+        },
+        'user_summary': {
+            'restingHeartRate': rng.randint(42, 60),
+            'maxHeartRate': rng.randint(140, 190),
+            'totalSteps': rng.randint(3000, 20000),
+            'totalKilocalories': rng.randint(1800, 3500),
+        },
+        'stress': {'avgStressLevel': rng.randint(10, 50), 'maxStressLevel': rng.randint(50, 99)},
+    }
+
+
+def athlete_month(seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    first = date(2025, 1, 1)
+    return [_garmin_day(first + timedelta(days=i), rng) for i in range(DAYS_PER_MONTH)]
+
+
+def run(iterations: int = 20, **options) -> Dict[str, Any]:
+    month = athlete_month()
+    variants = {'legacy_indent2': [(json.dumps(day, indent=2).encode('utf-8'), None) for day in month]}
+    for codec in available_codecs():
+        variants[codec if codec != 'identity' else 'compact'] = [encode_json(day, codec) for day in month]
+
+    legacy_bytes = sum(len(body) for body, _ in variants['legacy_indent2'])
+    results = {'days': DAYS_PER_MONTH, 'iterations': iterations, 'codecs': {}}
+    for name, payloads in variants.items():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for body, encoding in payloads:
+                decode_json(body, encoding)
+        decode_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        stored = sum(len(body) for body, _ in payloads)
+        results['codecs'][name] = {
+            'bytes_per_month': stored,
+            'ratio_vs_legacy': round(stored / legacy_bytes, 3),
+            'decode_ms_per_month': round(decode_ms, 3),
+        }
+    return results
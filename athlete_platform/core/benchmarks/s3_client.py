@@ -0,0 +1,63 @@
+"""Cost of building S3 clients per service instance vs the shared client registry"""
+import statistics
+import time
+from typing import Any, Dict
+
+import boto3
+from django.conf import settings
+
+from core.utils import aws_clients
+from core.utils.s3_utils import S3Utils
+
+DESCRIPTION = 'S3Utils construction with a client per instance vs the shared pooled client'
+
+# DataSyncService, its two processors and the WHOOP collector each build an S3Utils
+S3UTILS_PER_REQUEST = 4
+
+
+def _per_instance_client():
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME
+    )
+
+
+def _time_requests(build_client, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        for _ in range(S3UTILS_PER_REQUEST):
+            S3Utils(client=build_client(), bucket='benchmark')
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _summary(samples: list) -> Dict[str, float]:
+    return {
+        'mean_ms': round(statistics.mean(samples), 3),
+        'p50_ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+def run(iterations: int = 20, **options) -> Dict[str, Any]:
+    aws_clients.reset_clients()
+    started = time.perf_counter()
+    aws_clients.get_s3_client()
+    first_shared_ms = (time.perf_counter() - started) * 1000
+
+    per_instance = _time_requests(_per_instance_client, iterations)
+    shared = _time_requests(aws_clients.get_s3_client, iterations)
+
+    per_instance_mean = statistics.mean(per_instance)
+    shared_mean = statistics.mean(shared)
+    return {
+        'iterations': iterations,
+        's3utils_per_request': S3UTILS_PER_REQUEST,
+        'shared_client_startup_ms': round(first_shared_ms, 3),
+        'per_instance_client': _summary(per_instance),
+        'shared_client': _summary(shared),
+        'saved_per_request_ms': round(per_instance_mean - shared_mean, 3),
+    }
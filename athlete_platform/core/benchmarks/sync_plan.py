@@ -0,0 +1,66 @@
+"""Days and estimated API requests to fill a sync window's missing days: min..max span vs SyncPlan ranges"""
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from core.services.data_collectors.whoop_collector import WhoopCollector
+from core.services.data_processors import GarminProcessor
+from core.utils.sync_plan import SyncPlan
+
+DESCRIPTION = 'Days fetched and estimated requests per 30-day sync: one min..max range vs contiguous gaps vs cost-merged gaps'
+
+WINDOW_DAYS = 30
+
+
+def _cost_models():
+    # Neither cost model touches the athlete or credentials, so no fixture is needed
+    whoop = WhoopCollector.__new__(WhoopCollector)
+    whoop.range_fetch = True
+    return {
+        'whoop': whoop.fetch_cost_model(),
+        'garmin': GarminProcessor.__new__(GarminProcessor).fetch_cost_model(),
+    }
+
+
+def _scenarios(end: date, rng: random.Random) -> Dict[str, List[date]]:
+    window = [end - timedelta(days=offset) for offset in range(WINDOW_DAYS)]
+    return {
+        # A day that failed weeks ago, plus today
+        'one_old_gap': [end - timedelta(days=25), end],
+        # Days the device wasn't worn
+        'scattered': [day for day in window if rng.random() < 0.2],
+        'weekends': [day for day in window if day.weekday() >= 5],
+        'recent_week': window[:7],
+    }
+
+
+def _summary(plan: SyncPlan, days: int, requests: float) -> Dict[str, Any]:
+    return {'ranges': len(plan.ranges), 'days': days, 'requests': round(requests, 2)}
+
+
+def run(iterations: int = 1000, **options) -> Dict[str, Any]:
+    end = date(2025, 3, 31)
+    start = end - timedelta(days=WINDOW_DAYS - 1)
+    scenarios = _scenarios(end, random.Random(7))
+    results: Dict[str, Any] = {}
+
+    for source, cost_model in _cost_models().items():
+        for name, missing in scenarios.items():
+            plan = SyncPlan(source, start, end, missing, cost_model)
+            merged = SyncPlan(source, start, end, missing, cost_model, merge_gaps=True)
+            span_days = (max(missing) - min(missing)).days + 1
+            results[f'{source}:{name}'] = {
+                'missing_days': len(missing),
+                'span': {'ranges': 1, 'days': span_days, 'requests': round(plan.span_requests, 2)},
+                'gaps': _summary(plan, plan.fetch_days, plan.estimated_requests),
+                'merged': _summary(merged, merged.fetch_days, merged.estimated_requests),
+            }
+
+    # Planning is pure date arithmetic, it should cost nothing next to one request
+    missing = scenarios['scattered']
+    started = time.perf_counter()
+    for _ in range(iterations):
+        SyncPlan('whoop', start, end, missing, merge_gaps=True)
+    results['plan_us'] = round((time.perf_counter() - started) / iterations * 1e6, 2)
+    return results
@@ -0,0 +1,96 @@
+"""Routine default syncs: the fixed 30-day window vs resuming after the SyncState watermark"""
+import time
+from datetime import timedelta
+from typing import Any, Dict
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from core.models import Athlete, User, WhoopCredentials
+from core.services.data_sync_service import DataSyncService
+
+DESCRIPTION = 'Processor calls and days checked per routine default sync: fixed 30-day window vs SyncState watermark (rolled back fixture)'
+
+ROUTINE_SYNCS = 5
+
+
+class _CountingProcessor:
+    """Stands in for a source processor, counting the days each sync asks it to check"""
+
+    def __init__(self):
+        self.calls = 0
+        self.days = 0
+
+    def sync_data(self, start_date, end_date, force_refresh=False):
+        self.calls += 1
+        self.days += (end_date - start_date).days + 1
+        return True
+
+
+class _BenchmarkSyncService(DataSyncService):
+    def __init__(self, athlete, processor):
+        self.processor = processor
+        super().__init__(athlete)
+
+    def _initialize_processors(self):
+        pass
+
+    def _create_processor(self, source):
+        return self.processor
+
+
+def _create_athlete(seed: int) -> Athlete:
+    """Fixture athlete with WHOOP credentials, written with bulk_create so no user signals fire"""
+    user, = User.objects.bulk_create([User(username=f'benchmark-sync-{seed}', role='ATHLETE')])
+    athlete, = Athlete.objects.bulk_create([Athlete(user=user)])
+    WhoopCredentials.objects.create(
+        athlete=athlete, access_token='benchmark', refresh_token='benchmark',
+        expires_at=timezone.now() + timedelta(days=1),
+    )
+    return Athlete.objects.get(pk=athlete.pk)
+
+
+def _routine_syncs(athlete: Athlete, syncs: int):
+    """Per sync processor calls, days checked, queries and time of back to back default syncs"""
+    rounds = []
+    for _ in range(syncs):
+        # Each sync stands for one on a later visit, so none shares a previous sync's result
+        no_sharing = mock.patch('core.services.data_sync_service.single_flight', lambda key, work, **kwargs: work())
+        processor = _CountingProcessor()
+        service = _BenchmarkSyncService(athlete, processor)
+        started = time.perf_counter()
+        with no_sharing, CaptureQueriesContext(connection) as queries:
+            service.sync_specific_sources(['whoop'])
+        rounds.append({
+            'calls': processor.calls,
+            'days_checked': processor.days,
+            'queries': len(queries),
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+        })
+    return rounds
+
+
+def run(iterations: int = ROUTINE_SYNCS, **options) -> Dict[str, Any]:
+    # Each iteration is one default sync, the first watermark sync has nothing to resume from
+    syncs = min(max(2, iterations), 10)
+
+    # The fixture never outlives the benchmark
+    with transaction.atomic():
+        with override_settings(SYNC_INCREMENTAL=False):
+            fixed = _routine_syncs(_create_athlete(1), syncs)
+        with override_settings(SYNC_INCREMENTAL=True):
+            watermark = _routine_syncs(_create_athlete(2), syncs)
+        transaction.set_rollback(True)
+
+    routine = watermark[1:]
+    return {
+        'syncs': syncs,
+        'fixed_window': fixed[-1],
+        'watermark_first': watermark[0],
+        'watermark_routine': {
+            key: round(sum(sync[key] for sync in routine) / len(routine), 2) for key in routine[0]
+        },
+        'days_checked_saved': round(1 - routine[-1]['days_checked'] / fixed[-1]['days_checked'], 2),
+    }
@@ -0,0 +1,158 @@
+"""Per-athlete and per-position statistics for a team window: per-row Python lists vs the columnar TeamWindow"""
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from core.services.coach_data_sync_service import CoachDataSyncService
+from core.utils.team_window import TeamWindow
+
+DESCRIPTION = 'Coach position detail for 50 athletes x 365 days: per-athlete row objects and getattr lists vs one columnar TeamWindow'
+
+ATHLETES = 50
+DAYS = 365
+END_DATE = date(2025, 12, 31)
+
+
+def _fake_team(seed: int = 11):
+    rng = random.Random(seed)
+    team = SimpleNamespace(id=uuid.uuid4(), name='Benchmark Team')
+    athletes = [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            user=SimpleNamespace(username=f'athlete{number}'),
+            position='FORWARD',
+            jersey_number=number,
+        )
+        for number in range(ATHLETES)
+    ]
+    start_date = END_DATE - timedelta(days=DAYS)
+    rows = []
+    for athlete in athletes:
+        for offset in range(DAYS + 1):
+            # Roughly one day in ten has no wearable data
+            if rng.random() < 0.1:
+                continue
+            rows.append({
+                'athlete_id': athlete.id,
+                'date': start_date + timedelta(days=offset),
+                'source': 'garmin',
+                'resting_heart_rate': rng.randint(42, 65),
+                'max_heart_rate': rng.randint(150, 195),
+                'hrv_ms': round(rng.uniform(30, 120), 1),
+                'recovery_score': round(rng.uniform(20, 99), 1),
+                'total_sleep_seconds': rng.randint(18000, 34000),
+                'total_steps': rng.randint(2000, 22000),
+                'strain': round(rng.uniform(3, 20), 1),
+            })
+    return team, athletes, start_date, rows
+
+
+def _legacy_position_data(service: CoachDataSyncService, athletes, rows_by_athlete: Dict[Any, List[Any]]):
+    """The per-athlete path: one query per athlete, then per-metric lists built with getattr"""
+    averages_by_athlete = []
+    for athlete in athletes:
+        athlete_rows = rows_by_athlete[athlete.id]
+        data_points = []
+        for data in athlete_rows:
+            data_point = {'date': data.date.isoformat(), 'metrics': {}}
+            for metric in service.BIOMETRIC_METRICS:
+                db_field = service._get_db_field_name(metric)
+                if not db_field:
+                    continue
+                value = getattr(data, db_field, None)
+                if value is not None:
+                    value = round(float(value), 2)
+                    if db_field == 'total_sleep_seconds' and metric == 'sleep_hours':
+                        value = round(value / 3600, 2)
+                    data_point['metrics'][metric] = value
+            data_points.append(data_point)
+
+        averages = {}
+        for metric in service.BIOMETRIC_METRICS:
+            db_field = service._get_db_field_name(metric)
+            if not db_field:
+                continue
+            if db_field == 'total_sleep_seconds' and metric == 'sleep_hours':
+                values = [getattr(data, db_field, 0) / 3600 for data in athlete_rows]
+            else:
+                values = [getattr(data, db_field, None) for data in athlete_rows]
+            valid_values = [v for v in values if v is not None]
+            if valid_values:
+                averages[metric] = round(float(sum(valid_values) / len(valid_values)), 2)
+        averages_by_athlete.append(averages)
+
+    position_metrics = {}
+    for metric in service.BIOMETRIC_METRICS:
+        values = [averages[metric] for averages in averages_by_athlete if metric in averages]
+        if values:
+            position_metrics[metric] = round(float(sum(values) / len(values)), 2)
+    return averages_by_athlete, position_metrics
+
+
+def _window_position_data(service: CoachDataSyncService, athletes, start_date: date, values_list: List[tuple]):
+    """The TeamWindow path: one query for the position, then vectorized reductions"""
+    columns = list(dict.fromkeys(service._get_metric_field_map().values()))
+    window = TeamWindow.from_rows([athlete.id for athlete in athletes], start_date, END_DATE, columns, values_list)
+    athlete_data = [service._athlete_window_data(window, athlete) for athlete in athletes]
+
+    position_metrics = {}
+    for metric, db_field in service._get_metric_field_map().items():
+        value = window.group_mean_of_means(db_field)
+        if value is not None:
+            position_metrics[metric] = round(value * service._metric_scale(metric), 2)
+    return [data['averages'] for data in athlete_data], position_metrics
+
+
+def run(iterations: int = 20, **options) -> Dict[str, Any]:
+    iterations = min(iterations, 5)
+    team, athletes, start_date, rows = _fake_team()
+    service = CoachDataSyncService(team=team)
+
+    # What each path gets back from the database, built outside the timed section:
+    # model-like row objects per athlete query, or one values_list over the metric columns
+    rows_by_athlete = {athlete.id: [] for athlete in athletes}
+    for row in rows:
+        rows_by_athlete[row['athlete_id']].append(SimpleNamespace(**row))
+    columns = list(dict.fromkeys(service._get_metric_field_map().values()))
+    values_list = [(row['athlete_id'], row['date'], row['source'], *[row[column] for column in columns]) for row in rows]
+
+    timings = {}
+    outputs = {}
+    for name, path in (
+        ('legacy', lambda: _legacy_position_data(service, athletes, rows_by_athlete)),
+        ('team_window', lambda: _window_position_data(service, athletes, start_date, values_list)),
+    ):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            outputs[name] = path()
+        timings[name] = (time.perf_counter() - started) * 1000 / iterations
+
+    legacy_averages, legacy_position = outputs['legacy']
+    window_averages, window_position = outputs['team_window']
+    # Legacy averages the rounded athlete averages, so allow for rounding
+    mismatched = [
+        metric for metric, value in legacy_position.items()
+        if abs(window_position.get(metric, float('nan')) - value) > 0.011
+    ]
+    mismatched += [
+        metric
+        for legacy, window in zip(legacy_averages, window_averages)
+        for metric, value in legacy.items()
+        if abs(window.get(metric, float('nan')) - value) > 0.011
+    ]
+    if mismatched:
+        raise AssertionError(f"Averages differ between paths for {sorted(set(mismatched))}")
+
+    return {
+        'athletes': ATHLETES,
+        'days': DAYS,
+        'rows': len(rows),
+        'iterations': iterations,
+        # Both paths also run one roster query
+        'legacy': {'ms': round(timings['legacy'], 1), 'queries': 1 + ATHLETES},
+        'team_window': {'ms': round(timings['team_window'], 1), 'queries': 2},
+        'speedup': round(timings['legacy'] / timings['team_window'], 2),
+    }
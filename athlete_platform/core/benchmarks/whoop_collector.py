@@ -0,0 +1,179 @@
+"""WHOOP collection wall time against a local stub API with realistic latency"""
+import json
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from core.services.data_collectors.whoop_collector import WhoopCollector
+from core.utils.async_http import run_sync
+from core.utils.rate_limiter import TokenBucketLimiter
+
+DESCRIPTION = 'WHOOP collection over a stub API: serial blocking requests vs the async collector'
+
+DEFAULT_DAYS = 14
+DEFAULT_LATENCY_MS = 40
+WORKOUTS_PER_DAY = 2
+
+
+def _stub_record(kind: str, day: str, index: int) -> Dict[str, Any]:
+    """Deterministic record so list pages and detail lookups agree"""
+    record = {
+        'id': f"{kind}-{day}-{index}",
+        'start': f"{day}T{6 + index:02d}:00:00.000Z",
+        'end': f"{day}T{7 + index:02d}:00:00.000Z",
+        'timezone_offset': '+00:00',
+        'score': {'value': index + 1},
+    }
+    if kind == 'recovery':
+        record = {'cycle_id': f"cycle-{day}-0", 'created_at': record['end'], 'score': record['score']}
+    elif kind == 'sleep':
+        record['nap'] = False
+    elif kind == 'workout':
+        record['sport_id'] = 1
+    return record
+
+
+class _StubWhoopHandler(BaseHTTPRequestHandler):
+    """Serves the WHOOP endpoints the collector touches for any range, paginated newest first"""
+    protocol_version = 'HTTP/1.1'
+    latency = DEFAULT_LATENCY_MS / 1000
+    served = 0
+    served_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _list(self, kind: str, query: Dict[str, list]):
+        first = date.fromisoformat(query['start'][0][:10])
+        last = date.fromisoformat(query['end'][0][:10])
+        count = WORKOUTS_PER_DAY if kind == 'workout' else 1
+        records = [
+            _stub_record(kind, (last - timedelta(days=offset)).isoformat(), index)
+            for offset in range((last - first).days + 1)
+            for index in reversed(range(count))
+        ]
+        limit = int(query.get('limit', ['10'])[0])
+        position = int(query.get('nextToken', ['0'])[0])
+        next_position = position + limit
+        return self._send({
+            'records': records[position:next_position],
+            'next_token': str(next_position) if next_position < len(records) else None,
+        })
+
+    def do_GET(self):
+        with self.served_lock:
+            type(self).served += 1
+        time.sleep(self.latency)
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split('/') if p][2:]  # drop developer/v1
+        query = parse_qs(parsed.query)
+
+        if parts == ['user', 'profile', 'basic']:
+            return self._send({'user_id': 1, 'first_name': 'Bench'})
+        if parts[-1] in ('cycle', 'sleep', 'workout', 'recovery') and len(parts) <= 2:
+            return self._list(parts[-1], query)
+
+        # Detail lookups: /activity/sleep/{id}, /cycle/{id}, /cycle/{id}/recovery, /activity/workout/{id}
+        record_id = parts[-2] if parts[-1] == 'recovery' else parts[-1]
+        kind, rest = record_id.split('-', 1)
+        day, index = rest.rsplit('-', 1)
+        if parts[-1] == 'recovery':
+            return self._send(_stub_record('recovery', day, 0))
+        return self._send(_stub_record(kind, day, int(index)))
+
+
+def _start_server(latency_ms: float):
+    handler = type('Handler', (_StubWhoopHandler,), {'latency': latency_ms / 1000, 'served': 0, 'served_lock': threading.Lock()})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler, f"http://127.0.0.1:{server.server_address[1]}/developer/v1"
+
+
+def _serial_collect(base_url: str, start: date, days: int) -> None:
+    """The previous request pattern: one blocking call at a time, new connection per call, no rate limit"""
+    def get(path: str, params: Optional[dict] = None) -> dict:
+        return requests.request('GET', f"{base_url}{path}", params=params).json()
+
+    get('/user/profile/basic')
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        params = {'start': f"{day}T00:00:00.000Z", 'end': f"{day}T23:59:59.999Z"}
+        for record in get('/activity/sleep', params)['records'][:1]:
+            get(f"/activity/sleep/{record['id']}")
+        get('/recovery', params)
+        for record in get('/cycle', params)['records'][:1]:
+            get(f"/cycle/{record['id']}")
+            get(f"/cycle/{record['id']}/recovery")
+        for record in get('/activity/workout', params)['records']:
+            get(f"/activity/workout/{record['id']}")
+
+
+def _async_collect(base_url: str, start: date, days: int, range_fetch: bool) -> List[Dict]:
+    collector = WhoopCollector(SimpleNamespace(user=SimpleNamespace(username='benchmark')))
+    collector.BASE_URL = base_url
+    collector.access_token = 'benchmark'
+    collector.range_fetch = range_fetch
+    # The stub has no rate limit, and the serial baseline does not model one either
+    collector.rate_limiter = TokenBucketLimiter('whoop-benchmark', rate=1e6, capacity=1e6, shared=False)
+    results = run_sync(collector._collect_authenticated_async(start, start + timedelta(days=days - 1)))
+    if len(results) != days:
+        raise RuntimeError(f"Expected {days} days from the async collector, got {len(results)}")
+    return results
+
+
+def _summary(samples: list) -> Dict[str, float]:
+    return {
+        'mean_ms': round(statistics.mean(samples), 1),
+        'p50_ms': round(statistics.median(samples), 1),
+        'max_ms': round(max(samples), 1),
+    }
+
+
+def run(iterations: int = 20, days: int = DEFAULT_DAYS, latency_ms: float = DEFAULT_LATENCY_MS, **options) -> Dict[str, Any]:
+    # Every iteration is a full multi-day collection, so cap the default run
+    iterations = max(1, min(iterations, 5))
+    server, handler, base_url = _start_server(latency_ms)
+    start = date(2025, 1, 1)
+    variants = {
+        'serial_requests': lambda: _serial_collect(base_url, start, days),
+        'async_per_day': lambda: _async_collect(base_url, start, days, range_fetch=False),
+        'async_range': lambda: _async_collect(base_url, start, days, range_fetch=True),
+    }
+    results = {'days': days, 'latency_ms': latency_ms, 'iterations': iterations}
+    outputs = {}
+    try:
+        for name, collect in variants.items():
+            samples = []
+            served_before = handler.served
+            for _ in range(iterations):
+                started = time.perf_counter()
+                outputs[name] = collect()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = {'requests': (handler.served - served_before) // iterations, **_summary(samples)}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if outputs['async_per_day'] != outputs['async_range']:
+        raise RuntimeError("Range collection returned different days than per-day collection")
+
+    baseline = results['serial_requests']['mean_ms']
+    for name in ('async_per_day', 'async_range'):
+        results[name]['speedup'] = round(baseline / results[name]['mean_ms'], 2)
+    return results
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import BENCHMARKS
+import json
+
+# Refer to README.md for more information on the commands
+
+
+class Command(BaseCommand):
+    help = 'Run data pipeline micro-benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'name',
+            nargs='?',
+            help='Benchmark to run (omit with --list to see the available ones)'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List available benchmarks'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Number of measured iterations'
+        )
+
+    def handle(self, *args, **options):
+        if options['list'] or not options['name']:
+            for name, module in BENCHMARKS.items():
+                self.stdout.write(f"{name}: {module.DESCRIPTION}")
+            return
+
+        module = BENCHMARKS.get(options['name'])
+        if module is None:
+            raise CommandError(f"Unknown benchmark '{options['name']}'. Use --list to see the available ones.")
+
+        self.stdout.write(f"Running {options['name']} ({options['iterations']} iterations)...")
+        results = module.run(**options)
+        self.stdout.write(json.dumps(results, indent=2, default=str))
+        self.stdout.write(self.style.SUCCESS(f"Benchmark {options['name']} complete"))
@@ -2,7 +2,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from core.models import Athlete, Team
 from core.services.storage_service import UserStorageService
-import boto3
+from core.utils.aws_clients import get_s3_client
 from django.conf import settings
 import argparse
 
@@ -59,12 +59,7 @@ class Command(BaseCommand):
 
     def _delete_s3_directory(self, user_id):
         """Delete all S3 objects for a user"""
-        s3 = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME
-        )
+        s3 = get_s3_client()
         
         # List and delete all objects in user's directory
         paginator = s3.get_paginator('list_objects_v2')
@@ -154,7 +149,7 @@ class Command(BaseCommand):
         if options['verify_s3']:
             users = User.objects.all()
             for user in users:
-                s3 = boto3.client('s3')
+                s3 = get_s3_client()
                 base_path = user.get_s3_base_path()
                 try:
                     response = s3.list_objects_v2(
@@ -0,0 +1,87 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Team
+from core.services.team_rollup_service import TeamRollupService
+
+# Refer to README.md for more information on the commands
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily team rollups from CoreBiometricData, or check them against it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--team',
+            type=str,
+            help='Team ID or name (default: every team)'
+        )
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day to rebuild or check, YYYY-MM-DD (default: first day with data)'
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day to rebuild or check, YYYY-MM-DD (default: last day with data)'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Compare the rollups with the raw data without writing, fail if they differ'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Differences to print per team with --check'
+        )
+
+    def _teams(self, team):
+        if not team:
+            return list(Team.objects.all())
+        teams = list(Team.objects.filter(name=team))
+        if not teams:
+            try:
+                teams = list(Team.objects.filter(id=team))
+            except Exception:
+                teams = []
+        if not teams:
+            raise CommandError(f"Team '{team}' not found")
+        return teams
+
+    def handle(self, *args, **options):
+        service = TeamRollupService()
+        teams = self._teams(options['team'])
+
+        if not options['check']:
+            for team in teams:
+                written = service.rebuild(team, options['start'], options['end'])
+                self.stdout.write(f"{team.name}: {written[str(team.id)]} rollup rows")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {len(teams)} teams"))
+            return
+
+        inconsistent = 0
+        for team in teams:
+            problems = service.check(team, options['start'], options['end'])
+            if not problems:
+                self.stdout.write(f"{team.name}: consistent")
+                continue
+            inconsistent += 1
+            self.stdout.write(self.style.WARNING(f"{team.name}: {len(problems)} rollup rows differ from the raw data"))
+            for problem in problems[:options['limit']]:
+                if problem['problem'] == 'roster':
+                    # Rebuilding cannot fix these, Team.update_athletes_array does
+                    self.stdout.write(f"  athlete {problem['athlete_id']}: {problem['detail']}")
+                    continue
+                details = f" {problem['fields']}" if problem.get('fields') else ''
+                self.stdout.write(
+                    f"  {problem['date']} {problem['position']} {problem['metric']}: {problem['problem']}{details}"
+                )
+
+        if inconsistent:
+            raise CommandError(
+                f"{inconsistent} of {len(teams)} teams have inconsistent rollups, "
+                f"run rebuild_team_rollups to fix them"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rollups match the raw data for {len(teams)} teams"))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from core.services.sync_job_service import SyncJobService, BACKEND_WORKER
+import time
+
+# Refer to README.md for more information on the commands
+
+
+class Command(BaseCommand):
+    help = 'Run queued background sync jobs (for SYNC_JOB_BACKEND=worker, or to drain leftover jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs queued right now and exit instead of polling'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Maximum jobs to claim per poll'
+        )
+
+    def handle(self, *args, **options):
+        # Run jobs in this process regardless of how the web process dispatches them
+        service = SyncJobService(backend=BACKEND_WORKER)
+        self.stdout.write("Sync job worker started")
+
+        try:
+            while True:
+                service.requeue_stale_jobs()
+                ran = service.run_pending(limit=options['batch_size'])
+                if ran:
+                    self.stdout.write(f"Ran {ran} sync jobs")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping sync job worker")
+
+        self.stdout.write(self.style.SUCCESS("Sync job worker finished"))
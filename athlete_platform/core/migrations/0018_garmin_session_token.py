@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-16 22:55
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_team_cached_biometric_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GarminSessionToken',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Unique identifier for the Garmin session token', primary_key=True, serialize=False)),
+                ('profile_type', models.CharField(help_text='GarminCredentials.profile_type the session belongs to', max_length=20, unique=True)),
+                ('encrypted_tokens', models.TextField(help_text='garth OAuth tokens (garth.dumps()) encrypted with encryption_utils')),
+                ('login_count', models.PositiveIntegerField(default=0, help_text='Number of full username/password logins')),
+                ('resume_count', models.PositiveIntegerField(default=0, help_text='Number of syncs that resumed the cached session')),
+                ('resume_failure_count', models.PositiveIntegerField(default=0, help_text='Number of resume attempts that fell back to a full login')),
+                ('last_login_at', models.DateTimeField(blank=True, null=True)),
+                ('last_resumed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'core_garmin_session_token',
+            },
+        ),
+    ]
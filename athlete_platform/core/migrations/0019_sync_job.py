@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:06
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_garmin_session_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Unique identifier for the sync job', primary_key=True, serialize=False)),
+                ('job_type', models.CharField(choices=[('athlete', 'Athlete sync'), ('team', 'Team sync')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('reason', models.CharField(blank=True, help_text='What triggered the job, e.g. login, manual or team', max_length=50)),
+                ('params', models.JSONField(default=dict, help_text='Sync arguments: sources, force_refresh, days, start_date, end_date')),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Percent complete')),
+                ('progress_message', models.CharField(blank=True, max_length=255)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('athlete', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_jobs', to='core.athlete')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_jobs', to=settings.AUTH_USER_MODEL)),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_jobs', to='core.team')),
+            ],
+            options={
+                'db_table': 'core_sync_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_sync_j_status_3d3230_idx'), models.Index(fields=['athlete', 'status'], name='core_sync_j_athlete_77fa24_idx'), models.Index(fields=['team', 'status'], name='core_sync_j_team_id_3cc06b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_sync_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.CharField(help_text='Normalized position, UNKNOWN when blank', max_length=20)),
+                ('date', models.DateField()),
+                ('metric', models.CharField(help_text='CoreBiometricData column, or _rows', max_length=64)),
+                ('value_count', models.IntegerField(default=0, help_text='Rows with a value')),
+                ('value_sum', models.FloatField(default=0)),
+                ('value_sumsq', models.FloatField(default=0, help_text='Sum of squares, for variance')),
+                ('value_min', models.FloatField(blank=True, null=True)),
+                ('value_max', models.FloatField(blank=True, null=True)),
+                ('athlete_ids', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.team')),
+            ],
+            options={
+                'db_table': 'core_team_daily_rollup',
+                'indexes': [models.Index(fields=['team', 'date'], name='core_team_d_team_id_a80a06_idx')],
+                'unique_together': {('team', 'position', 'date', 'metric')},
+            },
+        ),
+    ]
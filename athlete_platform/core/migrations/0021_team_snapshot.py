@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_team_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', models.PositiveSmallIntegerField(default=7)),
+                ('version', models.PositiveIntegerField(default=0, help_text='Incremented whenever the content changes')),
+                ('etag', models.CharField(blank=True, help_text='Hash of the snapshot content', max_length=64)),
+                ('data', models.JSONField(default=dict, help_text='team_summary, position_summaries, comparison and optimization')),
+                ('stale', models.BooleanField(default=True, help_text="Set when the team's rollups change")),
+                ('generated_at', models.DateTimeField(blank=True, help_text='When the content last changed', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.team')),
+            ],
+            options={
+                'db_table': 'core_team_snapshot',
+                'unique_together': {('team', 'days')},
+            },
+        ),
+    ]
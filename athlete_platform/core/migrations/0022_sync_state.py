@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_team_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('settled_through', models.DateField(blank=True, help_text='Last date whose data can no longer change', null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_states', to='core.athlete')),
+            ],
+            options={
+                'db_table': 'core_sync_state',
+                'unique_together': {('athlete', 'source')},
+            },
+        ),
+    ]
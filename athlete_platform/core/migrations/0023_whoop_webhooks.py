@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_sync_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whoopcredentials',
+            name='last_webhook_at',
+            field=models.DateTimeField(blank=True, help_text='When WHOOP last pushed an update', null=True),
+        ),
+        migrations.AddField(
+            model_name='whoopcredentials',
+            name='whoop_user_id',
+            field=models.CharField(blank=True, db_index=True, help_text="WHOOP's user id, which webhooks identify the athlete by", max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='syncjob',
+            name='job_type',
+            field=models.CharField(choices=[('athlete', 'Athlete sync'), ('team', 'Team sync'), ('whoop_event', 'WHOOP webhook event')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='syncjob',
+            name='params',
+            field=models.JSONField(default=dict, help_text='Sync arguments: sources, force_refresh, days, start_date, end_date, or a WHOOP event type and record_id'),
+        ),
+    ]
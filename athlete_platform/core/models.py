@@ -5,6 +5,8 @@ Last Edit: March 6th, 2025
 Core data models for the athlete platform, defining database structure for users,
 athletes, teams, workout data, and biometric measurements.
 """
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -367,16 +369,18 @@ class Athlete(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
-    # Track the previous team to detect changes
+    # Track the previous team and position to detect changes
     _original_team_id = None
+    _original_position = None
 
     def __str__(self):
         return f"{self.user.username} - {self.team.name if self.team else 'No Team'}"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Store the original team ID when instance is initialized
+        # Store the original team ID and position when instance is initialized
         self._original_team_id = self.team_id if self.team_id else None
+        self._original_position = self.position
 
     def save(self, *args, **kwargs):
         if not self.id and self.user:
@@ -406,8 +410,9 @@ class Athlete(models.Model):
             except Exception as e:
                 logger.error(f"Error removing athlete {self.id} from previous team: {e}")
         
-        # Update the original team ID
+        # Update the original team ID and position
         self._original_team_id = self.team_id
+        self._original_position = self.position
 
 class WorkoutData(models.Model):
     WORKOUT_TYPES = [
@@ -631,6 +636,46 @@ class GarminCredentials(models.Model):
         return f"Garmin credentials for {self.athlete.user.username} ({self.profile_type})"
 
 
+class GarminSessionToken(models.Model):
+    """Encrypted garth session tokens per Garmin profile, so syncs can resume instead of logging in"""
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        help_text="Unique identifier for the Garmin session token"
+    )
+    profile_type = models.CharField(
+        max_length=20,
+        unique=True,
+        help_text="GarminCredentials.profile_type the session belongs to"
+    )
+    encrypted_tokens = models.TextField(
+        help_text="garth OAuth tokens (garth.dumps()) encrypted with encryption_utils"
+    )
+    login_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of full username/password logins"
+    )
+    resume_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of syncs that resumed the cached session"
+    )
+    resume_failure_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of resume attempts that fell back to a full login"
+    )
+    last_login_at = models.DateTimeField(null=True, blank=True)
+    last_resumed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_garmin_session_token'
+
+    def __str__(self):
+        return f"Garmin session for profile {self.profile_type}"
+
+
 class WhoopCredentials(models.Model):
     """Model for storing Whoop credentials"""
     id = models.UUIDField(
@@ -650,6 +695,14 @@ class WhoopCredentials(models.Model):
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now=True)
     scope = models.CharField(max_length=255, default='offline read:recovery read:cycles read:sleep read:workout read:profile')
+    whoop_user_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="WHOOP's user id, which webhooks identify the athlete by"
+    )
+    last_webhook_at = models.DateTimeField(null=True, blank=True, help_text="When WHOOP last pushed an update")
 
     class Meta:
         db_table = 'core_whoop_credentials'
@@ -661,6 +714,184 @@ class WhoopCredentials(models.Model):
         """Check if the token is expired"""
         return timezone.now() >= self.expires_at
 
+class SyncJob(models.Model):
+    """A queued or running data sync, so sync requests can return before upstream APIs answer"""
+    TYPE_ATHLETE = 'athlete'
+    TYPE_TEAM = 'team'
+    TYPE_WHOOP_EVENT = 'whoop_event'
+    JOB_TYPE_CHOICES = [
+        (TYPE_ATHLETE, 'Athlete sync'),
+        (TYPE_TEAM, 'Team sync'),
+        (TYPE_WHOOP_EVENT, 'WHOOP webhook event'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+    ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        help_text="Unique identifier for the sync job"
+    )
+    job_type = models.CharField(max_length=20, choices=JOB_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, null=True, blank=True, related_name='sync_jobs')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True, related_name='sync_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='sync_jobs')
+    reason = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="What triggered the job, e.g. login, manual or team"
+    )
+    params = models.JSONField(
+        default=dict,
+        help_text="Sync arguments: sources, force_refresh, days, start_date, end_date, or a WHOOP event type and record_id"
+    )
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_sync_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['athlete', 'status']),
+            models.Index(fields=['team', 'status']),
+        ]
+
+    def __str__(self):
+        target = self.athlete or self.team
+        return f"{self.get_job_type_display()} for {target} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @staticmethod
+    def stale_before():
+        """Active jobs not updated since then have lost their worker (SYNC_JOB_STALE_SECONDS lease)"""
+        return timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_JOB_STALE_SECONDS', 1800))
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'job_type': self.job_type,
+            'status': self.status,
+            'athlete_id': str(self.athlete_id) if self.athlete_id else None,
+            'team_id': str(self.team_id) if self.team_id else None,
+            'reason': self.reason,
+            'params': self.params,
+            'progress': self.progress,
+            'progress_message': self.progress_message,
+            'result': self.result,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class TeamDailyRollup(models.Model):
+    """
+    Per team, position, day and metric totals of CoreBiometricData, kept up to
+    date on ingest so team summaries add up a few rollup rows instead of
+    scanning every athlete-day
+    """
+    # Row count for the cell, its athlete_ids lists who had data that day
+    ROWS_METRIC = '_rows'
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='daily_rollups')
+    position = models.CharField(max_length=20, help_text="Normalized position, UNKNOWN when blank")
+    date = models.DateField()
+    metric = models.CharField(max_length=64, help_text="CoreBiometricData column, or _rows")
+    value_count = models.IntegerField(default=0, help_text="Rows with a value")
+    value_sum = models.FloatField(default=0)
+    value_sumsq = models.FloatField(default=0, help_text="Sum of squares, for variance")
+    value_min = models.FloatField(null=True, blank=True)
+    value_max = models.FloatField(null=True, blank=True)
+    athlete_ids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_team_daily_rollup'
+        unique_together = ['team', 'position', 'date', 'metric']
+        indexes = [
+            models.Index(fields=['team', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.team_id} {self.position} {self.date} {self.metric}"
+
+
+class TeamSnapshot(models.Model):
+    """
+    Precomputed coach analytics for a team over a day window, regenerated after
+    team syncs and when the team's rollups change, and served with an ETag
+    """
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='snapshots')
+    days = models.PositiveSmallIntegerField(default=7)
+    version = models.PositiveIntegerField(default=0, help_text="Incremented whenever the content changes")
+    etag = models.CharField(max_length=64, blank=True, help_text="Hash of the snapshot content")
+    data = models.JSONField(
+        default=dict,
+        help_text="team_summary, position_summaries, comparison and optimization"
+    )
+    stale = models.BooleanField(default=True, help_text="Set when the team's rollups change")
+    generated_at = models.DateTimeField(null=True, blank=True, help_text="When the content last changed")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_team_snapshot'
+        unique_together = ['team', 'days']
+
+    def __str__(self):
+        return f"{self.team_id} {self.days}d v{self.version}"
+
+
+class SyncState(models.Model):
+    """
+    Per athlete and source sync watermark. Dates up to settled_through are
+    final, so default syncs resume after it instead of rescanning their
+    whole window.
+    """
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='sync_states')
+    source = models.CharField(max_length=20)
+    settled_through = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Last date whose data can no longer change"
+    )
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_sync_state'
+        unique_together = ['athlete', 'source']
+
+    def __str__(self):
+        return f"{self.athlete_id} {self.source} through {self.settled_through}"
+
+
 class CoreBiometricTimeSeries(models.Model):
     """Stores detailed time-series biometric data"""
     id = models.UUIDField(primary_key=True)  # This will match CoreBiometricData's id
@@ -8,14 +8,21 @@ This service provides direct access to team data and implements methods correspo
 import logging
 from datetime import datetime, timedelta
 import traceback
-from ..models import Athlete, CoreBiometricData, Team, User
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ..models import Athlete, CoreBiometricData, Team, TeamSnapshot, User
 import json
-from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from django.core.cache import cache
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 from django.db.models import Avg, Max, Min, Count, Q, F
 from .data_sync_service import DataSyncService
+from .team_rollup_service import TeamRollupService, position_key, position_key_expression
+from ..utils.team_window import TeamWindow
 
 # Global debug flag - set to True to enable verbose logging
 DEBUG = True
@@ -34,6 +41,11 @@ class CoachDataSyncService:
     Provides methods that directly interact with the database to retrieve
     and process team biometric data.
     """
+    # How often the team sync checks time budgets and cancellation
+    SYNC_POLL_SECONDS = 0.5
+    
+    # Sections get_dashboard_data can compute together
+    DASHBOARD_SECTIONS = ('team_summary', 'position_summaries', 'comparison', 'optimization')
     
     def __init__(self, team: Team = None, coach=None):
         """
@@ -41,6 +53,11 @@ class CoachDataSyncService:
         """
         self.team = team
         
+        # The roster and the per-position aggregate rows are loaded once per
+        # instance, so every section computed from it shares them
+        self._team_athletes = None
+        self._position_rows = {}
+        
         # If a coach is provided but no team, try to get team from coach
         if not self.team and coach and hasattr(coach, 'team'):
             self.team = coach.team
@@ -102,6 +119,12 @@ class CoachDataSyncService:
         }
 
     def get_team_athletes(self) -> List[Athlete]:
+        """Get all athletes on the team, loaded once per service instance"""
+        if self._team_athletes is None:
+            self._team_athletes = self._load_team_athletes()
+        return list(self._team_athletes)
+    
+    def _load_team_athletes(self) -> List[Athlete]:
         """
         Get all athletes on the team by efficiently using the athletes_array field
         and looking up their athlete records.
@@ -115,29 +138,31 @@ class CoachDataSyncService:
         # Check if team has athletes_array field populated
         if hasattr(self.team, 'athletes_array') and self.team.athletes_array:
             try:
-                # athletes_array contains user IDs, not athlete IDs
-                user_ids = self.team.athletes_array
-                debug_log(f"Found {len(user_ids)} user IDs in athletes_array")
+                # athletes_array holds user IDs when written here, but Athlete.save
+                # appends athlete IDs, so match either in the same query
+                member_ids = self.team.athletes_array
+                debug_log(f"Found {len(member_ids)} IDs in athletes_array")
                 
-                # Get athletes by user IDs
-                athletes = Athlete.objects.filter(user_id__in=user_ids).select_related('user')
+                athletes = list(
+                    Athlete.objects.filter(Q(user_id__in=member_ids) | Q(id__in=member_ids)).select_related('user')
+                )
                 
-                if athletes.exists():
-                    debug_log(f"Found {athletes.count()} athletes through user IDs")
-                    return list(athletes)
+                if athletes:
+                    debug_log(f"Found {len(athletes)} athletes through athletes_array")
+                    return athletes
                 else:
-                    debug_log("No athletes found through user IDs in athletes_array")
+                    debug_log("No athletes found through IDs in athletes_array")
             except Exception as e:
                 logger.error(f"Error getting athletes from athletes_array: {str(e)}")
                 debug_log(traceback.format_exc())
         
         # Fallback: Get athletes through the direct relation
         debug_log("Falling back to direct team-athlete relation")
-        athletes = Athlete.objects.filter(team=self.team).select_related('user')
+        athletes = list(Athlete.objects.filter(team=self.team).select_related('user'))
         
         # If we found athletes, update the athletes_array for future use
-        if athletes.exists() and hasattr(self.team, 'athletes_array'):
-            debug_log(f"Updating athletes_array with {athletes.count()} athletes")
+        if athletes and hasattr(self.team, 'athletes_array'):
+            debug_log(f"Updating athletes_array with {len(athletes)} athletes")
             try:
                 # Store user IDs in the athletes_array
                 user_ids = [str(athlete.user.id) for athlete in athletes]
@@ -147,7 +172,7 @@ class CoachDataSyncService:
                 logger.error(f"Error updating athletes_array: {str(e)}")
                 debug_log(traceback.format_exc())
             
-        return list(athletes)
+        return athletes
         
     def get_athletes_by_position(self, position: str = None) -> List[Athlete]:
         """Get athletes filtered by position if provided"""
@@ -207,16 +232,28 @@ class CoachDataSyncService:
         
         debug_log(f"Found {len(athlete_ids)} athletes")
             
-        # Query CoreBiometricData for all team athletes in one go
+        # Aggregate every metric and the athlete count in one query
         try:
             biometric_data = CoreBiometricData.objects.filter(
                 athlete_id__in=athlete_ids,
                 date__range=[start_date, end_date]
             )
             
-            debug_log(f"Found {biometric_data.count()} biometric data points")
+            metric_fields = self._get_metric_field_map()
+            if days in self._position_rows and not self._use_rollups():
+                # Another section already grouped this window by position. Rollups keep
+                # the position at ingest time, so only the raw rows partition athletes.
+                results = self._merge_aggregate_rows(self._position_rows[days], metric_fields.values())
+            elif self._use_rollups():
+                results = TeamRollupService().summarize(
+                    self.team.id, start_date, end_date, by_position=False
+                ).get('ALL') or {'row_count': 0}
+            else:
+                results = biometric_data.aggregate(**self._build_metric_aggregates(metric_fields.values()))
+            
+            debug_log(f"Found {results['row_count']} biometric data points")
             
-            if not biometric_data.exists():
+            if not results['row_count']:
                 return {
                     'team_name': self.team.name,
                     'athlete_count': len(athlete_ids),
@@ -225,41 +262,8 @@ class CoachDataSyncService:
                     'timestamp': timezone.now().isoformat()
                 }
                 
-            # Calculate metrics in one query per metric
-            metrics = {}
-            for metric in self.BIOMETRIC_METRICS:
-                db_field = self._get_db_field_name(metric)
-                
-                # Skip metrics that don't map to direct DB fields
-                if not db_field:
-                    continue
-                    
-                # Filter out null values for this metric
-                valid_data = biometric_data.filter(**{f"{db_field}__isnull": False})
-                
-                if valid_data.exists():
-                    # Calculate in single query
-                    results = valid_data.aggregate(
-                        avg=Avg(db_field),
-                        max=Max(db_field),
-                        min=Min(db_field)
-                    )
-                    
-                    # Format numeric values
-                    avg_value = round(float(results['avg']), 2) if results['avg'] is not None else None
-                    max_value = round(float(results['max']), 2) if results['max'] is not None else None
-                    min_value = round(float(results['min']), 2) if results['min'] is not None else None
-                    
-                    metrics[metric] = {
-                        'avg': avg_value,
-                        'max': max_value,
-                        'min': min_value,
-                        'interpretation': self._get_metric_interpretation(metric),
-                        'display_name': self.METRIC_DISPLAY_NAMES.get(metric, metric.replace('_', ' ').title())
-                    }
-            
-            # Count unique athletes with data
-            athletes_with_data = biometric_data.values('athlete').distinct().count()
+            metrics = self._summarize_metrics(results, metric_fields)
+            athletes_with_data = results['athletes_with_data']
             
             debug_log(f"Processed {len(metrics)} metrics for {athletes_with_data} athletes")
                 
@@ -283,6 +287,79 @@ class CoachDataSyncService:
                 'timestamp': timezone.now().isoformat()
             }
     
+    def get_position_aggregates(self, days: int = 7) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate the team window per position in a single GROUP BY query
+        
+        Returns a dictionary keyed by position for every position on the roster,
+        including positions without data, with athlete counts and metric summaries
+        """
+        if not self.team:
+            logger.warning("No team specified for position aggregates")
+            return {}
+        
+        end_date = timezone.now().date()
+        start_date = end_date - timedelta(days=days)
+        
+        athletes = self.get_team_athletes()
+        
+        # Roster counts come from the athletes we already loaded
+        positions = {}
+        for athlete in athletes:
+            position = self._position_key(athlete.position)
+            if position not in positions:
+                positions[position] = {
+                    'position': position,
+                    'athlete_count': 0,
+                    'athletes_with_data': 0,
+                    'data_points': 0,
+                    'metrics': {}
+                }
+            positions[position]['athlete_count'] += 1
+        
+        if not athletes:
+            return positions
+        
+        metric_fields = self._get_metric_field_map()
+        try:
+            for row in self._position_aggregate_rows(days, athletes, start_date, end_date):
+                position = row['position_key']
+                if position not in positions:
+                    continue
+                positions[position].update({
+                    'athletes_with_data': row['athletes_with_data'],
+                    'data_points': row['row_count'],
+                    'metrics': self._summarize_metrics(row, metric_fields)
+                })
+        except Exception as e:
+            logger.error(f"Error aggregating biometric data by position: {str(e)}")
+            debug_log(traceback.format_exc())
+        
+        debug_log(f"Aggregated {len(athletes)} athletes into {len(positions)} positions")
+        return positions
+    
+    def _position_aggregate_rows(self, days: int, athletes: List[Athlete], start_date, end_date) -> List[Dict[str, Any]]:
+        """Aggregate rows keyed by position_key for the window, queried once per instance and window"""
+        if days in self._position_rows:
+            return self._position_rows[days]
+        
+        if self._use_rollups():
+            rows = [
+                {**row, 'position_key': position}
+                for position, row in TeamRollupService().summarize(self.team.id, start_date, end_date).items()
+            ]
+        else:
+            rows = list(
+                CoreBiometricData.objects
+                .filter(athlete_id__in=[athlete.id for athlete in athletes], date__range=[start_date, end_date])
+                .annotate(position_key=position_key_expression())
+                .values('position_key')
+                .annotate(**self._build_metric_aggregates(self._get_metric_field_map().values()))
+                .order_by()
+            )
+        self._position_rows[days] = rows
+        return rows
+    
     def get_position_biometric_summary(self, days: int = 7) -> Dict[str, Dict[str, Any]]:
         """
         Get aggregated biometric data summary organized by player position
@@ -294,99 +371,80 @@ class CoachDataSyncService:
             return {}
             
         debug_log(f"Getting position biometric summary for past {days} days")
-            
-        # Calculate date range
+        
+        # Positions without data in the window are left out
+        position_summaries = {
+            position: summary
+            for position, summary in self.get_position_aggregates(days).items()
+            if summary['athletes_with_data']
+        }
+        
+        debug_log(f"Returning summaries for {len(position_summaries)} positions")
+        return position_summaries
+    
+    def load_team_window(self, days: int = 7, athletes: Optional[List[Athlete]] = None) -> TeamWindow:
+        """
+        Load the team's biometric rows for the window into a columnar TeamWindow
+        with one query over only the metric columns
+        
+        Defaults to the whole roster, pass athletes to load a subset
+        """
+        if athletes is None:
+            athletes = self.get_team_athletes()
+        
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
+        columns = list(dict.fromkeys(self._get_metric_field_map().values()))
+        athlete_ids = [athlete.id for athlete in athletes]
         
-        # Get all athletes, grouped by position
-        all_athletes = self.get_team_athletes()
-        
-        # Group athletes by position
-        position_athletes = {}
-        for athlete in all_athletes:
-            position = athlete.position.upper() if athlete.position else "UNKNOWN"
-            if position not in position_athletes:
-                position_athletes[position] = []
-            position_athletes[position].append(athlete)
+        rows = []
+        if athlete_ids:
+            rows = CoreBiometricData.objects.filter(
+                athlete_id__in=athlete_ids,
+                date__range=[start_date, end_date]
+            ).values_list('athlete_id', 'date', 'source', *columns)
         
-        debug_log(f"Grouped {len(all_athletes)} athletes into {len(position_athletes)} positions")
+        window = TeamWindow.from_rows(athlete_ids, start_date, end_date, columns, rows)
+        debug_log(f"Loaded {int(window.rows.sum())} rows for {len(athlete_ids)} athletes over {days} days")
+        return window
+    
+    def _athlete_window_data(self, window: TeamWindow, athlete: Athlete) -> Dict[str, Any]:
+        """Data points and averages for one athlete from a loaded TeamWindow"""
+        index = window.athlete_position(athlete.id)
+        metric_fields = self._get_metric_field_map()
+        metrics = list(metric_fields)
+        scales = np.array([self._metric_scale(metric) for metric in metrics])
         
-        # Process each position
-        position_summaries = {}
+        # Scale and round every value at once, then drop the missing ones per row
+        dates, block = window.athlete_block(index, list(metric_fields.values()))
+        block = np.round(block * scales, 2)
+        data_points = [
+            {
+                'date': day.isoformat(),
+                'metrics': {metric: value for metric, value in zip(metrics, row) if value is not None}
+            }
+            for day, row in zip(dates, np.where(np.isnan(block), None, block).tolist())
+        ]
         
-        for position, athletes in position_athletes.items():
-            athlete_ids = [athlete.id for athlete in athletes]
-            
-            # Skip if no athletes in this position
-            if not athlete_ids:
-                continue
-                
-            debug_log(f"Processing {len(athlete_ids)} athletes in position {position}")
-                
-            # Query the database for biometric data for this position
-            try:
-                biometric_data = CoreBiometricData.objects.filter(
-                    athlete_id__in=athlete_ids,
-                    date__range=[start_date, end_date]
-                )
-                
-                # Skip if no data for this position
-                if not biometric_data.exists():
-                    debug_log(f"No biometric data found for position {position}")
-                    continue
-                
-                debug_log(f"Found {biometric_data.count()} data points for position {position}")
-                
-                # Calculate metrics
-                metrics = {}
-                for metric in self.BIOMETRIC_METRICS:
-                    db_field = self._get_db_field_name(metric)
-                    
-                    # Skip metrics that don't map to direct DB fields
-                    if not db_field:
-                        continue
-                        
-                    # Filter out null values for this metric
-                    valid_data = biometric_data.filter(**{f"{db_field}__isnull": False})
-                    
-                    if valid_data.exists():
-                        # Calculate in single query
-                        results = valid_data.aggregate(
-                            avg=Avg(db_field),
-                            max=Max(db_field),
-                            min=Min(db_field)
-                        )
-                        
-                        # Format numeric values
-                        avg_value = round(float(results['avg']), 2) if results['avg'] is not None else None
-                        max_value = round(float(results['max']), 2) if results['max'] is not None else None
-                        min_value = round(float(results['min']), 2) if results['min'] is not None else None
-                        
-                        metrics[metric] = {
-                            'avg': avg_value,
-                            'max': max_value,
-                            'min': min_value,
-                            'interpretation': self._get_metric_interpretation(metric),
-                            'display_name': self.METRIC_DISPLAY_NAMES.get(metric, metric.replace('_', ' ').title())
-                        }
-                
-                # Count unique athletes with data
-                athletes_with_data = biometric_data.values('athlete').distinct().count()
-                    
-                position_summaries[position] = {
-                    'position': position,
-                    'athlete_count': len(athlete_ids),
-                    'athletes_with_data': athletes_with_data,
-                    'metrics': metrics
-                }
-                
-            except Exception as e:
-                logger.error(f"Error processing position {position}: {str(e)}")
-                debug_log(traceback.format_exc())
+        means = np.array([window.athlete_stats(db_field)['mean'][index] for db_field in metric_fields.values()])
+        averages = {
+            metric: value
+            for metric, value in zip(metrics, np.where(np.isnan(means), None, np.round(means * scales, 2)).tolist())
+            if value is not None
+        }
         
-        debug_log(f"Returning summaries for {len(position_summaries)} positions")
-        return position_summaries
+        return {
+            'athlete': {
+                'id': str(athlete.id),
+                'name': athlete.user.username,
+                'username': athlete.user.username,
+                'position': athlete.position,
+                'jersey_number': athlete.jersey_number
+            },
+            'data_points': data_points,
+            'averages': averages,
+            'data_count': len(data_points)
+        }
     
     def get_athlete_biometric_data(self, athlete_id: str, days: int = 7) -> Dict[str, Any]:
         """
@@ -398,87 +456,20 @@ class CoachDataSyncService:
         
         try:
             # Get the athlete
-            athlete = Athlete.objects.get(id=athlete_id)
+            athlete = Athlete.objects.select_related('user').get(id=athlete_id)
             
             # Verify athlete is on the team if a team is specified
             if self.team and athlete.team_id != self.team.id:
                 logger.warning(f"Athlete {athlete_id} is not on team {self.team.id}")
                 return {}
             
-            # Calculate date range
-            end_date = timezone.now().date()
-            start_date = end_date - timedelta(days=days)
-            
-            # Query the database for this athlete's biometric data
-            biometric_data = CoreBiometricData.objects.filter(
-                athlete=athlete,
-                date__range=[start_date, end_date]
-            ).order_by('date')
-            
-            # Process data for return
-            data_points = []
-            for data in biometric_data:
-                data_point = {
-                    'date': data.date.isoformat(),
-                    'metrics': {}
-                }
-                
-                # Add each metric if it exists
-                for metric in self.BIOMETRIC_METRICS:
-                    db_field = self._get_db_field_name(metric)
-                    if not db_field:
-                        continue
-                        
-                    value = getattr(data, db_field, None)
-                    if value is not None:
-                        # Format numeric values
-                        if isinstance(value, (int, float)):
-                            value = round(float(value), 2)
-                        
-                        # Convert sleep seconds to hours if needed
-                        if db_field == 'total_sleep_seconds' and metric == 'sleep_hours':
-                            value = round(value / 3600, 2)
-                            
-                        data_point['metrics'][metric] = value
-                
-                data_points.append(data_point)
+            data = self._athlete_window_data(self.load_team_window(days, athletes=[athlete]), athlete)
             
             # Try to sync data for this athlete
             self._sync_athlete_data(athlete)
             
-            # Calculate averages across the period
-            averages = {}
-            for metric in self.BIOMETRIC_METRICS:
-                db_field = self._get_db_field_name(metric)
-                if not db_field:
-                    continue
-                    
-                if db_field == 'total_sleep_seconds' and metric == 'sleep_hours':
-                    # For sleep hours, we need to convert seconds to hours
-                    values = [getattr(data, db_field, 0) / 3600 for data in biometric_data]
-                else:
-                    values = [getattr(data, db_field, None) for data in biometric_data]
-                    
-                valid_values = [v for v in values if v is not None]
-                
-                if valid_values:
-                    avg_value = sum(valid_values) / len(valid_values)
-                    averages[metric] = round(float(avg_value), 2)
-            
-            debug_log(f"Returning {len(data_points)} data points for athlete {athlete_id}")
-            
-            return {
-                'athlete': {
-                    'id': str(athlete.id),
-                    'name': athlete.user.username,
-                    'username': athlete.user.username,
-                    'position': athlete.position,
-                    'jersey_number': athlete.jersey_number
-                },
-                'data_points': data_points,
-                'averages': averages,
-                'data_count': len(data_points)
-            }
+            debug_log(f"Returning {data['data_count']} data points for athlete {athlete_id}")
+            return data
             
         except Athlete.DoesNotExist:
             logger.error(f"Athlete {athlete_id} not found")
@@ -514,16 +505,13 @@ class CoachDataSyncService:
                 'athletes': [],
                 'athletes_with_data': 0
             }
-            
-        # Get all athletes to log their positions
-        all_athletes = self.get_team_athletes()
+        
+        # Get athletes in this position
+        athletes = self.get_athletes_by_position(position)
         if DEBUG:
-            for ath in all_athletes:
+            for ath in athletes:
                 pos_value = ath.position if ath.position else "None/null"
                 debug_log(f"Athlete {ath.user.username} ({ath.id}) has position: '{pos_value}'")
-                
-        # Get athletes in this position
-        athletes = self.get_athletes_by_position(position)
         
         if not athletes:
             debug_log(f"No athletes found for position {position}")
@@ -536,28 +524,29 @@ class CoachDataSyncService:
         
         debug_log(f"Found {len(athletes)} athletes in position {position}")
         
-        # Get data for each athlete
-        athlete_data = []
-        for athlete in athletes:
-            data = self.get_athlete_biometric_data(str(athlete.id), days)
-            if data and 'error' not in data:  # Only include if we got valid data
-                athlete_data.append(data)
-                debug_log(f"Added data for athlete {athlete.user.username} with {len(data.get('data_points', []))} data points")
+        # One query for every athlete in the position instead of one per athlete
+        try:
+            window = self.load_team_window(days, athletes=athletes)
+            athlete_data = [self._athlete_window_data(window, athlete) for athlete in athletes]
+        except Exception as e:
+            logger.error(f"Error getting position athletes data: {str(e)}")
+            debug_log(traceback.format_exc())
+            return {
+                'position': position,
+                'athlete_count': len(athletes),
+                'athletes': [],
+                'athletes_with_data': 0
+            }
         
         # Sort by jersey number if available
         athlete_data.sort(key=lambda x: x['athlete'].get('jersey_number', 999) or 999)
         
-        # Calculate position averages
+        # Position averages are the mean of the athlete averages
         position_metrics = {}
-        for metric in self.BIOMETRIC_METRICS:
-            values = []
-            for athlete in athlete_data:
-                if metric in athlete.get('averages', {}):
-                    values.append(athlete['averages'][metric])
-            
-            if values:
-                avg_value = sum(values) / len(values)
-                position_metrics[metric] = round(float(avg_value), 2)
+        for metric, db_field in self._get_metric_field_map().items():
+            value = window.group_mean_of_means(db_field)
+            if value is not None:
+                position_metrics[metric] = round(value * self._metric_scale(metric), 2)
         
         debug_log(f"Returning data for {len(athlete_data)} athletes with position metrics")
         
@@ -614,8 +603,9 @@ class CoachDataSyncService:
                     min_pos = min(metric_by_position.items(), key=lambda x: x[1])
                     max_pos = max(metric_by_position.items(), key=lambda x: x[1])
                     
-                    # Calculate the percentage difference
-                    diff_percent = abs(max_pos[1] - min_pos[1]) / ((max_pos[1] + min_pos[1]) / 2) * 100
+                    # Calculate the percentage difference, columns that default to 0 can average 0 everywhere
+                    midpoint = (max_pos[1] + min_pos[1]) / 2
+                    diff_percent = abs(max_pos[1] - min_pos[1]) / midpoint * 100 if midpoint else 0
                     
                     # If the difference is significant (> 15%), note it
                     if diff_percent > 15:
@@ -637,7 +627,7 @@ class CoachDataSyncService:
         debug_log(f"Found {len(comparison['notable_differences'])} notable differences between positions")
         return comparison
     
-    def get_training_optimization_data(self, position: str = None) -> Dict[str, Any]:
+    def get_training_optimization_data(self, position: str = None, days: int = 7) -> Dict[str, Any]:
         """
         Generate training optimization data based on athlete metrics
         
@@ -647,9 +637,15 @@ class CoachDataSyncService:
         
         # This is a placeholder implementation
         # In a real implementation, this would analyze biometric trends and generate recommendations
-        athletes = self.get_athletes_by_position(position)
+        position_aggregates = self.get_position_aggregates(days)
+        if position:
+            position_key = self._position_key(position)
+            position_aggregates = {
+                key: summary for key, summary in position_aggregates.items() if key == position_key
+            }
+        athlete_count = sum(summary['athlete_count'] for summary in position_aggregates.values())
         
-        if not athletes:
+        if not athlete_count:
             return {
                 'position': position,
                 'status': 'no_data',
@@ -659,7 +655,10 @@ class CoachDataSyncService:
         # For the placeholder, return a basic structure
         return {
             'position': position if position else 'all',
-            'athlete_count': len(athletes),
+            'athlete_count': athlete_count,
+            'metrics_by_position': {
+                key: summary['metrics'] for key, summary in position_aggregates.items() if summary['metrics']
+            },
             'status': 'scaffold',
             'message': "Training optimization algorithm not yet implemented",
             'recommendations': [
@@ -680,10 +679,48 @@ class CoachDataSyncService:
             ]
         }
         
-    def sync_team_data(self, days: int = 7, force_refresh: bool = False) -> Dict[str, Any]:
+    def get_dashboard_data(self, sections: Optional[List[str]] = None, days: int = 7,
+                           position: str = None) -> Dict[str, Any]:
+        """
+        Compute several coach dashboard sections from one load of the team
+        
+        Every section reads the same roster and per-position aggregates, so
+        the whole dashboard costs two queries instead of two per section.
+        Returns a dictionary keyed by section in the requested order.
+        """
+        sections = list(sections or self.DASHBOARD_SECTIONS)
+        builders = {
+            'team_summary': lambda: self.get_team_biometric_summary(days=days),
+            'position_summaries': lambda: self.get_position_biometric_summary(days=days),
+            'comparison': lambda: self.get_biometric_comparison_by_position(days=days),
+            'optimization': lambda: self.get_training_optimization_data(position=position, days=days),
+        }
+        unknown = [section for section in sections if section not in builders]
+        if unknown:
+            raise ValueError(f"Unknown dashboard sections: {', '.join(unknown)}")
+        
+        # The team summary goes last so it can merge the position rows the other sections loaded
+        results = {}
+        for section in sorted(sections, key=lambda section: section == 'team_summary'):
+            results[section] = builders[section]()
+        
+        debug_log(f"Computed dashboard sections {', '.join(sections)} for past {days} days")
+        return {section: results[section] for section in sections}
+    
+    def sync_team_data(self, days: int = 7, force_refresh: bool = False, max_workers: Optional[int] = None,
+                       athlete_timeout: Optional[float] = None, total_timeout: Optional[float] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
         Trigger a sync of biometric data for all athletes on the team
         
+        Athletes are synced concurrently on max_workers threads. An athlete that
+        runs past athlete_timeout seconds is reported as timed out and does not
+        hold up the rest of the team. Once total_timeout passes, or cancel_event
+        is set, or cancel_sync() is called, athletes that have not started are
+        skipped. Athletes already syncing are left to finish within their budget.
+        progress_callback is called with (finished, total) as athletes finish.
+        
         Returns information about the sync operation
         """
         if not self.team:
@@ -706,62 +743,140 @@ class CoachDataSyncService:
                 'sync_count': 0
             }
         
-        # Track success for each athlete
-        success_count = 0
-        failed_count = 0
-        athlete_results = []
+        max_workers = max(1, min(max_workers or getattr(settings, 'COACH_SYNC_WORKERS', 4), len(athletes)))
+        athlete_timeout = athlete_timeout or getattr(settings, 'COACH_SYNC_ATHLETE_TIMEOUT', 120)
+        total_timeout = total_timeout or getattr(settings, 'COACH_SYNC_TOTAL_TIMEOUT', None)
         
-        # Sync data for each athlete
-        for athlete in athletes:
+        cache.delete(self._cancel_key())
+        started = time.monotonic()
+        deadline = started + total_timeout if total_timeout else None
+        
+        # Results are keyed by athlete so the response keeps roster order
+        athlete_results = {}
+        started_at = {}
+        started_lock = threading.Lock()
+        
+        def run_athlete(athlete):
+            with started_lock:
+                started_at[athlete.id] = time.monotonic()
             try:
-                debug_log(f"Syncing data for athlete {athlete.user.username} ({athlete.id})")
-                result = self._sync_athlete_data(athlete, days=days)
+                return self._sync_athlete_data(athlete, days=days, force_refresh=force_refresh)
+            finally:
+                # Worker threads get their own connection, don't leave it open
+                connection.close()
+        
+        def record(athlete, status, message):
+            duration = time.monotonic() - started_at.get(athlete.id, time.monotonic())
+            athlete_results[athlete.id] = {
+                'athlete_id': str(athlete.id),
+                'username': getattr(athlete.user, 'username', 'Unknown'),
+                'success': status == 'success',
+                'status': status,
+                'message': message,
+                'duration_ms': round(duration * 1000, 1)
+            }
+            if progress_callback:
+                try:
+                    progress_callback(len(athlete_results), len(athletes))
+                except Exception as e:
+                    logger.warning(f"Team sync progress callback failed: {str(e)}")
+        
+        debug_log(f"Syncing {len(athletes)} athletes with {max_workers} workers, {athlete_timeout}s per athlete")
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"team-sync-{self.team.id}")
+        pending = {executor.submit(run_athlete, athlete): athlete for athlete in athletes}
+        cancelled = False
+        
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=self.SYNC_POLL_SECONDS, return_when=FIRST_COMPLETED)
                 
-                athlete_results.append({
-                    'athlete_id': str(athlete.id),
-                    'username': athlete.user.username,
-                    'success': result['success'],
-                    'message': result['message']
-                })
+                for future in done:
+                    athlete = pending.pop(future)
+                    if future.cancelled():
+                        record(athlete, 'cancelled', "Sync cancelled before it started")
+                        continue
+                    try:
+                        result = future.result()
+                        record(athlete, 'success' if result['success'] else 'failed', result['message'])
+                    except Exception as e:
+                        logger.error(f"Error syncing data for athlete {athlete.id}: {str(e)}")
+                        debug_log(traceback.format_exc())
+                        record(athlete, 'failed', str(e))
                 
-                if result['success']:
-                    success_count += 1
-                else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Error syncing data for athlete {athlete.id}: {str(e)}")
-                debug_log(traceback.format_exc())
-                failed_count += 1
-                athlete_results.append({
-                    'athlete_id': str(athlete.id),
-                    'username': getattr(athlete.user, 'username', 'Unknown'),
-                    'success': False,
-                    'message': str(e)
-                })
+                now = time.monotonic()
+                for future, athlete in list(pending.items()):
+                    athlete_started = started_at.get(athlete.id)
+                    if athlete_started and now - athlete_started > athlete_timeout:
+                        # The thread can't be interrupted, its late result is discarded
+                        logger.warning(f"Sync for athlete {athlete.id} exceeded {athlete_timeout}s budget")
+                        pending.pop(future)
+                        record(athlete, 'timed_out', f"Sync exceeded {athlete_timeout}s time budget")
+                
+                if not cancelled and (
+                    (deadline and now > deadline)
+                    or (cancel_event and cancel_event.is_set())
+                    or cache.get(self._cancel_key())
+                ):
+                    cancelled = True
+                    skipped = sum(future.cancel() for future in pending)
+                    logger.warning(f"Team sync for {self.team.name} cancelled, skipping {skipped} athletes not yet started")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = [athlete_results[athlete.id] for athlete in athletes if athlete.id in athlete_results]
+        success_count = sum(1 for result in results if result['status'] == 'success')
+        timed_out_count = sum(1 for result in results if result['status'] == 'timed_out')
+        cancelled_count = sum(1 for result in results if result['status'] == 'cancelled')
+        failed_count = len(results) - success_count - cancelled_count
         
         # Update timestamp in cache
         self._update_last_sync_timestamp()
-            
-        debug_log(f"Team sync complete: {success_count} successful, {failed_count} failed")
+        
+        # Precompute the coach dashboard analytics from the freshly synced data
+        if success_count:
+            from .team_snapshot_service import TeamSnapshotService
+            TeamSnapshotService(self.team).refresh()
+        
+        duration_ms = round((time.monotonic() - started) * 1000, 1)
+        debug_log(f"Team sync complete in {duration_ms}ms: {success_count} successful, {failed_count} failed "
+                  f"({timed_out_count} timed out), {cancelled_count} cancelled")
         
         return {
             'success': success_count > 0,
-            'message': f"Synced data for {success_count} athletes ({failed_count} failed)",
+            'message': f"Synced data for {success_count} athletes ({failed_count} failed)"
+                       + (f", {cancelled_count} cancelled" if cancelled_count else ""),
             'sync_count': success_count,
             'failed_count': failed_count,
+            'timed_out_count': timed_out_count,
+            'cancelled_count': cancelled_count,
+            'cancelled': cancelled,
             'total_count': len(athletes),
+            'workers': max_workers,
+            'duration_ms': duration_ms,
             'timestamp': timezone.now().isoformat(),
-            'results': athlete_results
+            'results': results
         }
     
+    def cancel_sync(self) -> bool:
+        """Ask a running sync_team_data for this team, in any worker, to skip athletes not yet started"""
+        if not self.team:
+            return False
+        cache.set(self._cancel_key(), True, 3600)
+        debug_log(f"Cancellation requested for team {self.team.name} sync")
+        return True
+    
+    def _cancel_key(self) -> str:
+        return f"team_sync_cancel_{self.team.id}"
+    
     def get_cached_team_data(self) -> Dict[str, Any]:
-        """Get cached team data if available"""
+        """Get the team summary from the team's current snapshot if there is one"""
         if not self.team:
             return None
             
-        key = f"team_data_{self.team.id}"
-        cached_data = cache.get(key)
+        snapshot = TeamSnapshot.objects.filter(
+            team=self.team, days=getattr(settings, 'TEAM_SNAPSHOT_DAYS', 7), stale=False
+        ).only('data').first()
+        cached_data = snapshot.data.get('team_summary') if snapshot else None
         
         if cached_data:
             debug_log("Returning cached team data")
@@ -774,7 +889,8 @@ class CoachDataSyncService:
             sync_service = DataSyncService(athlete)
             success = sync_service.sync_data(
                 start_date=timezone.now().date() - timedelta(days=days),
-                end_date=timezone.now().date()
+                end_date=timezone.now().date(),
+                force_refresh=force_refresh
             )
             
             if success:
@@ -813,6 +929,89 @@ class CoachDataSyncService:
         else:
             return 'neutral'
     
+    def _get_metric_field_map(self) -> Dict[str, str]:
+        """Tracked metrics that map to a CoreBiometricData column, in BIOMETRIC_METRICS order"""
+        return {
+            metric: db_field
+            for metric in self.BIOMETRIC_METRICS
+            if (db_field := self._get_db_field_name(metric))
+        }
+    
+    @staticmethod
+    def _build_metric_aggregates(db_fields) -> Dict[str, Any]:
+        """
+        Aggregate expressions for avg/max/min/non-null count of each column,
+        plus the row count and distinct athletes, for a single aggregate() call
+        """
+        aggregates = {
+            'row_count': Count('id'),
+            'athletes_with_data': Count('athlete', distinct=True),
+        }
+        for db_field in set(db_fields):
+            aggregates[f"{db_field}__avg"] = Avg(db_field)
+            aggregates[f"{db_field}__max"] = Max(db_field)
+            aggregates[f"{db_field}__min"] = Min(db_field)
+            aggregates[f"{db_field}__count"] = Count(db_field)
+        return aggregates
+    
+    @staticmethod
+    def _merge_aggregate_rows(rows: List[Dict[str, Any]], db_fields) -> Dict[str, Any]:
+        """Combine per-position aggregate rows into the row a single aggregate() over all of them returns"""
+        merged = {
+            'row_count': sum(row['row_count'] for row in rows),
+            # Each athlete is in exactly one position group
+            'athletes_with_data': sum(row['athletes_with_data'] for row in rows),
+        }
+        for db_field in set(db_fields):
+            counted = [row for row in rows if row[f"{db_field}__count"]]
+            count = sum(row[f"{db_field}__count"] for row in counted)
+            total = sum(float(row[f"{db_field}__avg"]) * row[f"{db_field}__count"] for row in counted)
+            merged[f"{db_field}__count"] = count
+            merged[f"{db_field}__avg"] = total / count if count else None
+            merged[f"{db_field}__max"] = max((row[f"{db_field}__max"] for row in counted), default=None)
+            merged[f"{db_field}__min"] = min((row[f"{db_field}__min"] for row in counted), default=None)
+        return merged
+    
+    def _summarize_metrics(self, results: Dict[str, Any], metric_fields: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Metric summaries from an aggregate row, leaving out metrics with no values"""
+        metrics = {}
+        for metric, db_field in metric_fields.items():
+            if results[f"{db_field}__count"]:
+                metrics[metric] = {
+                    **self._format_metric_aggregates(results, db_field),
+                    'interpretation': self._get_metric_interpretation(metric),
+                    'display_name': self.METRIC_DISPLAY_NAMES.get(metric, metric.replace('_', ' ').title())
+                }
+        return metrics
+    
+    @staticmethod
+    def _metric_scale(metric: str) -> float:
+        """Factor from the stored column to the value reported for a metric"""
+        # sleep_hours is stored as total_sleep_seconds
+        return 1 / 3600 if metric == 'sleep_hours' else 1.0
+    
+    @staticmethod
+    def _position_key(position: Optional[str]) -> str:
+        """Normalized position used to group athletes, blank positions are UNKNOWN"""
+        return position_key(position)
+    
+    @staticmethod
+    def _use_rollups() -> bool:
+        """Read team and position summaries from TeamDailyRollup instead of raw rows"""
+        return getattr(settings, 'COACH_ROLLUP_SUMMARIES', False)
+    
+    @staticmethod
+    def _format_metric_aggregates(results: Dict[str, Any], db_field: str) -> Dict[str, Optional[float]]:
+        """Rounded avg/max/min for one column from an aggregate row"""
+        def rounded(value):
+            return round(float(value), 2) if value is not None else None
+        
+        return {
+            'avg': rounded(results[f"{db_field}__avg"]),
+            'max': rounded(results[f"{db_field}__max"]),
+            'min': rounded(results[f"{db_field}__min"]),
+        }
+    
     def _get_db_field_name(self, metric: str) -> Optional[str]:
         """Map metric names to actual database field names"""
         # Direct mapping for most fields
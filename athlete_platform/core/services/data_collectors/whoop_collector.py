@@ -1,64 +1,63 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import date, timedelta, datetime
 from ..exceptions import CollectorError
 from core.utils.s3_utils import S3Utils
 from .base_collector import BaseDataCollector
 from core.models import Athlete
 import logging
-import requests
 from django.core.signing import Signer
-from django.core.cache import cache
 from django.conf import settings
 import json
 import time
 import random
 import asyncio
-from asgiref.sync import sync_to_async
-from concurrent.futures import ThreadPoolExecutor
-import threading
-from functools import partial
+from core.utils.async_http import get_async_client, run_async, run_sync
+from core.utils.rate_limiter import TokenBucketLimiter, get_rate_limiter
+from core.utils.sync_plan import FetchCostModel
 
 logger = logging.getLogger(__name__)
 
+
+def get_whoop_rate_limiter() -> TokenBucketLimiter:
+    """Request budget of the WHOOP client app, shared by every collector and worker"""
+    return get_rate_limiter(
+        f"whoop:{getattr(settings, 'WHOOP_CLIENT_ID', None) or 'default'}",
+        rate=getattr(settings, 'WHOOP_RATE_LIMIT_PER_MINUTE', 90) / 60,
+        capacity=getattr(settings, 'WHOOP_RATE_LIMIT_BURST', 20),
+    )
+
+
 class WhoopCollector(BaseDataCollector):
     """Collector for Whoop data"""
     BASE_URL = "https://api.prod.whoop.com/developer/v1"
-    RATE_LIMIT_KEY_PREFIX = "whoop_rate_limit_"
-    RATE_LIMIT_WINDOW = 8  # 1 minute window
-    MAX_REQUESTS_PER_WINDOW = 45  # WHOOP's rate limit (reduced to be safe)
+    RATE_LIMIT_WINDOW = 8  # Back-off after a 429 without Retry-After / X-RateLimit-Reset
+    RANGE_PAGE_LIMIT = 25  # Largest page the collection endpoints return
+    RANGE_RESOURCES = {
+        'cycle': '/cycle',
+        'sleep': '/activity/sleep',
+        'recovery': '/recovery',
+        'workout': '/activity/workout',
+    }
     
     def __init__(self, athlete: Athlete):
         self.athlete = athlete
         self.access_token = None
         self.s3_utils = S3Utils()
         self.request_count = 0
-        self.rate_limited = False
-        self.rate_limit_reset_time = 0
-        self.thread_local = threading.local()
-        self.executor = ThreadPoolExecutor(max_workers=4)
-
-    def get_event_loop(self):
-        """Get or create an event loop for the current thread"""
-        if not hasattr(self.thread_local, 'loop'):
-            try:
-                self.thread_local.loop = asyncio.get_event_loop()
-            except RuntimeError:
-                self.thread_local.loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(self.thread_local.loop)
-        return self.thread_local.loop
-
-    def run_async(self, coro):
-        """Run coroutine in the current thread's event loop"""
-        loop = self.get_event_loop()
-        if loop.is_running():
-            # Create a new loop for this specific call
-            new_loop = asyncio.new_event_loop()
-            try:
-                return new_loop.run_until_complete(coro)
-            finally:
-                new_loop.close()
-        else:
-            return loop.run_until_complete(coro)
+        self.rate_limiter = get_whoop_rate_limiter()
+        self.rate_limit_max_wait = getattr(settings, 'WHOOP_RATE_LIMIT_MAX_WAIT', 120)
+        # Bounds in-flight API requests across all concurrent day/detail fetches
+        self.max_concurrent_requests = getattr(settings, 'WHOOP_MAX_CONCURRENT_REQUESTS', 8)
+        self._semaphores = {}
+        # Pull each resource once for the whole window instead of once per day
+        self.range_fetch = getattr(settings, 'WHOOP_RANGE_FETCH', True)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Request semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._semaphores[loop]
 
     def authenticate(self) -> bool:
         """Authenticate with Whoop API"""
@@ -109,16 +108,15 @@ class WhoopCollector(BaseDataCollector):
     def _verify_token(self) -> bool:
         """Verify token is valid with a simple API call"""
         try:
-            # Make a simple API call to verify token works
-            response = requests.get(
-                f"{self.BASE_URL}/user/profile/basic",
-                headers=self._get_headers()
-            )
-            return response.status_code == 200
+            return run_sync(self._verify_token_async())
         except Exception as e:
             logger.error(f"Error verifying token: {e}")
             return False
 
+    async def _verify_token_async(self) -> bool:
+        response = await get_async_client().get(f"{self.BASE_URL}/user/profile/basic", headers=self._get_headers())
+        return response.status_code == 200
+
     def _get_headers(self):
         """Get authorization headers with current access token"""
         if self.access_token:
@@ -134,43 +132,11 @@ class WhoopCollector(BaseDataCollector):
         """Non-blocking wait function using asyncio"""
         await asyncio.sleep(seconds)
 
-    async def async_wait_for_rate_limit(self):
-        """Asynchronous version of wait_for_rate_limit"""
-        if not self.rate_limited:
-            return
-        
-        current_time = int(time.time())
-        if current_time < self.rate_limit_reset_time:
-            wait_time = self.rate_limit_reset_time - current_time
-            logger.info(f"Waiting for {wait_time} seconds for rate limit to reset...")
-            
-            MAX_SAFE_WAIT = 4
-            remaining_wait = wait_time
-            
-            while remaining_wait > 0:
-                chunk_wait = min(remaining_wait, MAX_SAFE_WAIT)
-                logger.info(f"Waiting for {chunk_wait}s (part of total {wait_time}s wait)...")
-                await asyncio.sleep(chunk_wait)
-                remaining_wait -= chunk_wait
-            
-            self.rate_limited = False
-            self.request_count = 0
-            logger.info("Rate limit cooldown complete, resuming data collection")
-
     async def async_make_request(self, method: str, url: str, params: dict = None) -> Optional[Dict]:
         """Asynchronous version of make_request"""
         max_retries = 3
         retry_count = 0
         
-        if self.rate_limited:
-            await self.async_wait_for_rate_limit()
-            
-        if self.request_count >= self.MAX_REQUESTS_PER_WINDOW:
-            logger.warning(f"Max request count reached ({self.request_count}/{self.MAX_REQUESTS_PER_WINDOW}). Implementing rate limit cooldown.")
-            self.rate_limited = True
-            self.rate_limit_reset_time = int(time.time()) + self.RATE_LIMIT_WINDOW
-            await self.async_wait_for_rate_limit()
-        
         while retry_count <= max_retries:
             try:
                 if retry_count > 0:
@@ -178,9 +144,14 @@ class WhoopCollector(BaseDataCollector):
                     backoff_time = (2 ** retry_count) + jitter
                     await asyncio.sleep(backoff_time)
                 
-                # Use ThreadPoolExecutor for the blocking requests call
-                with ThreadPoolExecutor() as executor:
-                    response = await sync_to_async(requests.request)(
+                # Every attempt spends from the app-wide budget, including retries
+                if not await self.rate_limiter.acquire_async(timeout=self.rate_limit_max_wait):
+                    logger.error(f"Timed out after {self.rate_limit_max_wait}s waiting for WHOOP rate limit budget")
+                    return None
+                
+                # Non-blocking request on the shared keep-alive client
+                async with self._get_semaphore():
+                    response = await get_async_client().request(
                         method,
                         url,
                         headers=self._get_headers(),
@@ -190,11 +161,13 @@ class WhoopCollector(BaseDataCollector):
                 self.request_count += 1
                 
                 if response.status_code == 200:
+                    # Out of budget on WHOOP's side even if our bucket disagrees, hold everyone until reset
+                    if response.headers.get('X-RateLimit-Remaining') == '0':
+                        self.rate_limiter.update_from_headers(response.headers)
                     return response.json()
                 elif response.status_code == 429:
-                    self.rate_limited = True
-                    self.rate_limit_reset_time = int(time.time()) + self.RATE_LIMIT_WINDOW
-                    await self.async_wait_for_rate_limit()
+                    wait_time = self.rate_limiter.update_from_headers(response.headers, default=self.RATE_LIMIT_WINDOW)
+                    logger.warning(f"WHOOP rate limited request to {url}, backing off for {wait_time}s")
                     retry_count += 1
                     continue
                 else:
@@ -214,57 +187,50 @@ class WhoopCollector(BaseDataCollector):
         return None
 
     async def _get_all_records_async(self, url: str, params: dict = None) -> List[Dict]:
-        """Async version of get_all_records"""
-        try:
-            all_records = []
-            next_token = None
+        """
+        Async version of get_all_records. Raises CollectorError when any page
+        fails, since a partial list would look like days without data.
+        """
+        all_records = []
+        next_token = None
+        
+        while True:
+            request_params = params.copy() if params else {}
+            if next_token:
+                request_params['nextToken'] = next_token
             
-            while True:
-                request_params = params.copy() if params else {}
-                if next_token:
-                    request_params['nextToken'] = next_token
-                
-                response = await self.async_make_request('GET', url, request_params)
-                
-                if not response or 'records' not in response:
-                    break
-                    
-                all_records.extend(response['records'])
+            response = await self.async_make_request('GET', url, request_params)
+            
+            if not response or 'records' not in response:
+                raise CollectorError(f"WHOOP request for {url} failed after {len(all_records)} records")
                 
-                next_token = response.get('next_token')
-                if not next_token:
-                    break
-                    
-            return all_records
+            all_records.extend(response['records'])
             
-        except Exception as e:
-            logger.error(f"Error getting paginated records: {e}")
-            return []
+            next_token = response.get('next_token')
+            if not next_token:
+                break
+                
+        return all_records
 
     def _get_all_records(self, url: str, params: dict = None) -> List[Dict]:
         """Synchronous wrapper for _get_all_records_async"""
-        # Create a new event loop if one doesn't exist
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # We're inside an async context, use sync_to_async
-                return loop.run_until_complete(self._get_all_records_async(url, params))
-            else:
-                # We're in a sync context, use asyncio.run
-                return asyncio.run(self._get_all_records_async(url, params))
-        except RuntimeError:
-            # No event loop exists, create one
-            return asyncio.run(self._get_all_records_async(url, params))
+        return run_sync(self._get_all_records_async(url, params))
 
     async def _get_recovery_data_async(self, date):
         """Async version of _get_recovery_data"""
         try:
-            params = {
-                'start': f"{date.strftime('%Y-%m-%d')}T00:00:00.000Z",
-                'end': f"{date.strftime('%Y-%m-%d')}T23:59:59.999Z"
-            }
+            params = self._window_params(date, date)
             
-            recovery_records = await self._get_all_records_async(f"{self.BASE_URL}/recovery", params)
+            # Recoveries belong to their cycle's day, as in _bucket_range_records
+            cycle_records, recovery_records = await asyncio.gather(
+                self._get_all_records_async(f"{self.BASE_URL}/cycle", params),
+                self._get_all_records_async(f"{self.BASE_URL}/recovery", params),
+            )
+            cycle_days = self._cycle_days(cycle_records)
+            recovery_records = [
+                recovery for recovery in recovery_records
+                if self._recovery_day(recovery, cycle_days) == date
+            ]
             
             if not recovery_records:
                 return None
@@ -274,6 +240,8 @@ class WhoopCollector(BaseDataCollector):
                 
             return None
             
+        except CollectorError:
+            raise
         except Exception as e:
             logger.error(f"Error getting recovery data: {e}")
             return None
@@ -295,10 +263,7 @@ class WhoopCollector(BaseDataCollector):
     async def _get_data_for_date_async(self, date: date, data_type: str) -> Optional[Dict]:
         """Async version of _get_data_for_date"""
         try:
-            params = {
-                'start': f"{date.strftime('%Y-%m-%d')}T00:00:00.000Z",
-                'end': f"{date.strftime('%Y-%m-%d')}T23:59:59.999Z"
-            }
+            params = self._window_params(date, date)
             
             if data_type == 'recovery':
                 return await self._get_recovery_data_async(date)
@@ -312,7 +277,11 @@ class WhoopCollector(BaseDataCollector):
                 logger.error(f"Invalid data type: {data_type}")
                 return None
 
-            records = await self._get_all_records_async(url, params)
+            # The padded window holds neighbouring days too, keep the athlete's local day
+            records = [
+                record for record in await self._get_all_records_async(url, params)
+                if self._local_day(record) == date
+            ]
             
             if not records:
                 return None if data_type != 'workout' else []
@@ -322,53 +291,52 @@ class WhoopCollector(BaseDataCollector):
             elif data_type == 'sleep':
                 return await self._get_detailed_record_async('sleep', records[0])
             elif data_type == 'cycle':
-                cycle_data = await self._get_detailed_record_async('cycle', records[0])
+                # The cycle id is already on the list record, fetch detail and recovery together
+                cycle_id = records[0].get('id')
+                cycle_data, cycle_recovery = await asyncio.gather(
+                    self._get_detailed_record_async('cycle', records[0]),
+                    self._get_cycle_recovery_data_async(cycle_id) if cycle_id else asyncio.sleep(0),
+                )
                 
-                if cycle_data and (cycle_id := cycle_data.get('id')):
-                    cycle_recovery = await self._get_cycle_recovery_data_async(cycle_id)
-                    if cycle_recovery:
-                        cycle_data['recovery'] = cycle_recovery
+                if cycle_data and cycle_recovery:
+                    cycle_data['recovery'] = cycle_recovery
                         
                 return cycle_data
             else:
                 return None
 
+        except CollectorError:
+            # A failed fetch is not an empty day, let the day be reported as an error
+            raise
         except Exception as e:
             logger.error(f"Error getting {data_type} data: {e}")
             return None if data_type != 'workout' else []
 
     def _get_data_for_date(self, date: date, data_type: str) -> Optional[Dict]:
         """Thread-safe synchronous wrapper for _get_data_for_date_async"""
-        def _run_get_data():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(self._get_data_for_date_async(date, data_type))
-            finally:
-                loop.close()
-        
-        return self.executor.submit(_run_get_data).result()
+        return run_sync(self._get_data_for_date_async(date, data_type))
 
     async def _get_detailed_workouts_async(self, workout_records: List[Dict]) -> List[Dict]:
         """Async version of _get_detailed_workouts"""
-        detailed_workouts = []
+        details = await asyncio.gather(*[
+            self.async_make_request('GET', f"{self.BASE_URL}/activity/workout/{workout_id}")
+            for workout in workout_records
+            if (workout_id := workout.get('id'))
+        ])
+        # A dropped workout would go unnoticed, and a day of dropped workouts would look empty
+        if not all(details):
+            raise CollectorError(f"WHOOP workout detail requests failed for {sum(not detail for detail in details)} workouts")
         
-        for workout in workout_records:
-            if workout_id := workout.get('id'):
-                detail = await self.async_make_request(
-                    'GET',
-                    f"{self.BASE_URL}/activity/workout/{workout_id}"
-                )
-                if detail:
-                    workout_data = {
-                        'id': detail.get('id'),
-                        'start': detail.get('start'),
-                        'end': detail.get('end'),
-                        'sport_id': detail.get('sport_id'),
-                        'score': detail.get('score', {})
-                    }
-                    detailed_workouts.append(workout_data)
-        return detailed_workouts
+        return [
+            {
+                'id': detail.get('id'),
+                'start': detail.get('start'),
+                'end': detail.get('end'),
+                'sport_id': detail.get('sport_id'),
+                'score': detail.get('score', {})
+            }
+            for detail in details
+        ]
 
     async def _get_detailed_record_async(self, data_type: str, record: Dict) -> Optional[Dict]:
         """Async version of _get_detailed_record"""
@@ -386,7 +354,7 @@ class WhoopCollector(BaseDataCollector):
 
             detail = await self.async_make_request('GET', url)
             if not detail:
-                return None
+                raise CollectorError(f"WHOOP {data_type} detail request for {record_id} failed")
 
             if data_type == 'sleep':
                 return {
@@ -406,6 +374,8 @@ class WhoopCollector(BaseDataCollector):
 
             return detail
 
+        except CollectorError:
+            raise
         except Exception as e:
             logger.error(f"Error getting detailed {data_type} record: {e}")
             return None
@@ -500,77 +470,223 @@ class WhoopCollector(BaseDataCollector):
         try:
             logger.info(f"Starting WHOOP data collection for athlete {self.athlete.user.username}")
             
-            # Use sync_to_async for authenticate since it's a sync method
-            if not await sync_to_async(self.authenticate)():
+            # authenticate() touches the database and blocks, keep it off the event loop
+            if not await asyncio.to_thread(self.authenticate):
                 return None
             
-            if not start_date:
-                start_date = date.today()
-            if not end_date:
-                end_date = date.today()
-            
-            logger.info(f"Collecting WHOOP data for {self.athlete.user.username} from {start_date} to {end_date}")
-            
-            # Get user profile data using async method
-            user_profile = await self.async_make_request('GET', f"{self.BASE_URL}/user/profile/basic")
+            # Requests go through the shared client, which lives on the runtime loop
+            return await run_async(self._collect_authenticated_async(start_date, end_date))
             
-            # Reset rate limit tracking
-            self.request_count = 0
-            self.rate_limited = False
-            
-            results = []
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime('%Y-%m-%d')
-                logger.info(f"Collecting WHOOP data for {date_str}")
-                
-                try:
-                    if self.rate_limited:
-                        await self.async_wait_for_rate_limit()
-                    
-                    # Use async methods directly
-                    sleep_data = await self._get_data_for_date_async(current_date, 'sleep')
-                    recovery_data = await self._get_data_for_date_async(current_date, 'recovery')
-                    cycle_data = await self._get_data_for_date_async(current_date, 'cycle')
-                    workout_data = await self._get_data_for_date_async(current_date, 'workout')
-                    
-                    daily_data = {
-                        'date': date_str,
-                        'daily_stats': {
-                            'date': date_str,
-                            'sleep_data': sleep_data,
-                            'recovery_data': recovery_data,
-                            'cycle_data': cycle_data,
-                            'workout_data': workout_data
-                        },
-                        'user_profile': user_profile
-                    }
-                    
-                    if self._verify_data_structure(daily_data):
-                        results.append(daily_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error collecting WHOOP data for {date_str}: {e}", exc_info=True)
-                    results.append({
-                        'date': date_str,
-                        'daily_stats': {
-                            'date': date_str,
-                            'sleep_data': {},
-                            'recovery_data': {},
-                            'cycle_data': {},
-                            'workout_data': []
-                        },
-                        'error': str(e)
-                    })
-                
-                current_date += timedelta(days=1)
+        except Exception as e:
+            logger.error(f"WHOOP data collection failed: {e}", exc_info=True)
+            return None
+
+    async def _collect_day_async(self, current_date: date, user_profile: Optional[Dict]) -> Dict:
+        """Collect every data type for one day concurrently"""
+        date_str = current_date.strftime('%Y-%m-%d')
+        logger.info(f"Collecting WHOOP data for {date_str}")
+        
+        try:
+            sleep_data, recovery_data, cycle_data, workout_data = await asyncio.gather(
+                self._get_data_for_date_async(current_date, 'sleep'),
+                self._get_data_for_date_async(current_date, 'recovery'),
+                self._get_data_for_date_async(current_date, 'cycle'),
+                self._get_data_for_date_async(current_date, 'workout'),
+            )
             
-            results.sort(key=lambda x: x['date'])
-            return results
+            return {
+                'date': date_str,
+                'daily_stats': {
+                    'date': date_str,
+                    'sleep_data': sleep_data,
+                    'recovery_data': recovery_data,
+                    'cycle_data': cycle_data,
+                    'workout_data': workout_data
+                },
+                'user_profile': user_profile
+            }
             
         except Exception as e:
-            logger.error(f"WHOOP data collection failed: {e}", exc_info=True)
+            logger.error(f"Error collecting WHOOP data for {date_str}: {e}", exc_info=True)
+            return {
+                'date': date_str,
+                'daily_stats': {
+                    'date': date_str,
+                    'sleep_data': {},
+                    'recovery_data': {},
+                    'cycle_data': {},
+                    'workout_data': []
+                },
+                'error': str(e)
+            }
+
+    async def _collect_authenticated_async(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Optional[List[Dict]]:
+        """Collect a date range once authenticated, with all days fetched concurrently"""
+        if not start_date:
+            start_date = date.today()
+        if not end_date:
+            end_date = date.today()
+        
+        return await self._collect_ranges_authenticated_async([(start_date, end_date)])
+
+    async def _collect_ranges_authenticated_async(self, ranges: List[Tuple[date, date]]) -> List[Dict]:
+        """Collect date ranges once authenticated, concurrently and sharing one profile request"""
+        # Get user profile data using async method
+        user_profile = await self.async_make_request('GET', f"{self.BASE_URL}/user/profile/basic")
+        
+        async def collect(start_date: date, end_date: date) -> List[Dict]:
+            logger.info(f"Collecting WHOOP data for {self.athlete.user.username} from {start_date} to {end_date}")
+            dates = [start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1)]
+            if self.range_fetch:
+                return await self._collect_range_async(dates, user_profile)
+            return await asyncio.gather(*[self._collect_day_async(current_date, user_profile) for current_date in dates])
+        
+        collected = await asyncio.gather(*[collect(start_date, end_date) for start_date, end_date in ranges])
+        
+        results = [
+            daily_data for days in collected for daily_data in days
+            if 'error' in daily_data or self._verify_data_structure(daily_data)
+        ]
+        results.sort(key=lambda x: x['date'])
+        logger.info(f"WHOOP collection used {self.request_count} requests, rate limit budget: {self.rate_limiter.utilization()}")
+        return results
+
+    def fetch_cost_model(self) -> FetchCostModel:
+        """Requests per collected range and per day, for pricing sync plans"""
+        resources = len(self.RANGE_RESOURCES)
+        if self.range_fetch:
+            # One paged query per resource covers the range, and each resource has about a record a day
+            return FetchCostModel(range_requests=resources, day_requests=resources / self.RANGE_PAGE_LIMIT)
+        return FetchCostModel(range_requests=0, day_requests=resources)
+
+    @staticmethod
+    def _local_day(record: Dict, field: str = 'start') -> Optional[date]:
+        """Calendar day of a record timestamp in the athlete's own timezone"""
+        value = record.get(field)
+        if not value:
             return None
+        try:
+            moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except (TypeError, ValueError):
+            return None
+
+        # WHOOP timestamps are UTC, timezone_offset is the athlete's offset at the time e.g. "-05:00"
+        offset = record.get('timezone_offset')
+        if offset:
+            try:
+                hours, minutes = offset.lstrip('+-').split(':')
+                delta = timedelta(hours=int(hours), minutes=int(minutes))
+                moment = moment - delta if offset.startswith('-') else moment + delta
+            except ValueError:
+                logger.warning(f"Ignoring invalid WHOOP timezone offset: {offset}")
+        return moment.date()
+
+    @staticmethod
+    def _window_params(start_date: date, end_date: date) -> Dict[str, str]:
+        """
+        Query window for a span of local days. Padded by a day each side so
+        records whose local day differs from their UTC day are included, then
+        filtered with _local_day.
+        """
+        return {
+            'start': f"{(start_date - timedelta(days=1)).strftime('%Y-%m-%d')}T00:00:00.000Z",
+            'end': f"{(end_date + timedelta(days=1)).strftime('%Y-%m-%d')}T23:59:59.999Z",
+        }
+
+    @classmethod
+    def _cycle_days(cls, cycles: List[Dict]) -> Dict[Any, date]:
+        return {
+            cycle['id']: current_date for cycle in cycles
+            if cycle.get('id') is not None and (current_date := cls._local_day(cycle))
+        }
+
+    @classmethod
+    def _recovery_day(cls, recovery: Dict, cycle_days: Dict[Any, date]) -> Optional[date]:
+        """A recovery's day is its cycle's, or its own creation day when the cycle was not fetched"""
+        return cycle_days.get(recovery.get('cycle_id')) or cls._local_day(recovery, 'created_at')
+
+    @classmethod
+    def _bucket_range_records(cls, dates: List[date], records: Dict[str, List[Dict]]) -> Dict[date, Dict[str, Any]]:
+        """
+        Split range query results into per-day data in the same shape the
+        per-day queries and detail calls produce.
+
+        Collection pages list the newest record first, so the first sleep and
+        cycle seen for a day is the one a one-day query would have returned.
+        Recoveries are matched to their cycle, the same score
+        /cycle/{id}/recovery returns, and fall back to their own creation day.
+        """
+        days = {current_date: {'sleep_data': None, 'recovery_data': None, 'cycle_data': None, 'workout_data': []} for current_date in dates}
+
+        cycle_days = cls._cycle_days(records.get('cycle', []))
+        for cycle in records.get('cycle', []):
+            current_date = cls._local_day(cycle)
+            if current_date in days and days[current_date]['cycle_data'] is None:
+                days[current_date]['cycle_data'] = {
+                    'id': cycle.get('id'),
+                    'start': cycle.get('start'),
+                    'end': cycle.get('end'),
+                    'score': cycle.get('score', {})
+                }
+
+        for sleep in records.get('sleep', []):
+            current_date = cls._local_day(sleep)
+            if current_date in days and days[current_date]['sleep_data'] is None:
+                days[current_date]['sleep_data'] = {
+                    'id': sleep.get('id'),
+                    'start': sleep.get('start'),
+                    'end': sleep.get('end'),
+                    'nap': sleep.get('nap', False),
+                    'score': sleep.get('score', {})
+                }
+
+        for recovery in records.get('recovery', []):
+            current_date = cls._recovery_day(recovery, cycle_days)
+            if current_date not in days:
+                continue
+            score = recovery.get('score', {})
+            if days[current_date]['recovery_data'] is None:
+                days[current_date]['recovery_data'] = score
+            cycle_data = days[current_date]['cycle_data']
+            if score and cycle_data and cycle_data['id'] == recovery.get('cycle_id'):
+                cycle_data['recovery'] = score
+
+        for workout in records.get('workout', []):
+            current_date = cls._local_day(workout)
+            if current_date in days and workout.get('id'):
+                days[current_date]['workout_data'].append({
+                    'id': workout.get('id'),
+                    'start': workout.get('start'),
+                    'end': workout.get('end'),
+                    'sport_id': workout.get('sport_id'),
+                    'score': workout.get('score', {})
+                })
+
+        return days
+
+    async def _collect_range_async(self, dates: List[date], user_profile: Optional[Dict]) -> List[Dict]:
+        """Fetch every resource once for the whole window and bucket the records into days"""
+        params = {**self._window_params(dates[0], dates[-1]), 'limit': self.RANGE_PAGE_LIMIT}
+        logger.info(f"Collecting WHOOP data for {len(dates)} days with range queries from {params['start']} to {params['end']}")
+
+        try:
+            pages = await asyncio.gather(*[
+                self._get_all_records_async(f"{self.BASE_URL}{path}", params)
+                for path in self.RANGE_RESOURCES.values()
+            ])
+            days = self._bucket_range_records(dates, dict(zip(self.RANGE_RESOURCES.keys(), pages)))
+        except Exception as e:
+            logger.error(f"WHOOP range collection failed, falling back to per-day queries: {e}", exc_info=True)
+            return await asyncio.gather(*[self._collect_day_async(current_date, user_profile) for current_date in dates])
+
+        return [
+            {
+                'date': current_date.strftime('%Y-%m-%d'),
+                'daily_stats': {'date': current_date.strftime('%Y-%m-%d'), **day},
+                'user_profile': user_profile
+            }
+            for current_date, day in sorted(days.items())
+        ]
 
     def _verify_data_structure(self, data: Dict) -> bool:
         """Verify data structure integrity
@@ -609,33 +725,101 @@ class WhoopCollector(BaseDataCollector):
 
     def collect_data(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Optional[List[Dict]]:
         """Thread-safe synchronous wrapper for async_collect_data"""
-        def _run_collect():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(self.async_collect_data(start_date, end_date))
-            finally:
-                loop.close()
-        
-        return self.executor.submit(_run_collect).result()
+        try:
+            logger.info(f"Starting WHOOP data collection for athlete {self.athlete.user.username}")
+            
+            # Authenticate on the caller's thread, it touches the database
+            if not self.authenticate():
+                return None
+            
+            return run_sync(self._collect_authenticated_async(start_date, end_date))
+            
+        except Exception as e:
+            logger.error(f"WHOOP data collection failed: {e}", exc_info=True)
+            return None
 
-    def make_request(self, method: str, url: str, params: dict = None) -> Optional[Dict]:
-        """Thread-safe synchronous wrapper for async_make_request"""
-        def _run_request():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(self.async_make_request(method, url, params))
-            finally:
-                loop.close()
-        
-        # Run in a separate thread using the executor
-        return self.executor.submit(_run_request).result()
+    def collect_ranges(self, ranges: List[Tuple[date, date]]) -> Optional[List[Dict]]:
+        """Collect several date ranges in one run, e.g. the ranges of a SyncPlan"""
+        try:
+            logger.info(f"Starting WHOOP data collection of {len(ranges)} ranges for athlete {self.athlete.user.username}")
+            
+            if not self.authenticate():
+                return None
+            
+            return run_sync(self._collect_ranges_authenticated_async(ranges))
+            
+        except Exception as e:
+            logger.error(f"WHOOP data collection failed: {e}", exc_info=True)
+            return None
 
-    def __del__(self):
-        """Cleanup resources"""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=False)
+    async def _collect_record_async(self, record_type: str, record_id: Any) -> Optional[Dict]:
+        """
+        Fetch one changed record, for webhook updates. Returns the record's
+        day and the daily_stats entries it changes, in the shape day
+        collection produces.
+        """
+        paths = {'workout': '/activity/workout', 'cycle': '/cycle', 'sleep': '/activity/sleep'}
+        if record_type not in (*paths, 'recovery'):
+            logger.error(f"Unsupported WHOOP record type: {record_type}")
+            return None
 
-        
+        # A recovery is identified by the sleep it was scored from
+        path = paths.get(record_type, paths['sleep'])
+        detail = await self.async_make_request('GET', f"{self.BASE_URL}{path}/{record_id}")
+        # The day comes from the full record, whose timezone_offset the detail shapes below drop
+        current_date = self._local_day(detail) if detail else None
+        if not current_date:
+            return None
+
+        if record_type == 'workout':
+            return {
+                'date': current_date,
+                'workout': {
+                    'id': detail.get('id'),
+                    'start': detail.get('start'),
+                    'end': detail.get('end'),
+                    'sport_id': detail.get('sport_id'),
+                    'score': detail.get('score', {})
+                }
+            }
+        if record_type == 'cycle':
+            return {
+                'date': current_date,
+                'cycle_data': {
+                    'id': detail.get('id'),
+                    'start': detail.get('start'),
+                    'end': detail.get('end'),
+                    'score': detail.get('score', {})
+                }
+            }
+
+        sleep = detail
+        update = {'date': current_date}
+        if not sleep.get('nap'):
+            update['sleep_data'] = {
+                'id': sleep.get('id'),
+                'start': sleep.get('start'),
+                'end': sleep.get('end'),
+                'nap': False,
+                'score': sleep.get('score', {})
+            }
+        if record_type == 'recovery':
+            if sleep.get('cycle_id'):
+                update['recovery_data'] = await self._get_cycle_recovery_data_async(sleep['cycle_id'])
+            else:
+                update['recovery_data'] = await self._get_recovery_data_async(current_date)
+        return update
 
+    def collect_record(self, record_type: str, record_id: Any) -> Optional[Dict]:
+        """Thread-safe synchronous wrapper for _collect_record_async"""
+        try:
+            if not self.authenticate():
+                return None
+            return run_sync(self._collect_record_async(record_type, record_id))
+        except Exception as e:
+            logger.error(f"WHOOP {record_type} {record_id} collection failed: {e}", exc_info=True)
+            return None
+
+    def make_request(self, method: str, url: str, params: dict = None) -> Optional[Dict]:
+        """Thread-safe synchronous wrapper for async_make_request"""
+        return run_sync(self.async_make_request(method, url, params))
@@ -1,4 +1,5 @@
 from .garmin_processor import GarminProcessor
 from .whoop_processor import WhoopProcessor
+from .bulk_writer import BiometricBulkWriter
 
-__all__ = ['GarminProcessor', 'WhoopProcessor']
+__all__ = ['GarminProcessor', 'WhoopProcessor', 'BiometricBulkWriter']
@@ -1,32 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set
 from datetime import date, datetime, timedelta
 from core.models import Athlete
 import logging
-from django.core.cache import cache
-from functools import wraps
+from django.conf import settings
 from django.utils import timezone
-# from core.utils.cache_utils import resource_lock
+from core.utils.cache_utils import CacheLock, EmptyDayCache, resource_lock
+from core.utils.sync_plan import FetchCostModel, SyncPlan
 from core.utils.validation_utils import DataValidator
 
 logger = logging.getLogger(__name__)
 
-def processing_lock(timeout=300):
-    """Decorator to prevent concurrent processing for the same athlete and source"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(self, *args, **kwargs):
-            lock_id = f"processing_lock_{self.athlete.id}_{self.source}"
-            if cache.get(lock_id):
-                logger.warning(f"Processing already in progress for athlete {self.athlete.id} source {self.source}")
-                return False
-            cache.set(lock_id, True, timeout)
-            try:
-                return func(self, *args, **kwargs)
-            finally:
-                cache.delete(lock_id)
-        return wrapper
-    return decorator
+def processor_lock_key(processor, *args, **kwargs) -> str:
+    """Processing locks are per athlete and source, so a WHOOP and a Garmin sync can run together"""
+    return f"{processor.athlete.id}:{processor.source}"
 
 class BaseDataProcessor(ABC):
     """Base class for data processors with enhanced data flow control"""
@@ -36,6 +23,8 @@ class BaseDataProcessor(ABC):
     def __init__(self, athlete: Athlete):
         self.athlete = athlete
         self.source = self.__class__.__name__.lower().replace('processor', '')
+        # Days the source answered with no data, skipped by syncs that aren't forced
+        self.empty_days = EmptyDayCache(athlete.id, self.source)
     
     def check_s3_freshness(self, date_range: List[date]) -> bool:
         """Check if S3 data is fresh for the given date range"""
@@ -60,6 +49,39 @@ class BaseDataProcessor(ABC):
             logger.error(f"Error checking DB freshness: {e}")
             return False
     
+    def fetch_cost_model(self) -> FetchCostModel:
+        """Estimated API requests per collector call and per day, used to price sync plans"""
+        return FetchCostModel()
+
+    def plan_fetch(self, start_date: date, end_date: date, missing_dates: List[date],
+                   merge_gaps: Optional[bool] = None) -> SyncPlan:
+        """Ranges to fetch for the missing days of a window, see SyncPlan"""
+        if merge_gaps is None:
+            merge_gaps = getattr(settings, 'SYNC_PLAN_MERGE_GAPS', True)
+        return SyncPlan(self.source, start_date, end_date, missing_dates, self.fetch_cost_model(), merge_gaps)
+
+    def held_dates(self, date_range: List[date], force_refresh: bool = False) -> Set[date]:
+        """
+        Days of the range a sync would not ask the API for: those already in
+        the database or S3, and those known to have no data. A forced sync
+        refetches every day.
+        """
+        if force_refresh:
+            return set()
+        held = set(self.athlete.biometric_data.filter(
+            date__in=date_range,
+            source=self.source
+        ).values_list('date', flat=True))
+        held |= self.s3_utils.get_available_dates(self.base_path) & set(date_range)
+        return held | self.empty_days.known_empty(date_range)
+
+    def plan_sync(self, start_date: date, end_date: date, force_refresh: bool = False,
+                  merge_gaps: Optional[bool] = None) -> SyncPlan:
+        """What sync_data would fetch for the range, without fetching anything"""
+        date_range = [start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1)]
+        held = self.held_dates(date_range, force_refresh)
+        return self.plan_fetch(start_date, end_date, [d for d in date_range if d not in held], merge_gaps)
+
     @abstractmethod
     def process_data(self, raw_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Process raw data into standardized format"""
@@ -140,7 +162,7 @@ class BaseDataProcessor(ABC):
         """Get data from API"""
         pass
 
-    @processing_lock()
+    @resource_lock('processing', key=processor_lock_key)
     def sync_data(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> bool:
         """
         Base sync logic: 
@@ -177,8 +199,7 @@ class BaseDataProcessor(ABC):
     def clear_processing_lock(self) -> bool:
         """Clear any existing processing locks for this athlete/source"""
         try:
-            lock_key = f"processing_lock_{self.athlete.id}_{self.source}"
-            cache.delete(lock_key)
+            CacheLock(f"processing:{processor_lock_key(self)}").force_release()
             logger.info(f"Cleared processing lock for athlete {self.athlete.id} source {self.source}")
             return True
         except Exception as e:
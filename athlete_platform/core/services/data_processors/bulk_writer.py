@@ -0,0 +1,159 @@
+from typing import Dict, Any, Optional, List
+from datetime import date, datetime
+import logging
+import time
+
+from django.db import connection, transaction
+
+from core.models import Athlete, CoreBiometricData, CoreBiometricTimeSeries
+from ..team_rollup_service import TeamRollupService
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify a row and must never be overwritten on conflict
+BIOMETRIC_UNIQUE_FIELDS = ['athlete', 'date', 'source']
+TIME_SERIES_FIELDS = ['sleep_heart_rate', 'sleep_stress', 'sleep_body_battery']
+
+
+class BiometricBulkWriter:
+    """
+    Collects processed days for one athlete/source and writes them in a single
+    batched upsert instead of one update_or_create per day.
+
+    A flush costs one INSERT ... ON CONFLICT for CoreBiometricData, one SELECT
+    to resolve row ids and one INSERT ... ON CONFLICT for CoreBiometricTimeSeries,
+    independent of the number of days collected, plus one refresh of the
+    team's daily rollups for those days.
+    """
+
+    def __init__(self, athlete: Athlete, source: str, batch_size: int = 500):
+        self.athlete = athlete
+        self.source = source
+        self.batch_size = batch_size
+        self._rows: Dict[date, Dict[str, Any]] = {}
+        self._time_series: Dict[date, Dict[str, Any]] = {}
+        self.last_stats: Dict[str, Any] = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    @staticmethod
+    def _to_date(value) -> Optional[date]:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str) and value:
+            return datetime.strptime(value[:10], '%Y-%m-%d').date()
+        return None
+
+    def add(self, date_value, fields: Dict[str, Any], time_series: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue one processed day. Later additions for the same date replace earlier ones."""
+        current_date = self._to_date(date_value)
+        if current_date is None:
+            logger.warning(f"[BULK] Skipping {self.source} row without a valid date for athlete {self.athlete.id}")
+            return False
+
+        # Identity columns are supplied by the writer itself
+        row = {k: v for k, v in fields.items() if k not in ('id', 'athlete', 'date', 'source')}
+        self._rows[current_date] = row
+        if time_series is not None:
+            self._time_series[current_date] = time_series
+        return True
+
+    def _update_fields(self) -> List[str]:
+        """
+        Columns the queued rows set, plus updated_at. A column no row sets keeps
+        its stored value on conflict instead of being reset to its default.
+        """
+        populated = set().union(*self._rows.values())
+        return [
+            field.name for field in CoreBiometricData._meta.concrete_fields
+            if not field.primary_key and field.name not in BIOMETRIC_UNIQUE_FIELDS
+            and (field.name in populated or field.name == 'updated_at')
+        ]
+
+    def flush(self) -> Dict[str, Any]:
+        """
+        Write every queued row and return instrumentation for the flush:
+        rows, time_series_rows, queries and duration_ms.
+        """
+        stats = {
+            'source': self.source,
+            'rows': 0,
+            'time_series_rows': 0,
+            'queries': 0,
+            'duration_ms': 0.0,
+            'success': True,
+        }
+        if not self._rows:
+            self.last_stats = stats
+            return stats
+
+        def count_queries(execute, sql, params, many, context):
+            stats['queries'] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries), transaction.atomic():
+                objects = [
+                    CoreBiometricData(athlete=self.athlete, date=current_date, source=self.source, **row)
+                    for current_date, row in sorted(self._rows.items())
+                ]
+                CoreBiometricData.objects.bulk_create(
+                    objects,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=BIOMETRIC_UNIQUE_FIELDS,
+                    update_fields=self._update_fields(),
+                )
+                stats['rows'] = len(objects)
+
+                if self._time_series:
+                    # Ids of rows that already existed are kept by the upsert, so resolve them once
+                    id_by_date = dict(
+                        CoreBiometricData.objects.filter(
+                            athlete=self.athlete,
+                            source=self.source,
+                            date__in=list(self._time_series.keys()),
+                        ).values_list('date', 'id')
+                    )
+                    series_objects = [
+                        CoreBiometricTimeSeries(
+                            id=id_by_date[current_date],
+                            **{name: series.get(name) or [] for name in TIME_SERIES_FIELDS}
+                        )
+                        for current_date, series in sorted(self._time_series.items())
+                        if current_date in id_by_date
+                    ]
+                    CoreBiometricTimeSeries.objects.bulk_create(
+                        series_objects,
+                        batch_size=self.batch_size,
+                        update_conflicts=True,
+                        unique_fields=['id'],
+                        update_fields=TIME_SERIES_FIELDS + ['updated_at'],
+                    )
+                    stats['time_series_rows'] = len(series_objects)
+        except Exception as e:
+            logger.error(f"[BULK] Error flushing {self.source} data for athlete {self.athlete.id}: {e}", exc_info=True)
+            stats['rows'] = 0
+            stats['time_series_rows'] = 0
+            stats['success'] = False
+
+        stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        # bulk_create skips the save signals, so refresh the team rollups here
+        if stats['success']:
+            TeamRollupService().refresh_athlete_days(self.athlete, self._rows.keys())
+
+        logger.info(
+            f"[BULK] {self.source} flush for athlete {self.athlete.id}: "
+            f"{stats['rows']} rows, {stats['time_series_rows']} time series rows, "
+            f"{stats['queries']} queries in {stats['duration_ms']}ms"
+        )
+
+        self._rows.clear()
+        self._time_series.clear()
+        self.last_stats = stats
+        return stats
@@ -1,15 +1,18 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set
 from datetime import date, timedelta, timezone
-from .base_processor import BaseDataProcessor
+from .base_processor import BaseDataProcessor, processor_lock_key
+from .bulk_writer import BiometricBulkWriter
 from ..exceptions import ValidationError
 from core.models import Athlete, CoreBiometricData, CoreBiometricTimeSeries
+from core.utils.cache_utils import resource_lock
 from core.utils.s3_utils import S3Utils
 import logging
 import json
 from datetime import datetime
 from ...utils.validation_utils import DataValidator
 from django.conf import settings
-from core.utils.garmin_utils import GarminDataCollector
+from core.utils.garmin_utils import DAILY_ENDPOINTS, GarminDataCollector
+from core.utils.sync_plan import FetchCostModel
 from ..data_transformers.garmin_transformer import GarminTransformer
 from django.db import transaction
 from django.utils import timezone
@@ -49,15 +52,9 @@ class GarminProcessor(BaseDataProcessor):
         try:
             if DEBUG_MODE:
                 logger.info(f"[GARMIN] Checking S3 freshness for {len(date_range)} dates")
-            for current_date in date_range:
-                # Get latest data for this date
-                data = self.s3_utils.get_latest_json_data(self.base_path, current_date)
-                if not data:
-                    if DEBUG_MODE:
-                        logger.info(f"[GARMIN] No S3 data found for {current_date}")
-                    missing_dates.add(current_date)
-                elif DEBUG_MODE:
-                    logger.info(f"[GARMIN] Found S3 data for {current_date}")
+            # One manifest read covers the whole range
+            available_dates = self.s3_utils.get_available_dates(self.base_path)
+            missing_dates = set(date_range) - available_dates
             
             if DEBUG_MODE:
                 logger.info(f"[GARMIN] S3 freshness check complete. Missing {len(missing_dates)} out of {len(date_range)} dates")
@@ -84,6 +81,65 @@ class GarminProcessor(BaseDataProcessor):
             }
         )
     
+    def _build_defaults(self, metrics: Dict[str, Any], now=None) -> Dict[str, Any]:
+        """Map transformed Garmin metrics onto CoreBiometricData columns"""
+        now = now or timezone.now()
+        # Create the defaults dictionary to maintain readability
+        defaults = {
+            'total_sleep_seconds': self._safe_get(metrics, 'total_sleep_seconds', 0),
+            'deep_sleep_seconds': self._safe_get(metrics, 'deep_sleep_seconds', 0),
+            'light_sleep_seconds': self._safe_get(metrics, 'light_sleep_seconds', 0),
+            'rem_sleep_seconds': self._safe_get(metrics, 'rem_sleep_seconds', 0),
+            'awake_seconds': self._safe_get(metrics, 'awake_seconds', 0),
+            'average_respiration': self._safe_get(metrics, 'average_respiration', 0),
+            'lowest_respiration': self._safe_get(metrics, 'lowest_respiration', 0),
+            'highest_respiration': self._safe_get(metrics, 'highest_respiration', 0),
+            'body_battery_change': self._safe_get(metrics, 'body_battery_change', 0),
+            'sleep_resting_heart_rate': self._safe_get(metrics, 'sleep_resting_heart_rate', 0),
+            
+            # Heart Rate Metrics
+            'resting_heart_rate': self._safe_get(metrics, 'resting_heart_rate', 0),
+            'max_heart_rate': self._safe_get(metrics, 'max_heart_rate', 0),
+            'min_heart_rate': self._safe_get(metrics, 'min_heart_rate', 0),
+            'last_seven_days_avg_resting_heart_rate': self._safe_get(metrics, 'last_seven_days_avg_resting_heart_rate', 0),
+            
+            # User Summary Metrics
+            'total_calories': self._safe_get(metrics, 'total_calories', 0),
+            'active_calories': self._safe_get(metrics, 'active_calories', 0),
+            'total_steps': self._safe_get(metrics, 'total_steps', 0),
+            'total_distance_meters': self._safe_get(metrics, 'total_distance_meters', 0),
+            'bmr_calories': self._safe_get(metrics, 'bmr_calories', 0),
+            'net_calorie_goal': self._safe_get(metrics, 'net_calorie_goal', 0),
+            'daily_step_goal': self._safe_get(metrics, 'daily_step_goal', 0),
+            'highly_active_seconds': self._safe_get(metrics, 'highly_active_seconds', 0),
+            'sedentary_seconds': self._safe_get(metrics, 'sedentary_seconds', 0),
+
+            # Stress Metrics
+            'average_stress_level': self._safe_get(metrics, 'average_stress_level', 0),
+            'max_stress_level': self._safe_get(metrics, 'max_stress_level', 0),
+            'stress_duration_seconds': self._safe_get(metrics, 'stress_duration_seconds', 0),
+            'rest_stress_duration': self._safe_get(metrics, 'rest_stress_duration', 0),
+            'activity_stress_duration': self._safe_get(metrics, 'activity_stress_duration', 0),
+            'low_stress_percentage': self._safe_get(metrics, 'low_stress_percentage', 0),
+            'medium_stress_percentage': self._safe_get(metrics, 'medium_stress_percentage', 0),
+            'high_stress_percentage': self._safe_get(metrics, 'high_stress_percentage', 0),
+            
+            # Metadata
+            'created_at': self._safe_get(metrics, 'created_at', now),
+            'updated_at': now,
+            'source': 'garmin',
+            'athlete': self.athlete,  # Explicitly ensure athlete is set in defaults
+        }
+        return defaults
+
+    def _build_time_series(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the sleep time series stored in CoreBiometricTimeSeries"""
+        return {
+            'sleep_heart_rate': self._safe_get(metrics, 'sleep_heart_rate', []),
+            'sleep_stress': self._safe_get(metrics, 'sleep_stress', []),
+            'sleep_body_battery': self._safe_get(metrics, 'sleep_body_battery', []),
+        }
+
     def store_processed_data(self, processed_data: Dict[str, Any]) -> bool:
         """Store final Garmin data in DB (CoreBiometricData) and time series in CoreBiometricDetails."""
         try:
@@ -103,52 +159,7 @@ class GarminProcessor(BaseDataProcessor):
                     logger.info(f"[GARMIN] Storing processed data for {current_date}, and doing sleep check, this is your sleep data: {metrics.get('total_sleep_seconds',0)}\n\n\n")
                     logger.info(f"[GARMIN] Ensuring association with athlete ID: {self.athlete.id}")
 
-                # Create the defaults dictionary to maintain readability
-                defaults = {
-                    'total_sleep_seconds': self._safe_get(metrics, 'total_sleep_seconds', 0),
-                    'deep_sleep_seconds': self._safe_get(metrics, 'deep_sleep_seconds', 0),
-                    'light_sleep_seconds': self._safe_get(metrics, 'light_sleep_seconds', 0),
-                    'rem_sleep_seconds': self._safe_get(metrics, 'rem_sleep_seconds', 0),
-                    'awake_seconds': self._safe_get(metrics, 'awake_seconds', 0),
-                    'average_respiration': self._safe_get(metrics, 'average_respiration', 0),
-                    'lowest_respiration': self._safe_get(metrics, 'lowest_respiration', 0),
-                    'highest_respiration': self._safe_get(metrics, 'highest_respiration', 0),
-                    'body_battery_change': self._safe_get(metrics, 'body_battery_change', 0),
-                    'sleep_resting_heart_rate': self._safe_get(metrics, 'sleep_resting_heart_rate', 0),
-                    
-                    # Heart Rate Metrics
-                    'resting_heart_rate': self._safe_get(metrics, 'resting_heart_rate', 0),
-                    'max_heart_rate': self._safe_get(metrics, 'max_heart_rate', 0),
-                    'min_heart_rate': self._safe_get(metrics, 'min_heart_rate', 0),
-                    'last_seven_days_avg_resting_heart_rate': self._safe_get(metrics, 'last_seven_days_avg_resting_heart_rate', 0),
-                    
-                    # User Summary Metrics
-                    'total_calories': self._safe_get(metrics, 'total_calories', 0),
-                    'active_calories': self._safe_get(metrics, 'active_calories', 0),
-                    'total_steps': self._safe_get(metrics, 'total_steps', 0),
-                    'total_distance_meters': self._safe_get(metrics, 'total_distance_meters', 0),
-                    'bmr_calories': self._safe_get(metrics, 'bmr_calories', 0),
-                    'net_calorie_goal': self._safe_get(metrics, 'net_calorie_goal', 0),
-                    'daily_step_goal': self._safe_get(metrics, 'daily_step_goal', 0),
-                    'highly_active_seconds': self._safe_get(metrics, 'highly_active_seconds', 0),
-                    'sedentary_seconds': self._safe_get(metrics, 'sedentary_seconds', 0),
-
-                    # Stress Metrics
-                    'average_stress_level': self._safe_get(metrics, 'average_stress_level', 0),
-                    'max_stress_level': self._safe_get(metrics, 'max_stress_level', 0),
-                    'stress_duration_seconds': self._safe_get(metrics, 'stress_duration_seconds', 0),
-                    'rest_stress_duration': self._safe_get(metrics, 'rest_stress_duration', 0),
-                    'activity_stress_duration': self._safe_get(metrics, 'activity_stress_duration', 0),
-                    'low_stress_percentage': self._safe_get(metrics, 'low_stress_percentage', 0),
-                    'medium_stress_percentage': self._safe_get(metrics, 'medium_stress_percentage', 0),
-                    'high_stress_percentage': self._safe_get(metrics, 'high_stress_percentage', 0),
-                    
-                    # Metadata
-                    'created_at': self._safe_get(metrics, 'created_at', now),
-                    'updated_at': now,
-                    'source': 'garmin',
-                    'athlete': self.athlete,  # Explicitly ensure athlete is set in defaults
-                }
+                defaults = self._build_defaults(metrics, now)
 
                 # Use get_or_create to ensure we don't create multiple records for same date/athlete
                 biometric_data, created = CoreBiometricData.objects.update_or_create(
@@ -161,11 +172,7 @@ class GarminProcessor(BaseDataProcessor):
                 # 2) Store detailed time series data
                 CoreBiometricTimeSeries.objects.update_or_create(
                     id=biometric_data.id,
-                    defaults={
-                        'sleep_heart_rate': self._safe_get(metrics, 'sleep_heart_rate', []),
-                        'sleep_stress': self._safe_get(metrics, 'sleep_stress', []),
-                        'sleep_body_battery': self._safe_get(metrics, 'sleep_body_battery', []),
-                    }
+                    defaults=self._build_time_series(metrics)
                 )
             
             if DEBUG_MODE:
@@ -178,6 +185,17 @@ class GarminProcessor(BaseDataProcessor):
                 logger.error(f"[GARMIN] Error storing processed data in DB: {str(e)}", exc_info=True)
             return False
     
+    def _queue_processed_data(self, writer: BiometricBulkWriter, processed_data: Dict[str, Any]) -> bool:
+        """Queue transformed Garmin data on a bulk writer instead of storing it immediately."""
+        current_date = processed_data.get('date')
+        if not current_date:
+            if DEBUG_MODE:
+                logger.error("[GARMIN] No date provided in processed data")
+            return False
+
+        metrics = processed_data.get('metrics', {})
+        return writer.add(current_date, self._build_defaults(metrics), self._build_time_series(metrics))
+
     def _get_from_db(self, date_range: List[date]) -> Optional[List[Dict[str, Any]]]:
         """Get data from DB for the specified dates."""
         try:
@@ -272,26 +290,16 @@ class GarminProcessor(BaseDataProcessor):
             logger.info(f"[GARMIN] Getting data from S3 for {len(date_range)} dates: {date_range}")
         try:
             s3_data = []
-            for current_date in date_range:
-                s3_path = f"accounts/{self.athlete.user.id}/biometric-data/garmin/{current_date.strftime('%Y-%m-%d')}_raw.json"
-                if DEBUG_MODE:
-                    logger.info(f"[GARMIN] Attempting to retrieve data from S3 path: {s3_path}")
-                try:
-                    raw_data = self.s3_utils.get_latest_json_data_full_path(s3_path)
-                    if raw_data:
-                        # Add date to the data dictionary if not present
-                        if 'date' not in raw_data:
-                            raw_data['date'] = current_date.strftime('%Y-%m-%d')
-                        s3_data.append(raw_data)
-                        if DEBUG_MODE:
-                            logger.info(f"[GARMIN] Successfully retrieved data from S3 for date {current_date}")
-                    elif DEBUG_MODE:
-                        logger.warning(f"[GARMIN] Empty or no data in S3 for date {current_date}")
-                except Exception as e:
-                    if DEBUG_MODE:
-                        logger.error(f"[GARMIN] Error retrieving data from S3 for date {current_date}: {str(e)}", exc_info=True)
-                    # Continue to next date instead of raising exception
-                    continue
+            # One manifest read plus concurrent GETs for the dates that exist
+            fetched = self.s3_utils.get_latest_json_data_many(self.base_path, date_range)
+            for current_date, raw_data in fetched.items():
+                if raw_data:
+                    # Add date to the data dictionary if not present
+                    if 'date' not in raw_data:
+                        raw_data['date'] = current_date.strftime('%Y-%m-%d')
+                    s3_data.append(raw_data)
+                elif DEBUG_MODE:
+                    logger.warning(f"[GARMIN] Empty or no data in S3 for date {current_date}")
 
             if not s3_data:
                 if DEBUG_MODE:
@@ -326,6 +334,19 @@ class GarminProcessor(BaseDataProcessor):
                 logger.error(f"[GARMIN] Error getting data from S3: {str(e)}", exc_info=True)
             return None
     
+    @staticmethod
+    def _as_dates(values) -> List[date]:
+        dates = []
+        for value in values:
+            if isinstance(value, str):
+                try:
+                    value = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    continue
+            if isinstance(value, date):
+                dates.append(value)
+        return dates
+
     def _get_from_api(self, start_date: date, end_date: date) -> Optional[List[Dict[str, Any]]]:
         """
         Actually call Garmin's API collector, transform the raw data, and return it in the standard shape.
@@ -334,7 +355,7 @@ class GarminProcessor(BaseDataProcessor):
             collector = GarminDataCollector({
                 'username': self.athlete.garmin_credentials.get_profile_config()['username'], 
                 'password': self.athlete.garmin_credentials.get_profile_config()['password']
-            })
+            }, profile_type=self.athlete.garmin_credentials.profile_type)
             raw_data_list = collector.collect_data(start_date, end_date)
             if not raw_data_list:
                 if DEBUG_MODE:
@@ -342,15 +363,25 @@ class GarminProcessor(BaseDataProcessor):
                 return None
 
             final_data = []
+            empty_dates = []
             for raw_day in raw_data_list:
                 # Check if we have valid data in user_summary
-                user_summary = raw_day.get('user_summary', {})
+                user_summary = raw_day.get('user_summary') or {}
+                if not user_summary:
+                    # No summary at all is a bad answer rather than an empty day, so it is not cached
+                    logger.warning(f"[GARMIN] No user_summary returned for date {raw_day.get('date')}")
+                    continue
                 if all(value is None for value in user_summary.values()):
                     if DEBUG_MODE:
                         logger.error(f"[GARMIN] All values in user_summary are None for date {raw_day.get('date')}")
+                    empty_dates.append(raw_day.get('date'))
                     continue
                 final_data.append(raw_day)
 
+            # Garmin answered for these days with nothing recorded, don't ask again until the cache entry lapses
+            self.empty_days.mark(self._as_dates(empty_dates))
+            self.empty_days.clear(self._as_dates(raw_day.get('date') for raw_day in final_data))
+
             return final_data if final_data else None
 
         except Exception as e:
@@ -364,6 +395,57 @@ class GarminProcessor(BaseDataProcessor):
                 logger.error(f"[GARMIN] Error getting data from API: {e}", exc_info=True)
             return None
     
+    def _store_api_data(self, api_data: List[Dict[str, Any]]) -> int:
+        """Store raw API days in S3, then transform them into one batched DB write. Returns the rows written."""
+        if DEBUG_MODE:
+            logger.info(f"[GARMIN] Successfully retrieved {len(api_data)} records from Garmin API")
+        
+        writer = BiometricBulkWriter(self.athlete, 'garmin')
+        # One manifest write for all the days, not one per day
+        with self.s3_utils.manifest_batch():
+            for raw_day in api_data:
+                try:
+                    # Store raw data in S3 first
+                    current_date = datetime.strptime(raw_day.get('date', ''), '%Y-%m-%d').date() if isinstance(raw_day.get('date'), str) else raw_day.get('date')
+                    if current_date:
+                        self.s3_utils.store_json_data(self.base_path, 
+                                                  f"{current_date.strftime('%Y-%m-%d')}_raw.json",
+                                                  raw_day)
+              
+                    # This is the exception log that should always show
+                    logger.info(f"[GARMIN] collecting data for this day {current_date}")
+                
+                    if DEBUG_MODE:
+                        logger.info(f"[GARMIN] Stored raw data in S3 at {self.base_path} for {current_date}")
+            
+                    # Transform and queue for the batched DB write
+                    transformed = GarminTransformer.transform(raw_day)
+                    if transformed:
+                        self._queue_processed_data(writer, transformed)
+                    elif DEBUG_MODE:
+                        logger.error(f"[GARMIN] Failed to transform API data for {raw_day.get('date')}")
+                except Exception as e:
+                    if DEBUG_MODE:
+                        logger.error(f"[GARMIN] Error processing API data for {raw_day.get('date')}: {str(e)}", exc_info=True)
+        
+        success_count = writer.flush()['rows'] if len(writer) else 0
+        failure_count = len(api_data) - success_count
+        
+        # Log detailed summary
+        logger.info(f"[GARMIN] API storage summary: {success_count} successes, {failure_count} failures out of {len(api_data)} total items")
+        return success_count
+
+    def fetch_cost_model(self) -> FetchCostModel:
+        # Every daily endpoint is called for every day, a range only adds resuming the session
+        return FetchCostModel(range_requests=1, day_requests=len(DAILY_ENDPOINTS))
+
+    def held_dates(self, date_range: List[date], force_refresh: bool = False) -> Set[date]:
+        if force_refresh:
+            # Forced Garmin syncs restore the days S3 has before asking the API
+            return self.s3_utils.get_available_dates(self.base_path) & set(date_range)
+        return super().held_dates(date_range)
+
+    @resource_lock('processing', key=processor_lock_key)
     def sync_data(self, start_date: Optional[date] = None, end_date: Optional[date] = None, force_refresh: bool = False) -> bool:
         """Garmin-specific sync implementation"""
         sync_data_debugging = True
@@ -419,108 +501,71 @@ class GarminProcessor(BaseDataProcessor):
                 if DEBUG_MODE:
                     logger.info(f"[GARMIN] Processing all {len(missing_dates)} dates in range")
             
-            # Always process all dates from S3 when force_refresh is True
-            if force_refresh:
-                s3_data = self._get_from_s3(date_range)
-            else:
-                # Otherwise just get missing dates
-                s3_data = self._get_from_s3(missing_dates) if missing_dates else None
+            # Days Garmin already answered with nothing are not missing until their cache entry lapses
+            if not force_refresh:
+                empty_dates = self.empty_days.known_empty(missing_dates)
+                if empty_dates:
+                    logger.info(f"[GARMIN] Skipping {len(empty_dates)} days known to have no data for athlete {self.athlete.id}")
+                    missing_dates = [d for d in missing_dates if d not in empty_dates]
+                    if not missing_dates:
+                        return True
+            
+            # Always process all dates from S3 when force_refresh is True, otherwise just the missing ones
+            wanted_dates = date_range if force_refresh else missing_dates
+            s3_data = self._get_from_s3(wanted_dates) if wanted_dates else None
+            success_count = 0
             
             # Store S3 data into DB if found
             if s3_data:
                 if DEBUG_MODE:
                     logger.info(f"[GARMIN] Processing {len(s3_data)} items from S3")
-                success_count = 0
-                failure_count = 0
+                writer = BiometricBulkWriter(self.athlete, 'garmin')
                 
                 for item in s3_data:
                     item_date = item.get('date')
                     try:
                         # The item should already be transformed by _get_from_s3
                         if DEBUG_MODE:
-                            logger.info(f"[GARMIN] Storing S3 data for {item_date} into DB for athlete {self.athlete.id}")
-                        store_success = self.store_processed_data(item)
-                        if store_success:
-                            success_count += 1
-                            if DEBUG_MODE:
-                                logger.info(f"[GARMIN] Successfully stored data for {item_date}")
-                        else:
-                            failure_count += 1
-                            if DEBUG_MODE:
-                                logger.error(f"[GARMIN] Failed to store data for {item_date}")
+                            logger.info(f"[GARMIN] Queueing S3 data for {item_date} for athlete {self.athlete.id}")
+                        self._queue_processed_data(writer, item)
                     except Exception as e:
-                        failure_count += 1
                         if DEBUG_MODE:
-                            logger.error(f"[GARMIN] Error storing data for {item_date}: {str(e)}", exc_info=True)
+                            logger.error(f"[GARMIN] Error queueing data for {item_date}: {str(e)}", exc_info=True)
+                
+                success_count = writer.flush()['rows']
+                failure_count = len(s3_data) - success_count
                 
                 # Log detailed summary
                 logger.info(f"[GARMIN] Storage summary: {success_count} successes, {failure_count} failures out of {len(s3_data)} total items")
-                
-                # Return True if at least one item was successfully processed
+            elif DEBUG_MODE:
+                logger.warning(f"[GARMIN] No S3 data found or processed")
+            
+            # Days S3 doesn't have come from the API, one contiguous range at a time
+            s3_dates = set(self._as_dates(item.get('date') for item in s3_data or []))
+            api_dates = [d for d in wanted_dates if d not in s3_dates]
+            if not api_dates:
                 return success_count > 0
-            else:
-                if DEBUG_MODE:
-                    logger.warning(f"[GARMIN] No S3 data found or processed")
-                # Try to get data from API instead of returning False
-                if DEBUG_MODE:
-                    logger.info(f"[GARMIN] Attempting to fetch data directly from Garmin API")
-                try:
-                    api_data = self._get_from_api(start_date, end_date)
+            
+            plan = self.plan_fetch(start_date, end_date, api_dates)
+            logger.info(f"[GARMIN] {plan}")
+            try:
+                for fetch_range in plan.ranges:
+                    api_data = self._get_from_api(fetch_range.start, fetch_range.end)
                     if not api_data:
                         if DEBUG_MODE:
-                            logger.error(f"[GARMIN] Failed to get data from Garmin API")
-                        return False
-                    
-                    if DEBUG_MODE:
-                        logger.info(f"[GARMIN] Successfully retrieved {len(api_data)} records from Garmin API")
-                    
-                    # Process and store API data
-                    success_count = 0
-                    failure_count = 0
+                            logger.error(f"[GARMIN] Failed to get data from Garmin API for {fetch_range.start} to {fetch_range.end}")
+                        continue
                     
-                    for raw_day in api_data:
-                        try:
-                            # Store raw data in S3 first
-                            current_date = datetime.strptime(raw_day.get('date', ''), '%Y-%m-%d').date() if isinstance(raw_day.get('date'), str) else raw_day.get('date')
-                            if current_date:
-                                self.s3_utils.store_json_data(self.base_path, 
-                                                          f"{current_date.strftime('%Y-%m-%d')}_raw.json",
-                                                          raw_day)
-                          
-                            # This is the exception log that should always show
-                            logger.info(f"[GARMIN] collecting data for this day {current_date}")
-                            
-                            if DEBUG_MODE:
-                                logger.info(f"[GARMIN] Stored raw data in S3 at {self.base_path} for {current_date}")
-                        
-                            # Transform and store in DB
-                            transformed = GarminTransformer.transform(raw_day)
-                            if transformed:
-                                store_success = self.store_processed_data(transformed)
-                                if store_success:
-                                    success_count += 1
-                                    if DEBUG_MODE:
-                                        logger.info(f"[GARMIN] Successfully stored API data for {raw_day.get('date')}")
-                                else:
-                                    failure_count += 1
-                                    if DEBUG_MODE:
-                                        logger.error(f"[GARMIN] Failed to store API data for {raw_day.get('date')}")
-                            elif DEBUG_MODE:
-                                failure_count += 1
-                                logger.error(f"[GARMIN] Failed to transform API data for {raw_day.get('date')}")
-                        except Exception as e:
-                            failure_count += 1
-                            if DEBUG_MODE:
-                                logger.error(f"[GARMIN] Error processing API data for {raw_day.get('date')}: {str(e)}", exc_info=True)
-                    
-                    # Log detailed summary
-                    logger.info(f"[GARMIN] API storage summary: {success_count} successes, {failure_count} failures out of {len(api_data)} total items")
-                    
-                    return success_count > 0
-                except Exception as e:
-                    if DEBUG_MODE:
-                        logger.error(f"[GARMIN] Error in API fallback: {str(e)}", exc_info=True)
-                    return False
+                    # Held days refetched only to save a range stay as they are
+                    api_data = [raw_day for raw_day in api_data
+                                if any(plan.is_missing(d) for d in self._as_dates([raw_day.get('date')]))]
+                    success_count += self._store_api_data(api_data)
+            except Exception as e:
+                if DEBUG_MODE:
+                    logger.error(f"[GARMIN] Error in API fallback: {str(e)}", exc_info=True)
+                return False
+            
+            return success_count > 0
                 
         except Exception as e:
             if DEBUG_MODE:
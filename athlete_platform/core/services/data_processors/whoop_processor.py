@@ -1,8 +1,10 @@
 from typing import Dict, Any, Optional, List
 from datetime import date, timedelta, datetime, timezone
-from .base_processor import BaseDataProcessor
+from .base_processor import BaseDataProcessor, processor_lock_key
+from .bulk_writer import BiometricBulkWriter
 from ..exceptions import ValidationError
-from core.models import Athlete, CoreBiometricData
+from core.models import Athlete, CoreBiometricData, WhoopCredentials
+from core.utils.cache_utils import resource_lock
 from core.utils.s3_utils import S3Utils
 import logging
 from datetime import datetime
@@ -28,6 +30,9 @@ class WhoopProcessor(BaseDataProcessor):
     def _safe_get(self, data, key, default=0):
         return super()._safe_get(data, key, default)
 
+    def fetch_cost_model(self):
+        return self.collector.fetch_cost_model()
+
     def check_s3_freshness(self, date_range: List[date]) -> bool:
         """Check if S3 data is fresh for the given date range"""
         try:
@@ -180,6 +185,58 @@ class WhoopProcessor(BaseDataProcessor):
             
         return True
     
+    def _build_fields_map(self, processed_data: Dict[str, Any], date_str: str) -> Dict[str, Any]:
+        """Map processed Whoop data onto CoreBiometricData columns"""
+        # Calculate total sleep seconds
+        deep_sleep_seconds = self._safe_get(processed_data, 'deep_sleep_seconds', 0)
+        rem_sleep_seconds = self._safe_get(processed_data, 'rem_sleep_seconds', 0)
+        light_sleep_seconds = self._safe_get(processed_data, 'light_sleep_seconds', 0)
+        awake_seconds = self._safe_get(processed_data, 'awake_seconds', 0)
+        total_sleep_seconds = deep_sleep_seconds + rem_sleep_seconds + light_sleep_seconds - awake_seconds
+
+        # Extract values from processed data with sensible defaults
+        fields_map = {
+            'date': date_str,  # Use the converted date string
+            'sleep_efficiency': self._safe_get(processed_data, 'sleep_efficiency', 0),
+            'sleep_consistency': self._safe_get(processed_data, 'sleep_consistency', 0),
+            'sleep_performance': self._safe_get(processed_data, 'sleep_performance', 0),
+            'respiratory_rate': self._safe_get(processed_data, 'respiratory_rate', 0),
+            'sleep_disturbances': self._safe_get(processed_data, 'sleep_disturbances', 0),
+            'sleep_cycle_count': self._safe_get(processed_data, 'sleep_cycle_count', 0),
+            'total_sleep_seconds': total_sleep_seconds,
+            'deep_sleep_seconds': deep_sleep_seconds,
+            'rem_sleep_seconds': rem_sleep_seconds,
+            'light_sleep_seconds': light_sleep_seconds,
+            'no_data_seconds': self._safe_get(processed_data, 'no_data_seconds', 0),
+            'awake_seconds': self._safe_get(processed_data, 'awake_seconds', 0),
+            'total_in_bed_seconds': self._safe_get(processed_data, 'total_in_bed_seconds', 0),
+            'baseline_sleep_seconds': self._safe_get(processed_data, 'baseline_sleep_seconds', 0),
+            'need_from_sleep_debt_seconds': self._safe_get(processed_data, 'need_from_sleep_debt_seconds', 0),
+            'need_from_recent_strain_seconds': self._safe_get(processed_data, 'need_from_recent_strain_seconds', 0),
+            'need_from_recent_nap_seconds': self._safe_get(processed_data, 'need_from_recent_nap_seconds', 0),
+            'recovery_score': self._safe_get(processed_data, 'recovery_score', 0),
+            'resting_heart_rate': self._safe_get(processed_data, 'resting_heart_rate', 0),
+            'sleep_resting_heart_rate': self._safe_get(processed_data, 'sleep_resting_heart_rate', 0),
+            'hrv_ms': self._safe_get(processed_data, 'hrv_ms', 0),
+            'spo2_percentage': self._safe_get(processed_data, 'spo2_percentage', 0),
+            'skin_temp_celsius': self._safe_get(processed_data, 'skin_temp_celsius', 0),
+            'strain': self._safe_get(processed_data, 'strain', 0),
+            'kilojoules': self._safe_get(processed_data, 'kilojoules', 0),
+            'average_heart_rate': self._safe_get(processed_data, 'average_heart_rate', 0),
+            'max_heart_rate': self._safe_get(processed_data, 'max_heart_rate', 0),
+            'user_id': self._safe_get(processed_data, 'user_id', 0),
+            'email': self._safe_get(processed_data, 'email', ''),
+            'first_name': self._safe_get(processed_data, 'first_name', ''),
+            'last_name': self._safe_get(processed_data, 'last_name', ''),
+            'gender': self._safe_get(processed_data, 'gender', ''),
+            'birthdate': self._safe_get(processed_data, 'birthdate', None),
+            'height_cm': self._safe_get(processed_data, 'height_cm', 0),
+            'weight_kg': self._safe_get(processed_data, 'weight_kg', 0),
+            'body_fat_percentage': self._safe_get(processed_data, 'body_fat_percentage', 0),
+            'source': self._safe_get(processed_data, 'source', 'whoop'),
+        }
+        return fields_map
+
     def store_processed_data(self, processed_data, date_value):
         """Store processed data in CoreBiometricData model"""
         try:
@@ -203,56 +260,8 @@ class WhoopProcessor(BaseDataProcessor):
             else:
                 date_str = str(date_value)
 
-            # Calculate total sleep seconds
-            deep_sleep_seconds = self._safe_get(processed_data, 'deep_sleep_seconds', 0)
-            rem_sleep_seconds = self._safe_get(processed_data, 'rem_sleep_seconds', 0)
-            light_sleep_seconds = self._safe_get(processed_data, 'light_sleep_seconds', 0)
-            awake_seconds = self._safe_get(processed_data, 'awake_seconds', 0)
-            total_sleep_seconds = deep_sleep_seconds + rem_sleep_seconds + light_sleep_seconds - awake_seconds
+            fields_map = self._build_fields_map(processed_data, date_str)
 
-            
-            # Extract values from processed data with sensible defaults
-            fields_map = {
-                'date': date_str,  # Use the converted date string
-                'sleep_efficiency': self._safe_get(processed_data, 'sleep_efficiency', 0),
-                'sleep_consistency': self._safe_get(processed_data, 'sleep_consistency', 0),
-                'sleep_performance': self._safe_get(processed_data, 'sleep_performance', 0),
-                'respiratory_rate': self._safe_get(processed_data, 'respiratory_rate', 0),
-                'sleep_disturbances': self._safe_get(processed_data, 'sleep_disturbances', 0),
-                'sleep_cycle_count': self._safe_get(processed_data, 'sleep_cycle_count', 0),
-                'total_sleep_seconds': total_sleep_seconds,
-                'deep_sleep_seconds': deep_sleep_seconds,
-                'rem_sleep_seconds': rem_sleep_seconds,
-                'light_sleep_seconds': light_sleep_seconds,
-                'no_data_seconds': self._safe_get(processed_data, 'no_data_seconds', 0),
-                'awake_seconds': self._safe_get(processed_data, 'awake_seconds', 0),
-                'total_in_bed_seconds': self._safe_get(processed_data, 'total_in_bed_seconds', 0),
-                'baseline_sleep_seconds': self._safe_get(processed_data, 'baseline_sleep_seconds', 0),
-                'need_from_sleep_debt_seconds': self._safe_get(processed_data, 'need_from_sleep_debt_seconds', 0),
-                'need_from_recent_strain_seconds': self._safe_get(processed_data, 'need_from_recent_strain_seconds', 0),
-                'need_from_recent_nap_seconds': self._safe_get(processed_data, 'need_from_recent_nap_seconds', 0),
-                'recovery_score': self._safe_get(processed_data, 'recovery_score', 0),
-                'resting_heart_rate': self._safe_get(processed_data, 'resting_heart_rate', 0),
-                'sleep_resting_heart_rate': self._safe_get(processed_data, 'sleep_resting_heart_rate', 0),
-                'hrv_ms': self._safe_get(processed_data, 'hrv_ms', 0),
-                'spo2_percentage': self._safe_get(processed_data, 'spo2_percentage', 0),
-                'skin_temp_celsius': self._safe_get(processed_data, 'skin_temp_celsius', 0),
-                'strain': self._safe_get(processed_data, 'strain', 0),
-                'kilojoules': self._safe_get(processed_data, 'kilojoules', 0),
-                'average_heart_rate': self._safe_get(processed_data, 'average_heart_rate', 0),
-                'max_heart_rate': self._safe_get(processed_data, 'max_heart_rate', 0),
-                'user_id': self._safe_get(processed_data, 'user_id', 0),
-                'email': self._safe_get(processed_data, 'email', ''),
-                'first_name': self._safe_get(processed_data, 'first_name', ''),
-                'last_name': self._safe_get(processed_data, 'last_name', ''),
-                'gender': self._safe_get(processed_data, 'gender', ''),
-                'birthdate': self._safe_get(processed_data, 'birthdate', None),
-                'height_cm': self._safe_get(processed_data, 'height_cm', 0),
-                'weight_kg': self._safe_get(processed_data, 'weight_kg', 0),
-                'body_fat_percentage': self._safe_get(processed_data, 'body_fat_percentage', 0),
-                'source': self._safe_get(processed_data, 'source', 'whoop'),
-            }
-            
             # Log the fields for debugging
             if DEBUG_MODE:
                 logger.debug(f"Field values for storage: {fields_map}")
@@ -312,12 +321,8 @@ class WhoopProcessor(BaseDataProcessor):
     def _get_from_s3(self, date_range: List[date]) -> Optional[List[Dict[str, Any]]]:
         """Get data from S3"""
         try:
-            data = []
-            
-            for current_date in date_range:
-                daily_data = self.s3_utils.get_latest_json_data(self.base_path, current_date)
-                if daily_data:
-                    data.append(daily_data)
+            fetched = self.s3_utils.get_latest_json_data_many(self.base_path, date_range)
+            data = [daily_data for daily_data in fetched.values() if daily_data]
             
             return data if data else None
             
@@ -339,6 +344,7 @@ class WhoopProcessor(BaseDataProcessor):
         pass
 
 
+    @resource_lock('processing', key=processor_lock_key)
     def sync_data(self, start_date: Optional[date] = None, end_date: Optional[date] = None, force_refresh: bool = False) -> bool:
         """Simple WHOOP data sync that fetches from API and stores in S3"""
         try:
@@ -363,6 +369,7 @@ class WhoopProcessor(BaseDataProcessor):
             # Track which dates we need data for
             missing_dates = date_range.copy()
             all_data = []
+            fetch_failed = False
             
             # First check S3 for data unless force refresh is True
             if not force_refresh:
@@ -403,6 +410,12 @@ class WhoopProcessor(BaseDataProcessor):
                                 if DEBUG_MODE:
                                     logger.warning(f"[WHOOP] Error processing DB data date: {e}")
             
+                # Days WHOOP already answered with nothing are not missing until their cache entry lapses
+                empty_dates = self.empty_days.known_empty(missing_dates)
+                if empty_dates:
+                    logger.info(f"[WHOOP] Skipping {len(empty_dates)} days known to have no data")
+                    missing_dates = [d for d in missing_dates if d not in empty_dates]
+            
             # If we still have missing dates, or force refresh is True, use the API
             if missing_dates or force_refresh:
                 # Get data from API using collector
@@ -411,13 +424,18 @@ class WhoopProcessor(BaseDataProcessor):
                         logger.error("[WHOOP] Failed to authenticate with API")
                     return False
                 
-                # If force_refresh, we need all dates; otherwise, just the missing ones
-                api_start_date = start_date if force_refresh else min(missing_dates)
-                api_end_date = end_date if force_refresh else max(missing_dates)
-                
-                if DEBUG_MODE:
-                    logger.info(f"[WHOOP] Fetching data from API for dates {api_start_date} to {api_end_date}")
-                raw_data = self.collector.collect_data(api_start_date, api_end_date)
+                # If force_refresh, we need all dates; otherwise, just the missing ones, gap by gap
+                plan = self.plan_fetch(start_date, end_date, date_range if force_refresh else missing_dates)
+                logger.info(f"[WHOOP] {plan}")
+                raw_data = self.collector.collect_ranges([(r.start, r.end) for r in plan.ranges])
+                # Held days refetched only to save a range stay as they are
+                raw_data = [daily_data for daily_data in raw_data or [] if self._is_planned_day(plan, daily_data)]
+                # A day whose fetch failed is not stored, so the sync fails and its watermark stays put
+                failed_days = [daily_data['date'] for daily_data in raw_data if 'error' in daily_data]
+                if failed_days:
+                    logger.warning(f"[WHOOP] Could not fetch {len(failed_days)} days: {', '.join(failed_days)}")
+                    fetch_failed = True
+                    raw_data = [daily_data for daily_data in raw_data if 'error' not in daily_data]
                 
                 if not raw_data:
                     if DEBUG_MODE:
@@ -426,57 +444,36 @@ class WhoopProcessor(BaseDataProcessor):
                     if not all_data:
                         return False
                 else:
+                    # Empty answers are only trusted from a sweep where every fetch succeeded
+                    self._record_empty_days(raw_data, mark_empty=not fetch_failed)
+                    self._remember_whoop_user(raw_data)
+                    
                     # Add API data to our collection
-                    for daily_data in raw_data:
-                        # Store raw data in S3
-                        try:
-                            current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
+                    # One manifest write for the whole sync, not one per day
+                    with self.s3_utils.manifest_batch():
+                        for daily_data in raw_data:
+                            # Store raw data in S3
+                            try:
+                                current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
                             
-                            # Always log this one regardless of DEBUG_MODE
-                            logger.info(f"[WHOOP] collecting data for this day {current_date}")
+                                # Always log this one regardless of DEBUG_MODE
+                                logger.info(f"[WHOOP] collecting data for this day {current_date}")
                             
-                            if DEBUG_MODE:
-                                logger.info(f"[WHOOP] Storing raw data in S3 for {current_date}")
-                            self.s3_utils.store_json_data(
-                                self.base_path, 
-                                f"{current_date.strftime('%Y-%m-%d')}_raw.json",
-                                daily_data
-                            )
+                                if DEBUG_MODE:
+                                    logger.info(f"[WHOOP] Storing raw data in S3 for {current_date}")
+                                self.s3_utils.store_json_data(
+                                    self.base_path, 
+                                    f"{current_date.strftime('%Y-%m-%d')}_raw.json",
+                                    daily_data
+                                )
                             
-                            # Add to our all_data collection
-                            all_data.append(daily_data)
-                        except Exception as e:
-                            if DEBUG_MODE:
-                                logger.error(f"[WHOOP] Error storing raw data in S3: {e}", exc_info=True)
+                                # Add to our all_data collection
+                                all_data.append(daily_data)
+                            except Exception as e:
+                                if DEBUG_MODE:
+                                    logger.error(f"[WHOOP] Error storing raw data in S3: {e}", exc_info=True)
 
-            # Process and store all collected data
-            success = True
-            for daily_data in all_data:
-                try:
-                    # Get the date for this data
-                    if isinstance(daily_data.get('date'), date):
-                        current_date = daily_data['date']
-                    else:
-                        current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
-                    
-                    # Process and store in database
-                    processed_data = self.process_raw_data(daily_data)
-                    if processed_data and self.validate_data(processed_data):
-                        if DEBUG_MODE:
-                            logger.info(f"[WHOOP] Processed data: {processed_data}")
-                        if not self.store_processed_data(processed_data, current_date):
-                            if DEBUG_MODE:
-                                logger.error(f"[WHOOP] Failed to store processed data for {current_date}")
-                            success = False
-                    else:
-                        if DEBUG_MODE:
-                            logger.warning(f"[WHOOP] Invalid processed data for {current_date}")
-                        success = False
-                        
-                except Exception as e:
-                    if DEBUG_MODE:
-                        logger.error(f"[WHOOP] Error processing data: {e}", exc_info=True)
-                    success = False
+            success = self._store_daily_data(all_data) and not fetch_failed
 
             if DEBUG_MODE:
                 logger.info(f"[WHOOP] data sync completed with status: {success}")
@@ -487,20 +484,145 @@ class WhoopProcessor(BaseDataProcessor):
                 logger.error(f"[WHOOP] Error in sync_data: {e}", exc_info=True)
             return False
 
-    def store_raw_data_in_s3(self, raw_data):
-        """Store raw data in S3"""
-        for daily_data in raw_data:
+    def _store_daily_data(self, all_data: List[Dict]) -> bool:
+        """Process collected days, then store them in one batched write"""
+        success = True
+        writer = BiometricBulkWriter(self.athlete, 'whoop')
+        for daily_data in all_data:
             try:
-                current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
+                # Get the date for this data
+                if isinstance(daily_data.get('date'), date):
+                    current_date = daily_data['date']
+                else:
+                    current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
                 
-                if DEBUG_MODE:
-                    logger.info(f"[WHOOP] Storing data in S3 for {current_date}")
-                self.s3_utils.store_json_data(
-                    self.base_path, 
-                    f"{current_date.strftime('%Y-%m-%d')}_raw.json",
-                    daily_data
-                )
+                # Process and store in database
+                processed_data = self.process_raw_data(daily_data)
+                if processed_data and self.validate_data(processed_data):
+                    if DEBUG_MODE:
+                        logger.info(f"[WHOOP] Processed data: {processed_data}")
+                    writer.add(current_date, self._build_fields_map(processed_data, current_date.isoformat()))
+                else:
+                    if DEBUG_MODE:
+                        logger.warning(f"[WHOOP] Invalid processed data for {current_date}")
+                    success = False
+                    
             except Exception as e:
                 if DEBUG_MODE:
-                    logger.error(f"[WHOOP] Error storing data in S3 for {daily_data.get('date')}: {e}")
-                continue 
\ No newline at end of file
+                    logger.error(f"[WHOOP] Error processing data: {e}", exc_info=True)
+                success = False
+
+        if len(writer) and not writer.flush()['success']:
+            if DEBUG_MODE:
+                logger.error(f"[WHOOP] Failed to store processed data for athlete {self.athlete.user.username}")
+            success = False
+        return success
+
+    @resource_lock('processing', wait=30, key=processor_lock_key)
+    def ingest_record(self, record_type: str, record_id: Any) -> bool:
+        """
+        Apply one record WHOOP reported as changed: fetch just that record, merge
+        it into the day's raw data in S3 and store the day again. A day with no
+        raw data yet is collected whole.
+        """
+        update = self.collector.collect_record(record_type, record_id)
+        if not update:
+            logger.warning(f"[WHOOP] Could not fetch {record_type} {record_id} for athlete {self.athlete.user.username}")
+            return False
+
+        current_date = update['date']
+        daily_data = self.s3_utils.get_latest_json_data_many(self.base_path, [current_date]).get(current_date)
+        if daily_data:
+            self._merge_record(daily_data.setdefault('daily_stats', {'date': current_date.isoformat()}), update)
+        else:
+            collected = self.collector.collect_data(current_date, current_date)
+            daily_data = collected[0] if collected else None
+            if not daily_data or 'error' in daily_data:
+                return False
+
+        logger.info(f"[WHOOP] Applying {record_type} {record_id} to {current_date} for athlete {self.athlete.user.username}")
+        self.s3_utils.store_json_data(self.base_path, f"{current_date.strftime('%Y-%m-%d')}_raw.json", daily_data)
+        self.empty_days.clear([current_date])
+        return self._store_daily_data([daily_data])
+
+    @staticmethod
+    def _merge_record(daily_stats: Dict[str, Any], update: Dict[str, Any]) -> None:
+        """Put a record from WhoopCollector.collect_record in place of the day's copy"""
+        if 'sleep_data' in update:
+            daily_stats['sleep_data'] = update['sleep_data']
+        if 'cycle_data' in update:
+            previous = daily_stats.get('cycle_data') or {}
+            daily_stats['cycle_data'] = update['cycle_data']
+            # The cycle detail carries no recovery, keep the one already matched to it
+            if previous.get('recovery'):
+                daily_stats['cycle_data']['recovery'] = previous['recovery']
+        if update.get('recovery_data'):
+            daily_stats['recovery_data'] = update['recovery_data']
+            # process_raw_data prefers the cycle's recovery, so it must not keep the old score
+            if daily_stats.get('cycle_data'):
+                daily_stats['cycle_data']['recovery'] = update['recovery_data']
+        if 'workout' in update:
+            workouts = [workout for workout in daily_stats.get('workout_data') or []
+                        if workout.get('id') != update['workout']['id']]
+            daily_stats['workout_data'] = workouts + [update['workout']]
+
+    @staticmethod
+    def _is_planned_day(plan, daily_data: Dict) -> bool:
+        try:
+            return plan.is_missing(datetime.strptime(daily_data['date'], '%Y-%m-%d').date())
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def _remember_whoop_user(self, raw_data: List[Dict]) -> None:
+        """Save the WHOOP user id webhooks are matched by, for athletes connected before it was stored"""
+        credentials = getattr(self.athlete, 'whoop_credentials', None)
+        if not credentials or credentials.whoop_user_id:
+            return
+        user_id = next((str(daily_data['user_profile']['user_id']) for daily_data in raw_data
+                        if (daily_data.get('user_profile') or {}).get('user_id')), None)
+        if user_id:
+            WhoopCredentials.objects.filter(pk=credentials.pk).update(whoop_user_id=user_id)
+            credentials.whoop_user_id = user_id
+
+    def _record_empty_days(self, raw_data: List[Dict], mark_empty: bool = True) -> None:
+        """
+        Cache the days WHOOP returned without sleep, recovery, cycle or
+        workouts, and clear the rest. With mark_empty off only the days with
+        data are cleared.
+        """
+        empty_dates, filled_dates = [], []
+        for daily_data in raw_data:
+            # A failed day query says nothing about the day
+            if 'error' in daily_data:
+                continue
+            try:
+                current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
+            except (KeyError, ValueError):
+                continue
+            stats = daily_data.get('daily_stats') or {}
+            if any(stats.get(key) for key in ('sleep_data', 'recovery_data', 'cycle_data', 'workout_data')):
+                filled_dates.append(current_date)
+            else:
+                empty_dates.append(current_date)
+        if mark_empty:
+            self.empty_days.mark(empty_dates)
+        self.empty_days.clear(filled_dates)
+
+    def store_raw_data_in_s3(self, raw_data):
+        """Store raw data in S3"""
+        with self.s3_utils.manifest_batch():
+            for daily_data in raw_data:
+                try:
+                    current_date = datetime.strptime(daily_data['date'], '%Y-%m-%d').date()
+                
+                    if DEBUG_MODE:
+                        logger.info(f"[WHOOP] Storing data in S3 for {current_date}")
+                    self.s3_utils.store_json_data(
+                        self.base_path, 
+                        f"{current_date.strftime('%Y-%m-%d')}_raw.json",
+                        daily_data
+                    )
+                except Exception as e:
+                    if DEBUG_MODE:
+                        logger.error(f"[WHOOP] Error storing data in S3 for {daily_data.get('date')}: {e}")
+                    continue 
\ No newline at end of file
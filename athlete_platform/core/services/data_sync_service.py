@@ -1,45 +1,38 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import traceback
 from ..utils.garmin_utils import GarminDataCollector
-from ..models import Athlete, CoreBiometricData, create_biometric_data, get_athlete_biometrics
+from ..models import Athlete, CoreBiometricData, SyncJob, SyncState, create_biometric_data, get_athlete_biometrics
 import json
 import numpy as np
 import logging
 from scipy import stats
 import pandas as pd
-from typing import Dict, Any, List, Optional
-from django.core.cache import cache
-from functools import wraps
+from typing import Dict, Any, List, Optional, Set, Tuple
 from .data_formats.biometric_format import StandardizedBiometricData
 from django.db import transaction
 from django.utils import timezone
-# from core.utils.cache_utils import resource_lock
+from django.conf import settings
+from ..utils.cache_utils import EmptyDayCache, resource_lock, single_flight
 
 from ..utils.s3_utils import S3Utils
 
 logger = logging.getLogger(__name__)
 
 
-def sync_lock(timeout=300):
-    """Decorator to prevent concurrent syncs for the same athlete"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(self, *args, **kwargs):
-            lock_id = f"sync_lock_{self.athlete.id}"
-            if cache.get(lock_id):
-                logger.warning(f"Sync already in progress for athlete {self.athlete.id}")
-                return False
-            cache.set(lock_id, True, timeout)
-            try:
-                return func(self, *args, **kwargs)
-            finally:
-                cache.delete(lock_id)
-        return wrapper
-    return decorator
+def covers_sync_request(running: Dict[str, Any], request: Dict[str, Any]) -> bool:
+    """Whether a running source sync also does everything the request asks for"""
+    return (
+        running['start_date'] <= request['start_date']
+        and running['end_date'] >= request['end_date']
+        and (running['force_refresh'] or not request['force_refresh'])
+    )
+
 
 class DataSyncService:
     """High-level service to coordinate data syncing."""
     
+    # Window of a sync without a start date, before any watermark is known
+    DEFAULT_SYNC_DAYS = 30
 
 
     def __init__(self, athlete: Athlete):
@@ -81,19 +74,20 @@ class DataSyncService:
 
         logger.info(f"Initialized {len(self.processors)} processors")
 
-    def sync_data(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> bool:
+    def sync_data(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                  force_refresh: bool = False) -> bool:
         """Main sync method called by frontend"""
         if not self.active_sources:
             logger.info(f"No active sources for athlete {self.athlete.id}, skipping sync")
             return False
     
-        success = self.sync_specific_sources(self.active_sources, start_date, end_date)
+        success = self.sync_specific_sources(self.active_sources, start_date, end_date, force_refresh=force_refresh)
         
         # Check if we have any data after sync
-        if not any(success.values()):
+        if not any(success.values()) and not force_refresh:
             # If sync failed for all sources, try with force_refresh
             logger.info("Still no data after sync, trying force refresh")
-            return self.sync_specific_sources(self.active_sources, start_date, end_date, force_refresh=True)
+            success = self.sync_specific_sources(self.active_sources, start_date, end_date, force_refresh=True)
         
         return any(success.values())
 
@@ -105,26 +99,11 @@ class DataSyncService:
             logger.warning("No sources specified for sync")
             return {source: False for source in sources}
 
-        # Set default date range if not provided
-        if not start_date:
-            start_date = timezone.now() - timedelta(days=30)
-        if not end_date:
-            end_date = timezone.now()
-            
-        # Convert to date objects if datetime objects were provided
-        if isinstance(start_date, datetime):
-            start_date = start_date.date()
-        if isinstance(end_date, datetime):
-            end_date = end_date.date()
+        incremental = self._is_incremental(start_date, force_refresh)
+        start_date, end_date = self._sync_window(start_date, end_date)
             
         logger.info(f"Sync date range: {start_date} to {end_date} (force_refresh: {force_refresh})")
 
-        # Get today's date to compare
-        today = timezone.now().date()
-        
-        # Check if current day is in the requested range
-        current_day_in_range = start_date <= today <= end_date
-        
         results = {}
         
         for source in sources:
@@ -143,47 +122,23 @@ class DataSyncService:
                     results[source] = False
                     continue
                     
-                # Initialize appropriate processor
-                processor = None
-                if source == 'whoop':
-                    from .data_processors import WhoopProcessor
-                    processor = WhoopProcessor(self.athlete)
-                elif source == 'garmin':
-                    from .data_processors import GarminProcessor
-                    # Get profile type from credentials
-                    profile_type = getattr(self.athlete, cred_attr).profile_type
-                    processor = GarminProcessor(self.athlete, profile_type)
+                processor = self._create_processor(source)
                 
                 if processor:
-                    # If today is in the date range, we need to sync it separately with force_refresh=True
-                    if current_day_in_range:
-                        logger.info(f"Current day ({today}) is in range - will force refresh for {source}")
-                        
-                        # Sync historical data (excluding today) first if exists
-                        historical_success = True
-                        if start_date < today:
-                            historical_end = today - timedelta(days=1)
-                            logger.info(f"Syncing historical {source} data for athlete {self.athlete.id} from {start_date} to {historical_end}")
-                            historical_success = processor.sync_data(start_date, historical_end, force_refresh=force_refresh)
-                        
-                        # Always force refresh the current day
-                        logger.info(f"Force refreshing today's {source} data for athlete {self.athlete.id}")
-                        today_success = processor.sync_data(today, today, force_refresh=True)
-                        
-                        # Sync future days if any (shouldn't normally happen, but handle it anyway)
-                        future_success = True
-                        if end_date > today:
-                            future_start = today + timedelta(days=1)
-                            logger.info(f"Syncing future {source} data for athlete {self.athlete.id} from {future_start} to {end_date}")
-                            future_success = processor.sync_data(future_start, end_date, force_refresh=force_refresh)
-                        
-                        # Success if any part was successful
-                        success = historical_success or today_success or future_success
-                    else:
-                        # If today is not in the range, use the normal sync path
-                        logger.info(f"Syncing {source} data for athlete {self.athlete.id} from {start_date} to {end_date}")
-                        success = processor.sync_data(start_date, end_date, force_refresh=force_refresh)
+                    source_start = self._incremental_start(source, start_date, end_date) if incremental else start_date
+                    
+                    # Concurrent syncs of this athlete and source share one run when its range covers theirs
+                    segments = single_flight(
+                        f"sync:{self.athlete.id}:{source}",
+                        lambda: self._sync_segments(processor, source, source_start, end_date, force_refresh),
+                        request={'start_date': source_start, 'end_date': end_date, 'force_refresh': force_refresh},
+                        covers=covers_sync_request,
+                        wait=getattr(settings, 'SYNC_SINGLE_FLIGHT_WAIT', 120),
+                    )
+                    success = any(segment_success for _, _, segment_success in segments)
                     
+                    if success:
+                        self._record_sync_state(source, source_start, self._synced_through(segments))
                     results[source] = success
                     logger.info(f"Sync {source} result: {success}")
                 else:
@@ -196,11 +151,182 @@ class DataSyncService:
                 
         return results
 
+    def _is_incremental(self, start_date, force_refresh: bool) -> bool:
+        """Default syncs resume after each source's watermark (see _incremental_start)"""
+        return not start_date and not force_refresh and getattr(settings, 'SYNC_INCREMENTAL', True)
+
+    def _sync_window(self, start_date, end_date) -> Tuple[date, date]:
+        """The requested range as dates, defaulting to the last DEFAULT_SYNC_DAYS days"""
+        # Set default date range if not provided
+        if not start_date:
+            start_date = timezone.now() - timedelta(days=self.DEFAULT_SYNC_DAYS)
+        if not end_date:
+            end_date = timezone.now()
+            
+        # Convert to date objects if datetime objects were provided
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime):
+            end_date = end_date.date()
+        return start_date, end_date
+
+    def plan_sync(self, sources: List[str], start_date: Optional[date] = None, end_date: Optional[date] = None,
+                  force_refresh: bool = False, merge_gaps: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Dry run of sync_specific_sources: the ranges each source would fetch
+        from its API, planned without fetching or storing anything
+        """
+        incremental = self._is_incremental(start_date, force_refresh)
+        start_date, end_date = self._sync_window(start_date, end_date)
+        today = timezone.now().date()
+        
+        plans = {}
+        for source in sources:
+            processor = self._create_processor(source) if source in self.SUPPORTED_SOURCES else None
+            if not processor:
+                plans[source] = {'error': f'Source {source} is not active'}
+                continue
+            
+            source_start = self._incremental_start(source, start_date, end_date) if incremental else start_date
+            # The same processor calls as _sync_segments, which force refreshes today on its own
+            if source_start <= today <= end_date:
+                segments = [(source_start, today - timedelta(days=1), force_refresh), (today, today, True),
+                            (today + timedelta(days=1), end_date, force_refresh)]
+            else:
+                segments = [(source_start, end_date, force_refresh)]
+            
+            source_plans = [
+                processor.plan_sync(segment_start, segment_end, segment_force, merge_gaps)
+                for segment_start, segment_end, segment_force in segments
+                if segment_start <= segment_end
+            ]
+            plans[source] = {
+                'start_date': source_start.isoformat(),
+                'end_date': end_date.isoformat(),
+                'incremental': incremental,
+                'plans': [plan.to_dict() for plan in source_plans],
+                'estimated_requests': round(sum(plan.estimated_requests for plan in source_plans), 2),
+                'span_requests': round(sum(plan.span_requests for plan in source_plans), 2),
+            }
+        return plans
+
+    def _create_processor(self, source: str):
+        """Processor for one of SUPPORTED_SOURCES, using the athlete's credentials"""
+        if source == 'whoop' and hasattr(self.athlete, 'whoop_credentials'):
+            from .data_processors import WhoopProcessor
+            return WhoopProcessor(self.athlete)
+        if source == 'garmin' and hasattr(self.athlete, 'garmin_credentials'):
+            from .data_processors import GarminProcessor
+            # Get profile type from credentials
+            return GarminProcessor(self.athlete, self.athlete.garmin_credentials.profile_type)
+        return None
+
+    def _incremental_start(self, source: str, start_date, end_date):
+        """
+        Start of a default sync: the day after the source's settled watermark,
+        or the whole default window when there is none yet
+        """
+        settled_through = SyncState.objects.filter(
+            athlete=self.athlete, source=source
+        ).values_list('settled_through', flat=True).first()
+        if not settled_through or settled_through < start_date:
+            return start_date
+        
+        resume = min(settled_through + timedelta(days=1), end_date)
+        logger.info(f"Resuming {source} sync for athlete {self.athlete.id} at {resume} "
+                    f"(settled through {settled_through})")
+        return resume
+
+    def _settling_days(self, source: str) -> int:
+        """Days before today a source's data may still change"""
+        if source == 'whoop':
+            # While WHOOP pushes changes, late scores arrive by webhook instead of by rescanning
+            last_webhook_at = getattr(getattr(self.athlete, 'whoop_credentials', None), 'last_webhook_at', None)
+            active_for = timedelta(hours=getattr(settings, 'WHOOP_WEBHOOK_ACTIVE_HOURS', 24))
+            if last_webhook_at and timezone.now() - last_webhook_at < active_for:
+                return 0
+        return getattr(settings, 'SYNC_SETTLING_DAYS', 3)
+
+    def _record_sync_state(self, source: str, start_date, end_date: Optional[date]) -> None:
+        """
+        Note a successful sync of start_date through end_date, or of nothing
+        from start_date on when end_date is None. Days older than the source's
+        settling days count as final, but the watermark only moves when the
+        range left no gap behind it.
+        """
+        try:
+            today = timezone.now().date()
+            settled = min(end_date, today - timedelta(days=self._settling_days(source))) if end_date else date.min
+            
+            with transaction.atomic():
+                state, _ = SyncState.objects.select_for_update().get_or_create(athlete=self.athlete, source=source)
+                if state.settled_through:
+                    contiguous = start_date <= state.settled_through + timedelta(days=1)
+                else:
+                    contiguous = start_date <= today - timedelta(days=self.DEFAULT_SYNC_DAYS)
+                
+                if contiguous and settled > (state.settled_through or date.min):
+                    state.settled_through = settled
+                state.last_success_at = timezone.now()
+                state.save()
+        except Exception as e:
+            logger.error(f"Error recording {source} sync state for athlete {self.athlete.id}: {e}")
+
+    @staticmethod
+    def _synced_through(segments: List[Tuple[date, date, bool]]) -> Optional[date]:
+        """End of the successful segments running on from the start of the sync, None if the first one failed"""
+        synced_through = None
+        for _, segment_end, segment_success in segments:
+            if not segment_success:
+                break
+            synced_through = segment_end
+        return synced_through
+
+    def _sync_segments(self, processor, source: str, start_date, end_date,
+                       force_refresh: bool = False) -> List[Tuple[date, date, bool]]:
+        """
+        Sync one source over the range, always force refreshing today. Returns
+        (start, end, success) for each segment synced, in date order.
+        """
+        today = timezone.now().date()
+        current_day_in_range = start_date <= today <= end_date
+        
+        # If today is in the date range, we need to sync it separately with force_refresh=True
+        if current_day_in_range:
+            logger.info(f"Current day ({today}) is in range - will force refresh for {source}")
+            
+            segments = []
+            # Sync historical data (excluding today) first if exists
+            if start_date < today:
+                historical_end = today - timedelta(days=1)
+                logger.info(f"Syncing historical {source} data for athlete {self.athlete.id} from {start_date} to {historical_end}")
+                segments.append((start_date, historical_end,
+                                 bool(processor.sync_data(start_date, historical_end, force_refresh=force_refresh))))
+            
+            # Always force refresh the current day
+            logger.info(f"Force refreshing today's {source} data for athlete {self.athlete.id}")
+            segments.append((today, today, bool(processor.sync_data(today, today, force_refresh=True))))
+            
+            # Sync future days if any (shouldn't normally happen, but handle it anyway)
+            if end_date > today:
+                future_start = today + timedelta(days=1)
+                logger.info(f"Syncing future {source} data for athlete {self.athlete.id} from {future_start} to {end_date}")
+                segments.append((future_start, end_date,
+                                 bool(processor.sync_data(future_start, end_date, force_refresh=force_refresh))))
+            return segments
+        
+        # If today is not in the range, use the normal sync path
+        logger.info(f"Syncing {source} data for athlete {self.athlete.id} from {start_date} to {end_date}")
+        return [(start_date, end_date, bool(processor.sync_data(start_date, end_date, force_refresh=force_refresh)))]
+
     def get_biometric_data(self, days: int = 30):
         """Get biometric data for the athlete"""
         if not self.active_sources:
             logger.info(f"No active sources for athlete {self.athlete.id}")
             return []
+        
+        if getattr(settings, 'BIOMETRIC_STALE_WHILE_REVALIDATE', True):
+            return self.read_biometric_data(days)['data']
             
         try:
             end_date = timezone.now().date()
@@ -221,21 +347,11 @@ class DataSyncService:
                 logger.info(f"No biometric data found for athlete {self.athlete.id}")
             
             # If no data found or data is severely incomplete, trigger a sync
-            # Note: We now sync if we have less than 1/3 of the expected days
             expected_days = (end_date - start_date).days + 1
-            threshold = expected_days // 3
-            
-            # Check if we're missing today's data or if we have insufficient data overall
             today = end_date
-            has_today = False
-            
-            for item in data:
-                if str(item['date']) == str(today):
-                    has_today = True
-                    break
-            
-            missing_today = not has_today
-            insufficient_data = not data.exists() or data.count() < threshold
+            missing_today, insufficient_data = self._window_gaps(
+                data, start_date, end_date, self._known_empty_dates(start_date, end_date)
+            )
             
             if missing_today or insufficient_data:
                 if missing_today:
@@ -259,16 +375,7 @@ class DataSyncService:
                     # If still no data, try a more aggressive sync with force_refresh
                     logger.info("Still no data after sync, trying force refresh")
                     for source in self.active_sources:
-                        # Initialize appropriate processor
-                        processor = None
-                        if source == 'whoop' and hasattr(self.athlete, 'whoop_credentials'):
-                            from .data_processors import WhoopProcessor
-                            processor = WhoopProcessor(self.athlete)
-                        elif source == 'garmin' and hasattr(self.athlete, 'garmin_credentials'):
-                            from .data_processors import GarminProcessor
-                            profile_type = self.athlete.garmin_credentials.profile_type
-                            processor = GarminProcessor(self.athlete, profile_type)
-                            
+                        processor = self._create_processor(source)
                         if processor:
                             logger.info(f"Force syncing {source} data")
                             processor.sync_data(start_date, end_date, force_refresh=True)
@@ -291,6 +398,79 @@ class DataSyncService:
             logger.error(f"Error getting biometric data: {str(e)}", exc_info=True)
             return []
 
+    def read_biometric_data(self, days: int = 30) -> Dict[str, Any]:
+        """
+        Stale-while-revalidate read: answer from the database right away and,
+        when the window is stale, queue a background sync instead of syncing
+        inline. Returns the rows (newest first) and their freshness.
+        """
+        from .sync_job_service import SyncJobService
+        
+        end_date = timezone.now().date()
+        start_date = end_date - timedelta(days=days)
+        rows = list(
+            CoreBiometricData.objects.filter(athlete=self.athlete, date__range=[start_date, end_date])
+            .order_by('-date')
+            .values()
+        )
+        missing_today, insufficient_data = self._window_gaps(
+            rows, start_date, end_date, self._known_empty_dates(start_date, end_date)
+        )
+        
+        jobs = SyncJob.objects.filter(athlete=self.athlete, job_type=SyncJob.TYPE_ATHLETE)
+        # An active job past its lease lost its worker and is replaced when the refresh is queued
+        job = jobs.filter(status__in=SyncJob.ACTIVE_STATUSES, updated_at__gte=SyncJob.stale_before()).first()
+        last_finished = jobs.filter(finished_at__isnull=False).order_by('-finished_at').values_list('finished_at', flat=True).first()
+        last_synced = max(filter(None, [last_finished, max((row['updated_at'] for row in rows), default=None)]), default=None)
+        
+        # Today may have no data yet, so a recent sync counts as fresh until the interval passes
+        recently_synced = last_finished and timezone.now() - last_finished < timedelta(
+            seconds=getattr(settings, 'BIOMETRIC_REFRESH_INTERVAL', 900)
+        )
+        stale = (missing_today or insufficient_data) and not recently_synced
+        
+        if stale and job is None and self.active_sources:
+            logger.info(f"Biometric data for athlete {self.athlete.id} is stale "
+                        f"(missing today: {missing_today}, {len(rows)} rows), queueing a refresh")
+            try:
+                job = SyncJobService().enqueue_athlete_sync(
+                    self.athlete, start_date=start_date, end_date=end_date, reason='stale_read'
+                )
+            except Exception as e:
+                logger.error(f"Error queueing refresh for athlete {self.athlete.id}: {e}")
+        
+        return {
+            'data': rows,
+            'freshness': {
+                'last_synced': last_synced.isoformat() if last_synced else None,
+                'stale': bool(stale),
+                'refresh_pending': job is not None,
+                'sync_job_id': str(job.id) if job else None,
+            }
+        }
+    
+    def _known_empty_dates(self, start_date, end_date) -> Set[date]:
+        """Days in the range that every active source has answered with no data"""
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        empty_dates = None
+        for source in self.active_sources:
+            source_empty = EmptyDayCache(self.athlete.id, source).known_empty(days)
+            empty_dates = source_empty if empty_dates is None else empty_dates & source_empty
+        return empty_dates or set()
+    
+    @staticmethod
+    def _window_gaps(rows, start_date, end_date, empty_dates: Set[date] = frozenset()) -> Tuple[bool, bool]:
+        """
+        Whether today's row is missing, and whether the window holds fewer than
+        a third of its days. Days known to have no data count as held.
+        """
+        rows = list(rows)
+        expected_days = (end_date - start_date).days + 1
+        row_dates = {row['date'] for row in rows}
+        missing_today = end_date not in row_dates
+        held = len(row_dates | set(empty_dates))
+        return missing_today, not held or held < expected_days // 3
+
     def _check_db_freshness(self, start_date: datetime.date, end_date: datetime.date) -> bool:
         """Check if database has fresh data for date range"""
         try:
@@ -335,7 +515,7 @@ class DataSyncService:
             logger.error(f"Error storing data in S3: {e}")
             return False
 
-    @sync_lock()
+    @resource_lock('sync')
     def sync_all_sources(self, 
                          start_date: Optional[datetime] = None,
                          end_date: Optional[datetime] = None) -> Dict[str, bool]:
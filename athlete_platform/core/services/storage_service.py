@@ -1,17 +1,12 @@
 import json
 from datetime import datetime
-import boto3
 from django.conf import settings
+from core.utils.aws_clients import get_s3_client
 from botocore.exceptions import ClientError
 
 class UserStorageService:
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME
-        )
+        self.s3_client = get_s3_client()
         self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
 
     def create_user_directory_structure(self, user):
@@ -0,0 +1,291 @@
+"""
+Background sync jobs.
+
+Requests enqueue a SyncJob and return straight away. Depending on
+SYNC_JOB_BACKEND the job then runs on Celery, on a small in-process worker
+pool, or on a separate `python manage.py run_sync_jobs` worker that polls
+the database. Clients follow progress through the job status endpoint.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Athlete, SyncJob, Team, User
+from ..utils.cache_utils import lock_stats
+from .coach_data_sync_service import CoachDataSyncService
+from .data_sync_service import DataSyncService
+
+logger = logging.getLogger(__name__)
+
+BACKEND_CELERY = 'celery'
+BACKEND_THREAD = 'thread'
+BACKEND_WORKER = 'worker'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SYNC_JOB_WORKERS', 2),
+                    thread_name_prefix='sync-job'
+                )
+    return _executor
+
+
+class SyncJobService:
+    """Enqueue, dispatch and run SyncJob records"""
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or getattr(settings, 'SYNC_JOB_BACKEND', BACKEND_THREAD)
+
+    def enqueue_athlete_sync(self, athlete: Athlete, sources: Optional[List[str]] = None, force_refresh: bool = False,
+                             start_date: Optional[date] = None, end_date: Optional[date] = None,
+                             requested_by: Optional[User] = None, reason: str = 'manual') -> SyncJob:
+        """Queue a sync of an athlete's sources. Without sources, all active sources are synced."""
+        params = {
+            'sources': sorted(sources) if sources else None,
+            'force_refresh': bool(force_refresh),
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+        }
+        return self._enqueue(SyncJob.TYPE_ATHLETE, params, requested_by, reason, athlete=athlete)
+
+    def enqueue_team_sync(self, team: Team, days: int = 7, force_refresh: bool = False,
+                          requested_by: Optional[User] = None, reason: str = 'team') -> SyncJob:
+        """Queue a sync of every athlete on a team"""
+        params = {'days': int(days), 'force_refresh': bool(force_refresh)}
+        return self._enqueue(SyncJob.TYPE_TEAM, params, requested_by, reason, team=team)
+
+    def enqueue_whoop_event(self, athlete: Athlete, record_type: str, record_id: Any,
+                            reason: str = 'whoop_webhook') -> SyncJob:
+        """Queue the fetch of one WHOOP record a webhook reported as changed"""
+        params = {'record_type': record_type, 'record_id': str(record_id)}
+        return self._enqueue(SyncJob.TYPE_WHOOP_EVENT, params, None, reason, athlete=athlete)
+
+    def _enqueue(self, job_type: str, params: Dict[str, Any], requested_by: Optional[User], reason: str, **target) -> SyncJob:
+        with transaction.atomic():
+            # Lock the athlete or team so two requests can't both miss the active job and create one each
+            for instance in target.values():
+                type(instance).objects.select_for_update().filter(pk=instance.pk).first()
+
+            active = SyncJob.objects.filter(job_type=job_type, status__in=SyncJob.ACTIVE_STATUSES, params=params, **target)
+            # A job nothing has touched within the lease lost its worker, e.g. to a restart of the thread backend
+            abandoned = active.filter(updated_at__lt=SyncJob.stale_before()).update(
+                status=SyncJob.STATUS_FAILED, error="Worker stopped responding",
+                finished_at=timezone.now(), updated_at=timezone.now()
+            )
+            if abandoned:
+                logger.warning(f"[SYNC_JOB] Failed {abandoned} abandoned {job_type} sync jobs before queueing a new one")
+
+            # A login and a sync click seconds apart should not run the same sync twice
+            existing = active.first()
+            if existing:
+                logger.info(f"[SYNC_JOB] Reusing active job {existing.id} for {job_type} sync")
+                return existing
+
+            job = SyncJob.objects.create(
+                job_type=job_type,
+                params=params,
+                requested_by=requested_by,
+                reason=reason,
+                **target
+            )
+        logger.info(f"[SYNC_JOB] Queued {job_type} sync job {job.id} ({reason}) on {self.backend} backend")
+        # Workers must not look for the row before the request's transaction commits
+        transaction.on_commit(lambda: self.dispatch(job.id))
+        return job
+
+    def dispatch(self, job_id) -> None:
+        """Hand a queued job to the configured backend"""
+        if self.backend == BACKEND_WORKER:
+            return
+
+        if self.backend == BACKEND_CELERY:
+            try:
+                from core.tasks import run_sync_job
+                run_sync_job.delay(str(job_id))
+                return
+            except Exception as e:
+                logger.error(f"[SYNC_JOB] Could not send job {job_id} to Celery, running it locally: {e}")
+
+        _get_executor().submit(self._run_in_thread, job_id)
+
+    def _run_in_thread(self, job_id) -> None:
+        try:
+            self.run(job_id)
+        finally:
+            # Pool threads get their own connection, don't leave it open
+            connection.close()
+
+    def run(self, job_id) -> Optional[SyncJob]:
+        """Claim a queued job and run it. Returns None if another worker already claimed it."""
+        now = timezone.now()
+        claimed = SyncJob.objects.filter(id=job_id, status=SyncJob.STATUS_QUEUED).update(
+            status=SyncJob.STATUS_RUNNING,
+            started_at=now,
+            updated_at=now,
+            attempts=F('attempts') + 1,
+            progress=0,
+        )
+        if not claimed:
+            logger.info(f"[SYNC_JOB] Job {job_id} is no longer queued, skipping")
+            return None
+
+        job = SyncJob.objects.select_related('athlete__user', 'team').get(id=job_id)
+        logger.info(f"[SYNC_JOB] Running {job.job_type} sync job {job.id} (attempt {job.attempts})")
+
+        try:
+            if job.job_type == SyncJob.TYPE_TEAM:
+                status, result = self._run_team_sync(job)
+            elif job.job_type == SyncJob.TYPE_WHOOP_EVENT:
+                status, result = self._run_whoop_event(job)
+            else:
+                status, result = self._run_athlete_sync(job)
+            self._finish(job, status, result=result)
+        except Exception as e:
+            logger.error(f"[SYNC_JOB] Job {job.id} failed: {e}", exc_info=True)
+            # The traceback stays in the log, the job status endpoint shows users only the message
+            self._finish(job, SyncJob.STATUS_FAILED, error=self._error_message(e))
+
+        job.refresh_from_db()
+        return job
+
+    def _run_athlete_sync(self, job: SyncJob):
+        params = job.params
+        sync_service = DataSyncService(job.athlete)
+        sources = params.get('sources') or sync_service.active_sources
+        if not sources:
+            return SyncJob.STATUS_FAILED, {'success': {}, 'errors': {}, 'message': 'No active sources found'}
+
+        start_date = date.fromisoformat(params['start_date']) if params.get('start_date') else None
+        end_date = date.fromisoformat(params['end_date']) if params.get('end_date') else None
+        force_refresh = params.get('force_refresh', False)
+
+        success = {}
+        for index, source in enumerate(sources):
+            self._set_progress(job, int(index * 100 / len(sources)), f"Syncing {source}")
+            success.update(sync_service.sync_specific_sources([source], start_date, end_date, force_refresh=force_refresh))
+
+        # Same fallback DataSyncService.sync_data applies when nothing came back
+        if not any(success.values()) and not force_refresh:
+            self._set_progress(job, 90, "No data synced, retrying with force refresh")
+            success = sync_service.sync_specific_sources(sources, start_date, end_date, force_refresh=True)
+
+        errors = {}
+        for source, result in success.items():
+            if not result:
+                if 'garmin' in source.lower() and hasattr(sync_service, 'last_garmin_error'):
+                    errors[source] = sync_service.last_garmin_error
+                elif 'whoop' in source.lower() and hasattr(sync_service, 'last_whoop_error'):
+                    errors[source] = sync_service.last_whoop_error
+
+        result = {'success': success, 'errors': errors}
+        return (SyncJob.STATUS_SUCCEEDED if any(success.values()) else SyncJob.STATUS_FAILED), result
+
+    def _run_team_sync(self, job: SyncJob):
+        params = job.params
+
+        def on_progress(completed: int, total: int):
+            self._set_progress(job, int(completed * 100 / total), f"Synced {completed} of {total} athletes")
+
+        result = CoachDataSyncService(team=job.team).sync_team_data(
+            days=params.get('days', 7),
+            force_refresh=params.get('force_refresh', False),
+            progress_callback=on_progress
+        )
+        if result.get('cancelled'):
+            return SyncJob.STATUS_CANCELLED, result
+        return (SyncJob.STATUS_SUCCEEDED if result.get('success') else SyncJob.STATUS_FAILED), result
+
+    def _run_whoop_event(self, job: SyncJob):
+        from .data_processors import WhoopProcessor
+
+        params = job.params
+        if not hasattr(job.athlete, 'whoop_credentials'):
+            return SyncJob.STATUS_FAILED, {'success': False, 'message': 'WHOOP is no longer connected'}
+        success = WhoopProcessor(job.athlete).ingest_record(params['record_type'], params['record_id'])
+        result = {'success': bool(success), 'record_type': params['record_type'], 'record_id': params['record_id']}
+        return (SyncJob.STATUS_SUCCEEDED if success else SyncJob.STATUS_FAILED), result
+
+    @staticmethod
+    def _error_message(error: Exception) -> str:
+        message = str(error).strip().splitlines()[0] if str(error).strip() else error.__class__.__name__
+        return message[:255]
+
+    def _set_progress(self, job: SyncJob, progress: int, message: str) -> None:
+        SyncJob.objects.filter(id=job.id).update(
+            progress=min(max(progress, 0), 100),
+            progress_message=message[:255],
+            updated_at=timezone.now()
+        )
+
+    def _finish(self, job: SyncJob, status: str, result: Optional[Dict[str, Any]] = None, error: str = '') -> None:
+        now = timezone.now()
+        SyncJob.objects.filter(id=job.id).update(
+            status=status,
+            result=result,
+            error=error,
+            progress=100,
+            progress_message=f"Sync {status}",
+            finished_at=now,
+            updated_at=now
+        )
+        duration = (now - job.started_at).total_seconds() if job.started_at else 0
+        logger.info(f"[SYNC_JOB] Job {job.id} {status} in {duration:.1f}s, lock contention: {lock_stats()}")
+
+    def cancel(self, job: SyncJob) -> bool:
+        """Cancel a queued job, or stop a running team sync from starting more athletes"""
+        now = timezone.now()
+        cancelled = SyncJob.objects.filter(id=job.id, status=SyncJob.STATUS_QUEUED).update(
+            status=SyncJob.STATUS_CANCELLED, finished_at=now, updated_at=now, progress_message="Sync cancelled"
+        )
+        if cancelled:
+            return True
+
+        job.refresh_from_db()
+        if job.status == SyncJob.STATUS_RUNNING and job.job_type == SyncJob.TYPE_TEAM:
+            # The job is marked cancelled when sync_team_data returns
+            return CoachDataSyncService(team=job.team).cancel_sync()
+        return False
+
+    def run_pending(self, limit: int = 10) -> int:
+        """Run queued jobs oldest first, for the database-polling worker. Returns how many ran."""
+        job_ids = list(
+            SyncJob.objects.filter(status=SyncJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        return sum(1 for job_id in job_ids if self.run(job_id) is not None)
+
+    def requeue_stale_jobs(self) -> int:
+        """
+        Put jobs back in the queue whose worker died mid-run, or fail them once
+        they have used up their attempts. Like _enqueue, a job only counts as
+        dead once it stops reporting progress, however long ago it started.
+        """
+        stale_before = SyncJob.stale_before()
+        max_attempts = getattr(settings, 'SYNC_JOB_MAX_ATTEMPTS', 3)
+        stale = SyncJob.objects.filter(status=SyncJob.STATUS_RUNNING, updated_at__lt=stale_before)
+
+        now = timezone.now()
+        failed = stale.filter(attempts__gte=max_attempts).update(
+            status=SyncJob.STATUS_FAILED, error="Worker stopped responding", finished_at=now, updated_at=now
+        )
+        requeued = stale.filter(attempts__lt=max_attempts).update(
+            status=SyncJob.STATUS_QUEUED, progress=0, progress_message="Requeued after worker stopped", updated_at=now
+        )
+        if failed or requeued:
+            logger.warning(f"[SYNC_JOB] Requeued {requeued} and failed {failed} stale sync jobs")
+        return requeued
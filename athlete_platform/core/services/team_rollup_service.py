@@ -0,0 +1,360 @@
+"""
+Daily team rollups.
+
+TeamDailyRollup keeps count, sum, sum of squares, min and max per team,
+position, day and metric. Ingest refreshes the days it touched by
+re-aggregating just those days from CoreBiometricData, which keeps min/max
+right when a day is overwritten. Summaries over any window then add up
+rollup rows instead of scanning raw athlete-days.
+
+Rollups group athletes by Athlete.team, while the raw coach queries use the
+team's athletes_array roster. The two only agree while the roster matches the
+team relation, so check() reports athletes that are in one but not the other.
+"""
+import logging
+import math
+import traceback
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from django.db import transaction
+from django.db.models import Q, Case, CharField, Count, FloatField, Max, Min, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Trim, Upper
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from ..models import Athlete, CoreBiometricData, Team, TeamDailyRollup, TeamSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Columns behind the coach metrics (see CoachDataSyncService._get_db_field_name)
+ROLLUP_COLUMNS = (
+    'resting_heart_rate',
+    'max_heart_rate',
+    'hrv_ms',
+    'recovery_score',
+    'total_sleep_seconds',
+    'total_steps',
+    'strain',
+)
+
+# Days re-aggregated per query when rebuilding
+REBUILD_CHUNK_DAYS = 31
+
+
+def position_key(position: Optional[str]) -> str:
+    """Normalized position used to group athletes, blank positions are UNKNOWN"""
+    return position.strip().upper() if position and position.strip() else "UNKNOWN"
+
+
+def position_key_expression(field: str = 'athlete__position'):
+    """SQL equivalent of position_key"""
+    position = Upper(Trim(Coalesce(field, Value(''))))
+    return Case(
+        When(Exact(position, ''), then=Value("UNKNOWN")),
+        default=position,
+        output_field=CharField()
+    )
+
+
+def mark_team_snapshots_stale(team_id) -> int:
+    """Flag a team's snapshots for regeneration on their next read"""
+    return TeamSnapshot.objects.filter(team_id=team_id, stale=False).update(stale=True, updated_at=timezone.now())
+
+
+class _PendingRefresh:
+    """Team days to refresh when the transaction commits, collected across every write in it"""
+
+    def __init__(self):
+        self.days: Dict[Any, Set[date]] = defaultdict(set)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        days, self.days = self.days, defaultdict(set)
+        service = TeamRollupService()
+        for team_id, dates in days.items():
+            service.refresh_days(team_id, dates)
+
+
+def refresh_days_on_commit(team_id, dates: Iterable[date]) -> None:
+    """
+    Refresh a team's days once the current transaction commits, once per day
+    however many rows of it are written. Outside a transaction they are
+    refreshed straight away.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_team_rollups', None)
+    # The callback is dropped when its transaction or savepoint rolls back, so look for it before reusing it
+    if pending is not None and not pending.done and any(entry[1] is pending for entry in connection.run_on_commit):
+        pending.days[team_id].update(dates)
+        return
+    pending = _PendingRefresh()
+    pending.days[team_id].update(dates)
+    connection.pending_team_rollups = pending
+    transaction.on_commit(pending)
+
+
+class TeamRollupService:
+    """Maintain, rebuild, check and read TeamDailyRollup rows"""
+
+    def refresh_athlete_days(self, athlete: Athlete, dates: Iterable[date]) -> bool:
+        """Refresh the rollups of the athlete's team for days the athlete's data changed on"""
+        if not athlete or not athlete.team_id:
+            return False
+        return self.refresh_days(athlete.team_id, dates)
+
+    def refresh_athlete(self, athlete: Athlete, team_ids: Iterable[Any]) -> bool:
+        """
+        Refresh every day the athlete has data on in the given teams, after the
+        athlete moved between them or changed position
+        """
+        dates = list(CoreBiometricData.objects.filter(athlete_id=athlete.id).values_list('date', flat=True).distinct())
+        refreshed = True
+        for team_id in {team_id for team_id in team_ids if team_id}:
+            refreshed = self.refresh_days(team_id, dates) and refreshed
+        return refreshed
+
+    def refresh_days(self, team_id, dates: Iterable[date]) -> bool:
+        """
+        Re-aggregate the given days of a team from CoreBiometricData and replace
+        their rollup rows. Errors are logged and never reach the caller's transaction.
+        """
+        dates = sorted(set(dates))
+        if not dates:
+            return True
+        try:
+            # A savepoint, so a failure here cannot abort an ingest transaction
+            with transaction.atomic():
+                raw = CoreBiometricData.objects.filter(athlete__team_id=team_id, date__in=dates)
+                rollups = self._build_rollups(team_id, raw)
+                TeamDailyRollup.objects.filter(team_id=team_id, date__in=dates).delete()
+                self._save(rollups)
+                mark_team_snapshots_stale(team_id)
+            return True
+        except Exception as e:
+            logger.error(f"[ROLLUP] Error refreshing rollups for team {team_id}: {e}")
+            logger.debug(traceback.format_exc())
+            return False
+
+    def rebuild(self, team: Optional[Team] = None, start_date: Optional[date] = None,
+                end_date: Optional[date] = None) -> Dict[str, int]:
+        """
+        Rebuild rollups from scratch for one team or every team, over the given
+        range or all the team's data. Returns the number of rollup rows per team.
+        """
+        teams = [team] if team else Team.objects.all()
+        written = {}
+        for current in teams:
+            first, last = self._date_bounds(current.id, start_date, end_date)
+            rows = 0
+            with transaction.atomic():
+                stale = TeamDailyRollup.objects.filter(team=current)
+                if start_date:
+                    stale = stale.filter(date__gte=start_date)
+                if end_date:
+                    stale = stale.filter(date__lte=end_date)
+                stale.delete()
+
+                for chunk_start, chunk_end in self._chunks(first, last):
+                    raw = CoreBiometricData.objects.filter(
+                        athlete__team_id=current.id, date__range=[chunk_start, chunk_end]
+                    )
+                    rollups = self._build_rollups(current.id, raw)
+                    self._save(rollups)
+                    rows += len(rollups)
+                mark_team_snapshots_stale(current.id)
+            written[str(current.id)] = rows
+            logger.info(f"[ROLLUP] Rebuilt {rows} rollup rows for team {current.name}")
+        return written
+
+    def check(self, team: Team, start_date: Optional[date] = None, end_date: Optional[date] = None,
+              tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+        """
+        Compare stored rollups with a fresh aggregation of CoreBiometricData.
+        Returns one entry per mismatched, missing or unexpected rollup row, and
+        one per athlete the team's athletes_array roster disagrees on.
+        """
+        first, last = self._date_bounds(team.id, start_date, end_date)
+        stored_rows = TeamDailyRollup.objects.filter(team=team)
+        if first and last:
+            stored_rows = stored_rows.filter(date__range=[first, last])
+        stored = {(row.position, row.date, row.metric): row for row in stored_rows}
+
+        expected = {}
+        for chunk_start, chunk_end in self._chunks(first, last):
+            raw = CoreBiometricData.objects.filter(athlete__team_id=team.id, date__range=[chunk_start, chunk_end])
+            for row in self._build_rollups(team.id, raw):
+                expected[(row.position, row.date, row.metric)] = row
+
+        problems = self._check_roster(team)
+        for key in sorted(set(stored) | set(expected), key=lambda k: (k[1], k[0], k[2])):
+            position, day, metric = key
+            entry = {'position': position, 'date': day.isoformat(), 'metric': metric}
+            if key not in stored:
+                problems.append({**entry, 'problem': 'missing'})
+            elif key not in expected:
+                problems.append({**entry, 'problem': 'unexpected'})
+            else:
+                fields = self._diff(stored[key], expected[key], tolerance)
+                if fields:
+                    problems.append({**entry, 'problem': 'mismatch', 'fields': fields})
+        return problems
+
+    def summarize(self, team_id, start_date: date, end_date: date, by_position: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Add up a window of rollups. Returns aggregate rows keyed by position (or
+        a single 'ALL' key) in the shape of the coach SQL aggregates: row_count,
+        athletes_with_data and {column}__avg/max/min/count/std.
+        """
+        rows = TeamDailyRollup.objects.filter(
+            team_id=team_id, date__range=[start_date, end_date]
+        ).values_list('position', 'metric', 'value_count', 'value_sum', 'value_sumsq', 'value_min', 'value_max', 'athlete_ids')
+
+        totals = defaultdict(lambda: {'rows': 0, 'athletes': set(), 'columns': {}})
+        for position, metric, count, total, sumsq, low, high, athlete_ids in rows:
+            group = totals[position if by_position else 'ALL']
+            if metric == TeamDailyRollup.ROWS_METRIC:
+                group['rows'] += count
+                group['athletes'].update(athlete_ids or [])
+                continue
+            column = group['columns'].setdefault(metric, {'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': None, 'max': None})
+            column['count'] += count
+            column['sum'] += total
+            column['sumsq'] += sumsq
+            if low is not None:
+                column['min'] = low if column['min'] is None else min(column['min'], low)
+            if high is not None:
+                column['max'] = high if column['max'] is None else max(column['max'], high)
+
+        return {position: self._aggregate_row(group) for position, group in totals.items()}
+
+    @staticmethod
+    def _check_roster(team: Team) -> List[Dict[str, Any]]:
+        """Athletes the raw coach queries (athletes_array) and the rollups (Athlete.team) disagree on"""
+        # Athlete.save edits the roster on its own Team instance, so read the stored one
+        member_ids = Team.objects.filter(id=team.id).values_list('athletes_array', flat=True).first()
+        if not member_ids:
+            return []
+        roster = set(Athlete.objects.filter(Q(user_id__in=member_ids) | Q(id__in=member_ids)).values_list('id', flat=True))
+        related = set(Athlete.objects.filter(team=team).values_list('id', flat=True))
+        problems = []
+        for athlete_id in sorted(roster - related, key=str):
+            problems.append({'athlete_id': str(athlete_id), 'problem': 'roster', 'detail': 'in athletes_array only'})
+        for athlete_id in sorted(related - roster, key=str):
+            problems.append({'athlete_id': str(athlete_id), 'problem': 'roster', 'detail': 'on the team only'})
+        return problems
+
+    @staticmethod
+    def _aggregate_row(group: Dict[str, Any]) -> Dict[str, Any]:
+        result = {'row_count': group['rows'], 'athletes_with_data': len(group['athletes'])}
+        for column in ROLLUP_COLUMNS:
+            totals = group['columns'].get(column)
+            count = totals['count'] if totals else 0
+            result[f"{column}__count"] = count
+            result[f"{column}__avg"] = totals['sum'] / count if count else None
+            result[f"{column}__min"] = totals['min'] if count else None
+            result[f"{column}__max"] = totals['max'] if count else None
+            if count:
+                variance = max(totals['sumsq'] / count - (totals['sum'] / count) ** 2, 0.0)
+                result[f"{column}__std"] = math.sqrt(variance)
+            else:
+                result[f"{column}__std"] = None
+        return result
+
+    def _build_rollups(self, team_id, raw) -> List[TeamDailyRollup]:
+        """Aggregate raw rows per position and day into unsaved rollup rows"""
+        raw = raw.annotate(position_key=position_key_expression())
+
+        aggregates = {'rows': Count('id')}
+        for column in ROLLUP_COLUMNS:
+            value = Cast(column, FloatField())
+            aggregates[f"{column}__count"] = Count(column)
+            aggregates[f"{column}__sum"] = Sum(value)
+            # Squares in floating point so large integer columns cannot overflow
+            aggregates[f"{column}__sumsq"] = Sum(value * value)
+            aggregates[f"{column}__min"] = Min(column)
+            aggregates[f"{column}__max"] = Max(column)
+
+        athletes: Dict[tuple, Set[str]] = defaultdict(set)
+        for position, day, athlete_id in raw.values_list('position_key', 'date', 'athlete_id').distinct():
+            athletes[(position, day)].add(str(athlete_id))
+
+        rollups = []
+        for row in raw.values('position_key', 'date').annotate(**aggregates).order_by():
+            position, day = row['position_key'], row['date']
+            rollups.append(TeamDailyRollup(
+                team_id=team_id,
+                position=position,
+                date=day,
+                metric=TeamDailyRollup.ROWS_METRIC,
+                value_count=row['rows'],
+                athlete_ids=sorted(athletes[(position, day)]),
+            ))
+            for column in ROLLUP_COLUMNS:
+                count = row[f"{column}__count"]
+                if not count:
+                    continue
+                rollups.append(TeamDailyRollup(
+                    team_id=team_id,
+                    position=position,
+                    date=day,
+                    metric=column,
+                    value_count=count,
+                    value_sum=float(row[f"{column}__sum"] or 0),
+                    value_sumsq=float(row[f"{column}__sumsq"] or 0),
+                    value_min=float(row[f"{column}__min"]),
+                    value_max=float(row[f"{column}__max"]),
+                ))
+        return rollups
+
+    @staticmethod
+    def _save(rollups: List[TeamDailyRollup]) -> None:
+        if not rollups:
+            return
+        # An upsert, so two ingests refreshing the same day cannot collide
+        TeamDailyRollup.objects.bulk_create(
+            rollups,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['team', 'position', 'date', 'metric'],
+            update_fields=['value_count', 'value_sum', 'value_sumsq', 'value_min', 'value_max', 'athlete_ids', 'updated_at'],
+        )
+
+    @staticmethod
+    def _diff(stored: TeamDailyRollup, expected: TeamDailyRollup, tolerance: float) -> Dict[str, Any]:
+        fields = {}
+        if stored.value_count != expected.value_count:
+            fields['value_count'] = {'stored': stored.value_count, 'expected': expected.value_count}
+        for name in ('value_sum', 'value_sumsq', 'value_min', 'value_max'):
+            stored_value, expected_value = getattr(stored, name), getattr(expected, name)
+            if stored_value is None or expected_value is None:
+                if stored_value != expected_value:
+                    fields[name] = {'stored': stored_value, 'expected': expected_value}
+            elif not math.isclose(stored_value, expected_value, rel_tol=tolerance, abs_tol=tolerance):
+                fields[name] = {'stored': stored_value, 'expected': expected_value}
+        if sorted(stored.athlete_ids or []) != sorted(expected.athlete_ids or []):
+            fields['athlete_ids'] = {'stored': stored.athlete_ids, 'expected': expected.athlete_ids}
+        return fields
+
+    @staticmethod
+    def _date_bounds(team_id, start_date: Optional[date], end_date: Optional[date]):
+        """The requested range, with open ends filled from the team's raw and rollup data"""
+        if start_date and end_date:
+            return start_date, end_date
+        raw = CoreBiometricData.objects.filter(athlete__team_id=team_id).aggregate(first=Min('date'), last=Max('date'))
+        stored = TeamDailyRollup.objects.filter(team_id=team_id).aggregate(first=Min('date'), last=Max('date'))
+        firsts = [d for d in (raw['first'], stored['first']) if d]
+        lasts = [d for d in (raw['last'], stored['last']) if d]
+        return (start_date or (min(firsts) if firsts else None)), (end_date or (max(lasts) if lasts else None))
+
+    @staticmethod
+    def _chunks(first: Optional[date], last: Optional[date]):
+        if not first or not last:
+            return
+        current = first
+        while current <= last:
+            chunk_end = min(current + timedelta(days=REBUILD_CHUNK_DAYS - 1), last)
+            yield current, chunk_end
+            current = chunk_end + timedelta(days=1)
@@ -0,0 +1,82 @@
+"""
+Versioned team snapshots.
+
+A TeamSnapshot holds the coach analytics for a team (team summary, position
+summaries, comparison and optimization) so dashboards load them with one
+indexed read. Snapshots are regenerated at the end of a team sync, and on
+the next read after a rollup refresh marks them stale. The ETag is a hash
+of the content, so a regeneration that changes nothing keeps the ETag and
+the version.
+"""
+import hashlib
+import json
+import logging
+import traceback
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Team, TeamSnapshot
+from .coach_data_sync_service import CoachDataSyncService
+
+logger = logging.getLogger(__name__)
+
+
+class TeamSnapshotService:
+    """Build, store and serve a team's snapshot for one day window"""
+
+    def __init__(self, team: Team, days: Optional[int] = None):
+        self.team = team
+        self.days = days or getattr(settings, 'TEAM_SNAPSHOT_DAYS', 7)
+        # Set by get() when the team had no snapshot yet
+        self.created = False
+
+    def get(self) -> Optional[TeamSnapshot]:
+        """The current snapshot, regenerated first if it is missing or stale"""
+        snapshot = TeamSnapshot.objects.filter(team=self.team, days=self.days).first()
+        self.created = snapshot is None
+        if snapshot and not snapshot.stale:
+            return snapshot
+        return self.refresh() or snapshot
+
+    def refresh(self) -> Optional[TeamSnapshot]:
+        """Recompute the snapshot. The version only moves when the content changes."""
+        started = timezone.now()
+        try:
+            content = self._build_content()
+            etag = self._etag(content)
+
+            with transaction.atomic():
+                snapshot, _ = TeamSnapshot.objects.select_for_update().get_or_create(team=self.team, days=self.days)
+                # Ingest that landed while we were computing needs another pass
+                marked_while_building = snapshot.stale and snapshot.version and snapshot.updated_at > started
+
+                if snapshot.etag != etag:
+                    now = timezone.now()
+                    content['team_summary']['timestamp'] = now.isoformat()
+                    snapshot.data = content
+                    snapshot.etag = etag
+                    snapshot.version += 1
+                    snapshot.generated_at = now
+                snapshot.stale = bool(marked_while_building)
+                snapshot.save()
+
+            logger.info(f"[SNAPSHOT] Team {self.team.name} snapshot at version {snapshot.version}")
+            return snapshot
+        except Exception as e:
+            logger.error(f"[SNAPSHOT] Error refreshing snapshot for team {self.team.id}: {e}")
+            logger.debug(traceback.format_exc())
+            return None
+
+    def _build_content(self) -> Dict[str, Any]:
+        content = CoachDataSyncService(team=self.team).get_dashboard_data(days=self.days)
+        # Generation time is kept on the snapshot, not in the hashed content
+        content['team_summary'].pop('timestamp', None)
+        return {'days': self.days, **content}
+
+    @staticmethod
+    def _etag(content: Dict[str, Any]) -> str:
+        body = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
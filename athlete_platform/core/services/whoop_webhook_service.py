@@ -0,0 +1,98 @@
+"""
+WHOOP webhooks.
+
+WHOOP posts an event whenever a sleep, recovery, workout or cycle is
+updated or deleted. The webhook view verifies the signature and hands the
+event to WhoopWebhookService, which maps the WHOOP user to an athlete and
+queues a SyncJob that fetches only the changed record
+(WhoopProcessor.ingest_record). A deleted record can no longer be fetched
+to find its day, so deletions resync the athlete's recent WHOOP days.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import SyncJob, WhoopCredentials
+
+logger = logging.getLogger(__name__)
+
+RECORD_TYPES = ('sleep', 'recovery', 'workout', 'cycle')
+ACTION_DELETED = 'deleted'
+
+
+def verify_signature(body: bytes, timestamp: Optional[str], signature: Optional[str],
+                     secret: Optional[str] = None, max_age: Optional[int] = None,
+                     now: Optional[float] = None) -> bool:
+    """
+    Check X-WHOOP-Signature: the base64 HMAC-SHA256 of the
+    X-WHOOP-Signature-Timestamp header followed by the raw body, keyed with
+    the app's client secret. Requests older than WHOOP_WEBHOOK_MAX_AGE
+    seconds are refused, so a captured request can't be replayed.
+    """
+    secret = secret if secret is not None else getattr(settings, 'WHOOP_CLIENT_SECRET', None)
+    if not (secret and timestamp and signature):
+        return False
+    try:
+        sent_at = int(timestamp) / 1000
+    except ValueError:
+        return False
+
+    max_age = max_age if max_age is not None else getattr(settings, 'WHOOP_WEBHOOK_MAX_AGE', 300)
+    if max_age and abs((now if now is not None else time.time()) - sent_at) > max_age:
+        return False
+
+    digest = hmac.new(secret.encode('utf-8'), timestamp.encode('utf-8') + body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode('ascii'), signature)
+
+
+def parse_event_type(event_type: Any) -> Tuple[str, str]:
+    """'recovery.updated' -> ('recovery', 'updated')"""
+    if not isinstance(event_type, str) or '.' not in event_type:
+        raise ValueError(f"Invalid WHOOP event type: {event_type!r}")
+    record_type, action = event_type.split('.', 1)
+    return record_type, action
+
+
+class WhoopWebhookService:
+    """Turn verified WHOOP webhook events into targeted sync jobs"""
+
+    def handle(self, event: Dict[str, Any]) -> Optional[SyncJob]:
+        """Queue the work for an event. Returns None for events that need none."""
+        if not isinstance(event, dict):
+            raise ValueError("WHOOP event must be a JSON object")
+        record_type, action = parse_event_type(event.get('type'))
+        if event.get('user_id') is None or event.get('id') is None:
+            raise ValueError("WHOOP event is missing user_id or id")
+
+        if record_type not in RECORD_TYPES:
+            logger.info(f"[WHOOP_WEBHOOK] Ignoring {event['type']} event")
+            return None
+
+        credentials = WhoopCredentials.objects.select_related('athlete').filter(
+            whoop_user_id=str(event['user_id'])
+        ).first()
+        if not credentials:
+            logger.warning(f"[WHOOP_WEBHOOK] No athlete for WHOOP user {event['user_id']}, ignoring {event['type']}")
+            return None
+
+        WhoopCredentials.objects.filter(pk=credentials.pk).update(last_webhook_at=timezone.now())
+
+        from .sync_job_service import SyncJobService
+        if action == ACTION_DELETED:
+            today = timezone.now().date()
+            return SyncJobService().enqueue_athlete_sync(
+                credentials.athlete,
+                sources=['whoop'],
+                force_refresh=True,
+                start_date=today - timedelta(days=getattr(settings, 'SYNC_SETTLING_DAYS', 3)),
+                end_date=today,
+                reason='whoop_webhook'
+            )
+        return SyncJobService().enqueue_whoop_event(credentials.athlete, record_type, event['id'])
@@ -5,11 +5,13 @@ Last Edit: January 26th, 2025
 Signal handlers for lifecycle events in the athlete platform, managing user
 creation, data synchronization triggers, and model operations.
 """
-from django.db.models.signals import post_save
+from datetime import date
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from .models import User, Athlete
+from .models import User, Athlete, CoreBiometricData
 from .services.storage_service import UserStorageService
+from .services.team_rollup_service import TeamRollupService, position_key, refresh_days_on_commit
 
 
 @receiver(post_save, sender=User)
@@ -28,4 +30,35 @@ def create_user_storage(sender, instance, created, **kwargs):
     """
     if created:
         storage_service = UserStorageService()
-        storage_service.create_user_directory_structure(instance)
\ No newline at end of file
+        storage_service.create_user_directory_structure(instance)
+
+
+@receiver(post_save, sender=CoreBiometricData)
+@receiver(post_delete, sender=CoreBiometricData)
+def refresh_team_rollup(sender, instance, **kwargs):
+    """
+    Keep the team's daily rollup in step with per-day writes (update_or_create).
+    BiometricBulkWriter refreshes its own days since bulk_create sends no signals.
+    The refresh waits for the commit, so a transaction writing many rows
+    re-aggregates each day once.
+    """
+    current_date = instance.date
+    if isinstance(current_date, str):
+        current_date = date.fromisoformat(current_date[:10])
+    team_id = Athlete.objects.filter(id=instance.athlete_id).values_list('team_id', flat=True).first()
+    if team_id:
+        refresh_days_on_commit(team_id, [current_date])
+
+
+@receiver(post_save, sender=Athlete)
+def refresh_moved_athlete_rollups(sender, instance, created, **kwargs):
+    """
+    Rollups group an athlete's days under their team and position at the
+    time, so moving them regroups every day they have data on
+    """
+    if created:
+        return
+    team_changed = instance.team_id != instance._original_team_id
+    position_changed = position_key(instance.position) != position_key(instance._original_position)
+    if team_changed or position_changed:
+        TeamRollupService().refresh_athlete(instance, [instance._original_team_id, instance.team_id])
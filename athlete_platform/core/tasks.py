@@ -5,11 +5,25 @@ Last Edit: February 19th, 2025
 Background task definitions for asynchronous processing of data collection,
 analysis, and notifications in the athlete platform.
 """
-# from celery import shared_task
+try:
+    from celery import shared_task
+except ImportError:  # Celery is optional, SyncJobService runs jobs locally without it
+    def shared_task(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 from .utils.whoop_utils import WhoopClient
 
 # @shared_task
 def collect_whoop_data(athlete_id):
     """Collect WHOOP data for an athlete"""
     collector = WhoopClient(athlete_id)
-    return collector.collect_and_store_data() 
\ No newline at end of file
+    return collector.collect_and_store_data()
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def run_sync_job(job_id):
+    """Run a queued SyncJob on a Celery worker"""
+    from .services.sync_job_service import SyncJobService
+    SyncJobService().run(job_id)
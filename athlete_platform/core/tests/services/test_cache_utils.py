@@ -0,0 +1,300 @@
+import asyncio
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from core.utils.cache_utils import CacheLock, EmptyDayCache, LockNotAcquired, lock_stats, resource_lock, single_flight
+
+
+class FakeCache:
+    """The subset of the Django cache API the lock uses, with atomic add and expiring keys"""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._live(key)
+        return default if value is None else value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self.data[key] = (value, None if timeout is None else time.monotonic() + timeout)
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self.data[key] = (value, None if timeout is None else time.monotonic() + timeout)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self.data.pop(key, None)
+
+    def get_many(self, keys):
+        return {key: value for key, value in ((key, self.get(key)) for key in keys) if value is not None}
+
+    def set_many(self, data, timeout=None):
+        for key, value in data.items():
+            self.set(key, value, timeout)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+
+class BrokenCache(FakeCache):
+    def add(self, key, value, timeout=None):
+        raise ConnectionError("cache is down")
+
+    def get_many(self, keys):
+        raise ConnectionError("cache is down")
+
+
+class TestCacheLock(unittest.TestCase):
+    def test_only_one_concurrent_caller_acquires(self):
+        cache = FakeCache()
+        barrier = threading.Barrier(8)
+        results = []
+
+        def contend():
+            barrier.wait()
+            results.append(CacheLock('sync:athlete-1', cache=cache).acquire())
+
+        threads = [threading.Thread(target=contend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == [False] * 7 + [True]
+
+    def test_only_the_owner_releases(self):
+        cache = FakeCache()
+        first = CacheLock('sync:athlete-2', ttl=1, cache=cache)
+        second = CacheLock('sync:athlete-2', ttl=1, cache=cache)
+        assert first.acquire()
+
+        # The first lease expires and another worker takes the lock over
+        cache.delete(first.key)
+        assert second.acquire()
+
+        assert not first.release()
+        assert second.locked
+        assert second.release()
+        assert not second.locked
+
+    def test_waits_for_the_holder_until_the_timeout(self):
+        cache = FakeCache()
+        holder = CacheLock('processing:athlete-3', cache=cache)
+        assert holder.acquire()
+
+        started = time.monotonic()
+        assert not CacheLock('processing:athlete-3', cache=cache).acquire(wait=0.2)
+        assert time.monotonic() - started >= 0.2
+
+        threading.Timer(0.1, holder.release).start()
+        assert CacheLock('processing:athlete-3', cache=cache).acquire(wait=2)
+        assert lock_stats()['processing']['timed_out'] >= 1
+        assert lock_stats()['processing']['contended'] >= 2
+
+    def test_auto_renew_keeps_the_lease_while_held(self):
+        cache = FakeCache()
+        renewed = CacheLock('sync:athlete-4', ttl=0.3, cache=cache, auto_renew=True)
+        expiring = CacheLock('sync:athlete-5', ttl=0.3, cache=cache)
+        assert renewed.acquire() and expiring.acquire()
+
+        time.sleep(1.2)
+
+        assert renewed.locked and not renewed.lost
+        assert not expiring.locked
+        assert renewed.release()
+
+    def test_falls_back_to_a_local_lock_when_the_cache_fails(self):
+        cache = BrokenCache()
+
+        with CacheLock('sync:athlete-6', cache=cache):
+            with self.assertRaises(LockNotAcquired):
+                with CacheLock('sync:athlete-6', cache=cache):
+                    pass
+
+        assert lock_stats()['sync']['fallbacks'] >= 2
+
+
+class TestResourceLock(unittest.TestCase):
+    def setUp(self):
+        cache = FakeCache()
+        patcher = mock.patch.object(CacheLock, '_get_cache', lambda lock: cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_overlapping_sync_calls_return_false(self):
+        service = SimpleNamespace(athlete=SimpleNamespace(id='athlete-7'))
+
+        @resource_lock('sync')
+        def sync(service):
+            return 'synced'
+
+        with CacheLock('sync:athlete-7'):
+            assert sync(service) is False
+        assert sync(service) == 'synced'
+
+    def test_async_calls_are_locked(self):
+        calls = []
+
+        @resource_lock('processing', key=lambda processor: processor)
+        async def process(processor):
+            calls.append(processor)
+            await asyncio.sleep(0.1)
+            return True
+
+        async def overlap():
+            return await asyncio.gather(process('athlete-8:whoop'), process('athlete-8:whoop'), process('athlete-8:garmin'))
+
+        assert sorted(asyncio.run(overlap())) == [False, True, True]
+        assert sorted(calls) == ['athlete-8:garmin', 'athlete-8:whoop']
+
+
+def _covers(running, request):
+    return running[0] <= request[0] and running[1] >= request[1]
+
+
+class TestSingleFlight(unittest.TestCase):
+    def _run_together(self, callers):
+        results = [None] * len(callers)
+
+        def call(index, caller):
+            results[index] = caller()
+
+        threads = []
+        for index, caller in enumerate(callers):
+            threads.append(threading.Thread(target=call, args=(index, caller)))
+            threads[-1].start()
+            # The first caller leads
+            if index == 0:
+                time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_covered_callers_share_the_running_result(self):
+        cache = FakeCache()
+        runs = []
+
+        def work(request):
+            runs.append(request)
+            time.sleep(0.2)
+            return {'synced': request}
+
+        results = self._run_together([
+            lambda request=request: single_flight('sync:athlete-9:whoop', lambda: work(request), request=request,
+                                                  covers=_covers, cache=cache)
+            for request in [(0, 7), (0, 7), (2, 5), (7, 7)]
+        ])
+
+        assert runs == [(0, 7)]
+        assert results == [{'synced': (0, 7)}] * 4
+        assert lock_stats()['flight']['shared'] >= 3
+
+    def test_callers_after_the_flight_run_again(self):
+        cache = FakeCache()
+        runs = []
+
+        def work():
+            runs.append(len(runs))
+            return len(runs)
+
+        first = single_flight('sync:athlete-13:whoop', work, request=(0, 7), covers=_covers, cache=cache)
+        second = single_flight('sync:athlete-13:whoop', work, request=(2, 5), covers=_covers, cache=cache)
+
+        # Data may have landed since the first flight, so its result is not reused
+        assert (first, second) == (1, 2)
+        assert cache.get('flight:sync:athlete-13:whoop:request') is None
+
+    def test_uncovered_callers_run_after_the_flight(self):
+        cache = FakeCache()
+        running = []
+        runs = []
+
+        def work(request):
+            running.append(request)
+            assert len(running) == 1, "flights overlapped"
+            runs.append(request)
+            time.sleep(0.1)
+            running.remove(request)
+            return request
+
+        results = self._run_together([
+            lambda request=request: single_flight('sync:athlete-10:whoop', lambda: work(request), request=request,
+                                                  covers=_covers, cache=cache)
+            for request in [(3, 7), (0, 7)]
+        ])
+
+        assert runs == [(3, 7), (0, 7)]
+        assert results == [(3, 7), (0, 7)]
+
+    def test_a_waiting_caller_takes_over_when_the_leader_fails(self):
+        cache = FakeCache()
+
+        def failing():
+            time.sleep(0.1)
+            raise ConnectionError("upstream is down")
+
+        def leader():
+            with self.assertRaises(ConnectionError):
+                single_flight('sync:athlete-11:garmin', failing, request=(0, 7), covers=_covers, cache=cache)
+            return 'failed'
+
+        results = self._run_together([
+            leader,
+            lambda: single_flight('sync:athlete-11:garmin', lambda: 'synced', request=(0, 7), covers=_covers, cache=cache),
+        ])
+
+        assert results == ['failed', 'synced']
+
+
+class TestEmptyDayCache(unittest.TestCase):
+    def test_marked_days_read_back_until_cleared(self):
+        cache = FakeCache()
+        days = [date.today() - timedelta(days=offset) for offset in range(1, 4)]
+        empty_days = EmptyDayCache('athlete-12', 'whoop', ttl=60, cache=cache)
+
+        empty_days.mark(days[:2])
+        assert empty_days.known_empty(days) == set(days[:2])
+        assert EmptyDayCache('athlete-12', 'garmin', ttl=60, cache=cache).known_empty(days) == set()
+
+        empty_days.clear(days[:1])
+        assert empty_days.known_empty(days) == {days[1]}
+
+    def test_today_is_never_cached(self):
+        empty_days = EmptyDayCache('athlete-13', 'whoop', ttl=60, cache=FakeCache())
+
+        empty_days.mark([date.today()])
+
+        assert empty_days.known_empty([date.today()]) == set()
+
+    def test_entries_expire(self):
+        yesterday = date.today() - timedelta(days=1)
+        empty_days = EmptyDayCache('athlete-14', 'whoop', ttl=0.1, cache=FakeCache())
+
+        empty_days.mark([yesterday])
+        time.sleep(1.1)
+
+        assert empty_days.known_empty([yesterday]) == set()
+
+    def test_cache_errors_read_as_nothing_cached(self):
+        empty_days = EmptyDayCache('athlete-15', 'whoop', ttl=60, cache=BrokenCache())
+
+        assert empty_days.known_empty([date.today() - timedelta(days=1)]) == set()
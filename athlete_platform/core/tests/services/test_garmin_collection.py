@@ -0,0 +1,83 @@
+import threading
+import time
+import unittest
+from datetime import date
+import garminconnect
+from core.utils.garmin_utils import GarminDataCollector, RequestBudget, DAILY_ENDPOINTS
+
+
+class FakeGarminClient:
+    """Answers every daily endpoint, optionally rate limiting the first few calls"""
+
+    def __init__(self, rate_limited_calls=0, delay=0.0):
+        self.rate_limited_calls = rate_limited_calls
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, method_name):
+        def endpoint(date_str):
+            with self._lock:
+                self.calls += 1
+                call_number = self.calls
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                time.sleep(self.delay)
+                if call_number <= self.rate_limited_calls:
+                    raise garminconnect.GarminConnectTooManyRequestsError("429 Too Many Requests")
+                return {'method': method_name, 'date': date_str}
+            finally:
+                with self._lock:
+                    self.active -= 1
+        return endpoint
+
+
+def make_collector(client, **kwargs):
+    collector = GarminDataCollector({}, **kwargs)
+    collector.garmin_client = client
+    collector.authenticate = lambda: True
+    collector.backoff_seconds = 0.01
+    return collector
+
+
+class TestGarminCollection(unittest.TestCase):
+    def test_days_are_returned_in_order_with_all_endpoints(self):
+        client = FakeGarminClient(delay=0.005)
+        collector = make_collector(client, max_workers=6, requests_per_second=1000, max_retries=0)
+
+        data = collector.collect_data(date(2025, 1, 1), date(2025, 1, 10))
+
+        assert [day['date'] for day in data] == [f'2025-01-{d:02d}' for d in range(1, 11)]
+        for field, method_name in DAILY_ENDPOINTS:
+            assert data[3][field] == {'method': method_name, 'date': '2025-01-04'}
+        assert client.calls == 10 * len(DAILY_ENDPOINTS)
+        assert client.max_active > 1
+
+    def test_rate_limited_calls_are_retried(self):
+        client = FakeGarminClient(rate_limited_calls=3)
+        collector = make_collector(client, max_workers=2, requests_per_second=1000, max_retries=3)
+
+        data = collector.collect_data(date(2025, 1, 1), date(2025, 1, 2))
+
+        assert len(data) == 2
+        assert client.calls == 2 * len(DAILY_ENDPOINTS) + 3
+
+    def test_exhausted_retries_drop_only_that_day(self):
+        client = FakeGarminClient(rate_limited_calls=1)
+        collector = make_collector(client, max_workers=1, requests_per_second=1000, max_retries=0)
+
+        data = collector.collect_data(date(2025, 1, 1), date(2025, 1, 3))
+
+        assert [day['date'] for day in data] == ['2025-01-02', '2025-01-03']
+
+
+class TestRequestBudget(unittest.TestCase):
+    def test_request_budget_paces_calls(self):
+        budget = RequestBudget(requests_per_second=50)
+        started = time.monotonic()
+        for _ in range(6):
+            budget.acquire()
+        assert time.monotonic() - started >= 5 / 50 * 0.9
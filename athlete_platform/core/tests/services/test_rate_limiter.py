@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+import unittest
+from core.utils.rate_limiter import TokenBucketLimiter, retry_after_seconds
+
+
+class FakeCache:
+    """The subset of the Django cache API the limiter uses, with atomic add/incr"""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if key in self.data:
+                return False
+            self.data[key] = value
+            return True
+
+    def incr(self, key, delta=1):
+        with self._lock:
+            self.data[key] += delta
+            return self.data[key]
+
+
+class BrokenCache(FakeCache):
+    def add(self, key, value, timeout=None):
+        raise ConnectionError("cache is down")
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_burst_is_limited_to_capacity(self):
+        limiter = TokenBucketLimiter('test', rate=1, capacity=5, shared=False)
+
+        assert [limiter.try_acquire() for _ in range(6)] == [True] * 5 + [False]
+        self.assertAlmostEqual(limiter.utilization()['utilization'], 1.0, delta=0.01)
+
+    def test_tokens_refill_at_rate(self):
+        limiter = TokenBucketLimiter('test', rate=200, capacity=2, shared=False)
+        for _ in range(2):
+            assert limiter.try_acquire()
+
+        started = time.monotonic()
+        assert limiter.acquire(timeout=1)
+        assert time.monotonic() - started < 0.5
+
+    def test_limiters_sharing_a_cache_share_the_budget(self):
+        cache = FakeCache()
+        first = TokenBucketLimiter('whoop:app', rate=1, capacity=4, cache=cache)
+        second = TokenBucketLimiter('whoop:app', rate=1, capacity=4, cache=cache)
+
+        granted = [first.try_acquire(), second.try_acquire(), first.try_acquire(), second.try_acquire()]
+
+        assert granted == [True] * 4
+        assert not first.try_acquire()
+        assert not second.try_acquire()
+
+    def test_falls_back_to_local_bucket_when_cache_fails(self):
+        limiter = TokenBucketLimiter('test', rate=1, capacity=2, cache=BrokenCache())
+
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        assert limiter.stats['fallbacks'] == 3
+
+    def test_penalty_is_seen_by_other_limiters_on_the_same_cache(self):
+        cache = FakeCache()
+        first = TokenBucketLimiter('whoop:app', rate=100, capacity=10, cache=cache)
+        second = TokenBucketLimiter('whoop:app', rate=100, capacity=10, cache=cache)
+
+        first.update_from_headers({'Retry-After': '30'})
+
+        assert second.blocked_for() > 25
+        assert not second.try_acquire()
+        assert not second.acquire(timeout=0.05)
+
+    def test_async_waiters_are_served_in_arrival_order(self):
+        limiter = TokenBucketLimiter('test', rate=100, capacity=1, shared=False)
+        order = []
+
+        async def request(number):
+            await limiter.acquire_async()
+            order.append(number)
+
+        async def main():
+            await asyncio.gather(*[request(number) for number in range(6)])
+
+        asyncio.run(main())
+
+        assert order == list(range(6))
+        assert limiter.stats['acquired'] == 6
+
+    def test_async_waiters_reach_the_shared_cache_off_the_event_loop(self):
+        cache = FakeCache()
+        cache_threads = set()
+        incr = cache.incr
+
+        def recording_incr(key, delta=1):
+            cache_threads.add(threading.get_ident())
+            return incr(key, delta)
+        cache.incr = recording_incr
+        limiter = TokenBucketLimiter('test', rate=100, capacity=2, cache=cache)
+
+        async def main():
+            await asyncio.gather(*[limiter.acquire_async() for _ in range(3)])
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(main())
+
+        assert cache_threads and loop_thread not in cache_threads
+        assert limiter.stats['acquired'] == 3
+
+
+class TestRetryAfterSeconds(unittest.TestCase):
+    def test_retry_after_seconds(self):
+        assert retry_after_seconds({'retry-after': '12'}) == 12
+
+    def test_retry_after_http_date(self):
+        self.assertAlmostEqual(retry_after_seconds({'Retry-After': 'Wed, 21 Oct 2015 07:28:10 GMT'}, now=1445412480), 10)
+
+    def test_rate_limit_reset_delay_and_epoch(self):
+        assert retry_after_seconds({'X-RateLimit-Reset': '7'}) == 7
+        assert retry_after_seconds({'X-RateLimit-Reset': '1700000045'}, now=1700000000) == 45
+
+    def test_missing_headers(self):
+        assert retry_after_seconds({}) is None
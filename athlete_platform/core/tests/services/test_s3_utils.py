@@ -0,0 +1,228 @@
+import io
+import json
+import unittest
+from unittest import mock
+from datetime import date, datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from core.utils.s3_utils import S3Utils, MANIFEST_FILENAME, _warn_unavailable_codec
+from core.utils.json_codec import encode_json, decode_json, available_codecs
+
+
+class FakeS3Client:
+    """Minimal in-memory stand-in for the boto3 S3 client"""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+        self._clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def _error(self, code):
+        return ClientError({'Error': {'Code': code}}, 'op')
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, ContentEncoding=None, **kwargs):
+        self.calls.append(('put', Key))
+        if IfMatch is not None and self.objects.get(Key, {}).get('ETag') != IfMatch:
+            raise self._error('PreconditionFailed')
+        self._clock += timedelta(seconds=1)
+        body = Body.encode('utf-8') if isinstance(Body, str) else Body
+        etag = f'"{len(self.calls)}"'
+        self.objects[Key] = {'Body': body, 'ETag': etag, 'LastModified': self._clock, 'ContentEncoding': ContentEncoding}
+        return {'ETag': etag}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        self.calls.append(('get', Key))
+        if Key not in self.objects:
+            raise self._error('NoSuchKey')
+        obj = self.objects[Key]
+        if IfNoneMatch is not None and obj['ETag'] == IfNoneMatch:
+            raise self._error('304')
+        response = {'Body': io.BytesIO(obj['Body']), 'ETag': obj['ETag']}
+        if obj.get('ContentEncoding'):
+            response['ContentEncoding'] = obj['ContentEncoding']
+        return response
+
+    def list_objects_v2(self, Bucket, Prefix, **kwargs):
+        self.calls.append(('list', Prefix))
+        contents = [
+            {'Key': key, 'ETag': obj['ETag'], 'Size': len(obj['Body']), 'LastModified': obj['LastModified']}
+            for key, obj in sorted(self.objects.items()) if key.startswith(Prefix)
+        ]
+        return {'Contents': contents} if contents else {}
+
+    def get_paginator(self, operation_name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield client.list_objects_v2(Bucket=Bucket, Prefix=Prefix)
+
+        return Paginator()
+
+
+BASE_PATH = 'accounts/1/biometric-data/whoop'
+
+
+class S3TestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeS3Client()
+        self.s3 = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+
+
+class TestS3Manifest(S3TestCase):
+    def test_store_json_data_indexes_day(self):
+        assert self.s3.store_json_data(BASE_PATH, '2025-01-02_raw.json', {'date': '2025-01-02'})
+
+        manifest_key = f'{BASE_PATH}/{MANIFEST_FILENAME}'
+        assert manifest_key in self.client.objects
+        fresh = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        assert fresh.get_latest_key(BASE_PATH, date(2025, 1, 2)) == f'{BASE_PATH}/2025-01-02_raw.json'
+
+    def test_lookups_cost_one_manifest_get(self):
+        for day in range(1, 31):
+            self.s3.store_json_data(BASE_PATH, f'2025-01-{day:02d}_raw.json', {'date': f'2025-01-{day:02d}'})
+
+        reader = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        self.client.calls.clear()
+        date_range = [date(2025, 1, 1) + timedelta(days=i) for i in range(30)]
+        assert reader.check_data_freshness(BASE_PATH, date_range)
+        assert reader.get_available_dates(BASE_PATH) == set(date_range)
+        assert self.client.calls == [('get', f'{BASE_PATH}/{MANIFEST_FILENAME}')]
+
+    def test_missing_manifest_is_rebuilt_from_listing(self):
+        # Files written before manifests existed
+        self.client.put_object(Bucket='b', Key=f'{BASE_PATH}/2025-01-01_raw.json', Body='{"date": "2025-01-01"}')
+        self.client.put_object(Bucket='b', Key=f'{BASE_PATH}/2025-01-03_raw.json', Body='{"date": "2025-01-03"}')
+
+        assert self.s3.get_latest_json_data(BASE_PATH, date(2025, 1, 3)) == {'date': '2025-01-03'}
+        assert self.s3.get_latest_json_data(BASE_PATH, date(2025, 1, 2)) is None
+        assert f'{BASE_PATH}/{MANIFEST_FILENAME}' in self.client.objects
+        assert not self.s3.check_data_freshness(BASE_PATH, [date(2025, 1, 1), date(2025, 1, 2)])
+
+    def test_concurrent_writer_entries_are_merged(self):
+        first = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        second = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        first.store_json_data(BASE_PATH, '2025-01-01_raw.json', {})
+        second.store_json_data(BASE_PATH, '2025-01-02_raw.json', {})
+        # first still holds a stale manifest etag and has to merge on retry
+        first.store_json_data(BASE_PATH, '2025-01-03_raw.json', {})
+
+        reader = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        assert reader.get_available_dates(BASE_PATH) == {date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)}
+
+    def test_cached_manifest_is_revalidated_after_ttl(self):
+        reader = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4, manifest_ttl=0)
+        writer = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        writer.store_json_data(BASE_PATH, '2025-01-01_raw.json', {})
+        assert reader.get_available_dates(BASE_PATH) == {date(2025, 1, 1)}
+
+        # Unchanged, the conditional GET keeps the cached copy
+        assert reader.get_available_dates(BASE_PATH) == {date(2025, 1, 1)}
+        # Another worker's write is picked up
+        writer.store_json_data(BASE_PATH, '2025-01-02_raw.json', {})
+        assert reader.get_available_dates(BASE_PATH) == {date(2025, 1, 1), date(2025, 1, 2)}
+
+    def test_cached_manifest_is_reused_within_ttl(self):
+        self.s3.store_json_data(BASE_PATH, '2025-01-01_raw.json', {})
+        other = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        other.store_json_data(BASE_PATH, '2025-01-02_raw.json', {})
+        self.client.calls.clear()
+
+        assert self.s3.get_available_dates(BASE_PATH) == {date(2025, 1, 1)}
+        assert self.client.calls == []
+
+
+class TestS3ManifestBatch(S3TestCase):
+    def test_a_batch_writes_the_manifest_once(self):
+        manifest_key = f'{BASE_PATH}/{MANIFEST_FILENAME}'
+        with self.s3.manifest_batch():
+            for day in range(1, 31):
+                self.s3.store_json_data(BASE_PATH, f'2025-01-{day:02d}_raw.json', {})
+            assert manifest_key not in self.client.objects
+
+        assert self.client.calls.count(('put', manifest_key)) == 1
+        reader = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        assert len(reader.get_available_dates(BASE_PATH)) == 30
+
+    def test_days_stored_in_a_batch_are_readable_before_it_ends(self):
+        self.s3.store_json_data(BASE_PATH, '2025-01-01_raw.json', {})
+
+        with self.s3.manifest_batch():
+            self.s3.store_json_data(BASE_PATH, '2025-01-02_raw.json', {'date': '2025-01-02'})
+            assert self.s3.get_latest_json_data(BASE_PATH, date(2025, 1, 2)) == {'date': '2025-01-02'}
+
+    def test_a_batch_merges_with_other_writers(self):
+        other = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        self.s3.store_json_data(BASE_PATH, '2025-01-01_raw.json', {})
+
+        with self.s3.manifest_batch():
+            self.s3.store_json_data(BASE_PATH, '2025-01-02_raw.json', {})
+            other.store_json_data(BASE_PATH, '2025-01-03_raw.json', {})
+
+        reader = S3Utils(client=self.client, bucket='test-bucket', codec='identity', fetch_workers=4)
+        assert reader.get_available_dates(BASE_PATH) == {date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)}
+
+
+class TestS3FetchMany(S3TestCase):
+    def test_fetch_many_preserves_order_and_reports_failures(self):
+        self.client.put_object(Bucket='b', Key='a.json', Body='{"n": 1}')
+        self.client.put_object(Bucket='b', Key='c.json', Body='not json')
+
+        fetched = self.s3.fetch_many(['c.json', 'missing.json', 'a.json'], max_workers=3)
+
+        assert list(fetched) == ['c.json', 'missing.json', 'a.json']
+        assert fetched['a.json'] == {'data': {'n': 1}, 'error': None}
+        assert fetched['missing.json']['data'] is None and fetched['missing.json']['error']
+        assert fetched['c.json']['error']
+
+    def test_latest_json_data_many_is_date_ordered(self):
+        for day in (3, 1, 2):
+            self.s3.store_json_data(BASE_PATH, f'2025-01-0{day}_raw.json', {'date': f'2025-01-0{day}'})
+
+        dates = [date(2025, 1, 4), date(2025, 1, 2), date(2025, 1, 1), date(2025, 1, 3)]
+        fetched = self.s3.get_latest_json_data_many(BASE_PATH, dates, max_workers=4)
+
+        assert list(fetched) == sorted(dates)
+        assert fetched[date(2025, 1, 4)] is None
+        assert [fetched[d]['date'] for d in sorted(dates)[:3]] == ['2025-01-01', '2025-01-02', '2025-01-03']
+
+
+class TestS3JsonCodec(S3TestCase):
+    def test_compressed_round_trip(self):
+        payload = {'date': '2025-01-01', 'sleep': {'sleepHeartRate': [{'value': 50 + i % 7} for i in range(500)]}}
+        for codec in [c for c in available_codecs() if c != 'identity']:
+            with self.subTest(codec=codec):
+                client = FakeS3Client()
+                s3 = S3Utils(client=client, bucket='test-bucket', codec='identity', fetch_workers=4)
+                assert s3.store_json_data(BASE_PATH, '2025-01-01_raw.json', payload, codec=codec)
+
+                stored = client.objects[f'{BASE_PATH}/2025-01-01_raw.json']
+                assert stored['ContentEncoding'] == codec
+                assert len(stored['Body']) < len(json.dumps(payload, indent=2))
+                assert s3.get_latest_json_data(BASE_PATH, date(2025, 1, 1)) == payload
+                assert s3.get_latest_json_data_full_path(f'{BASE_PATH}/2025-01-01_raw.json') == payload
+                assert s3.get_all_json_data(BASE_PATH) == [payload]
+
+    def test_legacy_and_compressed_objects_mix(self):
+        self.s3.store_json_data(BASE_PATH, '2025-01-01_raw.json', {'date': '2025-01-01'}, codec='identity')
+        self.s3.store_json_data(BASE_PATH, '2025-01-02_raw.json', {'date': '2025-01-02'}, codec='gzip')
+
+        fetched = self.s3.get_latest_json_data_many(BASE_PATH, [date(2025, 1, 1), date(2025, 1, 2)])
+        assert [day['date'] for day in fetched.values()] == ['2025-01-01', '2025-01-02']
+
+    def test_decode_without_content_encoding_header(self):
+        body, encoding = encode_json({'a': [1, 2]}, 'gzip')
+        assert encoding == 'gzip'
+        assert decode_json(body) == {'a': [1, 2]}
+
+    def test_unavailable_codec_is_reported_once_configured(self):
+        _warn_unavailable_codec.cache_clear()
+
+        with mock.patch('core.utils.json_codec.zstandard', None):
+            with self.assertLogs('core.utils.s3_utils', level='WARNING') as logs:
+                s3 = S3Utils(client=self.client, bucket='test-bucket', codec='zstd', fetch_workers=4)
+                S3Utils(client=self.client, bucket='test-bucket', codec='zstd', fetch_workers=4)
+            assert sum("'zstd' is unavailable" in line for line in logs.output) == 1
+
+            # Writes still succeed with the gzip fallback
+            assert s3.store_json_data(BASE_PATH, '2025-01-01_raw.json', {'date': '2025-01-01'})
+        assert self.client.objects[f'{BASE_PATH}/2025-01-01_raw.json']['ContentEncoding'] == 'gzip'
@@ -0,0 +1,74 @@
+import unittest
+from datetime import date, timedelta
+
+from core.utils.sync_plan import FetchCostModel, SyncPlan, contiguous_ranges
+
+END = date(2025, 3, 31)
+START = END - timedelta(days=29)
+
+
+def days_ago(*offsets):
+    return [END - timedelta(days=offset) for offset in offsets]
+
+
+def plan_ranges(plan):
+    return [(fetch_range.start, fetch_range.end) for fetch_range in plan.ranges]
+
+
+class TestContiguousRanges(unittest.TestCase):
+    def test_runs_of_consecutive_days(self):
+        assert contiguous_ranges(days_ago(0, 1, 2, 5, 9, 10)) == [
+            (END - timedelta(days=10), END - timedelta(days=9)),
+            (END - timedelta(days=5), END - timedelta(days=5)),
+            (END - timedelta(days=2), END),
+        ]
+
+    def test_order_and_duplicates_do_not_matter(self):
+        assert contiguous_ranges(days_ago(3, 0, 3, 1)) == contiguous_ranges(days_ago(0, 1, 3))
+        assert contiguous_ranges([]) == []
+
+
+class TestSyncPlan(unittest.TestCase):
+    def test_an_old_gap_is_not_fetched_through_the_held_days(self):
+        plan = SyncPlan('whoop', START, END, days_ago(25, 0))
+
+        assert plan_ranges(plan) == [(END - timedelta(days=25),) * 2, (END, END)]
+        assert plan.fetch_days == 2
+        assert not plan.is_missing(END - timedelta(days=10))
+
+    def test_gaps_are_merged_only_when_the_cost_model_says_so(self):
+        # A range costs 4 requests, refetching a held day 1
+        cost_model = FetchCostModel(range_requests=4, day_requests=1)
+        missing = days_ago(0, 1, 3, 20)
+
+        unmerged = SyncPlan('whoop', START, END, missing, cost_model)
+        merged = SyncPlan('whoop', START, END, missing, cost_model, merge_gaps=True)
+
+        assert len(unmerged.ranges) == 3
+        assert plan_ranges(merged) == [(END - timedelta(days=20),) * 2, (END - timedelta(days=3), END)]
+        assert merged.ranges[1].missing == 3 and merged.ranges[1].days == 4
+        assert merged.estimated_requests < unmerged.estimated_requests < merged.span_requests
+
+    def test_per_day_sources_never_merge(self):
+        cost_model = FetchCostModel(range_requests=1, day_requests=6)
+
+        plan = SyncPlan('garmin', START, END, days_ago(0, 2, 4), cost_model, merge_gaps=True)
+
+        assert len(plan.ranges) == 3
+
+    def test_nothing_missing_plans_nothing(self):
+        plan = SyncPlan('garmin', START, END, [])
+
+        assert not plan
+        assert plan.to_dict()['ranges'] == []
+        assert plan.estimated_requests == plan.span_requests == 0
+
+    def test_dict_lists_ranges_and_estimates(self):
+        plan = SyncPlan('whoop', START, END, days_ago(25, 0), FetchCostModel(range_requests=4, day_requests=0.16))
+
+        data = plan.to_dict()
+
+        assert data['ranges'][0] == {'start_date': '2025-03-06', 'end_date': '2025-03-06', 'days': 1, 'missing_days': 1}
+        assert data['missing_dates'] == ['2025-03-06', '2025-03-31']
+        assert data['estimated_requests'] == 8.32
+        assert data['span_requests'] == 8.16
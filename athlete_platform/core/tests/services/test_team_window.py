@@ -0,0 +1,83 @@
+import unittest
+from datetime import date
+
+import numpy as np
+from core.utils.team_window import TeamWindow
+
+START = date(2025, 3, 1)
+END = date(2025, 3, 3)
+COLUMNS = ['resting_heart_rate', 'hrv_ms']
+
+
+def make_window(rows, athlete_ids=('a', 'b', 'c')):
+    return TeamWindow.from_rows(list(athlete_ids), START, END, COLUMNS, rows)
+
+
+class TestTeamWindow(unittest.TestCase):
+    def test_rows_are_placed_by_athlete_day_and_source(self):
+        window = make_window([
+            ('a', date(2025, 3, 1), 'garmin', 50, 60.0),
+            ('a', date(2025, 3, 1), 'whoop', 52, None),
+            ('b', date(2025, 3, 3), 'garmin', 48, 70.0),
+        ])
+
+        assert window.values.shape == (3, 3, 2, 2)
+        assert window.sources == ['garmin', 'whoop']
+        assert window.row_counts().tolist() == [2, 1, 0]
+        assert np.isnan(window.column('hrv_ms')[0, 0, 1])
+
+    def test_athlete_stats_skip_missing_values(self):
+        window = make_window([
+            ('a', date(2025, 3, 1), 'garmin', 50, 60.0),
+            ('a', date(2025, 3, 2), 'garmin', 54, None),
+            ('b', date(2025, 3, 3), 'garmin', 48, 70.0),
+        ])
+
+        stats = window.athlete_stats('hrv_ms')
+        assert stats['count'].tolist() == [1, 1, 0]
+        assert stats['mean'][:2].tolist() == [60.0, 70.0]
+        assert np.isnan(stats['mean'][2])
+
+        heart_rate = window.athlete_stats('resting_heart_rate')
+        assert heart_rate['mean'][0] == 52.0
+        assert heart_rate['min'][0] == 50.0
+        assert heart_rate['max'][0] == 54.0
+
+    def test_group_mean_of_means_ignores_athletes_without_data(self):
+        window = make_window([
+            ('a', date(2025, 3, 1), 'garmin', 50, 60.0),
+            ('a', date(2025, 3, 2), 'garmin', 54, 62.0),
+            ('b', date(2025, 3, 3), 'garmin', 48, 70.0),
+        ])
+
+        self.assertAlmostEqual(window.group_mean_of_means('resting_heart_rate'), 50.0)
+        self.assertAlmostEqual(window.group_mean_of_means('hrv_ms', np.array([True, False, True])), 61.0)
+        assert window.group_mean_of_means('hrv_ms', np.array([False, False, True])) is None
+
+    def test_athlete_block_is_in_date_order(self):
+        window = make_window([
+            ('a', date(2025, 3, 3), 'garmin', 51, 61.0),
+            ('a', date(2025, 3, 1), 'garmin', 50, None),
+        ])
+
+        dates, block = window.athlete_block(window.athlete_position('a'), ['hrv_ms'])
+
+        assert dates == [date(2025, 3, 1), date(2025, 3, 3)]
+        assert block.shape == (2, 1)
+        assert np.isnan(block[0, 0])
+        assert block[1, 0] == 61.0
+
+    def test_rows_outside_the_window_or_roster_are_dropped(self):
+        window = make_window([
+            ('a', date(2025, 2, 28), 'garmin', 50, 60.0),
+            ('z', date(2025, 3, 1), 'garmin', 50, 60.0),
+        ])
+
+        assert window.rows.sum() == 0
+        assert window.athlete_position('z') is None
+
+    def test_empty_window(self):
+        window = make_window([])
+
+        assert window.row_counts().tolist() == [0, 0, 0]
+        assert window.group_mean_of_means('hrv_ms') is None
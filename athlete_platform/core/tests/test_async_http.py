@@ -0,0 +1,148 @@
+"""
+The shared async HTTP runtime: run_sync, run_async and the one client, and
+WHOOP requests and retries against a mocked httpx transport.
+
+These need Django settings, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_async_http
+"""
+import asyncio
+import threading
+import unittest
+from functools import partial
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from core.services.data_collectors.whoop_collector import WhoopCollector
+from core.utils import async_http
+from core.utils.async_http import get_async_client, run_async, run_sync
+
+AsyncClient = httpx.AsyncClient
+
+
+class AsyncHttpTestCase(SimpleTestCase):
+    def setUp(self):
+        self.requests = []
+        self.responses = []
+        # Every client the runtime creates answers from self.responses instead of the network
+        transport = httpx.MockTransport(self._respond)
+        patcher = mock.patch.object(async_http.httpx, 'AsyncClient', partial(AsyncClient, transport=transport))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._reset_client()
+        self.addCleanup(self._reset_client)
+
+    @staticmethod
+    def _reset_client():
+        if async_http._client is not None:
+            run_sync(async_http._client.aclose())
+        async_http._client = None
+
+    def _respond(self, request):
+        self.requests.append(request)
+        response = self.responses.pop(0) if self.responses else httpx.Response(200, json={})
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class RuntimeTest(AsyncHttpTestCase):
+    def test_run_sync_runs_on_the_runtime_loop(self):
+        async def where():
+            return threading.current_thread().name
+
+        self.assertEqual(run_sync(where()), 'async-http-runtime')
+
+    def test_run_sync_refuses_to_block_the_runtime_loop(self):
+        async def nested():
+            coro = asyncio.sleep(0)
+            with self.assertRaises(RuntimeError):
+                run_sync(coro)
+            return True
+
+        self.assertTrue(run_sync(nested()))
+
+    def test_other_loops_share_the_runtime_client(self):
+        async def fetch():
+            response = await get_async_client().get('https://example.test/')
+            return response.status_code, id(get_async_client())
+
+        async def from_short_lived_loop():
+            return await run_async(fetch())
+
+        # Each asyncio.run is a new loop that closes when it returns
+        results = [asyncio.run(from_short_lived_loop()) for _ in range(3)]
+
+        self.assertEqual({status for status, _ in results}, {200})
+        self.assertEqual(len({client for _, client in results}), 1)
+        self.assertEqual(len(self.requests), 3)
+
+    def test_the_client_is_not_created_on_other_loops(self):
+        async def on_own_loop():
+            with self.assertRaises(RuntimeError):
+                get_async_client()
+
+        asyncio.run(on_own_loop())
+        self.assertIsNone(async_http._client)
+
+
+@override_settings(WHOOP_RATE_LIMIT_MAX_WAIT=5)
+class WhoopRequestTest(AsyncHttpTestCase):
+    def setUp(self):
+        super().setUp()
+        athlete = mock.Mock()
+        athlete.user.username = 'whoop-athlete'
+        self.collector = WhoopCollector(athlete)
+        self.collector.access_token = 'token'
+        # Retry backoff is seconds long, skip it
+        patcher = mock.patch('core.services.data_collectors.whoop_collector.asyncio.sleep', new=mock.AsyncMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_a_response_is_returned_with_auth_and_params(self):
+        self.responses = [httpx.Response(200, json={'records': [{'id': 1}]})]
+
+        data = self.collector.make_request('GET', f"{WhoopCollector.BASE_URL}/cycle", {'limit': 25})
+
+        self.assertEqual(data, {'records': [{'id': 1}]})
+        request, = self.requests
+        self.assertEqual(request.headers['Authorization'], 'Bearer token')
+        self.assertEqual(request.url.params['limit'], '25')
+
+    def test_server_errors_are_retried(self):
+        self.responses = [httpx.Response(503), httpx.Response(502), httpx.Response(200, json={'id': 7})]
+
+        data = self.collector.make_request('GET', f"{WhoopCollector.BASE_URL}/cycle/7")
+
+        self.assertEqual(data, {'id': 7})
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.collector.request_count, 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.responses = [httpx.Response(404, text='not found')]
+
+        self.assertIsNone(self.collector.make_request('GET', f"{WhoopCollector.BASE_URL}/cycle/7"))
+        self.assertEqual(len(self.requests), 1)
+
+    def test_connection_errors_give_up_after_the_retries(self):
+        self.responses = [httpx.ConnectError("connection refused")] * 4
+
+        self.assertIsNone(self.collector.make_request('GET', f"{WhoopCollector.BASE_URL}/cycle/7"))
+        self.assertEqual(len(self.requests), 4)
+
+    def test_token_verification_uses_the_shared_client(self):
+        self.responses = [httpx.Response(200, json={}), httpx.Response(401)]
+
+        self.assertTrue(self.collector._verify_token())
+        self.assertFalse(self.collector._verify_token())
+
+        self.assertEqual(self.requests[0].url.path, '/developer/v1/user/profile/basic')
+        self.assertEqual(self.requests[0].headers['Authorization'], 'Bearer token')
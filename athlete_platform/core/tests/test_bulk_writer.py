@@ -0,0 +1,107 @@
+"""
+Batched biometric writes: the flush's query count, and upserts of existing
+days and their time series.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_bulk_writer
+"""
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Athlete, CoreBiometricData, CoreBiometricTimeSeries, User
+from core.services.data_processors.bulk_writer import BiometricBulkWriter
+
+START = date(2025, 3, 1)
+
+
+class BulkWriterTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Skip the S3 directory setup that runs when a user is created
+        with mock.patch('core.signals.UserStorageService'):
+            user = User.objects.create(username='bulk-athlete', role='ATHLETE')
+        cls.athlete = Athlete.objects.get(user=user)
+
+    def _flush(self, days, source='garmin', **fields):
+        writer = BiometricBulkWriter(self.athlete, source)
+        for offset in range(days):
+            current_date = START + timedelta(days=offset)
+            writer.add(current_date, {'resting_heart_rate': 50 + offset, **fields},
+                       time_series={'sleep_heart_rate': [offset], 'sleep_stress': [offset * 2]})
+        return writer.flush()
+
+
+class FlushTest(BulkWriterTestCase):
+    def test_queries_do_not_grow_with_the_days_written(self):
+        # SQLite caps the variables per statement, so stay within one of its insert batches
+        few = self._flush(2)
+        many = self._flush(10, source='whoop')
+
+        self.assertTrue(few['success'] and many['success'])
+        self.assertEqual((few['rows'], many['rows']), (2, 10))
+        self.assertEqual(few['queries'], many['queries'])
+        # Data upsert, id lookup and time series upsert, plus the savepoint around them
+        self.assertLessEqual(many['queries'], 5)
+
+    def test_existing_days_are_updated_in_place(self):
+        self._flush(3)
+        ids = dict(CoreBiometricData.objects.filter(athlete=self.athlete).values_list('date', 'id'))
+
+        self._flush(3, resting_heart_rate=40)
+
+        rows = CoreBiometricData.objects.filter(athlete=self.athlete, source='garmin')
+        self.assertEqual(rows.count(), 3)
+        self.assertEqual(dict(rows.values_list('date', 'id')), ids)
+        self.assertEqual(set(rows.values_list('resting_heart_rate', flat=True)), {40})
+
+    def test_columns_the_batch_does_not_set_keep_their_values(self):
+        self._flush(1, total_steps=9000)
+
+        self._flush(1, hrv_ms=70.0)
+
+        row = CoreBiometricData.objects.get(athlete=self.athlete, date=START, source='garmin')
+        self.assertEqual((row.total_steps, row.hrv_ms), (9000, 70.0))
+
+    def test_sources_are_separate_rows(self):
+        self._flush(1)
+        self._flush(1, source='whoop', resting_heart_rate=60)
+
+        self.assertEqual(
+            dict(CoreBiometricData.objects.filter(athlete=self.athlete).values_list('source', 'resting_heart_rate')),
+            {'garmin': 50, 'whoop': 60},
+        )
+
+
+class TimeSeriesTest(BulkWriterTestCase):
+    def test_time_series_share_their_days_id_and_are_replaced(self):
+        self._flush(2)
+        writer = BiometricBulkWriter(self.athlete, 'garmin')
+        writer.add(START, {'resting_heart_rate': 48}, time_series={'sleep_heart_rate': [60, 58]})
+        stats = writer.flush()
+
+        row = CoreBiometricData.objects.get(athlete=self.athlete, date=START, source='garmin')
+        series = CoreBiometricTimeSeries.objects.get(id=row.id)
+        self.assertEqual(stats['time_series_rows'], 1)
+        self.assertEqual(series.sleep_heart_rate, [60, 58])
+        # Fields missing from the new series are cleared, the series is replaced whole
+        self.assertEqual(series.sleep_stress, [])
+        self.assertEqual(CoreBiometricTimeSeries.objects.count(), 2)
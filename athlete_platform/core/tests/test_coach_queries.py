@@ -0,0 +1,361 @@
+"""
+Query-count tests for the coach aggregation paths.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_coach_queries
+"""
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Athlete, Coach, CoreBiometricData, Team, TeamDailyRollup, TeamSnapshot, User
+from core.services.coach_data_sync_service import CoachDataSyncService
+from core.services.data_processors.bulk_writer import BiometricBulkWriter
+from core.services.team_rollup_service import TeamRollupService
+from core.services.team_snapshot_service import TeamSnapshotService
+
+
+class CoachQueryTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Skip the S3 directory setup that runs when a user is created, rollups refresh on commit
+        with mock.patch('core.signals.UserStorageService'), cls.captureOnCommitCallbacks(execute=True):
+            coach = User.objects.create(username='coach', role='COACH')
+            cls.team = Team.objects.create(name='Test Team', coach=coach)
+
+            today = timezone.now().date()
+            for number in range(4):
+                user = User.objects.create(username=f'athlete{number}', role='ATHLETE')
+                athlete = Athlete.objects.get(user=user)
+                athlete.team = cls.team
+                athlete.position = 'DEFENDER' if number % 2 else 'FORWARD'
+                athlete.save()
+                # The last athlete has no biometric data in the window
+                if number == 3:
+                    continue
+                for offset in range(3):
+                    CoreBiometricData.objects.create(
+                        athlete=athlete,
+                        date=today - timedelta(days=offset),
+                        resting_heart_rate=50 + number,
+                        hrv_ms=60.0 + offset,
+                        recovery_score=70.0 + number,
+                        total_sleep_seconds=28800,
+                        total_steps=9000,
+                        max_heart_rate=180,
+                        strain=10.0,
+                    )
+
+
+class TeamBiometricSummaryQueryTest(CoachQueryTestCase):
+    def test_summary_uses_one_aggregate_query(self):
+        service = CoachDataSyncService(team=self.team)
+
+        # One query for the roster and one aggregate for every metric and the athlete count
+        with self.assertNumQueries(2):
+            summary = service.get_team_biometric_summary(days=7)
+
+        self.assertEqual(summary['athlete_count'], 4)
+        self.assertEqual(summary['athletes_with_data'], 3)
+        self.assertEqual(summary['metrics']['resting_heart_rate']['avg'], 51.0)
+        self.assertEqual(summary['metrics']['resting_heart_rate']['min'], 50.0)
+        self.assertEqual(summary['metrics']['resting_heart_rate']['max'], 52.0)
+        self.assertEqual(summary['metrics']['hrv_ms']['avg'], 61.0)
+        # readiness_score reads the same column as recovery_score
+        self.assertEqual(summary['metrics']['readiness_score'], {
+            **summary['metrics']['recovery_score'],
+            'interpretation': summary['metrics']['readiness_score']['interpretation'],
+            'display_name': summary['metrics']['readiness_score']['display_name'],
+        })
+        self.assertNotIn('vo2_max', summary['metrics'])
+
+    def test_summary_without_data_in_window(self):
+        CoreBiometricData.objects.all().delete()
+        service = CoachDataSyncService(team=self.team)
+
+        with self.assertNumQueries(2):
+            summary = service.get_team_biometric_summary(days=7)
+
+        self.assertEqual(summary['athletes_with_data'], 0)
+        self.assertEqual(summary['metrics'], {})
+
+
+class PositionAggregateQueryTest(CoachQueryTestCase):
+    def test_position_aggregates_use_one_grouped_query(self):
+        service = CoachDataSyncService(team=self.team)
+
+        # One query for the roster and one GROUP BY for every position and metric
+        with self.assertNumQueries(2):
+            positions = service.get_position_aggregates(days=7)
+
+        self.assertEqual(set(positions), {'FORWARD', 'DEFENDER'})
+        self.assertEqual(positions['FORWARD']['athlete_count'], 2)
+        self.assertEqual(positions['FORWARD']['athletes_with_data'], 2)
+        self.assertEqual(positions['FORWARD']['metrics']['resting_heart_rate']['avg'], 51.0)
+        # The defender without data still counts towards the roster
+        self.assertEqual(positions['DEFENDER']['athlete_count'], 2)
+        self.assertEqual(positions['DEFENDER']['athletes_with_data'], 1)
+        self.assertEqual(positions['DEFENDER']['metrics']['resting_heart_rate']['avg'], 51.0)
+
+    def test_comparison_and_optimization_reuse_the_grouped_query(self):
+        service = CoachDataSyncService(team=self.team)
+
+        with self.assertNumQueries(2):
+            comparison = service.get_biometric_comparison_by_position(days=7)
+        # The same service already holds the roster and the grouped rows for this window
+        with self.assertNumQueries(0):
+            optimization = service.get_training_optimization_data(position='defender')
+
+        self.assertEqual(comparison['metrics_compared']['recovery_score'], {'FORWARD': 71.0, 'DEFENDER': 71.0})
+        self.assertEqual(optimization['athlete_count'], 2)
+        self.assertEqual(list(optimization['metrics_by_position']), ['DEFENDER'])
+
+    def test_blank_positions_are_grouped_as_unknown(self):
+        Athlete.objects.filter(position='DEFENDER').update(position=' ')
+        service = CoachDataSyncService(team=self.team)
+
+        positions = service.get_position_aggregates(days=7)
+
+        self.assertEqual(positions['UNKNOWN']['athlete_count'], 2)
+        self.assertEqual(positions['UNKNOWN']['athletes_with_data'], 1)
+
+
+class CoachDashboardQueryTest(CoachQueryTestCase):
+    def test_dashboard_sections_share_one_load(self):
+        # Two queries for all four sections, against eight for the separate calls
+        with self.assertNumQueries(2):
+            dashboard = CoachDataSyncService(team=self.team).get_dashboard_data(days=7)
+
+        self.assertEqual(list(dashboard), list(CoachDataSyncService.DASHBOARD_SECTIONS))
+        separate_summary = CoachDataSyncService(team=self.team).get_team_biometric_summary(days=7)
+        for summary in (dashboard['team_summary'], separate_summary):
+            summary.pop('timestamp')
+        self.assertEqual(dashboard['team_summary'], separate_summary)
+        self.assertEqual(
+            dashboard['position_summaries'],
+            CoachDataSyncService(team=self.team).get_position_biometric_summary(days=7)
+        )
+        self.assertEqual(
+            dashboard['comparison'],
+            CoachDataSyncService(team=self.team).get_biometric_comparison_by_position(days=7)
+        )
+        self.assertEqual(
+            dashboard['optimization'],
+            CoachDataSyncService(team=self.team).get_training_optimization_data(days=7)
+        )
+
+    def test_dashboard_view_returns_requested_sections(self):
+        coach = User.objects.get(username='coach')
+        Coach.objects.create(user=coach, team=self.team)
+        client = APIClient()
+        client.force_authenticate(coach)
+        url = reverse('coach_dashboard')
+
+        response = client.get(url, {'sections': 'optimization,team_summary', 'days': 7}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['sections']), ['optimization', 'team_summary'])
+        self.assertEqual(response.data['sections']['team_summary']['athletes_with_data'], 3)
+
+        response = client.get(url, {'sections': 'team_summary,roster'}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class TeamWindowQueryTest(CoachQueryTestCase):
+    def test_position_athletes_data_loads_one_window(self):
+        service = CoachDataSyncService(team=self.team)
+
+        # The roster and one window query, however many athletes play the position
+        with self.assertNumQueries(2):
+            data = service.get_position_athletes_data('FORWARD', days=7)
+
+        self.assertEqual(data['athlete_count'], 2)
+        self.assertEqual([athlete['data_count'] for athlete in data['athletes']], [3, 3])
+        self.assertEqual(data['position_metrics']['resting_heart_rate'], 51.0)
+        self.assertEqual(data['position_metrics']['sleep_hours'], 8.0)
+        self.assertEqual(data['athletes'][0]['averages']['hrv_ms'], 61.0)
+
+    def test_athlete_biometric_data_from_window(self):
+        athlete = Athlete.objects.get(user__username='athlete0')
+        service = CoachDataSyncService(team=self.team)
+
+        with mock.patch.object(CoachDataSyncService, '_sync_athlete_data'):
+            data = service.get_athlete_biometric_data(str(athlete.id), days=7)
+
+        self.assertEqual(data['data_count'], 3)
+        self.assertEqual(data['data_points'][0]['metrics']['sleep_hours'], 8.0)
+        self.assertEqual(data['averages']['resting_heart_rate'], 50.0)
+        self.assertEqual(data['averages']['hrv_ms'], 61.0)
+
+
+class TeamDailyRollupTest(CoachQueryTestCase):
+    def test_per_day_writes_keep_rollups_consistent(self):
+        # The fixture rows were written through save(), which refreshes the rollups
+        self.assertTrue(TeamDailyRollup.objects.filter(team=self.team).exists())
+        self.assertEqual(TeamRollupService().check(self.team), [])
+
+        athlete = Athlete.objects.get(user__username='athlete0')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            CoreBiometricData.objects.update_or_create(
+                athlete=athlete, date=timezone.now().date(), source='garmin', defaults={'resting_heart_rate': 40}
+            )
+            CoreBiometricData.objects.filter(athlete__user__username='athlete1').first().delete()
+
+        # Both writes are refreshed together when the transaction commits
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(TeamRollupService().check(self.team), [])
+
+    def test_one_refresh_per_day_however_many_rows_are_written(self):
+        athlete = Athlete.objects.get(user__username='athlete3')
+        with mock.patch.object(TeamRollupService, 'refresh_days', autospec=True) as refresh_days:
+            with self.captureOnCommitCallbacks(execute=True):
+                for source in ('whoop', 'garmin', 'oura'):
+                    CoreBiometricData.objects.create(athlete=athlete, date=timezone.now().date(), source=source)
+
+        refresh_days.assert_called_once_with(mock.ANY, self.team.id, {timezone.now().date()})
+
+    def test_moving_an_athlete_regroups_their_days(self):
+        athlete = Athlete.objects.get(user__username='athlete0')
+        other_team = Team.objects.create(name='Other Team', coach=self.team.coach)
+
+        athlete.position = 'GOALKEEPER'
+        athlete.save()
+        self.assertEqual(TeamRollupService().check(self.team), [])
+        self.assertTrue(TeamDailyRollup.objects.filter(team=self.team, position='GOALKEEPER').exists())
+
+        athlete.team = other_team
+        athlete.save()
+        self.assertEqual(TeamRollupService().check(self.team), [])
+        self.assertEqual(TeamRollupService().check(other_team), [])
+        self.assertFalse(TeamDailyRollup.objects.filter(team=self.team, position='GOALKEEPER').exists())
+
+    def test_check_reports_roster_drift(self):
+        athlete = Athlete.objects.get(user__username='athlete0')
+        # update() skips Athlete.save, so athletes_array keeps the athlete the team relation lost
+        Athlete.objects.filter(id=athlete.id).update(team=None)
+        self.team.refresh_from_db()
+
+        problems = TeamRollupService().check(self.team, timezone.now().date(), timezone.now().date())
+
+        self.assertIn({'athlete_id': str(athlete.id), 'problem': 'roster', 'detail': 'in athletes_array only'}, problems)
+
+    def test_bulk_writer_flush_refreshes_rollups(self):
+        athlete = Athlete.objects.get(user__username='athlete3')
+        writer = BiometricBulkWriter(athlete, 'whoop')
+        for offset in range(2):
+            writer.add(timezone.now().date() - timedelta(days=offset), {'resting_heart_rate': 45, 'hrv_ms': 80.0})
+        writer.flush()
+
+        self.assertEqual(TeamRollupService().check(self.team), [])
+        rows = TeamDailyRollup.objects.get(
+            team=self.team, position='DEFENDER', date=timezone.now().date(), metric=TeamDailyRollup.ROWS_METRIC
+        )
+        self.assertEqual(rows.value_count, 2)
+        self.assertEqual(len(rows.athlete_ids), 2)
+
+    def test_rollup_summaries_match_raw_aggregates(self):
+        service = CoachDataSyncService(team=self.team)
+        raw_summary = service.get_team_biometric_summary(days=7)
+        raw_positions = service.get_position_aggregates(days=7)
+
+        # A new service, the first one holds the raw rows for this window
+        service = CoachDataSyncService(team=self.team)
+        with override_settings(COACH_ROLLUP_SUMMARIES=True):
+            with self.assertNumQueries(2):
+                rollup_summary = service.get_team_biometric_summary(days=7)
+            rollup_positions = service.get_position_aggregates(days=7)
+
+        self.assertEqual(rollup_summary['metrics'], raw_summary['metrics'])
+        self.assertEqual(rollup_summary['athletes_with_data'], raw_summary['athletes_with_data'])
+        self.assertEqual(rollup_positions, raw_positions)
+
+    def test_check_finds_drift_and_rebuild_repairs_it(self):
+        # update() sends no signals, so the rollups fall behind
+        CoreBiometricData.objects.filter(athlete__user__username='athlete0').update(resting_heart_rate=99)
+
+        problems = TeamRollupService().check(self.team)
+        self.assertTrue(problems)
+        self.assertEqual({problem['metric'] for problem in problems}, {'resting_heart_rate'})
+        with self.assertRaises(CommandError):
+            call_command('rebuild_team_rollups', '--check', stdout=StringIO())
+
+        call_command('rebuild_team_rollups', '--team', 'Test Team', stdout=StringIO())
+
+        self.assertEqual(TeamRollupService().check(self.team), [])
+
+
+class TeamSnapshotTest(CoachQueryTestCase):
+    def test_version_only_moves_when_content_changes(self):
+        first = TeamSnapshotService(self.team).refresh()
+        second = TeamSnapshotService(self.team).refresh()
+
+        self.assertEqual(first.version, 1)
+        self.assertEqual(second.version, 1)
+        self.assertEqual(second.etag, first.etag)
+        self.assertEqual(second.data['team_summary']['athletes_with_data'], 3)
+        self.assertIn('FORWARD', second.data['position_summaries'])
+        self.assertIn('metrics_compared', second.data['comparison'])
+        self.assertEqual(second.data['optimization']['athlete_count'], 4)
+
+    def test_current_snapshot_is_one_read(self):
+        TeamSnapshotService(self.team).refresh()
+
+        with self.assertNumQueries(1):
+            snapshot = TeamSnapshotService(self.team).get()
+
+        self.assertFalse(snapshot.stale)
+
+    def test_ingest_marks_snapshot_stale_and_next_read_regenerates(self):
+        first = TeamSnapshotService(self.team).refresh()
+
+        athlete = Athlete.objects.get(user__username='athlete3')
+        with self.captureOnCommitCallbacks(execute=True):
+            CoreBiometricData.objects.create(athlete=athlete, date=timezone.now().date(), resting_heart_rate=44)
+        self.assertTrue(TeamSnapshot.objects.get(id=first.id).stale)
+
+        snapshot = TeamSnapshotService(self.team).get()
+
+        self.assertFalse(snapshot.stale)
+        self.assertEqual(snapshot.version, 2)
+        self.assertNotEqual(snapshot.etag, first.etag)
+        self.assertEqual(snapshot.data['team_summary']['athletes_with_data'], 4)
+
+    def test_view_serves_snapshot_with_etag(self):
+        coach = User.objects.get(username='coach')
+        Coach.objects.create(user=coach, team=self.team)
+        client = APIClient()
+        client.force_authenticate(coach)
+        url = reverse('team_cached_biometrics')
+
+        with mock.patch('core.views.SyncJobService') as sync_jobs:
+            sync_jobs.return_value.enqueue_team_sync.return_value = mock.Mock(id='00000000-0000-0000-0000-000000000000', status='queued')
+            response = client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+        self.assertIn('sync_job', response.data)
+
+        repeat = client.get(url, secure=True, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], response['ETag'])
@@ -0,0 +1,351 @@
+"""
+DataSyncService and the source processors' sync planning: stale-while-
+revalidate reads, per-source watermarks, the empty-day cache and sync plans.
+Nothing is fetched, collectors and processors are mocked.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_data_sync_service
+"""
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import (
+    Athlete, CoreBiometricData, GarminCredentials, SyncJob, SyncState, User, WhoopCredentials,
+)
+from core.services.data_processors import GarminProcessor, WhoopProcessor
+from core.services.data_sync_service import DataSyncService
+from core.utils.cache_utils import EmptyDayCache
+from core.utils.s3_utils import S3Utils
+from core.utils.sync_plan import FetchCostModel
+
+
+class DataSyncTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Skip the S3 directory setup that runs when a user is created
+        with mock.patch('core.signals.UserStorageService'):
+            synced = User.objects.create(username='synced-athlete', role='ATHLETE')
+            User.objects.create(username='new-athlete', role='ATHLETE')
+
+        # synced-athlete has the last three days, new-athlete has nothing yet
+        today = timezone.now().date()
+        athlete = Athlete.objects.get(user=synced)
+        for offset in range(3):
+            CoreBiometricData.objects.create(athlete=athlete, date=today - timedelta(days=offset),
+                                             resting_heart_rate=50, hrv_ms=60.0 + offset)
+
+
+class StaleWhileRevalidateTest(DataSyncTestCase):
+    def _service(self, username):
+        service = DataSyncService(Athlete.objects.get(user__username=username))
+        # Fixture athletes have no credentials, pretend one source is connected
+        service.active_sources = ['whoop']
+        return service
+
+    def test_stale_read_answers_from_the_db_and_queues_one_refresh(self):
+        service = self._service('new-athlete')
+
+        with mock.patch.object(DataSyncService, 'sync_specific_sources') as sync:
+            first = service.read_biometric_data(days=7)
+            second = service.read_biometric_data(days=7)
+        sync.assert_not_called()
+
+        job = SyncJob.objects.get(athlete=service.athlete)
+        self.assertEqual(job.reason, 'stale_read')
+        self.assertEqual(first['data'], [])
+        self.assertTrue(first['freshness']['stale'])
+        self.assertTrue(first['freshness']['refresh_pending'])
+        self.assertEqual(first['freshness']['sync_job_id'], str(job.id))
+        self.assertEqual(second['freshness']['sync_job_id'], str(job.id))
+
+    def test_fresh_read_queues_nothing(self):
+        service = self._service('synced-athlete')
+
+        result = service.read_biometric_data(days=7)
+
+        self.assertEqual(len(result['data']), 3)
+        self.assertEqual(result['freshness']['last_synced'], max(row['updated_at'] for row in result['data']).isoformat())
+        self.assertFalse(result['freshness']['stale'])
+        self.assertFalse(result['freshness']['refresh_pending'])
+        self.assertFalse(SyncJob.objects.filter(athlete=service.athlete).exists())
+
+    @override_settings(BIOMETRIC_REFRESH_INTERVAL=900)
+    def test_recent_sync_holds_off_another_refresh(self):
+        service = self._service('new-athlete')
+        finished = timezone.now() - timedelta(minutes=5)
+        SyncJob.objects.create(job_type=SyncJob.TYPE_ATHLETE, athlete=service.athlete,
+                               status=SyncJob.STATUS_SUCCEEDED, finished_at=finished)
+
+        result = service.read_biometric_data(days=7)
+
+        self.assertFalse(result['freshness']['stale'])
+        self.assertEqual(result['freshness']['last_synced'], finished.isoformat())
+        self.assertEqual(SyncJob.objects.filter(athlete=service.athlete).count(), 1)
+
+    def test_view_returns_rows_with_freshness_headers(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='synced-athlete'))
+
+        response = client.get(reverse('get_biometric_data'), {'days': 7}, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response['X-Data-Stale'], 'false')
+        self.assertEqual(response['X-Data-Refresh-Pending'], 'false')
+        self.assertTrue(response['X-Data-Last-Synced'])
+        self.assertNotIn('X-Sync-Job-Id', response)
+
+
+@override_settings(SYNC_INCREMENTAL=True, SYNC_SETTLING_DAYS=3)
+class SyncWatermarkTest(DataSyncTestCase):
+    def setUp(self):
+        self.athlete = Athlete.objects.get(user__username='synced-athlete')
+        WhoopCredentials.objects.create(athlete=self.athlete, access_token='token', refresh_token='token',
+                                        expires_at=timezone.now() + timedelta(days=1))
+        self.athlete.refresh_from_db()
+        self.processor = mock.Mock()
+        self.processor.sync_data.return_value = True
+        self.today = timezone.now().date()
+
+    def _sync(self, *args, **kwargs):
+        service = DataSyncService(self.athlete)
+        with mock.patch.object(DataSyncService, '_create_processor', return_value=self.processor), \
+                mock.patch('core.services.data_sync_service.single_flight', lambda key, work, **options: work()):
+            return service.sync_specific_sources(['whoop'], *args, **kwargs)
+
+    def _synced_ranges(self):
+        ranges = [call.args[:2] for call in self.processor.sync_data.call_args_list]
+        self.processor.sync_data.reset_mock()
+        return ranges
+
+    def test_default_sync_resumes_after_the_settled_watermark(self):
+        self.assertEqual(self._sync(), {'whoop': True})
+        self.assertEqual(self._synced_ranges()[0][0], self.today - timedelta(days=30))
+
+        state = SyncState.objects.get(athlete=self.athlete, source='whoop')
+        self.assertEqual(state.settled_through, self.today - timedelta(days=3))
+        self.assertIsNotNone(state.last_success_at)
+
+        self._sync()
+        self.assertEqual(self._synced_ranges(), [
+            (self.today - timedelta(days=2), self.today - timedelta(days=1)),
+            (self.today, self.today),
+        ])
+
+    def test_ranges_that_leave_a_gap_do_not_move_the_watermark(self):
+        self._sync(self.today - timedelta(days=7), self.today)
+
+        state = SyncState.objects.get(athlete=self.athlete, source='whoop')
+        self.assertIsNone(state.settled_through)
+        self.assertIsNotNone(state.last_success_at)
+
+    def test_failed_history_does_not_move_the_watermark(self):
+        watermark = self.today - timedelta(days=10)
+        SyncState.objects.create(athlete=self.athlete, source='whoop', settled_through=watermark)
+        # Historical days fail while today's refresh succeeds
+        self.processor.sync_data.side_effect = lambda start, end, force_refresh=False: start == end == self.today
+
+        self.assertEqual(self._sync(), {'whoop': True})
+        self._sync()
+
+        state = SyncState.objects.get(athlete=self.athlete, source='whoop')
+        self.assertEqual(state.settled_through, watermark)
+        self.assertEqual(self._synced_ranges()[2], (watermark + timedelta(days=1), self.today - timedelta(days=1)))
+
+    def test_force_refresh_ignores_the_watermark(self):
+        SyncState.objects.create(athlete=self.athlete, source='whoop', settled_through=self.today - timedelta(days=3))
+
+        self._sync(force_refresh=True)
+
+        self.assertEqual(self._synced_ranges()[0][0], self.today - timedelta(days=30))
+
+
+@override_settings(EMPTY_DAY_CACHE_TTL=60)
+class EmptyDayCacheTest(DataSyncTestCase):
+    def setUp(self):
+        # new-athlete has no biometric data
+        self.athlete = Athlete.objects.get(user__username='new-athlete')
+        self.today = timezone.now().date()
+        self.addCleanup(EmptyDayCache(self.athlete.id, 'whoop').clear,
+                        [self.today - timedelta(days=offset) for offset in range(8)])
+
+    def test_whoop_stops_asking_for_a_day_it_returned_empty(self):
+        yesterday = self.today - timedelta(days=1)
+        processor = WhoopProcessor(self.athlete)
+        processor.collector = mock.Mock()
+        processor.collector.authenticate.return_value = True
+        processor.collector.fetch_cost_model.return_value = FetchCostModel()
+        processor.collector.collect_ranges.return_value = [{
+            'date': yesterday.isoformat(),
+            'daily_stats': {'date': yesterday.isoformat(), 'sleep_data': None, 'recovery_data': None,
+                            'cycle_data': None, 'workout_data': []},
+        }]
+
+        with mock.patch.object(WhoopProcessor, '_get_from_s3', return_value=[]), \
+                mock.patch.object(processor.s3_utils, 'store_json_data'):
+            processor.sync_data(yesterday, yesterday)
+            processor.sync_data(yesterday, yesterday)
+            processor.sync_data(yesterday, yesterday, force_refresh=True)
+
+        self.assertEqual(processor.collector.collect_ranges.call_count, 2)
+        self.assertEqual(processor.empty_days.known_empty([yesterday]), {yesterday})
+
+    def test_failed_fetches_are_not_cached_as_empty(self):
+        yesterday, before = self.today - timedelta(days=1), self.today - timedelta(days=2)
+        processor = WhoopProcessor(self.athlete)
+        processor.collector = mock.Mock()
+        processor.collector.authenticate.return_value = True
+        processor.collector.fetch_cost_model.return_value = FetchCostModel()
+        empty_stats = {'sleep_data': None, 'recovery_data': None, 'cycle_data': None, 'workout_data': []}
+        processor.collector.collect_ranges.return_value = [
+            {'date': before.isoformat(), 'daily_stats': {'date': before.isoformat(), **empty_stats}},
+            {'date': yesterday.isoformat(), 'daily_stats': {'date': yesterday.isoformat(), **empty_stats},
+             'error': 'WHOOP request failed'},
+        ]
+
+        with mock.patch.object(WhoopProcessor, '_get_from_s3', return_value=[]), \
+                mock.patch.object(processor.s3_utils, 'store_json_data') as store_raw:
+            success = processor.sync_data(before, yesterday)
+
+        self.assertFalse(success)
+        # The day that failed is not stored, and neither day is trusted as empty
+        self.assertEqual([call.args[1] for call in store_raw.call_args_list], [f"{before.isoformat()}_raw.json"])
+        self.assertEqual(processor.empty_days.known_empty([before, yesterday]), set())
+
+    def test_garmin_days_without_a_summary_are_not_cached_as_empty(self):
+        yesterday, before = self.today - timedelta(days=1), self.today - timedelta(days=2)
+        GarminCredentials.objects.create(athlete=self.athlete, access_token='token', refresh_token='token',
+                                         expires_at=timezone.now() + timedelta(days=1))
+        self.athlete.refresh_from_db()
+        processor = GarminProcessor(self.athlete)
+        self.addCleanup(processor.empty_days.clear, [before, yesterday])
+        raw_days = [
+            {'date': before.isoformat(), 'user_summary': {'totalSteps': None, 'restingHeartRate': None}},
+            {'date': yesterday.isoformat(), 'user_summary': {}},
+        ]
+
+        with mock.patch('core.services.data_processors.garmin_processor.GarminDataCollector') as collector, \
+                mock.patch.object(GarminCredentials, 'get_profile_config', return_value={'username': 'u', 'password': 'p'}):
+            collector.return_value.collect_data.return_value = raw_days
+            processor._get_from_api(before, yesterday)
+
+        self.assertEqual(processor.empty_days.known_empty([before, yesterday]), {before})
+
+    def test_known_empty_days_count_as_held_by_reads(self):
+        service = DataSyncService(self.athlete)
+        service.active_sources = ['whoop']
+        EmptyDayCache(self.athlete.id, 'whoop').mark([self.today - timedelta(days=offset) for offset in range(1, 8)])
+
+        gaps = service._window_gaps([], self.today - timedelta(days=7), self.today,
+                                    service._known_empty_dates(self.today - timedelta(days=7), self.today))
+
+        # Today is never cached, but the rest of the window is accounted for
+        self.assertEqual(gaps, (True, False))
+
+
+def _whoop_days(ranges):
+    """What the WHOOP collector returns for each requested range, one recorded sleep a day"""
+    days = []
+    for start, end in ranges:
+        for offset in range((end - start).days + 1):
+            day = (start + timedelta(days=offset)).isoformat()
+            days.append({'date': day, 'daily_stats': {'date': day, 'sleep_data': {'score': {}}, 'recovery_data': None,
+                                                      'cycle_data': None, 'workout_data': []}})
+    return days
+
+
+@override_settings(EMPTY_DAY_CACHE_TTL=0)
+class SyncPlanTest(DataSyncTestCase):
+    def setUp(self):
+        # new-athlete has no biometric data, it holds the days except these gaps
+        self.athlete = Athlete.objects.get(user__username='new-athlete')
+        WhoopCredentials.objects.create(athlete=self.athlete, access_token='token', refresh_token='token',
+                                        expires_at=timezone.now() + timedelta(days=1))
+        self.athlete.refresh_from_db()
+        self.today = timezone.now().date()
+        self.start, self.end = self._day(9), self._day(1)
+        self.gaps = [self._day(9), self._day(5), self._day(1)]
+        self.held = [self._day(offset) for offset in range(2, 9) if offset != 5]
+
+    def _day(self, offset):
+        return self.today - timedelta(days=offset)
+
+    def test_whoop_fetches_each_gap_on_its_own(self):
+        processor = WhoopProcessor(self.athlete)
+        processor.collector = mock.Mock()
+        processor.collector.authenticate.return_value = True
+        processor.collector.collect_ranges.side_effect = _whoop_days
+        processor.collector.fetch_cost_model.return_value = WhoopProcessor(self.athlete).fetch_cost_model()
+        held = [{'date': day.isoformat(), 'daily_stats': {'date': day.isoformat()}} for day in self.held]
+
+        with mock.patch.object(WhoopProcessor, '_get_from_s3', return_value=held), \
+                mock.patch.object(WhoopProcessor, '_store_daily_data', return_value=True), \
+                mock.patch.object(processor.s3_utils, 'store_json_data') as store_raw:
+            with override_settings(SYNC_PLAN_MERGE_GAPS=False):
+                processor.sync_data(self.start, self.end)
+            self.assertEqual(processor.collector.collect_ranges.call_args.args[0], [(day, day) for day in self.gaps])
+
+            # WHOOP ranges are cheap per day, merged they refetch the held days but don't store them again
+            store_raw.reset_mock()
+            processor.sync_data(self.start, self.end)
+            self.assertEqual(processor.collector.collect_ranges.call_args.args[0], [(self.start, self.end)])
+            self.assertEqual(sorted(call.args[1] for call in store_raw.call_args_list),
+                             [f"{day.isoformat()}_raw.json" for day in self.gaps])
+
+    def test_garmin_fetches_what_s3_lacks_even_when_it_has_some(self):
+        processor = GarminProcessor(self.athlete)
+        held = [{'date': day} for day in self.held + [self.start]]
+
+        with mock.patch.object(GarminProcessor, '_get_from_s3', return_value=held), \
+                mock.patch.object(GarminProcessor, '_queue_processed_data'), \
+                mock.patch.object(GarminProcessor, '_get_from_api', return_value=None) as get_from_api:
+            processor.sync_data(self.start, self.end)
+
+        self.assertEqual([call.args for call in get_from_api.call_args_list], [(day, day) for day in self.gaps[1:]])
+
+    def test_dry_run_lists_the_ranges_without_fetching(self):
+        for day in self.held + [self.start]:
+            CoreBiometricData.objects.create(athlete=self.athlete, date=day, source='whoop')
+        client = APIClient()
+        client.force_authenticate(self.athlete.user)
+        url = reverse('plan_biometric_sync')
+        params = {'start_date': self.start.isoformat(), 'end_date': self.end.isoformat()}
+
+        with mock.patch.object(S3Utils, 'get_available_dates', return_value=set()), \
+                mock.patch('core.services.data_collectors.whoop_collector.WhoopCollector.collect_ranges') as collect:
+            response = client.get(url, {**params, 'merge_gaps': 'false'}, secure=True)
+            merged = client.get(url, params, secure=True)
+            invalid = client.get(url, {'start_date': 'yesterday'}, secure=True)
+        collect.assert_not_called()
+
+        self.assertEqual(response.status_code, 200)
+        plan, = response.data['sources']['whoop']['plans']
+        self.assertEqual([(r['start_date'], r['end_date']) for r in plan['ranges']],
+                         [(day.isoformat(), day.isoformat()) for day in self.gaps[1:]])
+        self.assertEqual(plan['fetch_days'], 2)
+        merged_plan, = merged.data['sources']['whoop']['plans']
+        self.assertEqual(len(merged_plan['ranges']), 1)
+        self.assertLess(merged_plan['estimated_requests'], plan['estimated_requests'])
+        self.assertEqual(invalid.status_code, 400)
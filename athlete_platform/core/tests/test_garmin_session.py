@@ -0,0 +1,138 @@
+"""
+Cached Garmin sessions: resuming from a GarminSessionToken, falling back to a
+full login when the cached tokens are rejected, and keeping refreshed tokens.
+Collection itself is covered in services/test_garmin_collection.py.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_garmin_session
+"""
+import unittest
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.db import connection
+from django.test import TestCase
+
+from core.models import GarminSessionToken
+from core.utils.encryption_utils import decrypt_value, encrypt_value
+from core.utils.garmin_utils import GarminDataCollector
+
+PROFILE = 'primary'
+# garminconnect only reads token stores longer than 512 characters as tokens
+TOKENS = 'cached-' + 'a' * 600
+REFRESHED_TOKENS = 'refreshed-' + 'b' * 600
+LOGIN_TOKENS = 'login-' + 'c' * 600
+
+
+class FakeGarmin:
+    """Stands in for garminconnect.Garmin, accepting only the token store it is told to"""
+
+    accepted_tokens = TOKENS
+    dumps_after_login = None
+    instances = []
+
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.tokenstore = None
+        self.garth = mock.Mock()
+        self.garth.dumps.side_effect = lambda: self.dumps_after_login or self.tokenstore or LOGIN_TOKENS
+        FakeGarmin.instances.append(self)
+
+    def login(self, tokenstore=None):
+        if tokenstore is not None and tokenstore != self.accepted_tokens:
+            raise Exception("401 Unauthorized")
+        self.tokenstore = tokenstore
+
+
+class GarminSessionTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    def setUp(self):
+        FakeGarmin.instances = []
+        FakeGarmin.accepted_tokens = TOKENS
+        FakeGarmin.dumps_after_login = None
+        patcher = mock.patch('core.utils.garmin_utils.garminconnect.Garmin', FakeGarmin)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.collector = GarminDataCollector(
+            {'username': encrypt_value('athlete@example.com'), 'password': encrypt_value('secret')},
+            profile_type=PROFILE,
+        )
+
+    def _cache(self, tokens=TOKENS):
+        return GarminSessionToken.objects.create(profile_type=PROFILE, encrypted_tokens=encrypt_value(tokens))
+
+
+class ResumeTest(GarminSessionTestCase):
+    def test_a_cached_session_is_resumed_without_logging_in(self):
+        session = self._cache()
+
+        self.assertTrue(self.collector.authenticate())
+
+        client, = FakeGarmin.instances
+        self.assertEqual(client.tokenstore, TOKENS)
+        session.refresh_from_db()
+        self.assertEqual((session.resume_count, session.login_count, session.resume_failure_count), (1, 0, 0))
+        self.assertIsNotNone(session.last_resumed_at)
+
+    def test_refreshed_tokens_are_written_back(self):
+        session = self._cache()
+        FakeGarmin.dumps_after_login = REFRESHED_TOKENS
+
+        self.assertTrue(self.collector.authenticate())
+
+        session.refresh_from_db()
+        self.assertEqual(decrypt_value(session.encrypted_tokens), REFRESHED_TOKENS)
+
+    def test_unchanged_tokens_are_not_rewritten(self):
+        session = self._cache()
+        stored = session.encrypted_tokens
+
+        self.collector.authenticate()
+
+        session.refresh_from_db()
+        self.assertEqual(session.encrypted_tokens, stored)
+
+
+class FallbackTest(GarminSessionTestCase):
+    def test_rejected_tokens_fall_back_to_a_full_login(self):
+        session = self._cache()
+        FakeGarmin.accepted_tokens = 'something else'
+
+        self.assertTrue(self.collector.authenticate())
+
+        resume, login = FakeGarmin.instances
+        self.assertIsNone(login.tokenstore)
+        self.assertIs(self.collector.garmin_client, login)
+        session.refresh_from_db()
+        self.assertEqual((session.resume_failure_count, session.login_count), (1, 1))
+        # The fresh login's tokens replace the rejected ones
+        self.assertEqual(decrypt_value(session.encrypted_tokens), LOGIN_TOKENS)
+
+    def test_unreadable_tokens_fall_back_without_trying_them(self):
+        self._cache(tokens='short')
+
+        self.assertTrue(self.collector.authenticate())
+
+        login, = FakeGarmin.instances
+        self.assertIsNone(login.tokenstore)
+
+    def test_a_first_login_caches_the_session(self):
+        self.assertTrue(self.collector.authenticate())
+
+        session = GarminSessionToken.objects.get(profile_type=PROFILE)
+        self.assertEqual(session.login_count, 1)
+        self.assertEqual(decrypt_value(session.encrypted_tokens), LOGIN_TOKENS)
@@ -0,0 +1,217 @@
+"""
+Background sync jobs: enqueueing, claiming, running and cancelling.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_sync_jobs
+"""
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Athlete, SyncJob, User
+from core.services.data_sync_service import DataSyncService
+from core.services.sync_job_service import BACKEND_WORKER, SyncJobService
+
+
+@override_settings(SYNC_JOB_STALE_SECONDS=600)
+class SyncJobTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Skip the S3 directory setup that runs when a user is created
+        with mock.patch('core.signals.UserStorageService'):
+            cls.user = User.objects.create(username='sync-athlete', role='ATHLETE')
+            cls.other_user = User.objects.create(username='other-athlete', role='ATHLETE')
+        cls.athlete = Athlete.objects.get(user=cls.user)
+
+    def setUp(self):
+        # The polling worker backend never dispatches, so jobs stay queued until run() claims them
+        self.service = SyncJobService(backend=BACKEND_WORKER)
+
+    def _age(self, job, seconds):
+        # update() skips auto_now, so the job looks untouched since then
+        SyncJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(seconds=seconds))
+
+
+class EnqueueTest(SyncJobTestCase):
+    def test_same_params_reuse_the_active_job(self):
+        first = self.service.enqueue_athlete_sync(self.athlete, reason='login')
+        again = self.service.enqueue_athlete_sync(self.athlete, reason='manual')
+        forced = self.service.enqueue_athlete_sync(self.athlete, force_refresh=True)
+
+        self.assertEqual(again.id, first.id)
+        self.assertNotEqual(forced.id, first.id)
+        self.assertEqual(SyncJob.objects.filter(athlete=self.athlete).count(), 2)
+
+    def test_finished_jobs_are_not_reused(self):
+        first = self.service.enqueue_athlete_sync(self.athlete)
+        SyncJob.objects.filter(id=first.id).update(status=SyncJob.STATUS_SUCCEEDED)
+
+        self.assertNotEqual(self.service.enqueue_athlete_sync(self.athlete).id, first.id)
+
+    def test_a_job_past_its_lease_is_replaced(self):
+        # The worker thread running it died with the process
+        dead = self.service.enqueue_athlete_sync(self.athlete, reason='login')
+        SyncJob.objects.filter(id=dead.id).update(status=SyncJob.STATUS_RUNNING, started_at=timezone.now())
+        self._age(dead, 601)
+
+        job = self.service.enqueue_athlete_sync(self.athlete, reason='login')
+
+        self.assertNotEqual(job.id, dead.id)
+        self.assertEqual(job.status, SyncJob.STATUS_QUEUED)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, SyncJob.STATUS_FAILED)
+        self.assertEqual(dead.error, "Worker stopped responding")
+
+    def test_a_job_within_its_lease_is_kept(self):
+        running = self.service.enqueue_athlete_sync(self.athlete)
+        SyncJob.objects.filter(id=running.id).update(status=SyncJob.STATUS_RUNNING, started_at=timezone.now())
+        self._age(running, 300)
+
+        self.assertEqual(self.service.enqueue_athlete_sync(self.athlete).id, running.id)
+
+    def test_stale_reads_queue_a_new_refresh_over_a_dead_job(self):
+        sync_service = DataSyncService(self.athlete)
+        sync_service.active_sources = ['whoop']
+        first = sync_service.read_biometric_data(days=7)['freshness']
+        self._age(SyncJob.objects.get(id=first['sync_job_id']), 601)
+
+        second = sync_service.read_biometric_data(days=7)['freshness']
+
+        self.assertTrue(second['refresh_pending'])
+        self.assertNotEqual(second['sync_job_id'], first['sync_job_id'])
+
+
+class RunTest(SyncJobTestCase):
+    def test_a_job_is_claimed_run_and_finished_once(self):
+        job = self.service.enqueue_athlete_sync(self.athlete, sources=['whoop'])
+
+        with mock.patch.object(DataSyncService, 'sync_specific_sources', return_value={'whoop': True}) as sync:
+            finished = self.service.run(job.id)
+            rerun = self.service.run(job.id)
+
+        sync.assert_called_once()
+        self.assertIsNone(rerun)
+        self.assertEqual(finished.status, SyncJob.STATUS_SUCCEEDED)
+        self.assertEqual(finished.attempts, 1)
+        self.assertEqual(finished.progress, 100)
+        self.assertEqual(finished.result, {'success': {'whoop': True}, 'errors': {}})
+        self.assertIsNotNone(finished.started_at)
+        self.assertIsNotNone(finished.finished_at)
+
+    def test_failures_store_the_message_without_the_traceback(self):
+        job = self.service.enqueue_athlete_sync(self.athlete, sources=['whoop'])
+
+        with mock.patch.object(DataSyncService, 'sync_specific_sources',
+                               side_effect=RuntimeError("WHOOP is down\nsecret detail")):
+            finished = self.service.run(job.id)
+
+        self.assertEqual(finished.status, SyncJob.STATUS_FAILED)
+        self.assertEqual(finished.error, "WHOOP is down")
+        self.assertNotIn('Traceback', finished.to_dict()['error'])
+
+    def test_run_pending_runs_queued_jobs(self):
+        self.service.enqueue_athlete_sync(self.athlete, sources=['whoop'])
+        self.service.enqueue_athlete_sync(self.athlete, sources=['garmin'])
+
+        with mock.patch.object(DataSyncService, 'sync_specific_sources', return_value={'whoop': True}):
+            self.assertEqual(self.service.run_pending(), 2)
+
+        self.assertFalse(SyncJob.objects.filter(status=SyncJob.STATUS_QUEUED).exists())
+
+
+class RequeueTest(SyncJobTestCase):
+    def _running(self, started_seconds_ago):
+        job = self.service.enqueue_athlete_sync(self.athlete)
+        SyncJob.objects.filter(id=job.id).update(
+            status=SyncJob.STATUS_RUNNING, attempts=1,
+            started_at=timezone.now() - timedelta(seconds=started_seconds_ago)
+        )
+        return job
+
+    def test_a_long_job_still_reporting_progress_is_left_running(self):
+        job = self._running(started_seconds_ago=3600)
+        self.service._set_progress(job, 50, "Synced 5 of 10 athletes")
+
+        self.assertEqual(self.service.requeue_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_RUNNING)
+
+    def test_a_job_that_stopped_reporting_is_requeued(self):
+        job = self._running(started_seconds_ago=3600)
+        self._age(job, 601)
+
+        self.assertEqual(self.service.requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_QUEUED)
+
+
+class CancelTest(SyncJobTestCase):
+    def test_queued_jobs_cancel(self):
+        job = self.service.enqueue_athlete_sync(self.athlete)
+
+        self.assertTrue(self.service.cancel(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_CANCELLED)
+        self.assertIsNone(self.service.run(job.id))
+
+    def test_finished_and_running_athlete_jobs_do_not(self):
+        finished = self.service.enqueue_athlete_sync(self.athlete, sources=['whoop'])
+        running = self.service.enqueue_athlete_sync(self.athlete, sources=['garmin'])
+        SyncJob.objects.filter(id=finished.id).update(status=SyncJob.STATUS_SUCCEEDED)
+        SyncJob.objects.filter(id=running.id).update(status=SyncJob.STATUS_RUNNING)
+
+        self.assertFalse(self.service.cancel(finished))
+        self.assertFalse(self.service.cancel(running))
+
+
+class SyncJobStatusViewTest(SyncJobTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.job = self.service.enqueue_athlete_sync(self.athlete)
+
+    def test_the_athlete_sees_their_job(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(reverse('sync_job_status', args=[self.job.id]), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], str(self.job.id))
+        self.assertEqual(response.data['status'], SyncJob.STATUS_QUEUED)
+
+    def test_other_users_do_not(self):
+        self.client.force_authenticate(self.other_user)
+
+        response = self.client.get(reverse('sync_job_status', args=[self.job.id]), secure=True)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_cancel_endpoint(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(reverse('cancel_sync_job', args=[self.job.id]), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+        self.assertEqual(response.data['job']['status'], SyncJob.STATUS_CANCELLED)
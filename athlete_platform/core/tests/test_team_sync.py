@@ -0,0 +1,159 @@
+"""
+Concurrent team syncs: per-athlete and total time budgets, and cancellation.
+Each athlete's sync is a stub that returns, sleeps or blocks, so nothing is
+fetched.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_team_sync
+"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Athlete, Team, User
+from core.services.coach_data_sync_service import CoachDataSyncService
+from core.services.data_sync_service import DataSyncService
+
+
+class TeamSyncTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Skip the S3 directory setup that runs when a user is created
+        with mock.patch('core.signals.UserStorageService'):
+            coach = User.objects.create(username='sync-coach', role='COACH')
+            cls.team = Team.objects.create(name='Sync Team', coach=coach)
+            for number in range(4):
+                user = User.objects.create(username=f'sync-athlete{number}', role='ATHLETE')
+                athlete = Athlete.objects.get(user=user)
+                athlete.team = cls.team
+                athlete.save()
+
+    def setUp(self):
+        self.service = CoachDataSyncService(team=self.team)
+        self.release = threading.Event()
+        # Blocked stubs must not outlive the test
+        self.addCleanup(self.release.set)
+        self.calls = []
+        self.calls_lock = threading.Lock()
+        patcher = mock.patch.object(CoachDataSyncService, 'SYNC_POLL_SECONDS', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stub(self, behave):
+        """Replace each athlete's sync with behave(call_number, athlete), then report success"""
+        def sync_athlete(athlete, days=7, force_refresh=False):
+            with self.calls_lock:
+                self.calls.append(athlete.user.username)
+                call_number = len(self.calls)
+            behave(call_number, athlete)
+            return {'success': True, 'message': "Synced"}
+        patcher = mock.patch.object(self.service, '_sync_athlete_data', side_effect=sync_athlete)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _statuses(result):
+        return {entry['username']: entry['status'] for entry in result['results']}
+
+
+class AthleteTimeoutTest(TeamSyncTestCase):
+    def test_a_stuck_athlete_times_out_and_the_rest_of_the_team_finishes(self):
+        self._stub(lambda call_number, athlete: athlete.user.username == 'sync-athlete0' and self.release.wait(5))
+
+        started = time.monotonic()
+        result = self.service.sync_team_data(max_workers=2, athlete_timeout=0.2)
+
+        self.assertLess(time.monotonic() - started, 2)
+        statuses = self._statuses(result)
+        self.assertEqual(statuses.pop('sync-athlete0'), 'timed_out')
+        self.assertEqual(set(statuses.values()), {'success'})
+        self.assertEqual((result['sync_count'], result['timed_out_count'], result['failed_count']), (3, 1, 1))
+
+
+class TotalTimeoutTest(TeamSyncTestCase):
+    def test_athletes_not_started_by_the_deadline_are_skipped(self):
+        self._stub(lambda call_number, athlete: time.sleep(0.3))
+
+        result = self.service.sync_team_data(max_workers=1, total_timeout=0.1)
+
+        # The running athlete finishes within its own budget, nobody starts after the deadline
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(sorted(self._statuses(result).values()), ['cancelled', 'cancelled', 'cancelled', 'success'])
+        self.assertEqual(result['sync_count'], 1)
+
+
+class CancelTest(TeamSyncTestCase):
+    def test_cancel_event_skips_athletes_not_yet_started(self):
+        cancel_event = threading.Event()
+
+        def cancel_during_first(call_number, athlete):
+            if call_number == 1:
+                cancel_event.set()
+                time.sleep(0.1)
+        self._stub(cancel_during_first)
+
+        result = self.service.sync_team_data(max_workers=1, cancel_event=cancel_event)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(sorted(self._statuses(result).values()), ['cancelled', 'cancelled', 'cancelled', 'success'])
+        self.assertIn('3 cancelled', result['message'])
+
+    def test_cancel_sync_from_another_service_instance(self):
+        def cancel_during_first(call_number, athlete):
+            if call_number == 1:
+                # The flag lives in the cache, so any worker can set it
+                CoachDataSyncService(team=self.team).cancel_sync()
+                time.sleep(0.1)
+        self._stub(cancel_during_first)
+
+        result = self.service.sync_team_data(max_workers=1)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(list(self._statuses(result).values()).count('cancelled'), 3)
+
+    def test_a_cancel_left_over_from_an_earlier_sync_is_ignored(self):
+        self.service.cancel_sync()
+        self._stub(lambda call_number, athlete: None)
+
+        result = self.service.sync_team_data(max_workers=2)
+
+        self.assertEqual(set(self._statuses(result).values()), {'success'})
+        self.assertEqual(len(self.calls), 4)
+
+
+class ForceRefreshTest(TeamSyncTestCase):
+    def test_a_forced_team_sync_forces_every_athlete(self):
+        with mock.patch.object(DataSyncService, 'sync_data', return_value=True) as sync_data:
+            self.service.sync_team_data(max_workers=2, force_refresh=True)
+
+        self.assertEqual(sync_data.call_count, 4)
+        self.assertTrue(all(call.kwargs['force_refresh'] for call in sync_data.call_args_list))
+
+    def test_sync_data_passes_force_refresh_to_the_sources(self):
+        sync_service = DataSyncService(Athlete.objects.get(user__username='sync-athlete0'))
+        sync_service.active_sources = ['whoop']
+
+        with mock.patch.object(sync_service, 'sync_specific_sources', return_value={'whoop': False}) as sync:
+            self.assertFalse(sync_service.sync_data(force_refresh=True))
+
+        # Already forced, so no second forced attempt
+        sync.assert_called_once_with(['whoop'], None, None, force_refresh=True)
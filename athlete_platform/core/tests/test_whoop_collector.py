@@ -0,0 +1,204 @@
+"""
+WHOOP collection against mocked API responses: pagination, bucketing range
+query records into the athlete's local days, and failed fetches.
+
+These need Django settings, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_whoop_collector
+"""
+import asyncio
+import unittest
+from datetime import date
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.test import SimpleTestCase, override_settings
+
+from core.services.data_collectors.whoop_collector import WhoopCollector
+from core.services.exceptions import CollectorError
+
+BASE_URL = WhoopCollector.BASE_URL
+
+
+class FakeWhoopApi:
+    """Answers async_make_request from canned pages, failing the paths it is told to"""
+
+    def __init__(self, pages=None, fail=(), fail_ranges=False):
+        self.pages = pages or {}
+        self.fail = set(fail)
+        self.fail_ranges = fail_ranges
+        self.calls = []
+
+    async def __call__(self, method, url, params=None):
+        params = params or {}
+        self.calls.append((url, dict(params)))
+        path = url[len(BASE_URL):]
+        # Range queries are the ones asking for a page size
+        if path in self.fail or (self.fail_ranges and 'limit' in params):
+            return None
+        if path in self.pages:
+            return self.pages[path][params.get('nextToken')]
+        resource, _, rest = path.rpartition('/')
+        if rest == 'recovery' and resource.startswith('/cycle/'):
+            cycle_id = int(resource.split('/')[-1])
+            return next((record for record in self._records('/recovery') if record.get('cycle_id') == cycle_id), None)
+        if rest.isdigit():
+            # Detail requests answer with the listed record, or a bare one
+            return next((record for record in self._records(resource) if record.get('id') == int(rest)),
+                        {'id': int(rest), 'score': {}})
+        return {'records': []}
+
+    def _records(self, path):
+        return [record for page in self.pages.get(path, {}).values() if page for record in page['records']]
+
+
+@override_settings(WHOOP_RANGE_FETCH=True)
+class WhoopCollectorTestCase(SimpleTestCase):
+    def setUp(self):
+        athlete = mock.Mock()
+        athlete.user.username = 'whoop-athlete'
+        self.collector = WhoopCollector(athlete)
+
+    def _use(self, api):
+        patcher = mock.patch.object(self.collector, 'async_make_request', new=api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return api
+
+    def _collect(self, start, end):
+        return asyncio.run(self.collector._collect_ranges_authenticated_async([(start, end)]))
+
+
+class PaginationTest(WhoopCollectorTestCase):
+    def test_pages_are_followed_until_there_is_no_next_token(self):
+        api = self._use(FakeWhoopApi({'/cycle': {
+            None: {'records': [{'id': 3}, {'id': 2}], 'next_token': 'page-2'},
+            'page-2': {'records': [{'id': 1}], 'next_token': None},
+        }}))
+
+        records = asyncio.run(self.collector._get_all_records_async(f"{BASE_URL}/cycle", {'limit': 25}))
+
+        self.assertEqual([record['id'] for record in records], [3, 2, 1])
+        self.assertEqual([params for _, params in api.calls],
+                         [{'limit': 25}, {'limit': 25, 'nextToken': 'page-2'}])
+
+    def test_a_failed_page_raises_instead_of_returning_the_pages_before_it(self):
+        self._use(FakeWhoopApi({'/cycle': {
+            None: {'records': [{'id': 3}], 'next_token': 'page-2'},
+            'page-2': None,
+        }}))
+
+        with self.assertRaises(CollectorError):
+            asyncio.run(self.collector._get_all_records_async(f"{BASE_URL}/cycle"))
+
+
+class DayBucketingTest(WhoopCollectorTestCase):
+    def test_records_land_on_the_athletes_local_day(self):
+        cycle = {'id': 7, 'start': '2025-03-01T23:30:00.000Z', 'timezone_offset': '+02:00', 'score': {'strain': 9.1}}
+        records = {
+            # 23:30 UTC is already the 2nd two hours east of Greenwich
+            'cycle': [cycle],
+            # 03:30 UTC is still the evening of the 1st five hours west
+            'sleep': [{'id': 11, 'start': '2025-03-02T03:30:00.000Z', 'timezone_offset': '-05:00', 'score': {}}],
+            # Matched to its cycle's day, not its own creation time
+            'recovery': [{'cycle_id': 7, 'created_at': '2025-03-03T08:00:00.000Z', 'score': {'recovery_score': 64}}],
+            'workout': [
+                {'id': 21, 'start': '2025-03-01T00:30:00.000Z', 'timezone_offset': '-01:00'},
+                {'id': 22, 'start': '2025-03-03T23:59:00.000Z'},
+            ],
+        }
+
+        days = WhoopCollector._bucket_range_records([date(2025, 3, 1), date(2025, 3, 2)], records)
+
+        self.assertEqual(days[date(2025, 3, 1)]['sleep_data']['id'], 11)
+        self.assertIsNone(days[date(2025, 3, 1)]['cycle_data'])
+        self.assertEqual(days[date(2025, 3, 2)]['cycle_data']['id'], 7)
+        self.assertEqual(days[date(2025, 3, 2)]['recovery_data'], {'recovery_score': 64})
+        self.assertEqual(days[date(2025, 3, 2)]['cycle_data']['recovery'], {'recovery_score': 64})
+        # The first workout was on the 28th locally, the second is outside the window
+        self.assertEqual(days[date(2025, 3, 1)]['workout_data'], [])
+        self.assertEqual(days[date(2025, 3, 2)]['workout_data'], [])
+
+    def test_range_collection_returns_every_day_of_the_range(self):
+        self._use(FakeWhoopApi({'/activity/sleep': {None: {'records': [
+            {'id': 11, 'start': '2025-03-02T03:30:00.000Z', 'timezone_offset': '-05:00', 'score': {}},
+        ]}}}))
+
+        days = self._collect(date(2025, 3, 1), date(2025, 3, 2))
+
+        self.assertEqual([day['date'] for day in days], ['2025-03-01', '2025-03-02'])
+        self.assertEqual(days[0]['daily_stats']['sleep_data']['id'], 11)
+        self.assertIsNone(days[1]['daily_stats']['sleep_data'])
+        self.assertFalse(any('error' in day for day in days))
+
+
+class DayConventionTest(WhoopCollectorTestCase):
+    RECORDS = {
+        '/cycle': [
+            {'id': 8, 'start': '2025-03-02T21:00:00.000Z', 'timezone_offset': '+05:00', 'score': {'strain': 12.0}},
+            {'id': 7, 'start': '2025-03-01T23:30:00.000Z', 'timezone_offset': '+02:00', 'score': {'strain': 9.1}},
+        ],
+        '/activity/sleep': [
+            # Both sleeps start on a different UTC day than the athlete's local one
+            {'id': 12, 'start': '2025-03-04T02:00:00.000Z', 'timezone_offset': '-05:00', 'nap': False, 'score': {}},
+            {'id': 11, 'start': '2025-03-01T23:30:00.000Z', 'timezone_offset': '+02:00', 'nap': False, 'score': {}},
+        ],
+        '/recovery': [
+            {'cycle_id': 8, 'created_at': '2025-03-03T06:00:00.000Z', 'score': {'recovery_score': 71}},
+            {'cycle_id': 7, 'created_at': '2025-03-02T06:00:00.000Z', 'score': {'recovery_score': 64}},
+        ],
+        '/activity/workout': [
+            {'id': 21, 'start': '2025-03-02T00:30:00.000Z', 'timezone_offset': '-01:00', 'sport_id': 1, 'score': {}},
+        ],
+    }
+
+    def _collect_with(self, range_fetch):
+        self.collector.range_fetch = range_fetch
+        self._use(FakeWhoopApi({path: {None: {'records': records}} for path, records in self.RECORDS.items()}))
+        return {day['date']: day['daily_stats'] for day in self._collect(date(2025, 3, 1), date(2025, 3, 3))}
+
+    def test_range_and_day_queries_file_records_under_the_same_day(self):
+        by_range = self._collect_with(range_fetch=True)
+        by_day = self._collect_with(range_fetch=False)
+
+        self.assertEqual(by_day, by_range)
+        self.assertEqual(by_range['2025-03-02']['sleep_data']['id'], 11)
+        self.assertEqual(by_range['2025-03-03']['sleep_data']['id'], 12)
+        self.assertEqual(by_range['2025-03-02']['recovery_data'], {'recovery_score': 64})
+        self.assertEqual(by_range['2025-03-01']['workout_data'][0]['id'], 21)
+        self.assertEqual(by_range['2025-03-03']['cycle_data']['recovery'], {'recovery_score': 71})
+
+
+class FailedFetchTest(WhoopCollectorTestCase):
+    def test_a_failed_range_query_falls_back_to_day_queries(self):
+        api = self._use(FakeWhoopApi({'/activity/sleep': {None: {'records': [
+            {'id': 11, 'start': '2025-03-01T22:00:00.000Z', 'score': {}},
+        ]}}}, fail_ranges=True))
+
+        days = self._collect(date(2025, 3, 1), date(2025, 3, 2))
+
+        self.assertFalse(any('error' in day for day in days))
+        self.assertEqual(days[0]['daily_stats']['sleep_data']['id'], 11)
+        self.assertTrue(any('limit' not in params for url, params in api.calls if url.endswith('/activity/sleep')))
+
+    def test_days_that_cannot_be_fetched_are_reported_as_errors(self):
+        self._use(FakeWhoopApi(fail={'/recovery'}))
+
+        days = self._collect(date(2025, 3, 1), date(2025, 3, 2))
+
+        self.assertEqual([day['date'] for day in days], ['2025-03-01', '2025-03-02'])
+        self.assertTrue(all('error' in day for day in days))
+
+    def test_a_failed_detail_request_is_not_an_empty_day(self):
+        self._use(FakeWhoopApi({'/activity/sleep': {None: {'records': [
+            {'id': 11, 'start': '2025-03-01T22:00:00.000Z', 'score': {}},
+        ]}}}, fail={'/activity/sleep/11'}, fail_ranges=True))
+
+        days = self._collect(date(2025, 3, 1), date(2025, 3, 1))
+
+        self.assertIn('error', days[0])
@@ -0,0 +1,225 @@
+"""
+WHOOP webhook ingestion, replayed from the recorded payloads in fixtures/whoop.
+
+These need a database, so run them with Django's test runner:
+
+    python manage.py test core.tests.test_whoop_webhooks
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+
+if not settings.configured:
+    # Plain pytest runs without Django settings, see core/tests/services for those tests
+    raise unittest.SkipTest("Run with python manage.py test")
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Athlete, CoreBiometricData, SyncJob, User, WhoopCredentials
+from core.services.data_collectors.whoop_collector import WhoopCollector
+from core.services.data_sync_service import DataSyncService
+from core.services.sync_job_service import SyncJobService
+from core.services.whoop_webhook_service import verify_signature
+from core.utils.s3_utils import S3Utils
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'whoop'
+SECRET = 'test-client-secret'
+
+
+def _fixture(name):
+    return (FIXTURES / name).read_bytes()
+
+
+def _sign(body, timestamp=None):
+    timestamp = timestamp or str(int(time.time() * 1000))
+    digest = hmac.new(SECRET.encode(), timestamp.encode() + body, hashlib.sha256).digest()
+    return {
+        'HTTP_X_WHOOP_SIGNATURE': base64.b64encode(digest).decode(),
+        'HTTP_X_WHOOP_SIGNATURE_TIMESTAMP': timestamp,
+    }
+
+
+@override_settings(WHOOP_CLIENT_SECRET=SECRET, WHOOP_WEBHOOK_MAX_AGE=300)
+class WhoopWebhookTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Refuse to write fixtures into a real database if run outside the test runner
+        name = str(connection.settings_dict.get('NAME') or '')
+        if not (name.startswith('test_') or 'memory' in name):
+            raise unittest.SkipTest("Needs the test database, run with python manage.py test")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Skip the S3 directory setup that runs when a user is created
+        with mock.patch('core.signals.UserStorageService'):
+            user = User.objects.create(username='whoop-athlete', role='ATHLETE')
+        cls.athlete = Athlete.objects.get(user=user)
+        WhoopCredentials.objects.create(
+            athlete=cls.athlete, access_token='token', refresh_token='token',
+            expires_at=timezone.now() + timedelta(days=1), whoop_user_id='10129',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('whoop-webhook')
+
+    def _post(self, body, **headers):
+        return self.client.generic('POST', self.url, body, content_type='application/json', secure=True,
+                                   **(headers or _sign(body)))
+
+
+class WhoopWebhookViewTest(WhoopWebhookTestCase):
+    def test_signed_event_queues_one_fetch_of_the_record(self):
+        body = _fixture('webhook_recovery_updated.json')
+
+        first = self._post(body)
+        # WHOOP redelivers events it isn't sure arrived
+        retry = self._post(body)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.json()['job_id'], first.json()['job_id'])
+        job = SyncJob.objects.get(athlete=self.athlete)
+        self.assertEqual(job.job_type, SyncJob.TYPE_WHOOP_EVENT)
+        self.assertEqual(job.params, {'record_type': 'recovery', 'record_id': 'ecfc6a15-4661-442f-a9a4-f160dd7afae8'})
+        self.assertIsNotNone(WhoopCredentials.objects.get(athlete=self.athlete).last_webhook_at)
+
+    def test_bad_or_stale_signatures_are_refused(self):
+        body = _fixture('webhook_recovery_updated.json')
+        stale = str(int((time.time() - 600) * 1000))
+
+        self.assertEqual(self._post(body, **_sign(body + b' ')).status_code, 401)
+        self.assertEqual(self._post(body, **_sign(body, timestamp=stale)).status_code, 401)
+        self.assertEqual(self.client.post(self.url, body, content_type='application/json', secure=True).status_code, 401)
+        self.assertFalse(SyncJob.objects.exists())
+
+    def test_unknown_users_are_acknowledged_and_ignored(self):
+        event = json.loads(_fixture('webhook_workout_updated.json'))
+        event['user_id'] = 99999
+        body = json.dumps(event).encode()
+
+        response = self._post(body)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ignored')
+        self.assertFalse(SyncJob.objects.exists())
+
+    def test_malformed_events_are_rejected(self):
+        self.assertEqual(self._post(b'{"user_id": 10129, "id": 1}').status_code, 400)
+        self.assertEqual(self._post(b'not json').status_code, 400)
+
+    def test_deletions_resync_recent_days(self):
+        self._post(_fixture('webhook_sleep_deleted.json'))
+
+        job = SyncJob.objects.get(athlete=self.athlete)
+        self.assertEqual(job.job_type, SyncJob.TYPE_ATHLETE)
+        self.assertEqual(job.params['sources'], ['whoop'])
+        self.assertTrue(job.params['force_refresh'])
+
+    def test_active_webhooks_close_the_settling_window(self):
+        self.assertEqual(DataSyncService(self.athlete)._settling_days('whoop'), settings.SYNC_SETTLING_DAYS)
+
+        self._post(_fixture('webhook_workout_updated.json'))
+
+        athlete = Athlete.objects.get(pk=self.athlete.pk)
+        self.assertEqual(DataSyncService(athlete)._settling_days('whoop'), 0)
+        self.assertEqual(DataSyncService(athlete)._settling_days('garmin'), settings.SYNC_SETTLING_DAYS)
+
+    def test_signature_matches_whoops_scheme(self):
+        body = _fixture('webhook_recovery_updated.json')
+        headers = _sign(body, timestamp='1650000000000')
+
+        self.assertTrue(verify_signature(body, '1650000000000', headers['HTTP_X_WHOOP_SIGNATURE'],
+                                         now=1650000000.0))
+        self.assertFalse(verify_signature(body, '1650000000000', headers['HTTP_X_WHOOP_SIGNATURE'],
+                                          secret='another-secret', now=1650000000.0))
+
+
+class WhoopEventIngestTest(WhoopWebhookTestCase):
+    SLEEP_DAY = date(2022, 4, 23)
+
+    def setUp(self):
+        super().setUp()
+        api = {
+            '/activity/sleep/ecfc6a15-4661-442f-a9a4-f160dd7afae8': json.loads(_fixture('api_sleep.json')),
+            '/cycle/93845/recovery': json.loads(_fixture('api_cycle_recovery.json')),
+            '/activity/workout/1043': json.loads(_fixture('api_workout.json')),
+        }
+        self.requests = []
+
+        async def recorded_api(collector, method, url, params=None):
+            self.requests.append(url)
+            return api.get(url.replace(WhoopCollector.BASE_URL, ''))
+
+        # The day as a sync stored it, before WHOOP rescored the recovery
+        self.stored_day = {
+            'date': self.SLEEP_DAY.isoformat(),
+            'daily_stats': {
+                'date': self.SLEEP_DAY.isoformat(),
+                'sleep_data': None,
+                'recovery_data': {'recovery_score': 10, 'resting_heart_rate': 70},
+                'cycle_data': {'id': 93845, 'start': '2022-04-23T11:00:00.000Z', 'end': None, 'score': {'strain': 5.0},
+                               'recovery': {'recovery_score': 10, 'resting_heart_rate': 70}},
+                'workout_data': [],
+            },
+            'user_profile': {'user_id': 10129},
+        }
+        for patcher in [
+            mock.patch.object(WhoopCollector, 'authenticate', return_value=True),
+            mock.patch.object(WhoopCollector, 'async_make_request', recorded_api),
+            mock.patch.object(S3Utils, 'get_latest_json_data_many',
+                              lambda s3, base_path, dates: {day: self.stored_day for day in dates}),
+            mock.patch.object(S3Utils, 'store_json_data', return_value=True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run_event(self, name):
+        self._post(_fixture(name))
+        job = SyncJob.objects.get(athlete=self.athlete, job_type=SyncJob.TYPE_WHOOP_EVENT)
+        return SyncJobService().run(job.id)
+
+    def test_recovery_event_updates_only_that_day(self):
+        job = self._run_event('webhook_recovery_updated.json')
+
+        self.assertEqual(job.status, SyncJob.STATUS_SUCCEEDED)
+        # The sleep and its cycle's recovery, nothing else
+        self.assertEqual(len(self.requests), 2)
+        row = CoreBiometricData.objects.get(athlete=self.athlete, date=self.SLEEP_DAY)
+        self.assertEqual(row.recovery_score, 44)
+        self.assertEqual(row.resting_heart_rate, 64)
+        self.assertEqual(row.sleep_performance, 98)
+        self.assertEqual(row.strain, 5.0)
+        stored = S3Utils.store_json_data.call_args.args[2]
+        self.assertEqual(stored['daily_stats']['cycle_data']['recovery']['recovery_score'], 44)
+
+    def test_workout_event_replaces_the_days_copy(self):
+        self.stored_day['daily_stats']['workout_data'] = [{'id': 1043, 'score': {'strain': 1.0}}, {'id': 7}]
+
+        job = self._run_event('webhook_workout_updated.json')
+
+        self.assertEqual(job.status, SyncJob.STATUS_SUCCEEDED)
+        self.assertEqual(len(self.requests), 1)
+        workouts = S3Utils.store_json_data.call_args.args[2]['daily_stats']['workout_data']
+        self.assertEqual(sorted(workout['id'] for workout in workouts), [7, 1043])
+        self.assertEqual(next(w for w in workouts if w['id'] == 1043)['score']['strain'], 8.2463)
+        self.assertEqual(S3Utils.store_json_data.call_args.args[1], '2022-04-24_raw.json')
+
+    def test_missing_record_fails_the_job(self):
+        with mock.patch.object(WhoopCollector, 'async_make_request', mock.AsyncMock(return_value=None)):
+            job = self._run_event('webhook_recovery_updated.json')
+
+        self.assertEqual(job.status, SyncJob.STATUS_FAILED)
+        self.assertFalse(CoreBiometricData.objects.filter(athlete=self.athlete).exists())
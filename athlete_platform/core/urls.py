@@ -13,7 +13,7 @@ from .api_views.auth import (
 from .api_views.coach_auth import (
     coach_login_view, coach_register_view, check_coach_auth
 )
-from .views import dashboard_data, sync_biometric_data, get_biometric_data, get_current_user, activate_source, get_garmin_profiles, get_raw_biometric_data, active_sources, verify_dev_password, get_db_info, generate_insights, get_insight_categories, get_insight_trends, get_recommendations, submit_insight_feedback, get_teams, get_team_athletes, disconnect_source, frontend_view, team_biometric_summary, position_biometric_summary, position_athletes_data, athlete_biometric_data, biometric_comparison_by_position, training_optimization, sync_team_data, team_cached_biometrics
+from .views import dashboard_data, sync_biometric_data, get_biometric_data, get_current_user, activate_source, get_garmin_profiles, get_raw_biometric_data, active_sources, verify_dev_password, get_db_info, generate_insights, get_insight_categories, get_insight_trends, get_recommendations, submit_insight_feedback, get_teams, get_team_athletes, disconnect_source, frontend_view, team_biometric_summary, position_biometric_summary, position_athletes_data, athlete_biometric_data, biometric_comparison_by_position, training_optimization, coach_dashboard, sync_team_data, cancel_team_sync, team_cached_biometrics, sync_job_status, cancel_sync_job, plan_biometric_sync
 from .api_views.oauth import (
     WhoopOAuthView, WhoopCallbackView, WhoopWebhookView
 )
@@ -40,6 +40,9 @@ urlpatterns = [
     path('api/dashboard/', dashboard_data, name='dashboard_data'),
     path('api/dashboard/data/', views.dashboard_data, name='dashboard_data'),
     path('api/biometrics/sync/', sync_biometric_data, name='sync_biometric_data'),
+    path('api/biometrics/sync/plan/', plan_biometric_sync, name='plan_biometric_sync'),
+    path('api/sync-jobs/<uuid:job_id>/', sync_job_status, name='sync_job_status'),
+    path('api/sync-jobs/<uuid:job_id>/cancel/', cancel_sync_job, name='cancel_sync_job'),
     path('api/biometrics/', get_biometric_data, name='get_biometric_data'),
     path('api/current_user/', get_current_user, name='get_current_user'),
     path('api/biometrics/activate-source/', activate_source, name='activate_source'),
@@ -71,7 +74,10 @@ urlpatterns = [
     path('api/coach/athlete/<str:athlete_id>/biometrics/', athlete_biometric_data, name='athlete_biometric_data'),
     path('api/coach/position-comparison/', biometric_comparison_by_position, name='biometric_comparison_by_position'),
     path('api/coach/training-optimization/', training_optimization, name='training_optimization'),
+    path('api/coach/dashboard/', coach_dashboard, name='coach_dashboard'),
     path('api/coach/sync-team-data/', sync_team_data, name='sync_team_data'),
+    path('api/coach/sync-team-data/cancel/', cancel_team_sync, name='cancel_team_sync'),
+    path('api/coach/team-cached-biometrics/', team_cached_biometrics, name='team_cached_biometrics'),
 
     # Catch-all route for React frontend
     # This must be the last route to ensure API routes are handled correctly
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Optional
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# httpx.AsyncClient pools are bound to the event loop they were created on, so
+# the one shared client lives on a single long-lived runtime loop. Sync callers
+# reach it through run_sync and coroutines on other loops through run_async,
+# which keeps its keep-alive connections process-wide and never leaves a
+# client behind on a loop that has shut down.
+_client: Optional[httpx.AsyncClient] = None
+_runtime_loop: Optional[asyncio.AbstractEventLoop] = None
+_runtime_lock = threading.Lock()
+
+
+def _client_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=getattr(settings, 'ASYNC_HTTP_MAX_CONNECTIONS', 20),
+        max_keepalive_connections=getattr(settings, 'ASYNC_HTTP_MAX_KEEPALIVE', 10),
+        keepalive_expiry=30,
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client, from a coroutine running on the runtime loop"""
+    global _client
+    if asyncio.get_running_loop() is not _runtime_loop:
+        raise RuntimeError("get_async_client() must run on the async HTTP runtime loop, use run_sync() or run_async()")
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=_client_limits(),
+            timeout=httpx.Timeout(getattr(settings, 'ASYNC_HTTP_TIMEOUT', 30), connect=10),
+        )
+    return _client
+
+
+def _get_runtime_loop() -> asyncio.AbstractEventLoop:
+    global _client, _runtime_loop
+    if _runtime_loop is not None and _runtime_loop.is_running():
+        return _runtime_loop
+
+    with _runtime_lock:
+        if _runtime_loop is None or not _runtime_loop.is_running():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            threading.Thread(target=_run, name='async-http-runtime', daemon=True).start()
+            started.wait()
+            # A client from a previous runtime loop cannot be used on this one
+            _client = None
+            _runtime_loop = loop
+            logger.info("Started shared async HTTP runtime loop")
+    return _runtime_loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared runtime loop from synchronous code and wait for it.
+
+    Safe to call from any thread, including threads that already run their own
+    event loop, as long as it is not the runtime loop itself.
+    """
+    loop = _get_runtime_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the async HTTP runtime loop, await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def run_async(coro: Awaitable[Any]) -> Any:
+    """
+    Await a coroutine on the shared runtime loop from any other event loop, so
+    it can use the shared client. On the runtime loop it is simply awaited.
+    """
+    loop = _get_runtime_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
@@ -0,0 +1,64 @@
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# boto3 clients are thread-safe once created, but creating them is not cheap
+# (credential resolution, endpoint and model loading, a fresh urllib3 pool).
+# Share one per service/region across every S3Utils, storage service and command.
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _client_config() -> Config:
+    """Connection pool, keep-alive, timeouts and retry behaviour for shared clients"""
+    return Config(
+        max_pool_connections=getattr(settings, 'AWS_MAX_POOL_CONNECTIONS', 32),
+        tcp_keepalive=True,
+        connect_timeout=getattr(settings, 'AWS_CONNECT_TIMEOUT', 5),
+        read_timeout=getattr(settings, 'AWS_READ_TIMEOUT', 30),
+        retries={
+            'max_attempts': getattr(settings, 'AWS_MAX_RETRY_ATTEMPTS', 5),
+            'mode': 'standard',
+        },
+    )
+
+
+def get_client(service_name: str, region_name: Optional[str] = None) -> Any:
+    """Get the process-wide client for an AWS service, creating it on first use"""
+    region_name = region_name or settings.AWS_S3_REGION_NAME
+    key = (service_name, region_name)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = boto3.session.Session().client(
+                service_name,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=region_name,
+                config=_client_config(),
+            )
+            _clients[key] = client
+            logger.info(f"Created shared {service_name} client for region {region_name}")
+    return client
+
+
+def get_s3_client() -> Any:
+    """Get the shared S3 client"""
+    return get_client('s3')
+
+
+def reset_clients() -> None:
+    """Drop all shared clients, e.g. after credentials are rotated or in benchmarks"""
+    with _clients_lock:
+        _clients.clear()
@@ -1,46 +1,534 @@
-# from functools import wraps
-# from django.core.cache import cache
-# import logging
-# from asgiref.sync import sync_to_async
-# import asyncio
-
-# logger = logging.getLogger(__name__)
-
-# def resource_lock(resource_type: str, timeout: int = 300):
-#     """
-#     Decorator that locks a resource so multiple requests don't overlap.
-#     Handles both sync and async functions.
-#     """
-#     def decorator(func):
-#         if asyncio.iscoroutinefunction(func):
-#             @wraps(func)
-#             async def wrapper(*args, **kwargs):
-#                 lock_id = f"{resource_type}:{args[0].athlete.id if args else 'unknown'}"
-#                 has_lock = await sync_to_async(cache.get)(lock_id)
-#                 if has_lock:
-#                     logger.warning(f"{resource_type.title()} already in progress for {lock_id}")
-#                     return False
-
-#                 await sync_to_async(cache.set)(lock_id, True, timeout)
-#                 try:
-#                     return await func(*args, **kwargs)
-#                 finally:
-#                     await sync_to_async(cache.delete)(lock_id)
-#             return wrapper
-#         else:
-#             @wraps(func)
-#             def wrapper(*args, **kwargs):
-#                 lock_id = f"{resource_type}:{args[0].athlete.id if args else 'unknown'}"
-#                 has_lock = cache.get(lock_id)
-#                 if has_lock:
-#                     logger.warning(f"{resource_type.title()} already in progress for {lock_id}")
-#                     return False
-
-#                 cache.set(lock_id, True, timeout)
-#                 try:
-#                     return func(*args, **kwargs)
-#                 finally:
-#                     cache.delete(lock_id)
-#             return wrapper
-
-#     return decorator 
\ No newline at end of file
+import asyncio
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import date
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# Lease length when a lock does not give one. Holders renew the lease while
+# they work, so this only bounds how long a crashed worker blocks others.
+DEFAULT_LOCK_TTL = 300
+
+# Shortest and longest sleep between attempts while waiting for a lock
+LOCK_POLL_MIN = 0.05
+LOCK_POLL_MAX = 1.0
+
+# How long a single-flight result stays readable for the callers that waited on it
+SINGLE_FLIGHT_RESULT_TTL = 60
+
+# How long a day a source answered with no data is skipped, unless EMPTY_DAY_CACHE_TTL says otherwise
+EMPTY_DAY_TTL = 6 * 60 * 60
+
+# Release and renew only when the caller still owns the lock.
+# KEYS[1] is the lock key, ARGV[1] the owner token, ARGV[2] the lease in ms.
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+RENEW_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LockNotAcquired(Exception):
+    """Raised when a lock used as a context manager is held by someone else"""
+    pass
+
+
+def get_redis_client(cache) -> Optional[Any]:
+    """The raw Redis client behind a Django cache, or None for other backends"""
+    try:
+        if hasattr(cache, '_cache') and hasattr(cache._cache, 'get_client'):
+            return cache._cache.get_client(None, write=True)  # django.core.cache.backends.redis
+        if hasattr(cache, 'client') and hasattr(cache.client, 'get_client'):
+            return cache.client.get_client(write=True)  # django-redis
+    except Exception as e:
+        logger.warning(f"Could not get a Redis client from the cache: {e}")
+    return None
+
+
+class LocalLockStore:
+    """In-process leases, used when the shared cache is unavailable"""
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _current(self, key: str) -> Optional[str]:
+        token, expires = self._locks.get(key, (None, 0.0))
+        return token if expires > time.monotonic() else None
+
+    def add(self, key: str, token: str, ttl: float) -> bool:
+        with self._lock:
+            if self._current(key) is not None:
+                return False
+            self._locks[key] = (token, time.monotonic() + ttl)
+            return True
+
+    def release(self, key: str, token: str) -> bool:
+        with self._lock:
+            if self._current(key) != token:
+                return False
+            del self._locks[key]
+            return True
+
+    def renew(self, key: str, token: str, ttl: float) -> bool:
+        with self._lock:
+            if self._current(key) != token:
+                return False
+            self._locks[key] = (token, time.monotonic() + ttl)
+            return True
+
+    def owner(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._current(key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._locks.pop(key, None)
+
+
+class RedisLockStore:
+    """Leases taken with SET NX PX, released and renewed by owner-checking Lua scripts"""
+
+    def __init__(self, cache, client):
+        self._cache = cache
+        self._client = client
+        self._release = client.register_script(RELEASE_LOCK_LUA)
+        self._renew = client.register_script(RENEW_LOCK_LUA)
+
+    def _key(self, key: str) -> str:
+        # Same prefix and version the cache would use for this key
+        return self._cache.make_key(key)
+
+    def add(self, key: str, token: str, ttl: float) -> bool:
+        return bool(self._client.set(self._key(key), token, nx=True, px=max(1, int(ttl * 1000))))
+
+    def release(self, key: str, token: str) -> bool:
+        return bool(self._release(keys=[self._key(key)], args=[token]))
+
+    def renew(self, key: str, token: str, ttl: float) -> bool:
+        return bool(self._renew(keys=[self._key(key)], args=[token, max(1, int(ttl * 1000))]))
+
+    def owner(self, key: str) -> Optional[str]:
+        value = self._client.get(self._key(key))
+        return value.decode() if isinstance(value, bytes) else value
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+
+class CacheLockStore:
+    """
+    Leases on caches without scripting (memcached, locmem). cache.add is
+    atomic, release and renew check the owner before writing, which is safe
+    as long as leases are renewed well before they expire.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def add(self, key: str, token: str, ttl: float) -> bool:
+        return bool(self._cache.add(key, token, timeout=math.ceil(ttl)))
+
+    def release(self, key: str, token: str) -> bool:
+        if self._cache.get(key) != token:
+            return False
+        self._cache.delete(key)
+        return True
+
+    def renew(self, key: str, token: str, ttl: float) -> bool:
+        if self._cache.get(key) != token:
+            return False
+        self._cache.set(key, token, timeout=math.ceil(ttl))
+        return True
+
+    def owner(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+
+_local_store = LocalLockStore()
+
+# Contention counters per resource type, for this process
+_lock_stats: Dict[str, Dict[str, Any]] = {}
+_lock_stats_lock = threading.Lock()
+
+
+def _record(resource_type: str, name: str, amount: float = 1) -> None:
+    with _lock_stats_lock:
+        stats = _lock_stats.setdefault(resource_type, {
+            'acquired': 0,
+            'contended': 0,
+            'timed_out': 0,
+            'waited_seconds': 0.0,
+            'renewed': 0,
+            'lost': 0,
+            'released': 0,
+            'fallbacks': 0,
+            'shared': 0,
+        })
+        stats[name] += amount
+
+
+def lock_stats() -> Dict[str, Dict[str, Any]]:
+    """Lock counters per resource type since the process started, for logging and monitoring"""
+    with _lock_stats_lock:
+        return {
+            resource_type: {name: round(value, 3) if isinstance(value, float) else value for name, value in stats.items()}
+            for resource_type, stats in _lock_stats.items()
+        }
+
+
+class CacheLock:
+    """
+    Lock shared by every thread and worker process using the same cache.
+
+    Acquiring is a single atomic write (SET NX PX on Redis, cache.add on
+    other backends) of a random owner token, so only the holder can release
+    or renew it. The lock is a lease that expires after ttl seconds unless
+    renewed; with auto_renew a background thread renews it every third of
+    the lease for as long as it is held. If the cache fails, the lock falls
+    back to an in-process lease rather than blocking all work.
+    """
+
+    def __init__(self, name: str, ttl: float = DEFAULT_LOCK_TTL, wait: float = 0, auto_renew: bool = False,
+                 cache=None, resource_type: Optional[str] = None):
+        if ttl <= 0:
+            raise ValueError("Lock ttl must be positive")
+        self.name = name
+        self.key = f"lock:{name}"
+        self.ttl = float(ttl)
+        self.wait = wait
+        self.auto_renew = auto_renew
+        self.resource_type = resource_type or name.split(':', 1)[0]
+        self.token: Optional[str] = None
+        # Set when a renewal finds the lease expired or taken over
+        self.lost = False
+        self._cache = cache
+        self._store = None
+        self._renewer: Optional[threading.Thread] = None
+        self._stop_renewing = threading.Event()
+
+    def _get_cache(self):
+        if self._cache is None:
+            from django.core.cache import cache
+            self._cache = cache
+        return self._cache
+
+    def _get_store(self):
+        if self._store is None:
+            cache = self._get_cache()
+            client = get_redis_client(cache)
+            self._store = RedisLockStore(cache, client) if client is not None else CacheLockStore(cache)
+        return self._store
+
+    def _call(self, operation: str, *args):
+        try:
+            return getattr(self._get_store(), operation)(self.key, *args)
+        except Exception as e:
+            _record(self.resource_type, 'fallbacks')
+            logger.warning(f"Shared lock store failed for {self.key}, using a local lock: {e}")
+            return getattr(_local_store, operation)(self.key, *args)
+
+    @property
+    def locked(self) -> bool:
+        """Whether anyone holds the lock right now"""
+        return self._call('owner') is not None
+
+    def _try_acquire(self) -> bool:
+        token = uuid.uuid4().hex
+        if not self._call('add', token, self.ttl):
+            return False
+        self.token = token
+        self.lost = False
+        _record(self.resource_type, 'acquired')
+        if self.auto_renew:
+            self._start_renewing()
+        return True
+
+    def _next_wait(self, attempt: int, deadline: Optional[float]) -> Optional[float]:
+        """Seconds to sleep before the next attempt, or None once the wait is over"""
+        if attempt == 0:
+            _record(self.resource_type, 'contended')
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _record(self.resource_type, 'timed_out')
+            logger.info(f"Gave up waiting for lock {self.key} held by another worker")
+            return None
+        wait = min(LOCK_POLL_MIN * 2 ** attempt, LOCK_POLL_MAX, remaining)
+        _record(self.resource_type, 'waited_seconds', wait)
+        return wait
+
+    def acquire(self, wait: Optional[float] = None) -> bool:
+        """Take the lock, waiting up to `wait` seconds (the lock's default) for the holder to finish"""
+        wait = self.wait if wait is None else wait
+        deadline = time.monotonic() + wait if wait else None
+        attempt = 0
+        while not self._try_acquire():
+            sleep = self._next_wait(attempt, deadline)
+            if sleep is None:
+                return False
+            time.sleep(sleep)
+            attempt += 1
+        return True
+
+    async def acquire_async(self, wait: Optional[float] = None) -> bool:
+        """acquire() for async callers, without blocking the event loop"""
+        wait = self.wait if wait is None else wait
+        deadline = time.monotonic() + wait if wait else None
+        attempt = 0
+        while not await sync_to_async(self._try_acquire, thread_sensitive=False)():
+            sleep = self._next_wait(attempt, deadline)
+            if sleep is None:
+                return False
+            await asyncio.sleep(sleep)
+            attempt += 1
+        return True
+
+    def renew(self, ttl: Optional[float] = None) -> bool:
+        """Extend the lease. Returns False, and marks the lock lost, if we no longer hold it."""
+        if self.token is None:
+            return False
+        if self._call('renew', self.token, ttl or self.ttl):
+            _record(self.resource_type, 'renewed')
+            return True
+        self.lost = True
+        _record(self.resource_type, 'lost')
+        logger.warning(f"Lost lock {self.key}: the lease expired or another worker took it over")
+        return False
+
+    def release(self) -> bool:
+        """Give the lock up. Returns False if the lease had already been lost."""
+        self._stop_renewing.set()
+        if self._renewer is not None and self._renewer is not threading.current_thread():
+            self._renewer.join()
+        self._renewer = None
+        if self.token is None:
+            return False
+        released = self._call('release', self.token)
+        self.token = None
+        if released:
+            _record(self.resource_type, 'released')
+        return released
+
+    def force_release(self) -> None:
+        """Remove the lock whoever holds it, for clearing locks left by a stuck worker"""
+        self._call('delete')
+        logger.info(f"Force released lock {self.key}")
+
+    def _start_renewing(self) -> None:
+        self._stop_renewing = threading.Event()
+        stop = self._stop_renewing
+
+        def renew_until_released():
+            while not stop.wait(self.ttl / 3):
+                if not self.renew():
+                    return
+
+        self._renewer = threading.Thread(target=renew_until_released, name=f"lock-renew:{self.name}", daemon=True)
+        self._renewer.start()
+
+    def __enter__(self) -> 'CacheLock':
+        if not self.acquire():
+            raise LockNotAcquired(f"Lock {self.key} is held by another worker")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    async def __aenter__(self) -> 'CacheLock':
+        if not await self.acquire_async():
+            raise LockNotAcquired(f"Lock {self.key} is held by another worker")
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await sync_to_async(self.release, thread_sensitive=False)()
+
+
+def resource_lock(resource_type: str, timeout: int = DEFAULT_LOCK_TTL, wait: float = 0,
+                  key: Optional[Callable[..., Any]] = None):
+    """
+    Decorator that locks a resource so multiple requests don't overlap, across
+    threads and worker processes. Handles both sync and async functions.
+
+    The resource is key(*args, **kwargs), by default the athlete of the
+    instance the method is bound to. Calls that cannot get the lock within
+    `wait` seconds return False. `timeout` is the lease, renewed while the
+    call runs.
+    """
+    def lock_for(args, kwargs) -> CacheLock:
+        resource = key(*args, **kwargs) if key else (args[0].athlete.id if args else 'unknown')
+        return CacheLock(f"{resource_type}:{resource}", ttl=timeout, wait=wait, auto_renew=True,
+                         resource_type=resource_type)
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                lock = lock_for(args, kwargs)
+                if not await lock.acquire_async():
+                    logger.warning(f"{resource_type.title()} already in progress for {lock.name}")
+                    return False
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    await sync_to_async(lock.release, thread_sensitive=False)()
+            return wrapper
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                lock = lock_for(args, kwargs)
+                if not lock.acquire():
+                    logger.warning(f"{resource_type.title()} already in progress for {lock.name}")
+                    return False
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    lock.release()
+            return wrapper
+
+    return decorator
+
+
+def _same_request(leader: Any, follower: Any) -> bool:
+    return leader == follower
+
+
+def single_flight(key: str, work: Callable[[], Any], request: Any = None,
+                  covers: Callable[[Any, Any], bool] = _same_request, wait: float = DEFAULT_LOCK_TTL,
+                  ttl: float = DEFAULT_LOCK_TTL, cache=None) -> Any:
+    """
+    Run work() once for concurrent callers of the same key, across threads
+    and worker processes.
+
+    The first caller leads: it holds a lease on the key and publishes its
+    request while work() runs. Callers that arrive during the flight join it
+    when covers(leader_request, their_request) and get its result, kept for
+    SINGLE_FLIGHT_RESULT_TTL seconds only so they can pick it up. Otherwise
+    they wait for the flight to finish and lead their own. Once a flight ends
+    new callers run work() again, results are never reused as a cache. If the
+    leader fails, a waiting caller takes over. After `wait` seconds a caller
+    stops waiting and runs work() anyway.
+    """
+    if cache is None:
+        from django.core.cache import cache
+    flight_key = f"flight:{key}"
+    deadline = time.monotonic() + wait
+    attempt = 0
+    # Flights this caller saw running with a covering request
+    joined = set()
+
+    while True:
+        flight = cache.get(f"{flight_key}:request")
+        covered = flight is not None and covers(flight['request'], request)
+        if covered:
+            joined.add(flight['id'])
+        for flight_id in joined:
+            shared = cache.get(f"{flight_key}:result:{flight_id}")
+            if shared is not None:
+                _record('flight', 'shared')
+                logger.info(f"Sharing the result of the {key} flight")
+                return shared['value']
+
+        lock = CacheLock(flight_key, ttl=ttl, auto_renew=True, cache=cache, resource_type='flight')
+        if lock.acquire(wait=0):
+            try:
+                cache.set(f"{flight_key}:request", {'id': lock.token, 'request': request}, timeout=math.ceil(ttl))
+                try:
+                    result = work()
+                finally:
+                    # Nobody joins a finished flight
+                    cache.delete(f"{flight_key}:request")
+                cache.set(f"{flight_key}:result:{lock.token}", {'value': result}, timeout=SINGLE_FLIGHT_RESULT_TTL)
+                return result
+            finally:
+                lock.release()
+
+        if attempt == 0 and not covered:
+            # The running flight does not cover this request, run after it
+            _record('flight', 'contended')
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(min(LOCK_POLL_MIN * 2 ** attempt, LOCK_POLL_MAX, max(0.0, deadline - time.monotonic())))
+        attempt += 1
+
+    _record('flight', 'timed_out')
+    logger.warning(f"Gave up waiting for the {key} flight after {wait}s, running it again")
+    return work()
+
+
+class EmptyDayCache:
+    """
+    Negative cache of the days a source answered with no data for an athlete
+    (device not worn, no sleep recorded), so syncs stop asking the API for
+    them until the entry expires or data for the day arrives. Today is never
+    cached, its data is still coming in. Cache errors read as nothing cached.
+    """
+
+    def __init__(self, athlete_id: Any, source: str, ttl: Optional[float] = None, cache=None):
+        self.prefix = f"empty_day:{athlete_id}:{source}"
+        self.ttl = ttl
+        self._cache = cache
+
+    def _get_cache(self):
+        if self._cache is None:
+            from django.core.cache import cache
+            self._cache = cache
+        return self._cache
+
+    def _get_ttl(self) -> int:
+        if self.ttl is None:
+            from django.conf import settings
+            self.ttl = getattr(settings, 'EMPTY_DAY_CACHE_TTL', EMPTY_DAY_TTL)
+        return math.ceil(self.ttl)
+
+    def _key(self, day: date) -> str:
+        return f"{self.prefix}:{day.isoformat()}"
+
+    def known_empty(self, days: Iterable[date]) -> Set[date]:
+        """The days that are cached as empty"""
+        keys = {self._key(day): day for day in days}
+        if not keys:
+            return set()
+        try:
+            return {keys[key] for key in self._get_cache().get_many(list(keys))}
+        except Exception as e:
+            logger.warning(f"Could not read {self.prefix} from the cache: {e}")
+            return set()
+
+    def mark(self, days: Iterable[date]) -> None:
+        today = date.today()
+        entries = {self._key(day): True for day in days if day < today}
+        if not entries or self._get_ttl() <= 0:
+            return
+        try:
+            self._get_cache().set_many(entries, timeout=self._get_ttl())
+            logger.info(f"Cached {len(entries)} empty days for {self.prefix}")
+        except Exception as e:
+            logger.warning(f"Could not cache empty days for {self.prefix}: {e}")
+
+    def clear(self, days: Iterable[date]) -> None:
+        keys = [self._key(day) for day in days]
+        if not keys:
+            return
+        try:
+            self._get_cache().delete_many(keys)
+        except Exception as e:
+            logger.warning(f"Could not clear empty days for {self.prefix}: {e}")
@@ -2,22 +2,137 @@
 
 import garminconnect
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 from typing import Optional, Dict, Any, List
-from ..utils.encryption_utils import decrypt_value
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from ..utils.encryption_utils import decrypt_value, encrypt_value
 logger = logging.getLogger(__name__)
 
+# Daily payload field -> garminconnect method, each called once per day
+DAILY_ENDPOINTS = (
+    ('sleep', 'get_sleep_data'),
+    ('heart_rate', 'get_heart_rates'),
+    ('steps', 'get_steps_data'),
+    ('body_comp', 'get_body_composition'),
+    ('user_summary', 'get_user_summary'),
+    ('stress', 'get_stress_data'),
+)
+
+
+class RequestBudget:
+    """Thread-safe requests-per-second pacing shared by all collection workers"""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second and requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self) -> None:
+        """Block until the next request slot"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Push back every worker's next slot, e.g. after a 429"""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def get_session_metrics() -> Dict[str, Dict[str, Any]]:
+    """Login vs resume counts for every cached Garmin profile session"""
+    from core.models import GarminSessionToken
+
+    return {
+        session['profile_type']: session
+        for session in GarminSessionToken.objects.values(
+            'profile_type', 'login_count', 'resume_count', 'resume_failure_count',
+            'last_login_at', 'last_resumed_at'
+        )
+    }
+
+
 class GarminDataCollector:
-    def __init__(self, user_credentials=None):
+    def __init__(self, user_credentials=None, profile_type: Optional[str] = None, max_workers: Optional[int] = None,
+                 requests_per_second: Optional[float] = None, max_retries: Optional[int] = None):
         self.username = decrypt_value(user_credentials.get('username'))
         self.password = decrypt_value(user_credentials.get('password'))
+        # Sessions are cached per profile, without one every sync does a full login
+        self.profile_type = profile_type
         
         self.garmin_client = None
+        self.max_workers = max_workers or getattr(settings, 'GARMIN_COLLECTION_WORKERS', 4)
+        self.requests_per_second = requests_per_second or getattr(settings, 'GARMIN_REQUESTS_PER_SECOND', 4)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'GARMIN_MAX_RETRIES', 4)
+        self.backoff_seconds = 2.0
+
+    def _resume_session(self) -> bool:
+        """Resume the cached garth session for this profile instead of logging in"""
+        from core.models import GarminSessionToken
+
+        session = GarminSessionToken.objects.filter(profile_type=self.profile_type).first()
+        if not session:
+            return False
+
+        tokens = decrypt_value(session.encrypted_tokens)
+        try:
+            # garminconnect treats short token stores as a directory path
+            if len(tokens) <= 512:
+                raise ValueError("Cached session tokens are missing or unreadable")
+            client = garminconnect.Garmin(self.username, self.password)
+            client.login(tokenstore=tokens)
+        except Exception as e:
+            logger.warning(f"Could not resume Garmin session for profile {self.profile_type}, logging in: {e}")
+            GarminSessionToken.objects.filter(pk=session.pk).update(
+                resume_failure_count=F('resume_failure_count') + 1
+            )
+            return False
+
+        self.garmin_client = client
+        update = {'resume_count': F('resume_count') + 1, 'last_resumed_at': timezone.now()}
+        # garth refreshes expired OAuth2 tokens on load, keep the refreshed ones
+        refreshed = client.garth.dumps()
+        if refreshed != tokens:
+            update['encrypted_tokens'] = encrypt_value(refreshed)
+        GarminSessionToken.objects.filter(pk=session.pk).update(**update)
+        logger.info(f"Resumed cached Garmin session for profile {self.profile_type}")
+        return True
+
+    def _save_session(self) -> None:
+        """Cache the freshly logged-in session tokens for this profile"""
+        from core.models import GarminSessionToken
+
+        try:
+            session, _ = GarminSessionToken.objects.update_or_create(
+                profile_type=self.profile_type,
+                defaults={
+                    'encrypted_tokens': encrypt_value(self.garmin_client.garth.dumps()),
+                    'last_login_at': timezone.now(),
+                }
+            )
+            GarminSessionToken.objects.filter(pk=session.pk).update(login_count=F('login_count') + 1)
+        except Exception as e:
+            logger.error(f"Failed to cache Garmin session for profile {self.profile_type}: {e}")
 
     def authenticate(self) -> bool:
+        if self.profile_type and self._resume_session():
+            return True
+
         try:
             self.garmin_client = garminconnect.Garmin(self.username, self.password)
             self.garmin_client.login()
+            if self.profile_type:
+                self._save_session()
             return True
         except Exception as e:
             error_message = str(e)
@@ -28,34 +143,64 @@ class GarminDataCollector:
                 logger.error(f"Garmin authentication failed: {e}")
             return False
 
+    def _is_rate_limited(self, error: Exception) -> bool:
+        if isinstance(error, garminconnect.GarminConnectTooManyRequestsError):
+            return True
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None) == 429 or "429" in str(error)
+
+    def _call_endpoint(self, budget: RequestBudget, method_name: str, date_str: str) -> Any:
+        """Call one daily endpoint within the request budget, backing off on 429"""
+        for attempt in range(self.max_retries + 1):
+            budget.acquire()
+            try:
+                return getattr(self.garmin_client, method_name)(date_str)
+            except Exception as e:
+                if not self._is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt) + random.uniform(0, self.backoff_seconds)
+                logger.warning(f"Garmin rate limited on {method_name} for {date_str}, backing off {delay:.1f}s")
+                # Slow every worker down, not just this one
+                budget.pause(delay)
+
     def collect_data(self, start_date: date, end_date: date) -> Optional[List[Dict[str, Any]]]:
         """
         Collect data from Garmin Connect for all dates between start_date and end_date.
+
+        The six daily endpoint calls for every day are fanned out over a bounded worker
+        pool sharing the authenticated session, paced by GARMIN_REQUESTS_PER_SECOND.
+        A day is returned only if all of its calls succeed; days come back in date order.
         """
         if not self.authenticate():
             logger.error("Failed to authenticate Garmin client.")
             return None
 
-        data = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime("%Y-%m-%d")
-            try:
-                daily_data = {
-                    "date": date_str,
-                    "sleep": self.garmin_client.get_sleep_data(date_str),
-                    "heart_rate": self.garmin_client.get_heart_rates(date_str),
-                    "steps": self.garmin_client.get_steps_data(date_str),
-                    "body_comp": self.garmin_client.get_body_composition(date_str),
-                    "user_summary": self.garmin_client.get_user_summary(date_str),
-                    "stress": self.garmin_client.get_stress_data(date_str),
-                }
-                data.append(daily_data)
-                logger.info(f"Collected data for {current_date}")
-            except Exception as e:
-                logger.error(f"Error collecting data for {current_date}: {e}")
-            current_date += timedelta(days=1)
+        dates = [start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1)]
+        if not dates:
+            return None
+
+        budget = RequestBudget(self.requests_per_second)
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix='garmin-collect') as executor:
+            futures = {
+                (current_date, field): executor.submit(
+                    self._call_endpoint, budget, method_name, current_date.strftime("%Y-%m-%d")
+                )
+                for current_date in dates
+                for field, method_name in DAILY_ENDPOINTS
+            }
+
+            data = []
+            for current_date in dates:
+                date_str = current_date.strftime("%Y-%m-%d")
+                daily_data = {"date": date_str}
+                try:
+                    for field, _ in DAILY_ENDPOINTS:
+                        daily_data[field] = futures[(current_date, field)].result()
+                    data.append(daily_data)
+                    logger.info(f"Collected data for {current_date}")
+                except Exception as e:
+                    logger.error(f"Error collecting data for {current_date}: {e}")
 
         if data:
             logger.info(f"Successfully collected {len(data)} day(s) of Garmin data")
-        return data or None
\ No newline at end of file
+        return data or None
@@ -0,0 +1,65 @@
+import gzip
+import json
+import logging
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def available_codecs() -> list:
+    """Codecs usable in this environment"""
+    return [IDENTITY, GZIP] + ([ZSTD] if zstandard else [])
+
+
+def encode_json(data: Any, codec: str = IDENTITY, level: Optional[int] = None) -> Tuple[bytes, Optional[str]]:
+    """
+    Serialize data as compact JSON and compress it with the given codec.
+
+    Returns (body, content_encoding). content_encoding is None for identity so
+    callers can skip the header. Pre-serialized strings are compressed as is.
+    """
+    text = data if isinstance(data, str) else json.dumps(data, separators=(',', ':'), default=str)
+    raw = text.encode('utf-8')
+
+    if codec == GZIP:
+        return gzip.compress(raw, compresslevel=level or 6), GZIP
+    if codec == ZSTD:
+        if zstandard is None:
+            logger.warning("zstd codec requested but zstandard is not installed, falling back to gzip")
+            return gzip.compress(raw, compresslevel=6), GZIP
+        return zstandard.ZstdCompressor(level=level or 3).compress(raw), ZSTD
+    if codec not in (IDENTITY, None, ''):
+        logger.warning(f"Unknown JSON codec '{codec}', storing uncompressed")
+    return raw, None
+
+
+def decode_json(body: bytes, content_encoding: Optional[str] = None) -> Any:
+    """
+    Decode a JSON payload written by encode_json or by the legacy indented writer.
+
+    The declared Content-Encoding is honoured, and the payload's magic bytes are
+    checked as well so objects copied without their metadata still decode.
+    """
+    if isinstance(body, str):
+        return json.loads(body)
+
+    encoding = (content_encoding or '').lower()
+    if encoding == GZIP or body[:2] == GZIP_MAGIC:
+        body = gzip.decompress(body)
+    elif encoding == ZSTD or body[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise ValueError("Payload is zstd compressed but zstandard is not installed")
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return json.loads(body)
@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+from .cache_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Longest single sleep while waiting for tokens, so penalties set by other
+# workers are noticed promptly
+MAX_WAIT_STEP = 1.0
+
+# Refill and take atomically in Redis. KEYS[1] is the bucket hash,
+# ARGV is rate per second, capacity, now, tokens requested and key ttl.
+# Requesting 0 tokens just reports the current level.
+TOKEN_BUCKET_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {allowed, tostring(tokens)}
+"""
+
+
+class LocalBucketStore:
+    """In-process token buckets, used when no shared cache is available"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, requested: float, now: float) -> Tuple[bool, float, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= requested
+            if allowed:
+                tokens -= requested
+            self._buckets[key] = (tokens, now)
+        wait = 0.0 if allowed else (requested - tokens) / rate
+        return allowed, tokens, wait
+
+
+class RedisBucketStore:
+    """Token buckets refilled and taken atomically by a Lua script"""
+
+    def __init__(self, client):
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+
+    def take(self, key: str, rate: float, capacity: float, requested: float, now: float) -> Tuple[bool, float, float]:
+        ttl = max(1, math.ceil(capacity / rate) * 2)
+        allowed, tokens = self._script(keys=[key], args=[rate, capacity, now, requested, ttl])
+        tokens = float(tokens)
+        allowed = bool(int(allowed))
+        wait = 0.0 if allowed else (requested - tokens) / rate
+        return allowed, tokens, wait
+
+
+class CacheCounterStore:
+    """
+    Approximates the bucket on caches without scripting (memcached, locmem)
+    with atomic add/incr counters over a window of capacity / rate seconds,
+    which gives the same average rate and burst size.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def take(self, key: str, rate: float, capacity: float, requested: float, now: float) -> Tuple[bool, float, float]:
+        window = capacity / rate
+        window_id = int(now // window)
+        window_key = f"{key}:{window_id}"
+        wait = (window_id + 1) * window - now
+
+        if requested <= 0:
+            used = self._cache.get(window_key) or 0
+            return True, max(0.0, capacity - used), 0.0
+
+        self._cache.add(window_key, 0, timeout=math.ceil(window) + 1)
+        used = self._cache.incr(window_key, int(math.ceil(requested)))
+        allowed = used <= capacity
+        return allowed, max(0.0, capacity - used), 0.0 if allowed else wait
+
+
+def _header(headers: Mapping[str, Any], name: str) -> Optional[str]:
+    if headers is None:
+        return None
+    value = headers.get(name)
+    if value is None:
+        # Plain dicts are case sensitive, httpx/requests headers are not
+        lowered = name.lower()
+        value = next((v for k, v in headers.items() if k.lower() == lowered), None)
+    return str(value).strip() if value is not None else None
+
+
+def retry_after_seconds(headers: Mapping[str, Any], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds the server asked us to back off for, from Retry-After (seconds or
+    HTTP date) or X-RateLimit-Reset (seconds until reset, or an epoch timestamp).
+    """
+    now = time.time() if now is None else now
+
+    retry_after = _header(headers, 'Retry-After')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - now)
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring unparseable Retry-After header: {retry_after}")
+
+    reset = _header(headers, 'X-RateLimit-Reset')
+    if reset:
+        try:
+            value = float(reset)
+        except ValueError:
+            logger.warning(f"Ignoring unparseable X-RateLimit-Reset header: {reset}")
+            return None
+        # Anything this large is an absolute epoch rather than a delay
+        return max(0.0, value - now) if value > 1e9 else max(0.0, value)
+
+    return None
+
+
+class TokenBucketLimiter:
+    """
+    Request budget shared by every caller using the same key.
+
+    Tokens live in the Django cache so all collectors, threads and worker
+    processes draw from one budget: Redis gets an atomic Lua token bucket,
+    other caches use atomic incr counters. If the cache fails, the limiter
+    falls back to an in-process bucket rather than blocking requests.
+
+    Async callers on the same event loop are served first come, first served.
+    """
+
+    def __init__(self, key: str, rate: float, capacity: float, cache=None, shared: bool = True):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("Rate and capacity must be positive")
+        self.key = f"rate_limit:{key}"
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._cache = cache
+        self._shared = shared
+        self._store = None
+        self._local_store = LocalBucketStore()
+        self._local_blocked_until = 0.0
+        self._sync_lock = threading.Lock()
+        self._async_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        self.stats = {
+            'acquired': 0,
+            'throttled': 0,
+            'waited_seconds': 0.0,
+            'penalties': 0,
+            'fallbacks': 0,
+        }
+
+    def _get_cache(self):
+        if self._cache is None:
+            from django.core.cache import cache
+            self._cache = cache
+        return self._cache
+
+    def _get_store(self):
+        if self._store is not None:
+            return self._store
+        if not self._shared:
+            self._store = self._local_store
+            return self._store
+
+        cache = self._get_cache()
+        client = get_redis_client(cache)
+        self._store = RedisBucketStore(client) if client is not None else CacheCounterStore(cache)
+        return self._store
+
+    def _take(self, tokens: float) -> Tuple[bool, float, float]:
+        now = time.time()
+        try:
+            return self._get_store().take(self.key, self.rate, self.capacity, tokens, now)
+        except Exception as e:
+            self.stats['fallbacks'] += 1
+            logger.warning(f"Shared rate limit store failed for {self.key}, using local bucket: {e}")
+            return self._local_store.take(self.key, self.rate, self.capacity, tokens, now)
+
+    def blocked_for(self) -> float:
+        """Seconds left on a server-imposed back-off, seen by every worker"""
+        blocked_until = self._local_blocked_until
+        if self._shared:
+            try:
+                blocked_until = max(blocked_until, float(self._get_cache().get(f"{self.key}:blocked_until") or 0))
+            except Exception as e:
+                logger.warning(f"Could not read rate limit back-off for {self.key}: {e}")
+        return max(0.0, blocked_until - time.time())
+
+    def penalize(self, seconds: float) -> None:
+        """Stop all callers for the given number of seconds"""
+        if seconds <= 0:
+            return
+        blocked_until = time.time() + seconds
+        self._local_blocked_until = max(self._local_blocked_until, blocked_until)
+        self.stats['penalties'] += 1
+        if self._shared:
+            try:
+                self._get_cache().set(f"{self.key}:blocked_until", blocked_until, timeout=math.ceil(seconds) + 1)
+            except Exception as e:
+                logger.warning(f"Could not share rate limit back-off for {self.key}: {e}")
+        logger.warning(f"Rate limit back-off of {seconds:.1f}s for {self.key}")
+
+    def update_from_headers(self, headers: Mapping[str, Any], default: Optional[float] = None) -> Optional[float]:
+        """Apply Retry-After / X-RateLimit-Reset from a response, or the default if they are missing"""
+        seconds = retry_after_seconds(headers)
+        if seconds is None:
+            seconds = default
+        if seconds:
+            self.penalize(seconds)
+        return seconds
+
+    def _next_wait(self, tokens: float) -> float:
+        """Take tokens if possible, otherwise return how long to wait before retrying"""
+        blocked = self.blocked_for()
+        if blocked > 0:
+            return blocked
+        allowed, _, wait = self._take(tokens)
+        if allowed:
+            self.stats['acquired'] += 1
+            return 0.0
+        return max(wait, 0.01)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens without waiting"""
+        return self._next_wait(tokens) == 0.0
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available. Returns False if the timeout runs out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._sync_lock:
+            throttled = False
+            while True:
+                wait = self._next_wait(tokens)
+                if wait == 0.0:
+                    return True
+                if not throttled:
+                    self.stats['throttled'] += 1
+                    throttled = True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                wait = min(wait, MAX_WAIT_STEP)
+                self.stats['waited_seconds'] += wait
+                time.sleep(wait)
+
+    def _async_queue(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_queues:
+            self._async_queues[loop] = asyncio.Lock()
+        return self._async_queues[loop]
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for tokens without blocking the event loop. Waiters queue on a
+        FIFO lock, so earlier requests are never starved by later ones.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Shared stores make cache round trips, run those off the event loop
+        next_wait = sync_to_async(self._next_wait, thread_sensitive=False) if self._shared else None
+        async with self._async_queue():
+            throttled = False
+            while True:
+                wait = await next_wait(tokens) if next_wait else self._next_wait(tokens)
+                if wait == 0.0:
+                    return True
+                if not throttled:
+                    self.stats['throttled'] += 1
+                    throttled = True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                wait = min(wait, MAX_WAIT_STEP)
+                self.stats['waited_seconds'] += wait
+                await asyncio.sleep(wait)
+
+    def utilization(self) -> Dict[str, Any]:
+        """Current budget usage, for logging and monitoring"""
+        _, available, _ = self._take(0)
+        return {
+            'key': self.key,
+            'rate_per_second': self.rate,
+            'capacity': self.capacity,
+            'available': round(available, 2),
+            'utilization': round(1 - available / self.capacity, 3),
+            'blocked_for_seconds': round(self.blocked_for(), 2),
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in self.stats.items()},
+        }
+
+
+_limiters: Dict[str, TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, rate: float, capacity: float) -> TokenBucketLimiter:
+    """Get the process-wide limiter for a key, creating it on first use"""
+    limiter = _limiters.get(key)
+    if limiter is not None:
+        return limiter
+
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucketLimiter(key, rate, capacity)
+            _limiters[key] = limiter
+            logger.info(f"Created rate limiter {key}: {rate:.2f}/s, burst {capacity:g}")
+    return limiter
+
+
+def reset_rate_limiters() -> None:
+    """Drop all process-wide limiters, e.g. after settings change in benchmarks"""
+    with _limiters_lock:
+        _limiters.clear()
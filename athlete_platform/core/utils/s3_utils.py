@@ -1,26 +1,55 @@
-import boto3
-from botocore.exceptions import NoCredentialsError
+from botocore.exceptions import NoCredentialsError, ClientError
 import json
 from django.conf import settings
+from .aws_clients import get_s3_client
+from .json_codec import encode_json, decode_json, available_codecs, IDENTITY
 from typing import Any, List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, timezone, date as date_type
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import functools
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Per-prefix index of the latest object for every day, see get_manifest()
+MANIFEST_FILENAME = '_manifest.json'
+MANIFEST_VERSION = 1
+MANIFEST_WRITE_ATTEMPTS = 3
+# Cached manifests older than this are revalidated against S3 by ETag
+MANIFEST_CACHE_SECONDS = 30
+DEFAULT_FETCH_MAX_WORKERS = 8
+
+
+@functools.lru_cache(maxsize=None)
+def _warn_unavailable_codec(codec: str) -> None:
+    # S3Utils is built per request and processor, so only warn once per process
+    logger.warning(f"S3 JSON codec '{codec}' is unavailable, expected one of {available_codecs()}")
+
+
 class S3Utils:
-    def __init__(self):
-        self.client = self._get_client()
-        self.bucket = settings.AWS_STORAGE_BUCKET_NAME
+    def __init__(self, client=None, bucket: Optional[str] = None, codec: Optional[str] = None,
+                 fetch_workers: Optional[int] = None, manifest_ttl: float = MANIFEST_CACHE_SECONDS):
+        self.client = client or self._get_client()
+        self.bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+        self.codec = codec or getattr(settings, 'S3_JSON_CODEC', IDENTITY)
+        if self.codec not in available_codecs():
+            _warn_unavailable_codec(self.codec)
+        self.fetch_workers = fetch_workers or getattr(settings, 'S3_FETCH_MAX_WORKERS', DEFAULT_FETCH_MAX_WORKERS)
+        self.manifest_ttl = manifest_ttl
+        # base_path -> (manifest, etag, fetched_at) for manifests already read by this instance
+        self._manifests: Dict[str, Any] = {}
+        # base_path -> {day: entry} written by store_json_data inside manifest_batch()
+        self._pending_manifest: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._batch_depth = 0
+        self._batch_lock = threading.Lock()
 
     def _get_client(self):
-        """Initialize S3 client with error handling"""
+        """Get the shared, pooled S3 client with error handling"""
         try:
-            return boto3.client('s3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME
-            )
+            return get_s3_client()
         except Exception as e:
             logger.error(f"Failed to initialize S3 client: {e}")
             return None
@@ -56,30 +85,20 @@ class S3Utils:
     def check_data_freshness(self, base_path: str, date_range: List[datetime.date], required_fields: Optional[List[str]] = None) -> bool:
         """
         Generic data freshness checker for S3
-        - Checks if data exists for all dates
+        - Checks if data exists for all dates using the day-index manifest
         - Optionally validates required fields in the data
-        - Handles pagination for large date ranges
         """
         try:
-            date_files = set()
-            paginator = self.client.get_paginator('list_objects_v2')
-            
-            for page in paginator.paginate(Bucket=self.bucket, Prefix=base_path):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        date_str = self._extract_date_from_key(obj['Key'])
-                        if date_str:
-                            date_files.add(date_str)
-            
-            required_dates = {d.strftime('%Y%m%d') for d in date_range}
+            available = self.get_manifest(base_path)
+            required_dates = {self._day_key(d) for d in date_range}
             
             # If no field validation needed, just check dates
             if not required_fields:
-                return required_dates.issubset(date_files)
+                return required_dates.issubset(available.keys())
             
             # Validate fields in each file
-            for date_str in required_dates:
-                data = self.get_latest_json_data(base_path, datetime.strptime(date_str, '%Y%m%d').date())
+            for day in required_dates:
+                data = self.get_latest_json_data(base_path, day)
                 if not data or not all(field in data for field in required_fields):
                     return False
             
@@ -90,47 +109,298 @@ class S3Utils:
             return False
 
     def _extract_date_from_key(self, key: str) -> Optional[str]:
-        """Extract date string from S3 key"""
+        """Extract date string (YYYYMMDD) from S3 key"""
+        day = self._extract_day_from_key(key)
+        return day.replace('-', '') if day else None
+
+    def _extract_day_from_key(self, key: str) -> Optional[str]:
+        """Extract ISO date (YYYY-MM-DD) from keys like path/to/YYYY-MM-DD_raw.json or path/to/YYYYMMDD_*.json"""
         try:
-            # Expected format: path/to/YYYYMMDD_*.json
             filename = key.split('/')[-1]
-            if '_' in filename:
-                date_str = filename.split('_')[0]
-                # Validate it's a proper date string
-                datetime.strptime(date_str, '%Y%m%d')
-                return date_str
+            if '_' not in filename or not filename.endswith('.json'):
+                return None
+            date_str = filename.split('_')[0]
+            for fmt in ('%Y-%m-%d', '%Y%m%d'):
+                try:
+                    return datetime.strptime(date_str, fmt).date().isoformat()
+                except ValueError:
+                    continue
             return None
-        except (IndexError, ValueError):
+        except IndexError:
             return None
 
+    @staticmethod
+    def _day_key(value: Any) -> str:
+        """Normalize a date, datetime or date string to the manifest's YYYY-MM-DD key"""
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, date_type):
+            return value.isoformat()
+        return str(value)[:10]
+
+    def _manifest_key(self, base_path: str) -> str:
+        return f"{base_path.strip('/')}/{MANIFEST_FILENAME}"
+
+    def get_manifest(self, base_path: str, refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the day index for a prefix as {YYYY-MM-DD: {key, etag, size, last_modified}}.
+
+        The manifest is a single object stored next to the daily files, so date lookups
+        and freshness checks cost one GET instead of a listing per date. If it does not
+        exist (or cannot be read) it is rebuilt from one paginated listing.
+
+        A cached manifest is reused for manifest_ttl seconds, after that it is
+        revalidated with a conditional GET so writes from other workers show up.
+        """
+        base_path = base_path.strip('/')
+        cached = None if refresh else self._manifests.get(base_path)
+        if cached and time.monotonic() - cached[2] < self.manifest_ttl:
+            return cached[0]['days']
+
+        params = {'Bucket': self.bucket, 'Key': self._manifest_key(base_path)}
+        if cached and cached[1]:
+            params['IfNoneMatch'] = cached[1]
+        try:
+            obj = self.client.get_object(**params)
+            manifest = json.loads(obj['Body'].read())
+            if manifest.get('version') == MANIFEST_VERSION and isinstance(manifest.get('days'), dict):
+                # Days stored in an open batch are not in S3 yet
+                with self._batch_lock:
+                    manifest['days'].update(self._pending_manifest.get(base_path, {}))
+                self._manifests[base_path] = (manifest, obj.get('ETag'), time.monotonic())
+                return manifest['days']
+            logger.warning(f"Unsupported manifest format at {base_path}, rebuilding")
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in ('304', 'NotModified'):
+                # Unchanged since we read it
+                self._manifests[base_path] = (cached[0], cached[1], time.monotonic())
+                return cached[0]['days']
+            if code not in ('NoSuchKey', '404'):
+                logger.error(f"Error reading manifest for {base_path}: {e}")
+        except Exception as e:
+            logger.error(f"Error reading manifest for {base_path}: {e}")
+
+        return self.rebuild_manifest(base_path)
+
+    def rebuild_manifest(self, base_path: str) -> Dict[str, Dict[str, Any]]:
+        """Rebuild the day index for a prefix from a single paginated listing"""
+        base_path = base_path.strip('/')
+        days: Dict[str, Dict[str, Any]] = {}
+        try:
+            paginator = self.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{base_path}/"):
+                for obj in page.get('Contents', []):
+                    day = self._extract_day_from_key(obj['Key'])
+                    if not day:
+                        continue
+                    last_modified = obj['LastModified'].isoformat()
+                    current = days.get(day)
+                    if current is None or last_modified >= current['last_modified']:
+                        days[day] = {
+                            'key': obj['Key'],
+                            'etag': obj.get('ETag'),
+                            'size': obj.get('Size'),
+                            'last_modified': last_modified,
+                        }
+        except Exception as e:
+            logger.error(f"Error rebuilding manifest for {base_path}: {e}")
+            return {}
+
+        manifest = {'version': MANIFEST_VERSION, 'updated_at': datetime.now(timezone.utc).isoformat(), 'days': days}
+        etag = None
+        # Nothing to index yet, don't create manifests under empty prefixes
+        if days:
+            try:
+                etag = self._put_manifest(base_path, manifest)
+            except Exception as e:
+                logger.warning(f"Could not write manifest for {base_path}: {e}")
+        self._manifests[base_path] = (manifest, etag, time.monotonic())
+        logger.info(f"Rebuilt manifest for {base_path} with {len(days)} days")
+        return days
+
+    def _put_manifest(self, base_path: str, manifest: Dict[str, Any], if_match: Optional[str] = None) -> Optional[str]:
+        params = {
+            'Bucket': self.bucket,
+            'Key': self._manifest_key(base_path),
+            'Body': json.dumps(manifest, separators=(',', ':')),
+            'ContentType': 'application/json',
+        }
+        if if_match:
+            params['IfMatch'] = if_match
+        response = self.client.put_object(**params)
+        return response.get('ETag')
+
+    def _update_manifest(self, base_path: str, key: str, etag: Optional[str], size: int) -> None:
+        """Record a freshly written day file in the prefix manifest, or in the open batch"""
+        base_path = base_path.strip('/')
+        day = self._extract_day_from_key(key)
+        if not day:
+            return
+        entry = {
+            'key': key,
+            'etag': etag,
+            'size': size,
+            'last_modified': datetime.now(timezone.utc).isoformat(),
+        }
+        with self._batch_lock:
+            if self._batch_depth:
+                self._pending_manifest.setdefault(base_path, {})[day] = entry
+                # Reads in the meantime see the day already
+                if base_path in self._manifests:
+                    self._manifests[base_path][0]['days'][day] = entry
+                return
+        self._write_manifest_entries(base_path, {day: entry})
+
+    @contextmanager
+    def manifest_batch(self):
+        """
+        Defer manifest updates from store_json_data until the block ends, then
+        write each prefix's manifest once. A sync storing 30 days costs one
+        manifest read and write instead of 30.
+        """
+        with self._batch_lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._batch_lock:
+                self._batch_depth -= 1
+                pending = {}
+                if not self._batch_depth:
+                    pending, self._pending_manifest = self._pending_manifest, {}
+            for base_path, entries in pending.items():
+                self._write_manifest_entries(base_path, entries)
+
+    def _write_manifest_entries(self, base_path: str, entries: Dict[str, Dict[str, Any]]) -> None:
+        for attempt in range(MANIFEST_WRITE_ATTEMPTS):
+            try:
+                refreshed = base_path not in self._manifests or attempt
+                if refreshed:
+                    self.get_manifest(base_path, refresh=True)
+                manifest, manifest_etag, _ = self._manifests[base_path]
+                current = manifest['days']
+                if refreshed and manifest_etag and all(
+                    (current.get(day) or {}).get('key') == entry['key'] and current[day].get('etag') == entry['etag']
+                    for day, entry in entries.items()
+                ):
+                    # rebuild_manifest() listed the new files and already wrote them
+                    return
+                manifest['days'].update(entries)
+                manifest['updated_at'] = max(entry['last_modified'] for entry in entries.values())
+                new_etag = self._put_manifest(base_path, manifest, if_match=manifest_etag)
+                self._manifests[base_path] = (manifest, new_etag, time.monotonic())
+                return
+            except ClientError as e:
+                # Another writer updated the manifest since we read it, merge and retry
+                if e.response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                    continue
+                logger.error(f"Error updating manifest for {base_path}: {e}")
+                break
+            except Exception as e:
+                logger.error(f"Error updating manifest for {base_path}: {e}")
+                break
+        # Leave it to the next reader to rebuild from a listing
+        self._manifests.pop(base_path, None)
+
+    def get_latest_key(self, base_path: str, date: Any) -> Optional[str]:
+        """Get the key of the latest object for a date from the manifest"""
+        entry = self.get_manifest(base_path).get(self._day_key(date))
+        return entry['key'] if entry else None
+
+    def get_available_dates(self, base_path: str) -> set:
+        """Get the set of dates that have data under a prefix"""
+        return {
+            datetime.strptime(day, '%Y-%m-%d').date()
+            for day in self.get_manifest(base_path)
+        }
+
     def get_latest_json_data(self, base_path: str, date: datetime.date) -> Optional[dict]:
         """Get latest JSON data for a given date"""
         try:
-            # logger.info(f"Getting latest JSON data at {base_path}/{date}_raw.json")
-            date_prefix = f"{base_path}/{date}_raw.json"
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket,
-                Prefix=date_prefix
-            )
-            
-            if 'Contents' not in response:
+            key = self.get_latest_key(base_path, date)
+            if not key:
                 return None
             
-            # Get the latest file for this date
-            latest = max(response['Contents'], key=lambda x: x['LastModified'])
-            logger.info(f"Latest file: {latest['Key']}")
-            obj = self.client.get_object(
-                Bucket=self.bucket,
-                Key=latest['Key']
-            )
+            logger.info(f"Latest file: {key}")
+            try:
+                obj = self.client.get_object(
+                    Bucket=self.bucket,
+                    Key=key
+                )
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'NoSuchKey':
+                    raise
+                # Manifest points at a deleted object, re-index and try once more
+                key = self.rebuild_manifest(base_path).get(self._day_key(date), {}).get('key')
+                if not key:
+                    return None
+                obj = self.client.get_object(Bucket=self.bucket, Key=key)
             
-            return json.loads(obj['Body'].read())
+            return decode_json(obj['Body'].read(), obj.get('ContentEncoding'))
             
         except Exception as e:
             logger.error(f"Error getting latest JSON data: {e}")
             return None 
-        
 
+    def _fetch_json(self, key: str) -> Dict[str, Any]:
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=key)
+            return {'data': decode_json(obj['Body'].read(), obj.get('ContentEncoding')), 'error': None}
+        except Exception as e:
+            return {'data': None, 'error': str(e)}
+
+    def fetch_many(self, keys: List[str], max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch and decode several JSON objects concurrently.
+
+        GETs run on a bounded thread pool sharing this instance's client (boto3 clients
+        are thread-safe). Returns {key: {'data': payload or None, 'error': message or None}}
+        in the same order as keys, so callers can report failures per key.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        max_workers = max(1, min(max_workers or self.fetch_workers, len(keys)))
+
+        if max_workers == 1:
+            results = [self._fetch_json(key) for key in keys]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-fetch') as executor:
+                results = list(executor.map(self._fetch_json, keys))
+
+        fetched = dict(zip(keys, results))
+        failed = {key: result['error'] for key, result in fetched.items() if result['error']}
+        if failed:
+            logger.warning(f"Failed to fetch {len(failed)} of {len(keys)} S3 objects: {failed}")
+        return fetched
+
+    def get_latest_json_data_many(self, base_path: str, dates: List[Any], max_workers: Optional[int] = None) -> Dict[Any, Optional[dict]]:
+        """
+        Get the latest JSON data for several dates with one manifest read and concurrent GETs.
+
+        Returns {date: payload} ordered by date. Dates with no data, or whose fetch
+        failed, map to None.
+        """
+        try:
+            manifest = self.get_manifest(base_path)
+        except Exception as e:
+            logger.error(f"Error reading manifest for {base_path}: {e}")
+            return {}
+
+        ordered_dates = sorted(set(dates), key=self._day_key)
+        keys_by_date = {}
+        for current_date in ordered_dates:
+            entry = manifest.get(self._day_key(current_date))
+            if entry:
+                keys_by_date[current_date] = entry['key']
+
+        fetched = self.fetch_many(list(keys_by_date.values()), max_workers=max_workers)
+        return {
+            current_date: fetched[keys_by_date[current_date]]['data'] if current_date in keys_by_date else None
+            for current_date in ordered_dates
+        }
 
     def get_latest_json_data_full_path(self, full_path: str) -> Optional[dict]:
         """Get latest JSON data for a given full path"""
@@ -153,7 +423,7 @@ class S3Utils:
                 Key=latest['Key']
             )
             
-            return json.loads(obj['Body'].read())
+            return decode_json(obj['Body'].read(), obj.get('ContentEncoding'))
             
         except Exception as e:
             # logger.error(f"Error getting latest JSON data: {e}")
@@ -171,29 +441,46 @@ class S3Utils:
         """Put object in S3"""
         return self.client.put_object(Bucket=Bucket, Key=Key, Body=Body, ContentType=ContentType)
 
-    def store_json_data(self, base_path: str, filename: str, data: Any) -> bool:
+    def store_json_data(self, base_path: str, filename: str, data: Any, codec: Optional[str] = None) -> bool:
         """Store JSON data in S3 with proper path handling
         
         Args:
             base_path: Base path in S3 (e.g. 'accounts/123/biometric-data/garmin')
             filename: Name of file (e.g. '20240315_raw.json')
             data: Data to store (will be converted to JSON if not already)
+            codec: 'gzip' or 'zstd' to store compact, compressed JSON with a
+                Content-Encoding header. Defaults to the instance codec
+                (settings.S3_JSON_CODEC).
         """
         try:
             # Ensure path is properly formatted
             full_path = f"{base_path.strip('/')}/{filename}"
+            codec = codec or self.codec
             
-            # Convert data to JSON if it isn't already a string
-            if not isinstance(data, str):
-                data = json.dumps(data, indent=2)
+            params = {
+                'Bucket': self.bucket,
+                'Key': full_path,
+                'ContentType': 'application/json',
+            }
+            if codec == IDENTITY:
+                # Convert data to JSON if it isn't already a string
+                if not isinstance(data, str):
+                    data = json.dumps(data, indent=2)
+                params['Body'] = data.encode('utf-8')
+            else:
+                params['Body'], content_encoding = encode_json(data, codec)
+                if content_encoding:
+                    params['ContentEncoding'] = content_encoding
                 
-            self.client.put_object(
-                Bucket=self.bucket,
-                Key=full_path,
-                Body=data,
-                ContentType='application/json'
-            )
+            response = self.client.put_object(**params)
             logger.info(f"Successfully stored data at: {full_path}")
+            
+            self._update_manifest(
+                base_path,
+                full_path,
+                response.get('ETag'),
+                len(params['Body'])
+            )
             return True
             
         except Exception as e:
@@ -209,15 +496,11 @@ class S3Utils:
                 Prefix=base_path
             )
             
-            all_data = []
-            for obj in objects.get('Contents', []):
-                if obj['Key'].endswith('.json'):
-                    response = self.client.get_object(
-                        Bucket=self.bucket,
-                        Key=obj['Key']
-                    )
-                    data = json.loads(response['Body'].read().decode('utf-8'))
-                    all_data.append(data)
+            keys = [
+                obj['Key'] for obj in objects.get('Contents', [])
+                if obj['Key'].endswith('.json') and not obj['Key'].endswith(MANIFEST_FILENAME)
+            ]
+            all_data = [result['data'] for result in self.fetch_many(keys).values() if result['data'] is not None]
                     
             return sorted(all_data, key=lambda x: x.get('date', ''), reverse=True)
         except Exception as e:
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def contiguous_ranges(dates: Iterable[date]) -> List[Tuple[date, date]]:
+    """Sorted (start, end) runs of consecutive days covering exactly the given dates"""
+    ranges = []
+    for current_date in sorted(set(dates)):
+        if ranges and current_date == ranges[-1][1] + timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], current_date)
+        else:
+            ranges.append((current_date, current_date))
+    return ranges
+
+
+class FetchCostModel:
+    """
+    Estimated API requests of fetching a date range from a source: a fixed
+    cost per range, plus a cost per day in it
+    """
+
+    def __init__(self, range_requests: float = 0.0, day_requests: float = 1.0):
+        self.range_requests = range_requests
+        self.day_requests = day_requests
+
+    def cost(self, days: int) -> float:
+        return self.range_requests + self.day_requests * days
+
+    def merges(self, gap_days: int) -> bool:
+        """Whether refetching a gap of held days costs less than fetching the ranges either side separately"""
+        return self.day_requests * gap_days < self.range_requests
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'range_requests': self.range_requests, 'day_requests': self.day_requests}
+
+
+class FetchRange:
+    """Days to fetch in one collector call, of which `missing` were not held"""
+
+    def __init__(self, start: date, end: date, missing: int):
+        self.start = start
+        self.end = end
+        self.missing = missing
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def dates(self) -> List[date]:
+        return [self.start + timedelta(days=offset) for offset in range(self.days)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start_date': self.start.isoformat(),
+            'end_date': self.end.isoformat(),
+            'days': self.days,
+            'missing_days': self.missing,
+        }
+
+
+class SyncPlan:
+    """
+    The ranges a source sync fetches to fill the missing days of its window.
+
+    Missing days become contiguous ranges, so held days between gaps are not
+    refetched the way a single min(missing)..max(missing) fetch would. With
+    merge_gaps, ranges are joined across a gap whenever the cost model says
+    refetching the gap's held days is cheaper than paying for another range.
+    """
+
+    def __init__(self, source: str, start_date: date, end_date: date, missing_dates: Iterable[date],
+                 cost_model: Optional[FetchCostModel] = None, merge_gaps: bool = False):
+        self.source = source
+        self.start_date = start_date
+        self.end_date = end_date
+        self.missing_dates = sorted(set(missing_dates))
+        self._missing = set(self.missing_dates)
+        self.cost_model = cost_model or FetchCostModel()
+        self.merge_gaps = merge_gaps
+        self.ranges = self._plan_ranges()
+
+    def _plan_ranges(self) -> List[FetchRange]:
+        ranges: List[FetchRange] = []
+        for start, end in contiguous_ranges(self.missing_dates):
+            missing = (end - start).days + 1
+            # Each gap is priced on its own, so deciding them one at a time gives the cheapest plan
+            if ranges and self.merge_gaps and self.cost_model.merges((start - ranges[-1].end).days - 1):
+                ranges[-1] = FetchRange(ranges[-1].start, end, ranges[-1].missing + missing)
+            else:
+                ranges.append(FetchRange(start, end, missing))
+        return ranges
+
+    @property
+    def fetch_days(self) -> int:
+        return sum(fetch_range.days for fetch_range in self.ranges)
+
+    @property
+    def estimated_requests(self) -> float:
+        return sum(self.cost_model.cost(fetch_range.days) for fetch_range in self.ranges)
+
+    @property
+    def span_requests(self) -> float:
+        """Estimated requests of fetching min(missing)..max(missing) in one range"""
+        if not self.missing_dates:
+            return 0.0
+        return self.cost_model.cost((self.missing_dates[-1] - self.missing_dates[0]).days + 1)
+
+    def is_missing(self, current_date: date) -> bool:
+        """Whether a day was missing, rather than held and only refetched to save a range"""
+        return current_date in self._missing
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __str__(self) -> str:
+        ranges = ', '.join(f"{r.start}..{r.end}" for r in self.ranges) or 'nothing'
+        return (f"{self.source} plan for {self.start_date}..{self.end_date}: {len(self.missing_dates)} missing days "
+                f"in {len(self.ranges)} ranges ({ranges}), ~{self.estimated_requests:.1f} requests")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'source': self.source,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'missing_dates': [current_date.isoformat() for current_date in self.missing_dates],
+            'ranges': [fetch_range.to_dict() for fetch_range in self.ranges],
+            'fetch_days': self.fetch_days,
+            'merge_gaps': self.merge_gaps,
+            'cost_model': self.cost_model.to_dict(),
+            'estimated_requests': round(self.estimated_requests, 2),
+            'span_requests': round(self.span_requests, 2),
+        }
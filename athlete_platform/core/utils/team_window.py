@@ -0,0 +1,115 @@
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TeamWindow:
+    """
+    Columnar view of a team's biometric rows over a date window.
+
+    Values are held in a float array indexed athlete x day x source x column,
+    with NaN wherever a row or a value is missing. Sources get their own axis
+    because an athlete can have a Garmin and a WHOOP row for the same day, and
+    the statistics count every row the way the per-row queries did.
+    """
+
+    def __init__(self, athlete_ids: Sequence[Any], dates: Sequence[date], sources: Sequence[str],
+                 columns: Sequence[str], values: np.ndarray, rows: np.ndarray):
+        self.athlete_ids = list(athlete_ids)
+        self.dates = list(dates)
+        self.sources = list(sources)
+        self.columns = list(columns)
+        self.values = values
+        # True where the athlete has a row for that day and source
+        self.rows = rows
+        self._athlete_index = {str(athlete_id): i for i, athlete_id in enumerate(self.athlete_ids)}
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+        self._stats: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def from_rows(cls, athlete_ids: Sequence[Any], start_date: date, end_date: date, columns: Sequence[str],
+                  rows: Iterable[Sequence[Any]]) -> 'TeamWindow':
+        """
+        Build a window from (athlete_id, date, source, *column values) tuples,
+        as returned by values_list('athlete_id', 'date', 'source', *columns)
+        """
+        rows = list(rows)
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        sources = sorted({row[2] for row in rows}) or ['']
+
+        # Rows carry the same ID type as athlete_ids, string keys cover the rest
+        athlete_index = {str(athlete_id): i for i, athlete_id in enumerate(athlete_ids)}
+        athlete_index.update({athlete_id: i for i, athlete_id in enumerate(athlete_ids)})
+        source_index = {source: i for i, source in enumerate(sources)}
+
+        values = np.full((len(athlete_ids), len(dates), len(sources), len(columns)), np.nan)
+        present = np.zeros((len(athlete_ids), len(dates), len(sources)), dtype=bool)
+        if not rows:
+            return cls(athlete_ids, dates, sources, columns, values, present)
+
+        a = np.fromiter((athlete_index.get(row[0], athlete_index.get(str(row[0]), -1)) for row in rows), dtype=np.intp, count=len(rows))
+        d = np.fromiter(((row[1] - start_date).days for row in rows), dtype=np.intp, count=len(rows))
+        s = np.fromiter((source_index[row[2]] for row in rows), dtype=np.intp, count=len(rows))
+        # None becomes NaN when the object array is cast
+        block = np.array([row[3:] for row in rows], dtype=object).reshape(len(rows), len(columns))
+        block = np.where(block == None, np.nan, block).astype(float)  # noqa: E711
+
+        keep = (a >= 0) & (d >= 0) & (d < len(dates))
+        if not keep.all():
+            logger.debug(f"Dropping {int((~keep).sum())} rows outside the team window")
+        values[a[keep], d[keep], s[keep]] = block[keep]
+        present[a[keep], d[keep], s[keep]] = True
+        return cls(athlete_ids, dates, sources, columns, values, present)
+
+    def athlete_position(self, athlete_id: Any) -> Optional[int]:
+        """Index of an athlete on the first axis, or None if they are not in the window"""
+        return self._athlete_index.get(str(athlete_id))
+
+    def column(self, column: str) -> np.ndarray:
+        """athlete x day x source values for one column"""
+        return self.values[..., self._column_index[column]]
+
+    def row_counts(self) -> np.ndarray:
+        """Number of rows per athlete"""
+        return self.rows.sum(axis=(1, 2))
+
+    def athlete_stats(self, column: str) -> Dict[str, np.ndarray]:
+        """Per athlete count, mean, min and max of a column over the window, NaN where there is no value"""
+        if column in self._stats:
+            return self._stats[column]
+        values = self.column(column)
+        mask = ~np.isnan(values)
+        count = mask.sum(axis=(1, 2))
+        total = np.where(mask, values, 0.0).sum(axis=(1, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+        self._stats[column] = {
+            'count': count,
+            'mean': mean,
+            'min': np.where(count > 0, np.where(mask, values, np.inf).min(axis=(1, 2)), np.nan),
+            'max': np.where(count > 0, np.where(mask, values, -np.inf).max(axis=(1, 2)), np.nan),
+        }
+        return self._stats[column]
+
+    def group_mean_of_means(self, column: str, athletes: Optional[np.ndarray] = None) -> Optional[float]:
+        """Average of the per-athlete means across the selected athletes that have a value"""
+        means = self.athlete_stats(column)['mean']
+        if athletes is not None:
+            means = means[athletes]
+        means = means[~np.isnan(means)]
+        return float(means.mean()) if means.size else None
+
+    def athlete_block(self, index: int, columns: Optional[Sequence[str]] = None) -> Tuple[List[date], np.ndarray]:
+        """
+        An athlete's rows in date order (sources in name order within a day)
+        as their dates and a rows x columns array with NaN for missing values
+        """
+        days, sources = np.nonzero(self.rows[index])
+        block = self.values[index, days, sources]
+        if columns is not None:
+            block = block[:, [self._column_index[column] for column in columns]]
+        return [self.dates[day] for day in days.tolist()], block
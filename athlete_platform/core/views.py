@@ -39,7 +39,11 @@ from .ai_insights import (
     get_insight_trends_for_athlete
 )
 from .services.coach_data_sync_service import CoachDataSyncService
+from .services.sync_job_service import SyncJobService
+from .services.team_snapshot_service import TeamSnapshotService
+from .models import SyncJob
 from .permissions import IsCoach
+from django.urls import reverse
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -200,11 +204,11 @@ def sync_on_login(sender, request, user, **kwargs):
             pass
     
     # If we get here, either skip_sync was not set or there was an error parsing the request
-    # Proceed with normal sync behavior
+    # Queue the sync so login doesn't wait on WHOOP/Garmin
     try:
         if hasattr(user, 'athlete'):
-            sync_service = DataSyncService(user.athlete)
-            sync_service.sync_data()
+            job = SyncJobService().enqueue_athlete_sync(user.athlete, requested_by=user, reason='login')
+            request.session['sync_job_id'] = str(job.id)
         else:
             logger.warning(f"No athlete profile found for user {user.id}")
     except Exception as e:
@@ -252,26 +256,16 @@ def sync_biometric_data(request):
                     'error': f'Source {source} is not active'
                 }, status=400)
 
-        # Initialize sync service and sync data with force_refresh parameter
-        sync_service = DataSyncService(athlete)
-        success = sync_service.sync_specific_sources(active_sources, force_refresh=force_refresh)
-        
-        # Include source-specific error messages if available
-        source_errors = {}
-        for source, result in success.items():
-            if not result:
-                # Check if there's a specific error in the logger for this source
-                # This is a simplification - in reality you might want to capture errors during sync
-                if 'garmin' in source.lower() and hasattr(sync_service, 'last_garmin_error'):
-                    source_errors[source] = sync_service.last_garmin_error
-                elif 'whoop' in source.lower() and hasattr(sync_service, 'last_whoop_error'):
-                    source_errors[source] = sync_service.last_whoop_error
+        # Queue the sync, the job result has the per-source success and errors
+        job = SyncJobService().enqueue_athlete_sync(
+            athlete,
+            sources=active_sources,
+            force_refresh=force_refresh,
+            requested_by=request.user,
+            reason='manual'
+        )
 
-        return JsonResponse({
-            'success': success,
-            'data': [] if not any(success.values()) else '',
-            'errors': source_errors
-        })
+        return JsonResponse(_sync_job_response(job), status=202)
 
     except Exception as e:
         error_message = str(e)
@@ -288,6 +282,54 @@ def sync_biometric_data(request):
             'error': error_message
         }, status=status_code)
 
+def _query_flag(request, name):
+    """A true/false query parameter, or None when it isn't given"""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def plan_biometric_sync(request):
+    """
+    Dry run of a sync: the date ranges each active source would fetch from
+    its API and the estimated requests, without fetching anything
+    """
+    try:
+        athlete = request.user.athlete
+    except Athlete.DoesNotExist:
+        return Response({"error": "Athlete profile not found"}, status=404)
+    
+    try:
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return Response({"error": "start_date and end_date must be YYYY-MM-DD"}, status=400)
+    if start_date and end_date and start_date > end_date:
+        return Response({"error": "start_date must not be after end_date"}, status=400)
+    
+    try:
+        service = DataSyncService(athlete)
+        source = request.query_params.get('source')
+        sources = [source] if source else service.active_sources
+        if not sources:
+            return Response({"error": "No active sources found"}, status=400)
+        
+        plans = service.plan_sync(
+            sources,
+            start_date=start_date,
+            end_date=end_date,
+            force_refresh=bool(_query_flag(request, 'force_refresh')),
+            merge_gaps=_query_flag(request, 'merge_gaps'),
+        )
+        return Response({"dry_run": True, "sources": plans})
+    except Exception as e:
+        logger.error(f"Error planning sync for user {request.user.id}: {str(e)}", exc_info=True)
+        return Response({"error": str(e)}, status=500)
+
 def async_safe(f):
     @wraps(f)
     def wrapper(request, *args, **kwargs):
@@ -297,6 +339,16 @@ def async_safe(f):
         return f(request, *args, **kwargs)
     return wrapper
 
+def _add_freshness_headers(response, freshness):
+    """Freshness of a stale-while-revalidate read, so the frontend knows when to poll again"""
+    response['X-Data-Last-Synced'] = freshness['last_synced'] or ''
+    response['X-Data-Stale'] = 'true' if freshness['stale'] else 'false'
+    response['X-Data-Refresh-Pending'] = 'true' if freshness['refresh_pending'] else 'false'
+    if freshness['sync_job_id']:
+        response['X-Sync-Job-Id'] = freshness['sync_job_id']
+        response['X-Sync-Status-Url'] = reverse('sync_job_status', args=[freshness['sync_job_id']])
+    return response
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @async_safe
@@ -310,68 +362,28 @@ def get_biometric_data(request):
         # Add source filter if present
         source_filter = request.GET.get('source', None)
         
-        # DEBUG: Check database directly for available sources
-        from django.db.models import Count
-        
-        # Get source counts for this athlete
-        source_counts = CoreBiometricData.objects.filter(
-            athlete=athlete
-        ).values('source').annotate(count=Count('id'))
-        
-        logger.info(f"DB source counts for athlete {athlete.id}: {list(source_counts)}")
-        
-        # ADDED: Direct query to check all available sources in the database
-        all_sources = CoreBiometricData.objects.values_list('source', flat=True).distinct()
-        logger.info(f"All sources in database: {list(all_sources)}")
-        
-        # ADDED: Check if any Garmin data exists in database for any athlete
-        garmin_count = CoreBiometricData.objects.filter(source__iexact='garmin').count()
-        logger.info(f"Total Garmin entries in database: {garmin_count}")
-        
-    
-        # Use DataSyncService to get data
         sync_service = DataSyncService(athlete)
+        freshness = None
         
-        # ADDED: Log active sources from sync_service
-        logger.info(f"Active sources from sync_service: {sync_service.active_sources}")
-        
-        # Check if Garmin processor exists and is working
-        if hasattr(sync_service, 'processors'):
-            for processor in sync_service.processors:
-                logger.info(f"Processor: {type(processor).__name__} is active")
-                
-        data = sync_service.get_biometric_data(days=days)
-        
-        # Log what's being returned by the sync service
-        if data:
-            # Count by source
-            source_distribution = {}
-            for item in data:
-                source = item.get('source', 'unknown')
-                source_distribution[source] = source_distribution.get(source, 0) + 1
-            
-            logger.info(f"API returning {len(data)} items with source distribution: {source_distribution}")
-            
-            # Log any source field inconsistencies
-            unique_sources = set(item.get('source', 'unknown') for item in data)
-            logger.info(f"Unique source values in API data: {unique_sources}")
-            
-            # Check if we should apply source filter
-            if source_filter:
-                filtered_data = [item for item in data if item.get('source', '').lower() == source_filter.lower()]
-                logger.info(f"Filtered to {len(filtered_data)} items for source '{source_filter}'")
-                data = filtered_data
+        if getattr(settings, 'BIOMETRIC_STALE_WHILE_REVALIDATE', True):
+            # Answer from the database now; a stale window is refreshed by a queued sync
+            result = sync_service.read_biometric_data(days=days)
+            data, freshness = result['data'], result['freshness']
         else:
-            logger.info(f"No data found for athlete {athlete.id}, attempting to sync")
-            sync_service.sync_specific_sources(sync_service.active_sources)
             data = sync_service.get_biometric_data(days=days)
-            
-            if source_filter and data:
-                filtered_data = [item for item in data if item.get('source', '').lower() == source_filter.lower()]
-                logger.info(f"After sync, filtered to {len(filtered_data)} items for source '{source_filter}'")
-                data = filtered_data
-        
-        return Response(data)
+            if not data:
+                logger.info(f"No data found for athlete {athlete.id}, attempting to sync")
+                sync_service.sync_specific_sources(sync_service.active_sources)
+                data = sync_service.get_biometric_data(days=days)
+        
+        if source_filter and data:
+            data = [item for item in data if (item.get('source') or '').lower() == source_filter.lower()]
+            logger.info(f"Filtered to {len(data)} items for source '{source_filter}'")
+        
+        response = Response(data)
+        if freshness:
+            _add_freshness_headers(response, freshness)
+        return response
     except Exception as e:
         logger.error(f"Error in get_biometric_data: {e}", exc_info=True)
         return Response({'error': str(e)}, status=500)
@@ -1414,6 +1426,58 @@ def training_optimization(request):
             'message': 'Failed to retrieve training optimization data'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsCoach])
+def coach_dashboard(request):
+    """
+    Get several coach dashboard sections in one payload, computed from a single
+    load of the team. ?sections= takes a comma separated list, default all.
+    """
+    try:
+        days = int(request.query_params.get('days', 7))
+        position = request.query_params.get('position', None)
+        sections = [
+            section.strip() for section in request.query_params.get('sections', '').split(',') if section.strip()
+        ] or list(CoachDataSyncService.DASHBOARD_SECTIONS)
+        
+        unknown = [section for section in sections if section not in CoachDataSyncService.DASHBOARD_SECTIONS]
+        if unknown:
+            return Response({
+                'error': f"Unknown sections: {', '.join(unknown)}",
+                'available_sections': list(CoachDataSyncService.DASHBOARD_SECTIONS)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Get coach
+        coach = None
+        if hasattr(request.user, 'coach_profile'):
+            coach = request.user.coach_profile
+        elif hasattr(request.user, 'coach'):
+            coach = request.user.coach
+        
+        # Validate coach has a team
+        if not coach or not coach.team:
+            return Response({
+                'message': 'Coach or team not found',
+                'sections': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # One service for every section, so the roster and aggregates load once
+        service = CoachDataSyncService(coach=coach)
+        data = service.get_dashboard_data(sections=sections, days=days, position=position)
+        
+        return Response({
+            'team_name': coach.team.name,
+            'days': days,
+            'sections': data
+        })
+    except Exception as e:
+        logger.error(f"Error in coach_dashboard: {str(e)}")
+        return Response({
+            'error': str(e),
+            'message': 'Failed to retrieve coach dashboard data',
+            'sections': {}
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsCoach])
 @csrf_exempt
@@ -1441,15 +1505,42 @@ def sync_team_data(request):
         days = int(request.data.get('days', 7))
         force_refresh = request.data.get('force_refresh', False)
         
-        # Initialize service and sync
-        service = CoachDataSyncService(team=team)
-        sync_result = service.sync_team_data(days=days, force_refresh=force_refresh)
+        # Queue the team sync, progress is reported per athlete on the job
+        job = SyncJobService().enqueue_team_sync(team, days=days, force_refresh=force_refresh, requested_by=request.user)
         
-        return Response(sync_result)
+        return Response(_sync_job_response(job), status=status.HTTP_202_ACCEPTED)
     except Exception as e:
         logger.error(f"Error syncing team data: {str(e)}")
         return Response({"error": str(e)}, status=500)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsCoach])
+@csrf_exempt
+def cancel_team_sync(request):
+    """
+    Stop a running team sync from starting any more athletes
+    """
+    try:
+        coach = request.user
+        team = None
+        
+        if hasattr(coach, 'coach_profile') and coach.coach_profile.team:
+            team = coach.coach_profile.team
+        elif 'team_id' in request.data:
+            try:
+                team = Team.objects.get(id=request.data.get('team_id'))
+            except Team.DoesNotExist:
+                return Response({"error": "Team not found"}, status=404)
+        
+        if not team:
+            return Response({"error": "No team associated with this coach"}, status=400)
+        
+        service = CoachDataSyncService(team=team)
+        return Response({"success": service.cancel_sync()})
+    except Exception as e:
+        logger.error(f"Error cancelling team sync: {str(e)}")
+        return Response({"error": str(e)}, status=500)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsCoach])
 def team_cached_biometrics(request):
@@ -1472,42 +1563,96 @@ def team_cached_biometrics(request):
         if not team:
             return Response({"error": "No team associated with this coach"}, status=400)
         
-        # Initialize service
-        service = CoachDataSyncService(team=team)
+        # One indexed read when the snapshot is current, regenerated here when ingest marked it stale
+        snapshot_service = TeamSnapshotService(team)
+        snapshot = snapshot_service.get()
         
-        # Try to get cached data
-        cached_data = service.get_cached_team_data()
+        if not snapshot:
+            return Response({"error": "Failed to retrieve or generate team data"}, status=500)
         
-        if not cached_data:
-            # If no cache, trigger sync and return fresh data
-            sync_result = service.sync_team_data(days=7)
-            
-            # Get most recent team summary
-            fresh_data = service.get_team_biometric_summary(days=7)
-            
-            if not fresh_data:
-                return Response({
-                    "error": "Failed to retrieve or generate team data",
-                    "sync_result": sync_result
-                }, status=500)
-                
-            return Response({
-                "success": True,
-                "cached_data": fresh_data,
-                "last_updated": timezone.now().isoformat(),
-                "sync_result": sync_result
-            })
+        etag = f'"{snapshot.etag}"'
+        if _etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
-        return Response({
+        body = {
             "success": True,
-            "cached_data": cached_data,
-            "last_updated": cached_data.get('timestamp', 'unknown')
-        })
+            "cached_data": snapshot.data.get('team_summary', {}),
+            "snapshot": snapshot.data,
+            "version": snapshot.version,
+            "last_updated": snapshot.generated_at.isoformat() if snapshot.generated_at else None
+        }
+        
+        if snapshot_service.created:
+            # First load for this team, queue a sync so the next snapshot has fresh data
+            job = SyncJobService().enqueue_team_sync(team, days=snapshot.days, requested_by=request.user)
+            body["sync_job"] = _sync_job_response(job)
+        
+        return Response(body, headers={'ETag': etag})
     
     except Exception as e:
         logger.error(f"Error retrieving cached team biometrics: {str(e)}")
         return Response({"error": str(e)}, status=500)
 
+def _etag_matches(request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag"""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    candidates = [tag.strip() for tag in header.split(',') if tag.strip()]
+    return '*' in candidates or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+def _sync_job_response(job: SyncJob) -> dict:
+    """Body returned when a sync is queued"""
+    return {
+        'success': True,
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': reverse('sync_job_status', args=[job.id]),
+    }
+
+def _get_visible_sync_job(user, job_id):
+    """A job the user requested, or one for their athlete profile or a team they coach"""
+    try:
+        job = SyncJob.objects.select_related('athlete', 'team').get(id=job_id)
+    except SyncJob.DoesNotExist:
+        return None
+    
+    if (user.is_staff
+            or job.requested_by_id == user.id
+            or (job.athlete and job.athlete.user_id == user.id)
+            or (job.team and job.team.coach_id == user.id)):
+        return job
+    return None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_job_status(request, job_id):
+    """
+    Status, progress and result of a background sync job
+    """
+    job = _get_visible_sync_job(request.user, job_id)
+    if not job:
+        return Response({"error": "Sync job not found"}, status=404)
+    
+    return Response(job.to_dict())
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@csrf_exempt
+def cancel_sync_job(request, job_id):
+    """
+    Cancel a queued sync job, or stop a running team sync from starting more athletes
+    """
+    job = _get_visible_sync_job(request.user, job_id)
+    if not job:
+        return Response({"error": "Sync job not found"}, status=404)
+    
+    try:
+        cancelled = SyncJobService().cancel(job)
+        job.refresh_from_db()
+        return Response({"success": cancelled, "job": job.to_dict()})
+    except Exception as e:
+        logger.error(f"Error cancelling sync job {job_id}: {str(e)}")
+        return Response({"error": str(e)}, status=500)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def coach_api_debug(request):
@@ -15,9 +15,31 @@ export const fetchBiometricData = async () => {
     }
 };
 
+// Sync requests are queued and answered with 202 and a status_url.
+// Poll the job until it finishes and resolve with the finished job.
+export const waitForSyncJob = async (statusUrl, { intervalMs = 2000, timeoutMs = 300000 } = {}) => {
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+        const response = await fetch(statusUrl, { credentials: 'include' });
+        if (!response.ok) {
+            throw new Error(`Failed to get sync status: ${response.statusText}`);
+        }
+        const job = await response.json();
+        if (job.status !== 'queued' && job.status !== 'running') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+    throw new Error('Sync is still running, check back later');
+};
+
 export const syncBiometricData = async () => {
     try {
         const response = await axios.post(`${BASE_URL}/biometrics/sync/`);
+        if (response.status === 202 && response.data.status_url) {
+            const job = await waitForSyncJob(response.data.status_url);
+            return job.result || { success: false, error: job.error };
+        }
         return response.data;
     } catch (error) {
         console.error('Error syncing biometric data:', error);
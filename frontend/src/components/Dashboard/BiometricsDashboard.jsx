@@ -60,6 +60,7 @@ import FormLabel from '@mui/material/FormLabel';
 import HeartRateMetrics from '../HeartRateMetrics';
 import axios from 'axios';
 import WhoopConnect from '../WhoopConnect';
+import { waitForSyncJob } from '../../api/biometricApi';
 import HomeOutlinedIcon from '@mui/icons-material/HomeOutlined';
 import DevicesOutlinedIcon from '@mui/icons-material/DevicesOutlined';
 import './BiometricsDashboard.css';
@@ -841,7 +842,13 @@ const BiometricsDashboard = ({ username }) => {
         throw new Error(`Sync failed: ${response.statusText}`);
       }
 
-      const data = await response.json();
+      let data = await response.json();
+      if (response.status === 202 && data.status_url) {
+        // The sync runs in the background, wait for its result
+        addSyncMessage('Sync started, waiting for results...', 'info');
+        const job = await waitForSyncJob(data.status_url);
+        data = job.result || { error: job.error || `Sync ${job.status}` };
+      }
       const messages = [];
       console.log('Sync data:', data);
 
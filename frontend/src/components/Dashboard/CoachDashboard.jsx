@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import '../../styles/Dashboard.css';
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, BarElement, Title, Tooltip, Legend, ArcElement } from 'chart.js';
 import { Bar, Pie } from 'react-chartjs-2';
+import { waitForSyncJob } from '../../api/biometricApi';
 
 // Register ChartJS components
 ChartJS.register(
@@ -2228,7 +2229,12 @@ const CoachDashboard = () => {
       });
       
       if (response.ok) {
-        const data = await response.json();
+        let data = await response.json();
+        if (response.status === 202 && data.status_url) {
+          // The team sync runs in the background, wait for its result
+          const job = await waitForSyncJob(data.status_url);
+          data = job.result || { message: job.error || `Sync ${job.status}` };
+        }
         console.log("Sync team data response:", data);
         
         if (data.status === "success") {